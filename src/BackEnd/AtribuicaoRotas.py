@@ -0,0 +1,110 @@
+from flask import Blueprint, request, jsonify
+import json
+import traceback
+import uuid
+from banco import conectar
+from cache_respostas import invalidar
+from autenticacao import requer_login
+
+# Blueprint da atribuição em lote (registrado em /api/atribuicao)
+atribuicao_bp = Blueprint("atribuicao_bp", __name__)
+
+# A prévia fica na tabela atribuicao_previas (migração 010) até vencer: no banco,
+# e não no cache de respostas, porque o cache em memória é de cada processo
+# (com vários workers o /aplicar caía em outro e dava 404) e o LRU podia
+# descartar a prévia antes do prazo
+TTL_PREVIA = 30 * 60
+
+
+# =====================================================
+# Prévia da atribuição dos estudantes de uma escola
+# POST /previa {"escola": "...", "distancia_max_m": 800, "rota_ids": [...], "reatribuir": false}
+# reatribuir=false só considera quem ainda não tem inscrição ativa
+# =====================================================
+@atribuicao_bp.route("/previa", methods=["POST"])
+@requer_login("gestao")
+def previa_atribuicao():
+    # atribuicao_rotas usa numpy: importado só quando usado (ver BLUEPRINTS em app.py)
+    from atribuicao_rotas import atribuir, DISTANCIA_MAX_PADRAO_M
+
+    data = request.json or {}
+    escola = data.get("escola")
+    if not escola:
+        return jsonify({"erro": "escola é obrigatória"}), 400
+    try:
+        distancia_max = float(data.get("distancia_max_m", DISTANCIA_MAX_PADRAO_M))
+    except (TypeError, ValueError):
+        return jsonify({"erro": "distancia_max_m deve ser numérica"}), 400
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor(dictionary=True)
+
+        resultado = atribuir(cursor, escola, distancia_max, data.get("rota_ids"), bool(data.get("reatribuir")))
+        previa_id = uuid.uuid4().hex
+        # Aproveita a escrita para apagar as prévias vencidas
+        cursor.execute("DELETE FROM atribuicao_previas WHERE expira_em <= NOW()")
+        cursor.execute("""
+            INSERT INTO atribuicao_previas (id, escola, dados, expira_em)
+            VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+        """, (previa_id, escola, json.dumps(resultado), TTL_PREVIA))
+        conn.commit()
+
+        resultado["previa_id"] = previa_id
+        return jsonify(resultado), 200
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+
+
+# =====================================================
+# Aplica uma prévia: grava as inscrições numa transação
+# POST /aplicar {"previa_id": "..."}
+# =====================================================
+@atribuicao_bp.route("/aplicar", methods=["POST"])
+@requer_login("gestao")
+def aplicar_atribuicao():
+    from atribuicao_rotas import gravar, CapacidadeExcedida
+
+    previa_id = (request.json or {}).get("previa_id")
+    if not previa_id:
+        return jsonify({"erro": "Prévia não encontrada ou expirada; gere outra"}), 404
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT dados FROM atribuicao_previas WHERE id = %s AND expira_em > NOW()",
+            (previa_id,)
+        )
+        linha = cursor.fetchone()
+        if linha is None:
+            return jsonify({"erro": "Prévia não encontrada ou expirada; gere outra"}), 404
+        previa = json.loads(linha[0])
+
+        inseridos, ignorados = gravar(conn, cursor, previa)
+        # vagas_ocupadas mudou nas rotas da prévia (e, ao reatribuir, nas que liberaram lugar)
+        invalidar("rotas", "rota")
+        return jsonify({
+            "mensagem": "Atribuição aplicada!",
+            "previa_id": previa_id,
+            "inscritos": inseridos,
+            "ignorados_ja_inscritos": ignorados
+        }), 201
+
+    except CapacidadeExcedida as erro:
+        return jsonify({"erro": str(erro)}), 409
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
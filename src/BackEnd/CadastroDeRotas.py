@@ -1,24 +1,20 @@
-from flask import Blueprint, request, jsonify
-import mysql.connector
+from flask import Blueprint, request, jsonify, g
+from banco import conectar
 import traceback
-import json
+from cache_respostas import em_cache, invalidar
+from autenticacao import requer_login, dono_da_url
+from paradas import salvar_paradas, carregar_paradas, colunas_rota, rotas_proximas, RAIO_PADRAO_M, RAIO_MAXIMO_M
+from respostas_json import como_dicts
+from detector_consultas import orcamento_consultas
 
 # Blueprint do módulo de rotas
 rotas_bp = Blueprint('rotas_bp', __name__)
 
-# Função para conectar ao banco de dados
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
-
 # =====================================================
-# ROTA: Cadastrar uma nova rota escolar (sem capacidade)
+# ROTA: Cadastrar uma nova rota escolar (capacidade opcional)
 # =====================================================
 @rotas_bp.route("/cadastrar", methods=["POST"])
+@requer_login("gestao")
 def cadastrar_rota():
     data = request.json
 
@@ -28,7 +24,6 @@ def cadastrar_rota():
 
         # PONTOS DE PARADA: lista de objetos {name, latitude, longitude, horario}
         pontos = data.get("pontos_parada", [])
-        pontos_serializados = json.dumps(pontos)  # Salva como JSON no banco
 
         # Inserindo a rota no banco (id é auto incremento, não passamos mais)
         cursor.execute("""
@@ -37,7 +32,7 @@ def cadastrar_rota():
                 turno, motorista_nome, motorista_telefone,
                 horario_saida_casa, horario_chegada_escola,
                 horario_saida_escola, horario_chegada_casa,
-                pontos_parada, observacoes
+                observacoes, capacidade
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (
             data.get("nome_rota"),
@@ -50,14 +45,19 @@ def cadastrar_rota():
             data.get("horario_chegada_escola"),
             data.get("horario_saida_escola"),
             data.get("horario_chegada_casa"),
-            pontos_serializados,
-            data.get("observacoes")
+            data.get("observacoes"),
+            data.get("capacidade")  # lugares no ônibus; sem valor usa UNIBUS_CAPACIDADE_PADRAO
         ))
-
-        conn.commit()
         # Pega o id gerado automaticamente
         id_rota = cursor.lastrowid
 
+        # Paradas vão para rotas_paradas, na mesma transação da rota
+        salvar_paradas(cursor, id_rota, pontos)
+        conn.commit()
+
+        # Listagens e detalhes em cache ficaram velhos
+        invalidar("rotas")
+
         return jsonify({"mensagem": "Rota cadastrada com sucesso!", "id_rota": id_rota}), 201
 
     except Exception as erro:
@@ -67,29 +67,27 @@ def cadastrar_rota():
     finally:
         if 'cursor' in locals():
             cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 
 # =====================================================
 # ROTA: Listar todas as rotas (atualizada)
+# Resposta em cache (namespace "rotas") com ETag; invalidada ao cadastrar rota
+# Cursor de tuplas: os dicts são montados de uma vez (como_dicts)
 # =====================================================
 @rotas_bp.route("/listar", methods=["GET"])
+@em_cache("rotas")
 def listar_rotas():
     try:
         conn = conectar()
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM rotas")
-        rotas = cursor.fetchall()
+        cursor.execute(f"SELECT {colunas_rota()} FROM rotas")
+        rotas = como_dicts(cursor, cursor.fetchall())
 
-        # Converter pontos de parada de JSON para lista de objetos
+        # Pontos de parada de todas as rotas numa consulta só
+        paradas = carregar_paradas(cursor)
         for rota in rotas:
-            if rota.get("pontos_parada"):
-                try:
-                    rota["pontos_parada"] = json.loads(rota["pontos_parada"])
-                except:
-                    rota["pontos_parada"] = []
+            rota["pontos_parada"] = paradas.get(rota["id"], [])
 
         return jsonify(rotas), 200
 
@@ -100,54 +98,122 @@ def listar_rotas():
     finally:
         if 'cursor' in locals():
             cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 
-# Função auxiliar para gerar coordenadas fictícias a partir do nome (para testes)
-def coordenadas_por_nome(nome):
-    base_lat = -8.28179
-    base_lng = -35.99857
-    offset = hash(nome) % 100 / 10000
-    return base_lat + offset, base_lng + offset
+# Coordenadas da escola cadastradas pela gestão (None se não houver)
+def coordenadas_escola(cursor, nome_escola):
+    cursor.execute("""
+        SELECT latitude, longitude FROM gestao
+        WHERE nome_escola = %s AND latitude IS NOT NULL AND longitude IS NOT NULL
+        LIMIT 1
+    """, (nome_escola,))
+    escola = cursor.fetchone()
+    if not escola:
+        return None, None
+    return float(escola["latitude"]), float(escola["longitude"])
+
+
+# Escola mais comum entre os inscritos ativos da rota, com localização cadastrada
+def escola_da_rota(cursor, rota_id):
+    cursor.execute("""
+        SELECT g.nome_escola, g.latitude, g.longitude, COUNT(*) AS inscritos
+        FROM inscricoes_rotas i
+        JOIN estudantes e ON e.id = i.estudante_id
+        JOIN gestao g ON g.nome_escola = e.escola
+        WHERE i.rota_id = %s AND i.status = 'ativa'
+          AND g.latitude IS NOT NULL AND g.longitude IS NOT NULL
+        GROUP BY g.nome_escola, g.latitude, g.longitude
+        ORDER BY inscritos DESC
+        LIMIT 1
+    """, (rota_id,))
+    escola = cursor.fetchone()
+    if not escola:
+        return None, None, None
+    return escola["nome_escola"], float(escola["latitude"]), float(escola["longitude"])
+
+
+# ETA da viagem em andamento, fora do cache da resposta de detalhes
+# (eta e otimizacao_rotas usam numpy: importados só quando usados, para a
+# partida do app não pagar por eles; ver BLUEPRINTS em app.py).
+# Sem viagem em andamento devolve None: o corpo em cache já traz "eta": null
+# e vai direto, sem decodificar e recalcular o ETag
+def _eta_detalhes(id_rota, id_estudante=None):
+    from eta import gerenciador as gerenciador_eta
+
+    try:
+        cursor = conectar().cursor(dictionary=True)
+        try:
+            eta = gerenciador_eta.eta_da_rota(cursor, int(id_rota))
+        finally:
+            cursor.close()
+    except Exception:
+        traceback.print_exc()
+        return None
+    return {"eta": eta} if eta is not None else None
 
 
 # =====================================================
 # ROTA: Detalhes da rota para um estudante
+# Parte fixa em cache (com "eta": null); o ETA da viagem em andamento
+# é calculado a cada requisição e substitui o null.
+# /detalhes/<rota> usa o estudante do token; /detalhes/<rota>/<estudante>
+# continua para o app antigo.
 # =====================================================
+@rotas_bp.route("/detalhes/<id_rota>", methods=["GET"])
+@orcamento_consultas(4)
+@requer_login("estudante")
+@em_cache("rota:{id_rota}", complemento=_eta_detalhes, por_usuario=True)
+def detalhes_minha_rota(id_rota):
+    return _detalhes_rota(id_rota, g.usuario["id"])
+
+
 @rotas_bp.route("/detalhes/<id_rota>/<id_estudante>", methods=["GET"])
+@orcamento_consultas(4)
+@dono_da_url("estudante", "id_estudante")
+@em_cache("rota:{id_rota}", complemento=_eta_detalhes)
 def detalhes_rota(id_rota, id_estudante):
+    return _detalhes_rota(id_rota, id_estudante)
+
+
+def _detalhes_rota(id_rota, id_estudante):
     try:
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
 
-        # Buscar rota
-        cursor.execute("SELECT * FROM rotas WHERE id = %s", (id_rota,))
+        # Rota, escola do estudante e localização da escola numa consulta só
+        cursor.execute("""
+            SELECT r.*, e.escola AS escola_do_estudante,
+                   esc.latitude AS escola_latitude, esc.longitude AS escola_longitude
+            FROM rotas r
+            LEFT JOIN estudantes e ON e.id = %s
+            LEFT JOIN LATERAL (
+                SELECT latitude, longitude FROM gestao
+                WHERE nome_escola = e.escola AND latitude IS NOT NULL AND longitude IS NOT NULL
+                LIMIT 1
+            ) esc ON TRUE
+            WHERE r.id = %s
+        """, (id_estudante, id_rota))
         rota = cursor.fetchone()
         if not rota:
             return jsonify({"erro": "Rota não encontrada"}), 404
 
-        # Transformar pontos em lista de objetos
-        pontos = rota.get("pontos_parada") or "[]"
-        try:
-            pontos_lista = json.loads(pontos)
-        except:
-            pontos_lista = []
+        escola_nome = rota.pop("escola_do_estudante")
+        escola_lat, escola_lng = rota.pop("escola_latitude"), rota.pop("escola_longitude")
+        if escola_lat is not None:
+            escola_lat, escola_lng = float(escola_lat), float(escola_lng)
 
-        # Buscar escola do estudante
-        cursor.execute("SELECT escola FROM estudantes WHERE id = %s", (id_estudante,))
-        estudante = cursor.fetchone()
-        escola_nome = estudante.get("escola") if estudante else None
+        # Pontos de parada em ordem
+        pontos_lista = carregar_paradas(cursor, [rota["id"]]).get(rota["id"], [])
 
         # Adiciona a escola do estudante como destino se não estiver na lista
-        if escola_nome and not any(p.get("name") == escola_nome for p in pontos_lista):
-            lat, lng = coordenadas_por_nome(escola_nome)
+        # (só quando a gestão informou a localização da escola)
+        if escola_lat is not None and not any(p.get("name") == escola_nome for p in pontos_lista):
             pontos_lista.append({
                 "id": len(pontos_lista)+1,
                 "name": escola_nome,
                 "type": "destination",
-                "latitude": lat,
-                "longitude": lng,
+                "latitude": escola_lat,
+                "longitude": escola_lng,
                 "horario": None
             })
 
@@ -165,9 +231,10 @@ def detalhes_rota(id_rota, id_estudante):
         rota["pontos_parada"] = pontos_lista
         rota["destino_escola"] = {
             "nome": escola_nome,
-            "latitude": pontos_lista[-1]["latitude"] if pontos_lista else None,
-            "longitude": pontos_lista[-1]["longitude"] if pontos_lista else None
-        }
+            "latitude": escola_lat,
+            "longitude": escola_lng
+        } if escola_lat is not None else None
+        rota["eta"] = None
 
         return jsonify(rota), 200
 
@@ -178,5 +245,171 @@ def detalhes_rota(id_rota, id_estudante):
     finally:
         if 'cursor' in locals():
             cursor.close()
-        if 'conn' in locals():
-            conn.close()
+
+
+# =====================================================
+# ROTA: Previsão de chegada em cada parada
+# Usa a última posição gravada da viagem em andamento; o servidor de
+# rastreamento também manda o ETA junto de cada posição (campo "eta").
+# =====================================================
+@rotas_bp.route("/<int:id_rota>/eta", methods=["GET"])
+def eta_rota(id_rota):
+    from eta import gerenciador as gerenciador_eta
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor(dictionary=True)
+
+        eta = gerenciador_eta.eta_da_rota(cursor, id_rota)
+        if eta is None:
+            return jsonify({"erro": "Nenhuma viagem em andamento com posição para esta rota"}), 404
+
+        eta["rota_id"] = id_rota
+        return jsonify(eta), 200
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+
+
+# =====================================================
+# ROTA: Otimizar a ordem das paradas
+# GET (ou POST sem "aplicar") só mostra o antes/depois; POST {"aplicar": true}
+# grava a nova ordem. Opcional: "escola" (nome, senão a escola dos inscritos)
+# e "fixar_inicio" (padrão true: a primeira parada continua sendo a primeira).
+# =====================================================
+@rotas_bp.route("/<int:id_rota>/otimizar", methods=["GET", "POST"])
+@requer_login("gestao")
+def otimizar_rota(id_rota):
+    from eta import gerenciador as gerenciador_eta
+    from otimizacao_rotas import ProblemaRota, otimizar, comparar
+
+    data = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    aplicar = request.method == "POST" and bool(data.get("aplicar"))
+    fixar_inicio = str(data.get("fixar_inicio", "true")).lower() not in ("0", "false", "nao", "não")
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor(dictionary=True)
+
+        paradas = carregar_paradas(cursor, [id_rota]).get(id_rota, [])
+        if not paradas:
+            return jsonify({"erro": "Rota sem paradas cadastradas"}), 404
+
+        if data.get("escola"):
+            escola_nome = data.get("escola")
+            escola_lat, escola_lng = coordenadas_escola(cursor, escola_nome)
+        else:
+            escola_nome, escola_lat, escola_lng = escola_da_rota(cursor, id_rota)
+        escola = (escola_lat, escola_lng) if escola_lat is not None else None
+
+        problema = ProblemaRota(paradas, escola=escola, fixar_inicio=fixar_inicio)
+        resultado = comparar(problema, otimizar(problema))
+        indices = resultado.pop("indices")
+
+        if aplicar and resultado["mudancas"]:
+            # origem/parada/destino voltam a ser definidos pela posição
+            nova_ordem = [dict(paradas[i], type=None) for i in indices]
+            cursor.execute("DELETE FROM rotas_paradas WHERE rota_id = %s", (id_rota,))
+            salvar_paradas(cursor, id_rota, nova_ordem)
+            conn.commit()
+            invalidar("rotas", f"rota:{id_rota}")
+            gerenciador_eta.invalidar(id_rota)
+
+        resultado.update({
+            "rota_id": id_rota,
+            "escola": {"nome": escola_nome, "latitude": escola_lat, "longitude": escola_lng},
+            "aplicado": aplicar and bool(resultado["mudancas"])
+        })
+        return jsonify(resultado), 200
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+
+
+# =====================================================
+# ROTA: Rotas com parada perto de um ponto
+# GET /proximas?lat=-8.28&lng=-35.99&raio=500 (raio em metros)
+# =====================================================
+@rotas_bp.route("/proximas", methods=["GET"])
+@em_cache("rotas", parametros={"lat": float, "lng": float, "raio": float})
+def listar_rotas_proximas():
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        raio = float(request.args.get("raio", RAIO_PADRAO_M))
+    except (KeyError, ValueError):
+        return jsonify({"erro": "Informe lat, lng e (opcional) raio numéricos"}), 400
+    raio = max(1.0, min(raio, RAIO_MAXIMO_M))
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor(dictionary=True)
+        return jsonify(rotas_proximas(cursor, lat, lng, raio)), 200
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+
+
+# =====================================================
+# ROTA: Motorista inicia uma viagem da rota (motorista do token, só na rota
+# dele: motoristas.rota_id)
+# As posições vão para o servidor de rastreamento (servidor_rastreamento.py)
+# em /api/viagens/<viagem_id>/posicoes
+# =====================================================
+@rotas_bp.route("/iniciar", methods=["POST"])
+@requer_login("motorista")
+def iniciar_rota():
+    data = request.json or {}
+    rota_id = data.get("rota_id") or data.get("rotaId")
+    if not rota_id:
+        return jsonify({"erro": "rota_id é obrigatório"}), 400
+
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT 1 FROM motoristas WHERE id = %s AND rota_id = %s",
+                       (g.usuario["id"], rota_id))
+        if cursor.fetchone() is None:
+            return jsonify({"erro": "Esta rota não é do motorista"}), 403
+
+        # Só uma viagem em andamento por rota
+        cursor.execute("""
+            UPDATE viagens SET status = 'encerrada', encerrada_em = NOW()
+            WHERE rota_id = %s AND status = 'em_andamento'
+        """, (rota_id,))
+        cursor.execute(
+            "INSERT INTO viagens (rota_id, motorista_id) VALUES (%s, %s)",
+            (rota_id, g.usuario["id"])
+        )
+        viagem_id = cursor.lastrowid
+        conn.commit()
+
+        return jsonify({
+            "mensagem": "Viagem iniciada!",
+            "viagem_id": viagem_id,
+            "rota_id": rota_id
+        }), 201
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
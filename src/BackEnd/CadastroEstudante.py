@@ -1,19 +1,17 @@
 # cadastroEstudante.py
 from flask import Blueprint, request, jsonify
 import mysql.connector
+from banco import conectar
 import uuid
-from werkzeug.security import generate_password_hash, check_password_hash
+from senhas import gerar_hash, HashOcupado
+from autenticacao import conferir_senha, sessao, resposta_ocupado, requer_login
+from perfis import criar_perfil
+from busca_estudantes import montar_busca
+from paginacao import ler_limite, decodificar_cursor, cortar_pagina, resposta_paginada
+from detector_consultas import orcamento_consultas
 
 estudantes_bp = Blueprint("estudantes_bp", __name__)
 
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
-
 # =====================================================
 # Cadastrar Estudante
 # =====================================================
@@ -30,22 +28,18 @@ def cadastro():
     cursor = conn.cursor()
     try:
         estudante_id = str(uuid.uuid4())
-        profile_id = str(uuid.uuid4())
-        senha_hash = generate_password_hash(data["senha"])
+        senha_hash = gerar_hash(data["senha"])
 
         # Criar profile
-        cursor.execute("""
-            INSERT INTO profiles (id, email, nome_completo, role)
-            VALUES (%s, %s, %s, 'estudante')
-        """, (profile_id, data["email"], data["nome_completo"]))
+        profile_id = criar_perfil(cursor, data["email"], data["nome_completo"], "estudante")
 
         # Criar estudante vinculado ao profile
         cursor.execute("""
             INSERT INTO estudantes (
                 id, nome_completo, escola, turma, email,
                 numero_matricula, nome_responsavel, numero_responsavel,
-                senha, created_by, profile_id
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                senha, created_by, profile_id, latitude, longitude
+            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """, (
             estudante_id,
             data["nome_completo"],
@@ -57,7 +51,9 @@ def cadastro():
             data["numero_responsavel"],
             senha_hash,
             data.get("created_by"),
-            profile_id
+            profile_id,
+            data.get("latitude"),   # casa do estudante (opcional, usada na atribuição de rotas)
+            data.get("longitude")
         ))
 
         conn.commit()
@@ -67,6 +63,9 @@ def cadastro():
             "profile_id": profile_id
         }), 201
 
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
+
     except mysql.connector.IntegrityError as ie:
         print("IntegrityError:", ie)
         return jsonify({"erro": "Email ou número de matrícula já cadastrado.", "detalhe": str(ie)}), 409
@@ -77,12 +76,12 @@ def cadastro():
 
     finally:
         cursor.close()
-        conn.close()
 
 # =====================================================
 # Login Estudante
 # =====================================================
 @estudantes_bp.route("/login", methods=["POST"])
+@orcamento_consultas(2)
 def login():
     data = request.json or {}
     email = data.get("email")
@@ -103,18 +102,59 @@ def login():
         if not estudante:
             return jsonify({"erro": "Email ou senha inválidos."}), 401
 
-        senha_hash = estudante.get("senha")
-        if not check_password_hash(senha_hash, senha):
+        if not conferir_senha(conn, "estudante", estudante, senha):
             return jsonify({"erro": "Email ou senha inválidos."}), 401
 
-        # Não retorne a senha
+        # Não retorne a senha; o token substitui a senha nas próximas chamadas
         estudante.pop("senha", None)
+        estudante.update(sessao("estudante", estudante))
         return jsonify(estudante), 200
 
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
+
+    except mysql.connector.Error as erro:
+        print("Erro no banco:", erro)
+        return jsonify({"erro": "Erro no banco de dados.", "detalhe": str(erro)}), 500
+
+    finally:
+        cursor.close()
+
+# =====================================================
+# Buscar estudantes (listagem da gestão escolar)
+# GET /buscar?q=joao&matricula=2024001&escola=...&turma=...&limite=30&cursor=...
+# q ignora acentos e caixa; a próxima página vem no header X-Proximo-Cursor
+# =====================================================
+@estudantes_bp.route("/buscar", methods=["GET"])
+@requer_login("gestao")
+def buscar():
+    limite = ler_limite(request.args)
+    try:
+        posicao = decodificar_cursor(request.args.get("cursor"), converter=str, converter_id=str)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+
+    sql, params = montar_busca(
+        texto=request.args.get("q"),
+        matricula=request.args.get("matricula"),
+        escola=request.args.get("escola"),
+        turma=request.args.get("turma"),
+        posicao=posicao,
+        limite=limite
+    )
+
+    conn = conectar()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, params)
+        estudantes, proximo = cortar_pagina(cursor.fetchall(), limite, "nome_busca", "id")
+        for estudante in estudantes:
+            estudante.pop("nome_busca", None)
+        return resposta_paginada(estudantes, proximo), 200
+
     except mysql.connector.Error as erro:
         print("Erro no banco:", erro)
         return jsonify({"erro": "Erro no banco de dados.", "detalhe": str(erro)}), 500
 
     finally:
         cursor.close()
-        conn.close()
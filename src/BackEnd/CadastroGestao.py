@@ -1,19 +1,14 @@
 from flask import Blueprint, request, jsonify
 import mysql.connector
+from banco import conectar
 import traceback
-from werkzeug.security import generate_password_hash, check_password_hash
+from senhas import gerar_hash, HashOcupado
+from autenticacao import conferir_senha, sessao, resposta_ocupado, requer_login
+from perfis import criar_perfil
+from detector_consultas import orcamento_consultas
 
 gestao_bp = Blueprint("gestao_bp", __name__)
 
-# Conexão com o banco
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
-
 # =====================================================
 # Cadastrar gestão escolar
 # =====================================================
@@ -23,13 +18,14 @@ def cadastrar_gestao():
     try:
         conn = conectar()
         cursor = conn.cursor()
-        senha_hash = generate_password_hash(data.get("senha"))
+        senha_hash = gerar_hash(data.get("senha"))
+        profile_id = criar_perfil(cursor, data.get("email_gestor"), data.get("nome_gestor"), "gestao")
 
         cursor.execute("""
             INSERT INTO gestao (
                 nome_escola, endereco, latitude, longitude, contato_escola,
-                nome_gestor, cargo, email_gestor, telefone_gestor, senha
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                nome_gestor, cargo, email_gestor, telefone_gestor, senha, profile_id
+            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """, (
             data.get("nome_escola"),
             data.get("endereco"),
@@ -40,17 +36,19 @@ def cadastrar_gestao():
             data.get("cargo") or "",
             data.get("email_gestor"),
             data.get("telefone_gestor") or "",
-            senha_hash
+            senha_hash,
+            profile_id
         ))
+        gestao_id = cursor.lastrowid
         conn.commit()
-        cursor.execute("SELECT LAST_INSERT_ID() AS id")
-        gestao_id = cursor.fetchone()[0]
 
         return jsonify({
             "mensagem": "Gestão cadastrada com sucesso!",
             "id": gestao_id
         }), 201
 
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
     except mysql.connector.IntegrityError as ie:
         traceback.print_exc()
         return jsonify({"erro": "Email já cadastrado.", "detalhe": str(ie)}), 409
@@ -59,12 +57,12 @@ def cadastrar_gestao():
         return jsonify({"erro": str(erro)}), 400
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
 
 # =====================================================
 # Login gestão escolar
 # =====================================================
 @gestao_bp.route("/login", methods=["POST"])
+@orcamento_consultas(2)
 def login_gestao():
     data = request.json
     email = data.get("email")
@@ -76,31 +74,44 @@ def login_gestao():
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
         # Alteração aqui: coluna correta no banco
-        cursor.execute("SELECT * FROM gestao WHERE email_gestor=%s", (email,))
+        cursor.execute("""
+            SELECT id, nome_escola, endereco, latitude, longitude, contato_escola,
+                   nome_gestor, cargo, email_gestor, telefone_gestor, profile_id, senha
+            FROM gestao
+            WHERE email_gestor=%s
+        """, (email,))
         gestao = cursor.fetchone()
 
-        if gestao and check_password_hash(gestao["senha"], senha):
+        if gestao and conferir_senha(conn, "gestao", gestao, senha):
             gestao.pop("senha", None)
+            gestao.update(sessao("gestao", gestao))
             return jsonify(gestao), 200
         else:
             return jsonify({"erro": "Email ou senha inválidos"}), 401
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
     except Exception as erro:
         traceback.print_exc()
         return jsonify({"erro": str(erro)}), 400
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
 
 
 # =====================================================
 # Listar gestões
 # =====================================================
 @gestao_bp.route("/listar", methods=["GET"])
+@requer_login("gestao")
 def listar_gestao():
     try:
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM gestao")
+        # Sem a senha (hash)
+        cursor.execute("""
+            SELECT id, nome_escola, endereco, latitude, longitude, contato_escola,
+                   nome_gestor, cargo, email_gestor, telefone_gestor, created_at
+            FROM gestao
+        """)
         gestoes = cursor.fetchall()
         return jsonify(gestoes), 200
     except Exception as erro:
@@ -108,4 +119,3 @@ def listar_gestao():
         return jsonify({"erro": str(erro)}), 400
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
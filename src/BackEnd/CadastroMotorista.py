@@ -1,23 +1,17 @@
-from flask import Blueprint, request, jsonify
-import mysql.connector
+from flask import Blueprint, request, jsonify, g
+from banco import conectar
 import traceback
-from werkzeug.security import generate_password_hash, check_password_hash
+from senhas import gerar_hash, HashOcupado
+from autenticacao import conferir_senha, sessao, resposta_ocupado, requer_login, dono_da_url
+from perfis import criar_perfil, resolver_rota
+from detector_consultas import orcamento_consultas
 
 motoristas_bp = Blueprint("motoristas_bp", __name__)
 
-# =====================================================
-# Função para conectar ao MySQL
-# =====================================================
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
-
 # =====================================================
 # Cadastrar motorista
+# Cria o perfil (profiles) junto; a rota vai por id (rota_id) ou, como
+# antes, pelo nome (rota)
 # =====================================================
 @motoristas_bp.route("/cadastrar", methods=["POST"])
 def cadastrar_motorista():
@@ -32,50 +26,64 @@ def cadastrar_motorista():
 
         # Gera hash da senha (usa padrão 123456 se não enviada)
         senha_raw = data.get("senha") or "123456"
-        senha_hash = generate_password_hash(senha_raw)
+        senha_hash = gerar_hash(senha_raw)
+
+        rota_id, nome_rota = resolver_rota(cursor, data.get("rota_id"), data.get("rota"))
+        profile_id = criar_perfil(cursor, data.get("email"), data.get("nome_completo"), "motorista")
 
         cursor.execute("""
             INSERT INTO motoristas (
                 nome_completo, email, senha, telefone,
-                placa_onibus, rota, foto_perfil
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s)
+                placa_onibus, rota, rota_id, foto_perfil, profile_id
+            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """, (
             data.get("nome_completo"),
             data.get("email"),
             senha_hash,
             data.get("telefone"),
             data.get("placa_onibus"),
-            data.get("rota"),
-            data.get("foto_perfil", "")
+            nome_rota,
+            rota_id,
+            data.get("foto_perfil", ""),
+            profile_id
         ))
-        conn.commit()
-
         # pega o id gerado automaticamente
         novo_id = cursor.lastrowid
+        conn.commit()
 
         return jsonify({
             "mensagem": "Motorista cadastrado com sucesso!",
-            "id": novo_id
+            "id": novo_id,
+            "profile_id": profile_id,
+            "rota_id": rota_id
         }), 201
 
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
+
     except Exception as erro:
         traceback.print_exc()
         return jsonify({"erro": str(erro)}), 400
 
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
 
 
 # =====================================================
 # Listar motoristas
 # =====================================================
 @motoristas_bp.route("/listar", methods=["GET"])
+@requer_login("gestao")
 def listar_motoristas():
     try:
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM motoristas")
+        # Sem a senha (hash): só os dados que a tela de gestão mostra
+        cursor.execute("""
+            SELECT id, nome_completo, email, telefone, placa_onibus,
+                   rota, rota_id, foto_perfil, is_active, created_at
+            FROM motoristas
+        """)
         motoristas = cursor.fetchall()
         return jsonify(motoristas), 200
 
@@ -85,63 +93,79 @@ def listar_motoristas():
 
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
 
 
 # =====================================================
 # Atualizar motorista
 # =====================================================
+@motoristas_bp.route("/atualizar", methods=["PUT"])
+@orcamento_consultas(2)
+@requer_login("motorista")
+def atualizar_meus_dados():
+    return atualizar_motorista(id_motorista=g.usuario["id"])
+
+
 @motoristas_bp.route("/atualizar/<int:id_motorista>", methods=["PUT"])
+@orcamento_consultas(2)
+@dono_da_url("motorista", "id_motorista")
 def atualizar_motorista(id_motorista):
     data = request.json
     try:
         conn = conectar()
         cursor = conn.cursor()
 
-        # Se senha for enviada, gera hash. Se não, mantém a senha atual no banco.
-        if data.get("senha"):
-            senha_hash = generate_password_hash(data.get("senha"))
-        else:
-            cursor.execute("SELECT senha FROM motoristas WHERE id=%s", (id_motorista,))
-            senha_atual = cursor.fetchone()
-            senha_hash = senha_atual[0] if senha_atual else None
+        # Se senha for enviada, gera hash. Se não, mantém a senha atual no banco (COALESCE).
+        senha_hash = gerar_hash(data.get("senha")) if data.get("senha") else None
 
+        rota_id, nome_rota = resolver_rota(cursor, data.get("rota_id"), data.get("rota"))
+
+        # Email e nome do perfil acompanham o cadastro, no mesmo UPDATE
         cursor.execute("""
-            UPDATE motoristas
-            SET nome_completo=%s,
-                email=%s,
-                telefone=%s,
-                senha=%s,
-                placa_onibus=%s,
-                rota=%s,
-                foto_perfil=%s
-            WHERE id=%s
+            UPDATE motoristas m
+            LEFT JOIN profiles p ON p.id = m.profile_id
+            SET m.nome_completo=%s,
+                m.email=%s,
+                m.telefone=%s,
+                m.senha=COALESCE(%s, m.senha),
+                m.placa_onibus=%s,
+                m.rota=%s,
+                m.rota_id=%s,
+                m.foto_perfil=%s,
+                p.email=%s,
+                p.nome_completo=%s
+            WHERE m.id=%s
         """, (
             data.get("nome_completo"),
             data.get("email"),
             data.get("telefone"),
             senha_hash,
             data.get("placa_onibus"),
-            data.get("rota"),
+            nome_rota,
+            rota_id,
             data.get("foto_perfil", ""),
+            data.get("email"),
+            data.get("nome_completo"),
             id_motorista
         ))
         conn.commit()
         return jsonify({"mensagem": "Motorista atualizado com sucesso!"}), 200
 
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
+
     except Exception as erro:
         traceback.print_exc()
         return jsonify({"erro": str(erro)}), 400
 
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
 
 
 # =====================================================
 # Login do motorista
 # =====================================================
 @motoristas_bp.route("/login", methods=["POST"])
+@orcamento_consultas(2)
 def login_motorista():
     data = request.json
     try:
@@ -154,24 +178,33 @@ def login_motorista():
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("SELECT * FROM motoristas WHERE email=%s", (email,))
+        # Só o que o app usa (profile_id vai no token, para as notificações)
+        cursor.execute("""
+            SELECT id, nome_completo, email, telefone, placa_onibus,
+                   rota, rota_id, foto_perfil, profile_id, senha
+            FROM motoristas
+            WHERE email=%s
+        """, (email,))
         motorista = cursor.fetchone()
 
         if not motorista:
             return jsonify({"erro": "Email não encontrado"}), 401
 
         # valida a senha
-        if not check_password_hash(motorista["senha"], senha):
+        if not conferir_senha(conn, "motorista", motorista, senha):
             return jsonify({"erro": "Senha incorreta"}), 401
 
         # remove a senha do retorno
         motorista.pop("senha", None)
 
-        return jsonify({"mensagem": "Login realizado com sucesso!", "motorista": motorista}), 200
+        return jsonify({"mensagem": "Login realizado com sucesso!", "motorista": motorista,
+                        **sessao("motorista", motorista)}), 200
+
+    except HashOcupado as erro:
+        return resposta_ocupado(erro)
 
     except Exception as erro:
         traceback.print_exc()
         return jsonify({"erro": str(erro)}), 400
     finally:
         if 'cursor' in locals(): cursor.close()
-        if 'conn' in locals(): conn.close()
@@ -0,0 +1,79 @@
+from flask import Blueprint, jsonify, g
+import traceback
+from banco import conectar
+from autenticacao import requer_login, dono_da_url
+from detector_consultas import orcamento_consultas
+
+# Blueprint da tela inicial do estudante (registrado em /api/estudantes)
+dashboard_bp = Blueprint("dashboard_bp", __name__)
+
+# =====================================================
+# Tela inicial do estudante em uma requisição
+# Substitui a sequência /api/rotas/listar ->
+# /inscricaoEstudante/listar_rotas_estudante/<id> -> /api/rotas/detalhes/<rota>/<id>
+# usando uma conexão e duas consultas.
+# =====================================================
+@dashboard_bp.route("/<id_estudante>/dashboard", methods=["GET"])
+@orcamento_consultas(2)
+@dono_da_url("estudante", "id_estudante")
+def dashboard_estudante(id_estudante):
+    try:
+        conn = conectar()
+        cursor = conn.cursor()  # tuplas: os dicts das rotas são montados uma vez só
+
+        # Escola do estudante + rotas em que está inscrito (uma linha por inscrição ativa)
+        cursor.execute("""
+            SELECT e.escola, i.rota_id
+            FROM estudantes e
+            LEFT JOIN inscricoes_rotas i
+              ON i.estudante_id = e.id AND i.status = 'ativa'
+            WHERE e.id = %s
+        """, (id_estudante,))
+        linhas = cursor.fetchall()
+        if not linhas:
+            return jsonify({"erro": "Estudante não encontrado"}), 404
+
+        escola = linhas[0][0]
+        inscritas = [rota_id for _, rota_id in linhas if rota_id is not None]
+        inscritas_set = set(inscritas)
+
+        cursor.execute("""
+            SELECT id, nome_rota, numero_onibus, placa_veiculo, turno,
+                   motorista_nome, motorista_telefone,
+                   horario_saida_casa, horario_chegada_escola,
+                   horario_saida_escola, horario_chegada_casa, observacoes,
+                   capacidade, vagas_ocupadas
+            FROM rotas
+            ORDER BY id
+        """)
+        colunas = cursor.column_names
+        rotas = [dict(zip(colunas, r), inscrito=r[0] in inscritas_set) for r in cursor.fetchall()]
+
+        return jsonify({
+            "estudante_id": id_estudante,
+            "escola": {"nome": escola},
+            "rotas": rotas,
+            "rotas_inscritas": inscritas,
+            "resumo": {
+                "total_rotas": len(rotas),
+                "rotas_inscritas": sum(1 for r in rotas if r["inscrito"])
+            }
+        }), 200
+
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 400
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+
+
+# =====================================================
+# Mesma tela para o estudante do token (sem id na URL)
+# =====================================================
+@dashboard_bp.route("/dashboard", methods=["GET"])
+@orcamento_consultas(2)
+@requer_login("estudante")
+def meu_dashboard():
+    return dashboard_estudante(id_estudante=g.usuario["id"])
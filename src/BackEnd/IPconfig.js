@@ -9,8 +9,13 @@ const extras =
 
 const API_HOST = extras.API_HOST || "192.168.0.100"; // seu IP fixo
 const API_PORT = extras.API_PORT || "5000";
+const RASTREIO_PORT = extras.RASTREIO_PORT || "5001"; // servidor_rastreamento.py
 const ENV = extras.ENV || "development";
 
 // 🔥 sempre vai usar o IP da sua máquina
 export const API_URL = `http://${API_HOST}:${API_PORT}`;
 
+// posição dos ônibus em tempo real (HTTP para o motorista, WebSocket para os estudantes)
+export const RASTREIO_URL = `http://${API_HOST}:${RASTREIO_PORT}`;
+export const RASTREIO_WS_URL = `ws://${API_HOST}:${RASTREIO_PORT}`;
+
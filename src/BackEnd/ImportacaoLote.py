@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, Response
+import io
+import traceback
+from banco import conectar
+from autenticacao import requer_login
+from importacao import TIPOS, CODIFICACAO_PADRAO, ler_planilha, importar, escrever_relatorio
+
+# Blueprint da importação em lote (registrado em /api/importacao)
+importacao_bp = Blueprint("importacao_bp", __name__)
+
+# Erros devolvidos no JSON; o relatório completo sai com ?formato=csv
+MAX_ERROS_RESPOSTA = 500
+
+
+# =====================================================
+# Importar planilha (multipart, campo "arquivo": .csv ou .xlsx)
+# POST /api/importacao/<estudantes|motoristas|rotas>
+#   ?simular=1     só valida, não grava
+#   ?formato=csv   devolve o relatório de erros em CSV
+#   form: created_by, codificacao (ex.: latin-1)
+# Para arquivos muito grandes prefira o CLI: python importacao.py <tipo> <arquivo>
+# =====================================================
+@importacao_bp.route("/<tipo>", methods=["POST"])
+@requer_login("gestao")
+def importar_planilha(tipo):
+    if tipo not in TIPOS:
+        return jsonify({"erro": f"Tipo inválido; use {', '.join(sorted(TIPOS))}"}), 404
+    arquivo = request.files.get("arquivo")
+    if arquivo is None or not arquivo.filename:
+        return jsonify({"erro": "Envie a planilha no campo 'arquivo'"}), 400
+    simular = request.args.get("simular", "").lower() in ("1", "true", "sim")
+
+    try:
+        linhas = ler_planilha(arquivo.stream, arquivo.filename,
+                              request.form.get("codificacao") or CODIFICACAO_PADRAO)
+        relatorio = importar(conectar(), tipo, linhas, simular=simular,
+                             created_by=request.form.get("created_by"))
+    except (ValueError, LookupError) as erro:
+        return jsonify({"erro": str(erro)}), 400
+    except Exception as erro:
+        traceback.print_exc()
+        return jsonify({"erro": str(erro)}), 500
+
+    status = 500 if "interrompido" in relatorio else (200 if simular else 201)
+    if request.args.get("formato") == "csv":
+        saida = io.StringIO()
+        escrever_relatorio(relatorio, saida)
+        return Response("\ufeff" + saida.getvalue(), status=status, mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename=erros_{tipo}.csv"})
+
+    erros = relatorio["erros"]
+    relatorio["erros_total"] = len(erros)
+    relatorio["erros"] = erros[:MAX_ERROS_RESPOSTA]
+    return jsonify(relatorio), status
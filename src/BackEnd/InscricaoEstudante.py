@@ -1,24 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 import mysql.connector
+from banco import conectar
+from paradas import carregar_paradas, colunas_rota
+from respostas_json import como_dicts
+from busca_estudantes import filtro_nome
+from paginacao import ler_limite, decodificar_cursor, filtro_cursor, cortar_pagina, resposta_paginada
+from cache_respostas import invalidar
+from autenticacao import requer_login, dono_da_url, estudante_alvo
+from vagas_rotas import (ocupar_vaga, liberar_vaga, inserir_inscricao, ja_inscrito, travar_rota,
+                         entrar_na_espera, sair_da_espera, promover_espera)
 import uuid
 
 inscricoes_bp = Blueprint('inscricoes_bp', __name__, url_prefix="/inscricaoEstudante")
 
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
-
 # =====================================================
 # Inscrever estudante em uma rota
+# Caminho comum em uma transação: ocupa a vaga (UPDATE condicional no
+# contador da rota) e insere a inscrição (chave única de inscrição ativa).
+# Rota cheia: o estudante entra na lista de espera (202).
+# Estudante do token, ou estudante_id do corpo quando quem chama é a gestão.
 # =====================================================
 @inscricoes_bp.route("/inscrever", methods=["POST"])
+@requer_login("estudante", "gestao")
 def inscrever_estudante():
     data = request.json
-    estudante_id = data.get("estudante_id")
+    estudante_id = estudante_alvo(data.get("estudante_id"))
     rota_id = data.get("rota_id")
 
     if not estudante_id or not rota_id:
@@ -28,35 +34,53 @@ def inscrever_estudante():
     cursor = conn.cursor()
 
     try:
-        # Verifica se já existe inscrição ativa
-        cursor.execute(
-            "SELECT * FROM inscricoes_rotas WHERE estudante_id = %s AND rota_id = %s AND status = 'ativa'",
-            (estudante_id, rota_id)
-        )
-        if cursor.fetchone():
+        if ocupar_vaga(cursor, rota_id):
+            if not inserir_inscricao(cursor, estudante_id, rota_id):
+                conn.rollback()  # devolve a vaga
+                return jsonify({"erro": "Estudante já inscrito nesta rota"}), 400
+            sair_da_espera(cursor, estudante_id, rota_id)
+            conn.commit()
+            invalidar("rotas", f"rota:{rota_id}")
+            return jsonify({"mensagem": "Inscrição realizada com sucesso!"}), 201
+
+        # Sem vaga (ou rota inexistente): confere com a rota travada
+        tem_vaga = travar_rota(cursor, rota_id)
+        if tem_vaga is None:
+            conn.rollback()
+            return jsonify({"erro": "Rota não encontrada"}), 404
+        if ja_inscrito(cursor, estudante_id, rota_id):
+            conn.rollback()
             return jsonify({"erro": "Estudante já inscrito nesta rota"}), 400
-
-        # Inserir sem o campo 'id', pois é auto-increment
-        cursor.execute("""
-            INSERT INTO inscricoes_rotas (estudante_id, rota_id)
-            VALUES (%s, %s)
-        """, (estudante_id, rota_id))
+        if tem_vaga and ocupar_vaga(cursor, rota_id) and inserir_inscricao(cursor, estudante_id, rota_id):
+            # uma vaga abriu entre as duas consultas
+            sair_da_espera(cursor, estudante_id, rota_id)
+            conn.commit()
+            invalidar("rotas", f"rota:{rota_id}")
+            return jsonify({"mensagem": "Inscrição realizada com sucesso!"}), 201
+
+        posicao = entrar_na_espera(cursor, estudante_id, rota_id)
         conn.commit()
-        return jsonify({"mensagem": "Inscrição realizada com sucesso!"}), 201
+        return jsonify({
+            "mensagem": "Rota sem vagas. Estudante na lista de espera.",
+            "lista_espera": True,
+            "posicao": posicao
+        }), 202
 
     except mysql.connector.Error as erro:
+        conn.rollback()
         return jsonify({"erro": str(erro)}), 400
 
     finally:
         cursor.close()
-        conn.close()
 
 # =====================================================
 # Remover inscrição do estudante
+# A vaga liberada vai para o primeiro da lista de espera
 # =====================================================
 @inscricoes_bp.route("/remover", methods=["DELETE"])
+@requer_login("estudante", "gestao")
 def remover_inscricao():
-    estudante_id = request.args.get("estudante_id")
+    estudante_id = estudante_alvo(request.args.get("estudante_id"))
     rota_id = request.args.get("rota_id")
 
     if not estudante_id or not rota_id:
@@ -66,67 +90,135 @@ def remover_inscricao():
     cursor = conn.cursor()
 
     try:
+        # Trava a rota antes das inscrições (mesma ordem de /inscrever, sem deadlock)
+        travar_rota(cursor, rota_id)
+        cursor.execute(
+            "DELETE FROM inscricoes_rotas WHERE estudante_id = %s AND rota_id = %s AND status = 'ativa'",
+            (estudante_id, rota_id)
+        )
+        removidas = cursor.rowcount
+        # Linhas em outros status (histórico) saem também, como antes
         cursor.execute(
             "DELETE FROM inscricoes_rotas WHERE estudante_id = %s AND rota_id = %s",
             (estudante_id, rota_id)
         )
+        saiu_da_espera = sair_da_espera(cursor, estudante_id, rota_id)
+
+        promovidos = []
+        if removidas:
+            liberar_vaga(cursor, rota_id, removidas)
+            promovidos = promover_espera(cursor, rota_id)
         conn.commit()
-        return jsonify({"mensagem": "Inscrição removida com sucesso!"}), 200
+        if removidas:
+            invalidar("rotas", f"rota:{rota_id}")
+
+        return jsonify({
+            "mensagem": "Inscrição removida com sucesso!",
+            "saiu_da_lista_espera": bool(saiu_da_espera),
+            "promovidos": promovidos
+        }), 200
 
     except mysql.connector.Error as erro:
+        conn.rollback()
         return jsonify({"erro": str(erro)}), 400
 
     finally:
         cursor.close()
-        conn.close()
+
+# =====================================================
+# Lista de espera de uma rota, em ordem de chegada
+# =====================================================
+@inscricoes_bp.route("/espera/<rota_id>", methods=["GET"])
+@requer_login("gestao")
+def listar_espera(rota_id):
+    conn = conectar()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT w.estudante_id, e.nome_completo, e.turma, w.created_at
+            FROM inscricoes_espera w
+            JOIN estudantes e ON e.id = w.estudante_id
+            WHERE w.rota_id = %s
+            ORDER BY w.id
+        """, (rota_id,))
+        espera = cursor.fetchall()
+        for posicao, item in enumerate(espera, start=1):
+            item["posicao"] = posicao
+        return jsonify(espera), 200
+    except mysql.connector.Error as erro:
+        return jsonify({"erro": str(erro)}), 400
+    finally:
+        cursor.close()
 
 # =====================================================
 # Listar estudantes inscritos em uma rota
+# Paginado em ordem alfabética (?limite=&cursor=, próximo cursor no header
+# X-Proximo-Cursor); ?q= filtra pelo nome como em /api/estudantes/buscar
 # =====================================================
 @inscricoes_bp.route("/listar/<rota_id>", methods=["GET"])
+@requer_login("gestao")
 def listar_inscritos(rota_id):
+    limite = ler_limite(request.args)
+    try:
+        posicao = decodificar_cursor(request.args.get("cursor"), converter=str, converter_id=str)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
+
+    filtro_q, params_q = filtro_nome(request.args.get("q"))
+    filtro_pos, params_pos = filtro_cursor(posicao, "e.nome_busca", "e.id", ordem="ASC")
+
     conn = conectar()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT e.id, e.nome_completo, e.escola, e.turma, e.numero_matricula
+        cursor.execute(f"""
+            SELECT e.id, e.nome_completo, e.escola, e.turma, e.numero_matricula, e.nome_busca
             FROM inscricoes_rotas i
             JOIN estudantes e ON i.estudante_id = e.id
-            WHERE i.rota_id = %s
-        """, (rota_id,))
-        inscritos = cursor.fetchall()
-        return jsonify(inscritos), 200
+            WHERE i.rota_id = %s{filtro_q}{filtro_pos}
+            ORDER BY e.nome_busca, e.id
+            LIMIT %s
+        """, [rota_id] + params_q + params_pos + [limite + 1])
+        inscritos, proximo = cortar_pagina(cursor.fetchall(), limite, "nome_busca", "id")
+        for inscrito in inscritos:
+            inscrito.pop("nome_busca", None)
+        return resposta_paginada(inscritos, proximo), 200
     except mysql.connector.Error as erro:
         return jsonify({"erro": str(erro)}), 400
     finally:
         cursor.close()
-        conn.close()
 
 
 # =====================================================
 # Listar todas as rotas em que um estudante está inscrito
+# /minhas_rotas usa o estudante do token
 # =====================================================
+@inscricoes_bp.route("/minhas_rotas", methods=["GET"])
+@requer_login("estudante")
+def minhas_rotas():
+    return listar_rotas_estudante(estudante_id=g.usuario["id"])
+
+
 @inscricoes_bp.route("/listar_rotas_estudante/<estudante_id>", methods=["GET"])
+@dono_da_url("estudante", "estudante_id")
 def listar_rotas_estudante(estudante_id):
     conn = conectar()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT r.*
+        cursor.execute(f"""
+            SELECT {colunas_rota('r')}
             FROM inscricoes_rotas i
             JOIN rotas r ON i.rota_id = r.id
             WHERE i.estudante_id = %s AND i.status = 'ativa'
         """, (estudante_id,))
-        rotas = cursor.fetchall()
+        rotas = como_dicts(cursor, cursor.fetchall())
 
-        # Converter pontos de parada de string para lista
+        # Pontos de parada das rotas inscritas (uma consulta para todas)
+        paradas = carregar_paradas(cursor, [rota["id"] for rota in rotas])
         for rota in rotas:
-            if rota.get("pontos_parada"):
-                rota["pontos_parada"] = rota["pontos_parada"].split(",")
+            rota["pontos_parada"] = paradas.get(rota["id"], [])
 
         return jsonify(rotas), 200
     except mysql.connector.Error as erro:
         return jsonify({"erro": str(erro)}), 400
     finally:
         cursor.close()
-        conn.close()
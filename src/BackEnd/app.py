@@ -1,31 +1,118 @@
-from flask import Flask
+import os
+
+from flask import Flask, jsonify
 from flask_cors import CORS
 
-# Importa os módulos (Blueprints)
-from CadastroEstudante import estudantes_bp
-from CadastroDeRotas import rotas_bp
-from InscricaoEstudante import inscricoes_bp
-from CadastroMotorista import motoristas_bp  # módulo motoristas
-from notificacoes import notificacoes_bp
-from CadastroGestao import gestao_bp
+import banco
+import respostas_json
+import instrumentacao
+import detector_consultas
+
+# =====================================================
+# Blueprints disponíveis: nome -> (módulo, objeto, prefixo, módulos pesados)
+# Os módulos só são importados se o blueprint entrar no app. Os "pesados"
+# (numpy) são importados dentro das funções que usam; preaquecer=True os
+# importa na criação do app (gunicorn com preload_app, para os workers
+# herdarem tudo pronto).
+# =====================================================
+BLUEPRINTS = {
+    "estudantes": ("CadastroEstudante", "estudantes_bp", "/api/estudantes", ()),
+    "rotas": ("CadastroDeRotas", "rotas_bp", "/api/rotas", ("eta", "otimizacao_rotas")),
+    "inscricoes": ("InscricaoEstudante", "inscricoes_bp", "/inscricaoEstudante", ()),
+    "motoristas": ("CadastroMotorista", "motoristas_bp", "/api/motoristas", ()),
+    "notificacoes": ("notificacoes", "notificacoes_bp", "/api/notificacoes", ()),
+    "gestao": ("CadastroGestao", "gestao_bp", "/api/gestao", ()),
+    "dashboard": ("DashboardEstudante", "dashboard_bp", "/api/estudantes", ()),  # tela inicial do estudante
+    "atribuicao": ("AtribuicaoRotas", "atribuicao_bp", "/api/atribuicao", ("atribuicao_rotas",)),
+    "importacao": ("ImportacaoLote", "importacao_bp", "/api/importacao", ()),  # importação de planilhas
+}
+
+# Conjuntos por tipo de deploy (UNIBUS_BLUEPRINTS aceita conjuntos e nomes,
+# separados por vírgula: "notificacoes" ou "app_estudante,gestao")
+CONJUNTOS = {
+    "todos": list(BLUEPRINTS),
+    "app_estudante": ["estudantes", "dashboard", "rotas", "inscricoes", "notificacoes"],
+    "gestao": ["gestao", "estudantes", "motoristas", "rotas", "inscricoes",
+               "notificacoes", "atribuicao", "importacao"],
+    # viagens (POST /api/rotas/iniciar), ETA e login do motorista
+    "rastreamento": ["rotas", "motoristas"],
+    "notificacoes": ["notificacoes"],
+}
+
+
+def escolher_blueprints(texto):
+    nomes = []
+    for parte in (texto or "todos").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if parte not in CONJUNTOS and parte not in BLUEPRINTS:
+            raise ValueError(f"Blueprint ou conjunto desconhecido: {parte} "
+                             f"(use {', '.join(dict.fromkeys(list(CONJUNTOS) + list(BLUEPRINTS)))})")
+        for nome in CONJUNTOS.get(parte, [parte]):
+            if nome not in nomes:
+                nomes.append(nome)
+    return nomes
+
+
+def criar_app(blueprints=None, preaquecer=False):
+    if blueprints is None or isinstance(blueprints, str):
+        blueprints = escolher_blueprints(blueprints or os.environ.get("UNIBUS_BLUEPRINTS"))
+
+    app = Flask(__name__)
+    CORS(app)
 
+    # Conexões do pool são devolvidas ao final de cada requisição
+    banco.init_app(app)
 
+    # jsonify com orjson (quando instalado), datas em ISO 8601 e Decimal como número
+    respostas_json.init_app(app)
 
-app = Flask(__name__)
-CORS(app)
+    # Latência, tempo de banco/JSON e consultas por endpoint em /metrics
+    instrumentacao.init_app(app)
 
-# Registra os Blueprints
-app.register_blueprint(estudantes_bp, url_prefix="/api/estudantes")
-app.register_blueprint(rotas_bp, url_prefix="/api/rotas")
-app.register_blueprint(inscricoes_bp, url_prefix="/inscricaoEstudante")
-app.register_blueprint(motoristas_bp, url_prefix="/api/motoristas")  # motoristas
-app.register_blueprint(notificacoes_bp, url_prefix="/api/notificacoes")
-app.register_blueprint(gestao_bp, url_prefix="/api/gestao")
+    # UNIBUS_CONSULTAS_DEBUG=1: loga as consultas de cada requisição e aponta N+1
+    detector_consultas.init_app(app)
 
-# Rota de teste
-@app.route("/")
-def index():
-    return "API do TCC Unibus funcionando!"
+    # Registra os Blueprints
+    for nome in blueprints:
+        modulo, objeto, prefixo, pesados = BLUEPRINTS[nome]
+        # __import__ (e não importlib.import_module) para o -X importtime contar o módulo
+        app.register_blueprint(getattr(__import__(modulo), objeto), url_prefix=prefixo)
+        if preaquecer:
+            for pesado in pesados:
+                __import__(pesado)
 
+    # Rota de teste
+    @app.route("/")
+    def index():
+        return "API do TCC Unibus funcionando!"
+
+    # Métricas do pool de conexões (para dimensionar UNIBUS_DB_POOL_TAMANHO)
+    @app.route("/status/banco")
+    def status_banco():
+        return jsonify(banco.obter_pool().metricas())
+
+    return app
+
+
+# "from app import app" continua funcionando: o app padrão (UNIBUS_BLUEPRINTS)
+# só é criado no primeiro acesso, e quem usa criar_app() não paga por ele
+def __getattr__(nome):
+    if nome != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    instancia = globals()["app"] = criar_app()
+    return instancia
+
+
+# Servidor de desenvolvimento; em produção: gunicorn -c gunicorn.conf.py (wsgi.py)
 if __name__ == "__main__":
+    import fila_notificacoes
+
+    app = criar_app()
+    # Threads que fazem o fan-out dos envios enfileirados. Com debug=True o
+    # reloader roda este bloco duas vezes (processo que vigia os arquivos e
+    # processo que atende); os workers só sobem no que atende
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        fila_notificacoes.iniciar_workers()
     app.run(host="0.0.0.0", port=5000, debug=True)
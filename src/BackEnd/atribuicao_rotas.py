@@ -0,0 +1,392 @@
+import math
+import os
+
+import numpy as np
+
+from eta import haversine_m
+from paradas import carregar_paradas
+from vagas_rotas import CAPACIDADE_PADRAO, promover_espera, recontar_vagas
+
+# =====================================================
+# Atribuição em lote de estudantes às rotas de uma escola
+#
+# Custo = caminhada de casa até a parada mais próxima da rota. Cada estudante
+# só pode ir para rotas com parada a até distancia_max_m, e cada rota tem
+# `capacidade` lugares (menos os já ocupados por quem fica de fora do lote).
+#
+# 1. Índice espacial em grade: células do tamanho da distância máxima; cada
+#    célula de estudantes consulta só as paradas das 3x3 células vizinhas
+#    (distâncias calculadas em bloco com NumPy).
+# 2. Guloso por arrependimento: primeiro quem tem menos alternativas (maior
+#    diferença entre a melhor e a segunda melhor rota), cada um na rota mais
+#    barata com vaga.
+# 3. Reparo: quem ficou sem vaga tenta liberar lugar mudando um estudante da
+#    rota cheia para outra rota dele com vaga (troca de menor custo extra).
+# 4. Melhoria: move estudantes para rotas mais perto que ainda têm vaga e
+#    troca pares de estudantes de rota quando os dois juntos caminham menos.
+# =====================================================
+
+DISTANCIA_MAX_PADRAO_M = float(os.environ.get("UNIBUS_ATRIBUICAO_DISTANCIA_M", "800"))
+METROS_POR_GRAU = 111320.0
+
+
+class GradeParadas:
+    def __init__(self, lats, lngs, tamanho_m):
+        self.lats = lats
+        self.lngs = lngs
+        lat_ref = float(np.mean(lats)) if len(lats) else 0.0
+        self.passo_lat = tamanho_m / METROS_POR_GRAU
+        self.passo_lng = tamanho_m / (METROS_POR_GRAU * max(math.cos(math.radians(lat_ref)), 0.01))
+        self.celulas = {}
+        for i, chave in enumerate(zip(*self.celula(lats, lngs))):
+            self.celulas.setdefault(chave, []).append(i)
+
+    def celula(self, lats, lngs):
+        return (np.floor(lats / self.passo_lat).astype(np.int64).tolist(),
+                np.floor(lngs / self.passo_lng).astype(np.int64).tolist())
+
+    def vizinhas(self, cl, cg):
+        indices = []
+        for dl in (-1, 0, 1):
+            for dg in (-1, 0, 1):
+                indices.extend(self.celulas.get((cl + dl, cg + dg), ()))
+        return indices
+
+
+# Candidatos (aluno, rota, parada, distância): a parada mais próxima de cada rota
+# dentro do raio. Devolve uma lista por aluno, ordenada pela distância.
+def candidatos(alunos_lat, alunos_lng, paradas_lat, paradas_lng, paradas_rota, distancia_max_m):
+    n = len(alunos_lat)
+    por_aluno = [[] for _ in range(n)]
+    if not n or not len(paradas_lat):
+        return por_aluno
+
+    grade = GradeParadas(paradas_lat, paradas_lng, distancia_max_m)
+    grupos = {}
+    for i, chave in enumerate(zip(*grade.celula(alunos_lat, alunos_lng))):
+        grupos.setdefault(chave, []).append(i)
+
+    for (cl, cg), alunos in grupos.items():
+        perto = grade.vizinhas(cl, cg)
+        if not perto:
+            continue
+        alunos = np.array(alunos)
+        perto = np.array(perto)
+        d = haversine_m(alunos_lat[alunos][:, None], alunos_lng[alunos][:, None],
+                        paradas_lat[perto][None, :], paradas_lng[perto][None, :])
+        linhas, colunas = np.nonzero(d <= distancia_max_m)
+        if not len(linhas):
+            continue
+        dist = d[linhas, colunas]
+        aluno = alunos[linhas]
+        parada = perto[colunas]
+        rota = paradas_rota[parada]
+        # mais perto primeiro; depois fica só a primeira ocorrência de cada (aluno, rota)
+        ordem = np.lexsort((dist, rota, aluno))
+        aluno, rota, parada, dist = aluno[ordem], rota[ordem], parada[ordem], dist[ordem]
+        primeira = np.ones(len(aluno), dtype=bool)
+        primeira[1:] = (aluno[1:] != aluno[:-1]) | (rota[1:] != rota[:-1])
+        for a, r, p, di in zip(aluno[primeira].tolist(), rota[primeira].tolist(),
+                               parada[primeira].tolist(), dist[primeira].tolist()):
+            por_aluno[a].append((di, r, p))
+
+    for lista in por_aluno:
+        lista.sort()
+    return por_aluno
+
+
+def resolver(por_aluno, vagas):
+    vagas = list(vagas)
+    escolha = [None] * len(por_aluno)       # índice em por_aluno[a] da opção escolhida
+    ocupantes = [set() for _ in vagas]      # alunos de cada rota (para o reparo)
+
+    def colocar(a, k):
+        r = por_aluno[a][k][1]
+        escolha[a] = k
+        vagas[r] -= 1
+        ocupantes[r].add(a)
+
+    def retirar(a):
+        r = por_aluno[a][escolha[a]][1]
+        escolha[a] = None
+        vagas[r] += 1
+        ocupantes[r].discard(a)
+
+    # 2. guloso por arrependimento
+    def arrependimento(a):
+        opcoes = por_aluno[a]
+        segunda = opcoes[1][0] if len(opcoes) > 1 else math.inf
+        return (-(segunda - opcoes[0][0]), opcoes[0][0])
+
+    com_opcao = [a for a, opcoes in enumerate(por_aluno) if opcoes]
+    com_opcao.sort(key=arrependimento)
+    sem_vaga = []
+    for a in com_opcao:
+        for k, (_, r, _) in enumerate(por_aluno[a]):
+            if vagas[r] > 0:
+                colocar(a, k)
+                break
+        else:
+            sem_vaga.append(a)
+
+    # 3. reparo: libera lugar numa rota cheia mudando outro aluno de rota
+    ainda_sem_vaga = []
+    for a in sem_vaga:
+        melhor = None
+        for k, (custo_a, r, _) in enumerate(por_aluno[a]):
+            for b in ocupantes[r]:
+                atual_b = por_aluno[b][escolha[b]][0]
+                for k2, (custo_b, r2, _) in enumerate(por_aluno[b]):
+                    if r2 != r and vagas[r2] > 0:
+                        extra = custo_a + custo_b - atual_b
+                        if melhor is None or extra < melhor[0]:
+                            melhor = (extra, k, b, k2)
+                        break  # opções de b estão em ordem de custo
+        if melhor is None:
+            ainda_sem_vaga.append(a)
+            continue
+        _, k, b, k2 = melhor
+        retirar(b)
+        colocar(b, k2)
+        colocar(a, k)
+
+    # 4. melhoria: rota mais perto com vaga
+    for a in com_opcao:
+        if escolha[a] is None or escolha[a] == 0:
+            continue
+        for k in range(escolha[a]):
+            if vagas[por_aluno[a][k][1]] > 0:
+                retirar(a)
+                colocar(a, k)
+                break
+
+    # 5. trocas: dois alunos em rotas cheias trocam de rota se ambos caminham menos no total
+    opcao_na_rota = [{r: k for k, (_, r, _) in enumerate(opcoes)} for opcoes in por_aluno]
+    for a in com_opcao:
+        if escolha[a] is None or escolha[a] == 0:
+            continue
+        custo_a, rota_a, _ = por_aluno[a][escolha[a]]
+        for k in range(escolha[a]):
+            melhor_a, r, _ = por_aluno[a][k]
+            troca = None
+            for b in ocupantes[r]:
+                kb = opcao_na_rota[b].get(rota_a)
+                if kb is None:
+                    continue
+                ganho = custo_a + por_aluno[b][escolha[b]][0] - melhor_a - por_aluno[b][kb][0]
+                if ganho > 1e-6 and (troca is None or ganho > troca[0]):
+                    troca = (ganho, b, kb)
+            if troca:
+                _, b, kb = troca
+                retirar(a)
+                retirar(b)
+                colocar(a, k)
+                colocar(b, kb)
+                break
+
+    return escolha, ainda_sem_vaga
+
+
+# =====================================================
+# Carregamento do banco
+# =====================================================
+def carregar_alunos(cursor, escola, reatribuir=False):
+    filtro = "" if reatribuir else """
+          AND NOT EXISTS (
+              SELECT 1 FROM inscricoes_rotas i
+              WHERE i.estudante_id = e.id AND i.status = 'ativa'
+          )"""
+    cursor.execute(f"""
+        SELECT e.id, e.latitude, e.longitude
+        FROM estudantes e
+        WHERE e.escola = %s AND e.is_active = 1{filtro}
+        ORDER BY e.id
+    """, (escola,))
+    return cursor.fetchall()
+
+
+# Rotas com capacidade e lugares já ocupados por quem não entra no lote.
+# Em reatribuir o lote são os estudantes ativos da escola (o mesmo filtro de
+# carregar_alunos); gravar apaga as inscrições exatamente desses estudantes.
+def carregar_rotas(cursor, escola, rota_ids=None, reatribuir=False):
+    filtro_rotas, params = "", []
+    if reatribuir:
+        filtro_ocupadas = " AND (e.escola <> %s OR e.is_active <> 1)"
+        params.append(escola)
+    else:
+        filtro_ocupadas = ""
+    if rota_ids:
+        filtro_rotas = f" WHERE r.id IN ({','.join(['%s'] * len(rota_ids))})"
+        params.extend(rota_ids)
+    cursor.execute(f"""
+        SELECT r.id, r.nome_rota, r.capacidade,
+               (SELECT COUNT(*)
+                FROM inscricoes_rotas i
+                JOIN estudantes e ON e.id = i.estudante_id
+                WHERE i.rota_id = r.id AND i.status = 'ativa'{filtro_ocupadas}) AS ocupadas
+        FROM rotas r{filtro_rotas}
+        ORDER BY r.id
+    """, params)
+    return cursor.fetchall()
+
+
+def atribuir(cursor, escola, distancia_max_m=DISTANCIA_MAX_PADRAO_M, rota_ids=None, reatribuir=False):
+    alunos = carregar_alunos(cursor, escola, reatribuir)
+    rotas = carregar_rotas(cursor, escola, rota_ids, reatribuir)
+    paradas = carregar_paradas(cursor, [r["id"] for r in rotas])
+
+    indice_rota = {r["id"]: i for i, r in enumerate(rotas)}
+    capacidades = [r["capacidade"] if r["capacidade"] is not None else CAPACIDADE_PADRAO for r in rotas]
+    vagas = [max(0, c - r["ocupadas"]) for c, r in zip(capacidades, rotas)]
+
+    lista_paradas = [(indice_rota[rota_id], p) for rota_id, ps in paradas.items() for p in ps]
+    paradas_lat = np.array([p["latitude"] for _, p in lista_paradas], dtype=float)
+    paradas_lng = np.array([p["longitude"] for _, p in lista_paradas], dtype=float)
+    paradas_rota = np.array([r for r, _ in lista_paradas], dtype=np.int64)
+
+    com_local = [a for a in alunos if a["latitude"] is not None and a["longitude"] is not None]
+    sem_local = [a for a in alunos if a["latitude"] is None or a["longitude"] is None]
+    por_aluno = candidatos(
+        np.array([float(a["latitude"]) for a in com_local]),
+        np.array([float(a["longitude"]) for a in com_local]),
+        paradas_lat, paradas_lng, paradas_rota, distancia_max_m
+    )
+    escolha, sem_vaga = resolver(por_aluno, vagas)
+
+    atribuidos, novas = [], [0] * len(rotas)
+    for aluno, opcoes, k in zip(com_local, por_aluno, escolha):
+        if k is None:
+            continue
+        distancia, r, p = opcoes[k]
+        novas[r] += 1
+        atribuidos.append({
+            "estudante_id": aluno["id"],
+            "rota_id": rotas[r]["id"],
+            "parada": lista_paradas[p][1]["name"],
+            "distancia_m": round(distancia, 1),
+        })
+
+    sem_vaga = set(sem_vaga)
+    nao_atribuidos = [{"estudante_id": a["id"], "motivo": "sem_localizacao"} for a in sem_local]
+    for i, (aluno, opcoes) in enumerate(zip(com_local, por_aluno)):
+        if not opcoes:
+            nao_atribuidos.append({"estudante_id": aluno["id"], "motivo": "sem_parada_proxima"})
+        elif i in sem_vaga:
+            nao_atribuidos.append({"estudante_id": aluno["id"], "motivo": "sem_vaga"})
+
+    distancias = [a["distancia_m"] for a in atribuidos]
+    return {
+        "escola": escola,
+        "distancia_max_m": distancia_max_m,
+        "reatribuir": reatribuir,
+        "atribuidos": atribuidos,
+        "nao_atribuidos": nao_atribuidos,
+        "rotas": [{
+            "rota_id": r["id"],
+            "nome_rota": r["nome_rota"],
+            "capacidade": capacidades[i],
+            "ocupadas": r["ocupadas"],
+            "novas": novas[i],
+            "vagas_restantes": capacidades[i] - r["ocupadas"] - novas[i],
+        } for i, r in enumerate(rotas)],
+        "resumo": {
+            "estudantes": len(alunos),
+            "atribuidos": len(atribuidos),
+            "sem_localizacao": len(sem_local),
+            "sem_parada_proxima": sum(1 for n in nao_atribuidos if n["motivo"] == "sem_parada_proxima"),
+            "sem_vaga": len(sem_vaga),
+            "distancia_media_m": round(sum(distancias) / len(distancias), 1) if distancias else None,
+            "distancia_maior_m": max(distancias) if distancias else None,
+        },
+    }
+
+
+# =====================================================
+# Gravação da prévia em inscricoes_rotas (uma transação)
+# Trava as rotas envolvidas, confere a capacidade de novo, insere em lotes e
+# atualiza rotas.vagas_ocupadas. Em reatribuir apaga antes as inscrições de
+# todo o lote (atribuídos e não atribuídos), cujos lugares a prévia contou
+# como livres.
+# Devolve (inseridos, ignorados); levanta CapacidadeExcedida se não couber mais.
+# =====================================================
+LOTE_GRAVACAO = 1000
+
+
+class CapacidadeExcedida(Exception):
+    pass
+
+
+def _em_lotes(itens, tamanho=LOTE_GRAVACAO):
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+def gravar(conn, cursor, previa):
+    atribuidos = previa["atribuidos"]
+    rota_ids = sorted({a["rota_id"] for a in atribuidos})
+    estudantes = [a["estudante_id"] for a in atribuidos]
+    if previa.get("reatribuir"):
+        estudantes += [a["estudante_id"] for a in previa["nao_atribuidos"]]
+    if not estudantes:
+        return 0, 0
+
+    try:
+        capacidades = {}
+        if rota_ids:
+            marcadores = ','.join(['%s'] * len(rota_ids))
+            cursor.execute(f"SELECT id, capacidade FROM rotas WHERE id IN ({marcadores}) FOR UPDATE", rota_ids)
+            capacidades = {linha[0]: linha[1] if linha[1] is not None else CAPACIDADE_PADRAO
+                           for linha in cursor.fetchall()}
+
+        ja_inscritos, liberadas = set(), set()
+        for lote in _em_lotes(estudantes):
+            marcadores = ','.join(['%s'] * len(lote))
+            if previa.get("reatribuir"):
+                cursor.execute(f"""
+                    SELECT DISTINCT rota_id FROM inscricoes_rotas
+                    WHERE status = 'ativa' AND estudante_id IN ({marcadores})
+                """, lote)
+                liberadas.update(linha[0] for linha in cursor.fetchall())
+                cursor.execute(f"""
+                    DELETE FROM inscricoes_rotas
+                    WHERE status = 'ativa' AND estudante_id IN ({marcadores})
+                """, lote)
+            else:
+                cursor.execute(f"""
+                    SELECT estudante_id FROM inscricoes_rotas
+                    WHERE status = 'ativa' AND estudante_id IN ({marcadores})
+                """, lote)
+                ja_inscritos.update(linha[0] for linha in cursor.fetchall())
+
+        novos = [a for a in atribuidos if a["estudante_id"] not in ja_inscritos]
+
+        ocupadas = {}
+        if rota_ids:
+            marcadores = ','.join(['%s'] * len(rota_ids))
+            cursor.execute(f"""
+                SELECT rota_id, COUNT(*) FROM inscricoes_rotas
+                WHERE status = 'ativa' AND rota_id IN ({marcadores})
+                GROUP BY rota_id
+            """, rota_ids)
+            ocupadas = dict(cursor.fetchall())
+        for a in novos:
+            ocupadas[a["rota_id"]] = ocupadas.get(a["rota_id"], 0) + 1
+        cheias = [r for r in rota_ids if ocupadas.get(r, 0) > capacidades.get(r, CAPACIDADE_PADRAO)]
+        if cheias:
+            raise CapacidadeExcedida(f"Rotas sem vagas suficientes desde a prévia: {cheias}")
+
+        for lote in _em_lotes(novos):
+            valores = ','.join(['(%s,%s)'] * len(lote))
+            params = [campo for a in lote for campo in (a["estudante_id"], a["rota_id"])]
+            cursor.execute(f"INSERT INTO inscricoes_rotas (estudante_id, rota_id) VALUES {valores}", params)
+
+        # Contadores de vagas em dia; rotas que perderam estudantes chamam a lista de espera
+        recontar_vagas(cursor, set(rota_ids) | liberadas)
+        for rota_id in sorted(liberadas - set(rota_ids)):
+            promover_espera(cursor, rota_id)
+
+        conn.commit()
+        return len(novos), len(atribuidos) - len(novos)
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,182 @@
+import functools
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import mysql.connector
+from flask import g, request, jsonify
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+from senhas import verificar_senha
+
+# =====================================================
+# Autenticação: conferência de senha no login e token de sessão
+#
+# O login confere a senha no pool de processos (senhas.py) e devolve um
+# token assinado {papel, id, profile_id}; as próximas chamadas mandam o token
+# no header "Authorization: Bearer <token>" em vez de ids na URL. Sem
+# UNIBUS_SEGREDO o segredo é aleatório por processo: os tokens caem a cada
+# reinício e não valem entre workers.
+# =====================================================
+
+SEGREDO = os.environ.get("UNIBUS_SEGREDO")
+if not SEGREDO:
+    print("Aviso: UNIBUS_SEGREDO não definido; usando segredo temporário para os tokens")
+    SEGREDO = secrets.token_hex(32)
+
+# Um dia letivo (ida e volta) com folga
+TTL_TOKEN = int(os.environ.get("UNIBUS_TOKEN_TTL", str(12 * 60 * 60)))
+# Tokens já conferidos guardados em memória (LRU)
+TAMANHO_CACHE_TOKENS = int(os.environ.get("UNIBUS_TOKEN_CACHE", "10000"))
+# As rotas antigas com id na URL exigem token; "0" só enquanto houver versão
+# antiga do app (sem token) em uso: aí quem não manda o header passa sem conferência
+EXIGIR_TOKEN = os.environ.get("UNIBUS_EXIGIR_TOKEN", "1") == "1"
+
+# Tabela de cada papel (coluna "senha" e chave "id" em todas)
+TABELAS = {
+    "estudante": "estudantes",
+    "motorista": "motoristas",
+    "gestao": "gestao",
+}
+
+_assinador = URLSafeTimedSerializer(SEGREDO, salt="unibus-sessao")
+
+
+def emitir_token(papel, usuario_id, profile_id=None):
+    return _assinador.dumps({"papel": papel, "id": usuario_id, "profile_id": profile_id})
+
+
+# -> {papel, id, profile_id} ou None (assinatura inválida ou expirado)
+def ler_token(token, ttl=TTL_TOKEN):
+    try:
+        return _assinador.loads(token, max_age=ttl)
+    except BadSignature:
+        return None
+
+
+# =====================================================
+# Cache LRU de tokens conferidos: token -> (usuário, expira em)
+# Cada requisição autenticada resolve o usuário sem banco e, no acerto,
+# sem refazer a assinatura/JSON do token.
+# =====================================================
+class CacheTokens:
+    def __init__(self, tamanho=TAMANHO_CACHE_TOKENS, ttl=TTL_TOKEN):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._trava = threading.Lock()
+
+    def usuario(self, token):
+        agora = time.time()
+        with self._trava:
+            item = self._dados.get(token)
+            if item is not None:
+                if item[1] > agora:
+                    self._dados.move_to_end(token)
+                    return item[0]
+                del self._dados[token]
+
+        try:
+            usuario, emitido = _assinador.loads(token, max_age=self.ttl, return_timestamp=True)
+        except BadSignature:
+            return None
+        with self._trava:
+            self._dados[token] = (usuario, emitido.timestamp() + self.ttl)
+            if len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+        return usuario
+
+
+cache_tokens = CacheTokens()
+
+
+# Usuário do token da requisição atual (ou None)
+def usuario_atual():
+    if "usuario" not in g:
+        cabecalho = request.headers.get("Authorization", "")
+        token = cabecalho[7:].strip() if cabecalho.startswith("Bearer ") else None
+        g.usuario = cache_tokens.usuario(token) if token else None
+    return g.usuario
+
+
+def _negado(mensagem, status):
+    return jsonify({"erro": mensagem}), status
+
+
+# Exige token de um dos papéis; o usuário fica em g.usuario
+def requer_login(*papeis):
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            usuario = usuario_atual()
+            if usuario is None:
+                return _negado("Faça login novamente", 401)
+            if papeis and usuario["papel"] not in papeis:
+                return _negado("Acesso não permitido para este usuário", 403)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+# Rotas antigas com o id na URL: com token, o id tem que ser o do próprio
+# usuário (a gestão vê todos; papel=None aceita qualquer papel com o mesmo
+# campo); sem token, 401 (ou passa com UNIBUS_EXIGIR_TOKEN=0)
+def dono_da_url(papel, parametro, campo="id"):
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            usuario = usuario_atual()
+            if usuario is None:
+                if EXIGIR_TOKEN:
+                    return _negado("Faça login novamente", 401)
+            elif usuario["papel"] != "gestao" and (
+                    (papel and usuario["papel"] != papel) or str(usuario.get(campo)) != str(kwargs[parametro])):
+                return _negado("Acesso não permitido para este usuário", 403)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+# Estudante de uma ação com o id no corpo/query: o estudante logado só age por
+# si mesmo; a gestão (ou o app antigo, sem token e com UNIBUS_EXIGIR_TOKEN=0)
+# informa o id
+def estudante_alvo(informado):
+    usuario = usuario_atual()
+    if usuario is None:
+        return None if EXIGIR_TOKEN else informado
+    if usuario["papel"] == "estudante":
+        return usuario["id"]
+    return informado if usuario["papel"] == "gestao" else None
+
+
+def sessao(papel, usuario):
+    return {
+        "token": emitir_token(papel, usuario["id"], usuario.get("profile_id")),
+        "expira_em": TTL_TOKEN,
+    }
+
+
+# Confere a senha do usuário (linha do banco com "id" e "senha").
+# Hash com custo antigo é regravado com o atual; se isso falhar o login segue.
+def conferir_senha(conn, papel, usuario, senha):
+    confere, novo_hash = verificar_senha(usuario.get("senha"), senha)
+    if confere and novo_hash:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"UPDATE {TABELAS[papel]} SET senha = %s WHERE id = %s AND senha = %s",
+                (novo_hash, usuario["id"], usuario["senha"])
+            )
+            conn.commit()
+        except mysql.connector.Error as erro:
+            conn.rollback()
+            print("Rehash da senha falhou:", erro)
+        finally:
+            cursor.close()
+    return confere
+
+
+def resposta_ocupado(erro):
+    return jsonify({"erro": str(erro)}), 503, {"Retry-After": "2"}
@@ -0,0 +1,348 @@
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errors
+from flask import g, has_app_context
+
+# =====================================================
+# Configuração do banco (variáveis de ambiente com os valores de antes)
+# =====================================================
+CONFIG_BANCO = {
+    "host": os.environ.get("UNIBUS_DB_HOST", "localhost"),
+    "user": os.environ.get("UNIBUS_DB_USER", "root"),
+    "password": os.environ.get("UNIBUS_DB_PASSWORD", "neto2007"),
+    "database": os.environ.get("UNIBUS_DB_NAME", "UNIBUS"),
+}
+
+TAMANHO_POOL = int(os.environ.get("UNIBUS_DB_POOL_TAMANHO", "10"))
+TIMEOUT_POOL = float(os.environ.get("UNIBUS_DB_POOL_TIMEOUT", "10"))
+# Conexões mais velhas que isso são fechadas e recriadas no checkout
+RECICLAR_APOS = float(os.environ.get("UNIBUS_DB_POOL_RECICLAR", "1800"))
+# Só faz ping na conexão se ela ficou parada mais que isso (segundos)
+PING_APOS = float(os.environ.get("UNIBUS_DB_POOL_PING_APOS", "5"))
+
+# Janela usada para calcular checkouts por segundo
+JANELA_METRICAS = 60.0
+
+
+class PoolEsgotado(errors.PoolError):
+    pass
+
+
+# =====================================================
+# Observadores de consultas (ferramentas de diagnóstico e métricas)
+# Cada função registrada recebe (sql, params, duracao_s) depois de todo
+# execute() feito com conexões do pool; as de observar_linhas recebem
+# (linhas, duracao_s) a cada fetch. Sem observadores o cursor é o do
+# conector, sem nenhum custo extra. Registrar de novo a mesma função não faz
+# nada (cada criar_app() chama os init_app, e as listas valem para o processo).
+# =====================================================
+_observadores = []
+_observadores_linhas = []
+
+
+def observar_consultas(funcao):
+    if funcao not in _observadores:
+        _observadores.append(funcao)
+    return funcao
+
+
+def observar_linhas(funcao):
+    if funcao not in _observadores_linhas:
+        _observadores_linhas.append(funcao)
+    return funcao
+
+
+def parar_de_observar(funcao):
+    for lista in (_observadores, _observadores_linhas):
+        if funcao in lista:
+            lista.remove(funcao)
+
+
+class CursorObservado:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        for linha in self._cursor:
+            self._contar(1, 0.0)
+            yield linha
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def _avisar(self, sql, params, inicio):
+        duracao = time.perf_counter() - inicio
+        for funcao in list(_observadores):
+            funcao(sql, params, duracao)
+
+    def _contar(self, linhas, duracao):
+        for funcao in list(_observadores_linhas):
+            funcao(linhas, duracao)
+
+    # Com o cursor sem buffer o tempo de rede/servidor aparece no fetch
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = self._cursor.fetchone()
+        self._contar(0 if linha is None else 1, time.perf_counter() - inicio)
+        return linha
+
+    def fetchmany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        linhas = self._cursor.fetchmany(*args, **kwargs)
+        self._contar(len(linhas), time.perf_counter() - inicio)
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = self._cursor.fetchall()
+        self._contar(len(linhas), time.perf_counter() - inicio)
+        return linhas
+
+    def execute(self, sql, params=(), *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params, *args, **kwargs)
+        finally:
+            self._avisar(sql, params, inicio)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_params, *args, **kwargs)
+        finally:
+            self._avisar(sql, seq_params, inicio)
+
+
+# =====================================================
+# Conexão emprestada pelo pool
+# close() devolve ao pool em vez de fechar o socket
+# =====================================================
+class ConexaoDoPool:
+    def __init__(self, pool, conexao, criada_em):
+        self._pool = pool
+        self._conexao = conexao
+        self._criada_em = criada_em
+
+    def __getattr__(self, nome):
+        if self._conexao is None:
+            raise errors.InterfaceError("Conexão já devolvida ao pool")
+        return getattr(self._conexao, nome)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.__getattr__("cursor")(*args, **kwargs)
+        return CursorObservado(cursor) if _observadores or _observadores_linhas else cursor
+
+    def close(self):
+        if self._conexao is None:
+            return
+        conexao, self._conexao = self._conexao, None
+        self._pool.devolver(conexao, self._criada_em)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =====================================================
+# Pool de conexões limitado, com health-check e reciclagem
+# =====================================================
+class PoolDeConexoes:
+    def __init__(self, tamanho=TAMANHO_POOL, timeout=TIMEOUT_POOL,
+                 reciclar_apos=RECICLAR_APOS, ping_apos=PING_APOS, **config):
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.reciclar_apos = reciclar_apos
+        self.ping_apos = ping_apos
+        self._config = config or dict(CONFIG_BANCO)
+
+        self._cond = threading.Condition()
+        self._livres = []  # (conexao, criada_em, devolvida_em) — usada como pilha
+        self._abertas = 0
+        self._em_uso = 0
+
+        self._checkouts = 0
+        self._checkouts_recentes = deque()
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._esgotamentos = 0
+        self._recicladas = 0
+        self._falhas_ping = 0
+
+    def _nova_conexao(self):
+        return mysql.connector.connect(**self._config)
+
+    def _validar(self, conexao, criada_em, devolvida_em):
+        agora = time.monotonic()
+        if self.reciclar_apos and agora - criada_em > self.reciclar_apos:
+            self._recicladas += 1
+            self._fechar(conexao)
+            return None
+        if agora - devolvida_em > self.ping_apos:
+            try:
+                conexao.ping(reconnect=False)
+            except errors.Error:
+                self._falhas_ping += 1
+                self._fechar(conexao)
+                return None
+        return conexao
+
+    @staticmethod
+    def _fechar(conexao):
+        try:
+            conexao.close()
+        except errors.Error:
+            pass
+
+    def obter(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+
+        with self._cond:
+            while not self._livres and self._abertas >= self.tamanho:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._esgotamentos += 1
+                    raise PoolEsgotado(
+                        f"Nenhuma conexão livre após {timeout:.1f}s (pool de {self.tamanho})"
+                    )
+                self._cond.wait(restante)
+
+            item = self._livres.pop() if self._livres else None
+            if item is None:
+                self._abertas += 1  # reserva a vaga antes de abrir fora do lock
+            self._em_uso += 1
+
+        try:
+            conexao = None
+            if item is not None:
+                conexao, criada_em, devolvida_em = item
+                conexao = self._validar(conexao, criada_em, devolvida_em)
+            if conexao is None:
+                conexao = self._nova_conexao()
+                criada_em = time.monotonic()
+        except Exception:
+            with self._cond:
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._cond.notify()
+            raise
+
+        espera = time.monotonic() - inicio
+        with self._cond:
+            self._checkouts += 1
+            self._checkouts_recentes.append(time.monotonic())
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+
+        return ConexaoDoPool(self, conexao, criada_em)
+
+    def devolver(self, conexao, criada_em):
+        saudavel = True
+        try:
+            if conexao.in_transaction:
+                conexao.rollback()
+        except errors.Error:
+            saudavel = False
+
+        with self._cond:
+            self._em_uso -= 1
+            if saudavel:
+                self._livres.append((conexao, criada_em, time.monotonic()))
+            else:
+                self._abertas -= 1
+            self._cond.notify()
+
+        if not saudavel:
+            self._fechar(conexao)
+
+    def fechar_todas(self):
+        with self._cond:
+            livres, self._livres = self._livres, []
+            self._abertas -= len(livres)
+        for conexao, _, _ in livres:
+            self._fechar(conexao)
+
+    def metricas(self):
+        with self._cond:
+            agora = time.monotonic()
+            while self._checkouts_recentes and agora - self._checkouts_recentes[0] > JANELA_METRICAS:
+                self._checkouts_recentes.popleft()
+            return {
+                "tamanho": self.tamanho,
+                "abertas": self._abertas,
+                "em_uso": self._em_uso,
+                "livres": len(self._livres),
+                "checkouts": self._checkouts,
+                "checkouts_por_segundo": round(len(self._checkouts_recentes) / JANELA_METRICAS, 3),
+                "espera_media_ms": round(self._espera_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+                "esgotamentos": self._esgotamentos,
+                "recicladas": self._recicladas,
+                "falhas_ping": self._falhas_ping,
+            }
+
+
+# =====================================================
+# Pool global do processo (criado sob demanda)
+# =====================================================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolDeConexoes()
+    return _pool
+
+
+# No processo filho depois de um fork (gunicorn com preload_app): esquece o
+# pool herdado sem fechar as conexões, que ainda são do processo pai
+# (close() mandaria COM_QUIT pelo mesmo socket). Cada worker cria o seu.
+def apos_fork():
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+# =====================================================
+# Conexão da requisição atual
+# Todas as chamadas numa mesma requisição reutilizam a mesma conexão,
+# que volta para o pool no teardown (com rollback se ficou transação aberta).
+# =====================================================
+def conectar():
+    if not has_app_context():
+        raise RuntimeError("conectar() só pode ser usado dentro de uma requisição; use conexao()")
+    if "conexao_banco" not in g:
+        g.conexao_banco = obter_pool().obter()
+    return g.conexao_banco
+
+
+def liberar_conexao(exc=None):
+    conexao = g.pop("conexao_banco", None)
+    if conexao is not None:
+        conexao.close()
+
+
+# Para código fora de requisição (workers, scripts): with conexao() as conn: ...
+def conexao(timeout=None):
+    return obter_pool().obter(timeout)
+
+
+def init_app(app):
+    app.teardown_appcontext(liberar_conexao)
@@ -0,0 +1,63 @@
+# Benchmark do resolvedor de atribuição em lote (atribuicao_rotas.py)
+#
+# Gera um município sintético (~33 km de lado): rotas com 15 paradas em volta
+# de um centro aleatório e estudantes espalhados, com um ônibus de 44 lugares
+# para cada ~40 estudantes. Mede a busca de candidatos (índice em grade) e a
+# atribuição com capacidade. Não precisa de banco.
+#   python benchmarks/bench_atribuicao_rotas.py --estudantes 10000 50000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from atribuicao_rotas import candidatos, resolver
+
+PARADAS_POR_ROTA = 15
+CAPACIDADE = 44
+
+
+def municipio(estudantes, semente=0):
+    aleatorio = np.random.default_rng(semente)
+    rotas = estudantes // 40 + 1
+    centros = aleatorio.random((rotas, 2)) * 0.3
+    paradas_lat = (centros[:, None, 0] + aleatorio.normal(0, 0.01, (rotas, PARADAS_POR_ROTA))).ravel() - 8.4
+    paradas_lng = (centros[:, None, 1] + aleatorio.normal(0, 0.01, (rotas, PARADAS_POR_ROTA))).ravel() - 36.1
+    paradas_rota = np.repeat(np.arange(rotas), PARADAS_POR_ROTA)
+    alunos_lat = -8.4 + aleatorio.random(estudantes) * 0.3
+    alunos_lng = -36.1 + aleatorio.random(estudantes) * 0.3
+    return rotas, alunos_lat, alunos_lng, paradas_lat, paradas_lng, paradas_rota
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--estudantes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--distancia-max", type=float, default=800.0)
+    args = parser.parse_args()
+
+    print(f"{'estudantes':>10} {'rotas':>6} {'candidatos (s)':>15} {'atribuição (s)':>15} "
+          f"{'atribuídos':>10} {'sem vaga':>9} {'sem parada':>11} {'caminhada média (m)':>20}")
+    for quantidade in args.estudantes:
+        rotas, alunos_lat, alunos_lng, paradas_lat, paradas_lng, paradas_rota = municipio(quantidade)
+
+        inicio = time.perf_counter()
+        por_aluno = candidatos(alunos_lat, alunos_lng, paradas_lat, paradas_lng, paradas_rota,
+                               args.distancia_max)
+        tempo_candidatos = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        escolha, sem_vaga = resolver(por_aluno, [CAPACIDADE] * rotas)
+        tempo_atribuicao = time.perf_counter() - inicio
+
+        distancias = [por_aluno[a][k][0] for a, k in enumerate(escolha) if k is not None]
+        sem_parada = sum(1 for opcoes in por_aluno if not opcoes)
+        print(f"{quantidade:>10} {rotas:>6} {tempo_candidatos:>15.2f} {tempo_atribuicao:>15.2f} "
+              f"{len(distancias):>10} {len(sem_vaga):>9} {sem_parada:>11} "
+              f"{sum(distancias) / max(len(distancias), 1):>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
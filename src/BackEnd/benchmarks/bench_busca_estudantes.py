@@ -0,0 +1,144 @@
+# Benchmark de GET /api/estudantes/buscar (consultas de busca_estudantes.py)
+#
+# Cria num banco MySQL descartável (UNIBUS_BENCH_DB, padrão UNIBUS_BENCH) uma
+# tabela estudantes com N alunos de nomes acentuados, aplica os índices da
+# migração 005 e mede p50/p95/p99 de cada tipo de busca. Para comparação,
+# mede também a listagem completa que a tela fazia antes (filtro no app).
+#   python benchmarks/bench_busca_estudantes.py --estudantes 100000
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+
+from banco import CONFIG_BANCO
+from busca_estudantes import montar_busca
+from migrar import PASTA_MIGRACOES, comandos
+
+BANCO_BENCH = os.environ.get("UNIBUS_BENCH_DB", "UNIBUS_BENCH")
+
+NOMES = ["João", "José", "Ana", "Antônio", "Maria", "Júlia", "Lúcia", "Luís", "Inês",
+         "Cecília", "Fábio", "Márcio", "Sérgio", "Vitória", "Gabriel", "Beatriz"]
+SOBRENOMES = ["Silva", "Santos", "Araújo", "Conceição", "Gonçalves", "Lima", "Ferreira",
+              "Pereira", "Magalhães", "Brandão", "Assunção", "Oliveira", "Galvão"]
+ESCOLAS = [f"Escola Municipal {i}" for i in range(40)]
+TURMAS = [f"{ano}º {letra}" for ano in range(1, 10) for letra in "ABC"]
+
+
+def preparar(conn, quantidade):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS inscricoes_rotas")
+    cursor.execute("DROP TABLE IF EXISTS estudantes")
+    cursor.execute("""
+        CREATE TABLE estudantes (
+            id VARCHAR(36) PRIMARY KEY,
+            nome_completo VARCHAR(255),
+            escola VARCHAR(255),
+            turma VARCHAR(50),
+            email VARCHAR(255),
+            numero_matricula VARCHAR(50) UNIQUE,
+            nome_responsavel VARCHAR(255),
+            numero_responsavel VARCHAR(30)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE inscricoes_rotas (
+            id VARCHAR(36) PRIMARY KEY,
+            estudante_id VARCHAR(36),
+            rota_id INT,
+            status VARCHAR(20)
+        )
+    """)
+    aleatorio = random.Random(42)
+    lote = []
+    for i in range(quantidade):
+        nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+        lote.append((str(uuid.uuid4()), nome, aleatorio.choice(ESCOLAS), aleatorio.choice(TURMAS),
+                     f"aluno{i}@bench", f"{2024000000 + i}", "Responsável", "(87) 99999-0000"))
+        if len(lote) == 5000:
+            cursor.executemany("INSERT INTO estudantes VALUES (%s,%s,%s,%s,%s,%s,%s,%s)", lote)
+            lote = []
+    if lote:
+        cursor.executemany("INSERT INTO estudantes VALUES (%s,%s,%s,%s,%s,%s,%s,%s)", lote)
+
+    with open(os.path.join(PASTA_MIGRACOES, "005_estudantes_busca.sql"), encoding="utf-8") as arquivo:
+        for comando in comandos(arquivo.read()):
+            cursor.execute(comando)
+    conn.commit()
+    cursor.close()
+
+
+def medir(conn, repeticoes, **busca):
+    cursor = conn.cursor(dictionary=True)
+    tempos = []
+    for _ in range(repeticoes):
+        sql, params = montar_busca(**busca)
+        inicio = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    cursor.close()
+    tempos.sort()
+    return tempos
+
+
+def percentil(tempos, p):
+    return tempos[min(len(tempos) - 1, int(len(tempos) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--estudantes", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    config = dict(CONFIG_BANCO)
+    config.pop("database")
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BANCO_BENCH}")
+    cursor.close()
+    conn.database = BANCO_BENCH
+
+    preparar(conn, args.estudantes)
+
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT nome_busca, id FROM estudantes ORDER BY nome_busca, id LIMIT 1 OFFSET 5000")
+    meio = cursor.fetchone()
+    cursor.close()
+
+    casos = [
+        ("prefixo curto 'jo'", {"texto": "jo"}),
+        ("prefixo 'joao si'", {"texto": "joao si"}),
+        ("palavras 'ana arau'", {"texto": "ana arau"}),
+        ("matrícula", {"matricula": "2024000123"}),
+        ("escola+turma", {"escola": ESCOLAS[3], "turma": TURMAS[5]}),
+        ("escola+turma+q", {"escola": ESCOLAS[3], "turma": TURMAS[5], "texto": "mar"}),
+        ("página seguinte", {"posicao": (meio["nome_busca"], meio["id"])}),
+    ]
+
+    print(f"{'busca':>22} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for nome, busca in casos:
+        tempos = medir(conn, args.repeticoes, **busca)
+        print(f"{nome:>22} {statistics.median(tempos):>10.2f} "
+              f"{percentil(tempos, 0.95):>10.2f} {percentil(tempos, 0.99):>10.2f}")
+
+    # Antes: a tela recebia a lista inteira e filtrava no app
+    cursor = conn.cursor(dictionary=True)
+    inicio = time.perf_counter()
+    cursor.execute("SELECT * FROM estudantes")
+    linhas = len(cursor.fetchall())
+    cursor.close()
+    print(f"{'lista completa':>22} {(time.perf_counter() - inicio) * 1000:>10.2f}   ({linhas} linhas)")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
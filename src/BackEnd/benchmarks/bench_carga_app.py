@@ -0,0 +1,280 @@
+# Teste de carga de ponta a ponta: repete as sequências de chamadas dos apps
+#
+# Roda contra um servidor com o banco semeado por dados_sinteticos.py
+# (suba a API com UNIBUS_DB_NAME=UNIBUS_carga) e mede p50/p95/p99 e req/s
+# por endpoint. Cenários:
+#   login   - pico de logins no início do turno (todos ao mesmo tempo)
+#   inicio  - tela inicial do estudante: dashboard e detalhes de uma rota
+#   avisos  - aba de notificações: não lidas, 1ª página (às vezes a 2ª) e
+#             marcar uma como lida
+#   envio   - central de avisos da gestão: rotas, motoristas, histórico,
+#             POST /enviar e o histórico de novo
+# A fase 1 faz --logins logins simultâneos (os tokens servem para a fase 2)
+# e o login de gestor1 (o cenário envio usa o token da gestão);
+# a fase 2 roda --usuarios usuários virtuais por --duracao segundos, cada um
+# sorteando o próximo cenário pelos pesos de --mix.
+#
+#   python benchmarks/bench_carga_app.py --url http://localhost:5000 --usuarios 50 --duracao 60
+#   python benchmarks/bench_carga_app.py --json atual.json --comparar base.json
+#
+# Com --comparar sai com código 1 se o p95 de algum endpoint piorar mais que
+# --tolerancia em relação ao arquivo de base.
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+SENHA_SINTETICA = "unibus123"
+MIX_PADRAO = "inicio=60,avisos=35,envio=5"
+
+
+def percentil(tempos, p):
+    return tempos[min(len(tempos) - 1, int(len(tempos) * p))]
+
+
+# =====================================================
+# Medidas por endpoint (nome = método + caminho com os ids trocados)
+# =====================================================
+class Medidas:
+    def __init__(self):
+        self._tempos = defaultdict(list)
+        self._erros = defaultdict(int)
+        self._trava = threading.Lock()
+
+    def registrar(self, nome, ms, ok):
+        with self._trava:
+            self._tempos[nome].append(ms)
+            if not ok:
+                self._erros[nome] += 1
+
+    def resumo(self, duracao):
+        with self._trava:
+            itens = dict(self._tempos)
+            itens["TOTAL"] = [t for tempos in self._tempos.values() for t in tempos]
+            erros = dict(self._erros, TOTAL=sum(self._erros.values()))
+        resumo = {}
+        for nome, tempos in itens.items():
+            if not tempos:
+                continue
+            tempos = sorted(tempos)
+            resumo[nome] = {
+                "pedidos": len(tempos),
+                "erros": erros.get(nome, 0),
+                "req_s": round(len(tempos) / duracao, 1),
+                "p50_ms": round(statistics.median(tempos), 1),
+                "p95_ms": round(percentil(tempos, 0.95), 1),
+                "p99_ms": round(percentil(tempos, 0.99), 1),
+            }
+        return resumo
+
+
+class Cliente:
+    def __init__(self, base, medidas):
+        self.base = base
+        self.medidas = medidas
+
+    def chamar(self, nome, metodo, caminho, corpo=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = "Bearer " + token
+        dados = json.dumps(corpo).encode() if corpo is not None else None
+        pedido = urllib.request.Request(self.base + caminho, data=dados, method=metodo, headers=headers)
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(pedido) as resposta:
+                status, bruto, cabecalhos = resposta.status, resposta.read(), resposta.headers
+        except urllib.error.HTTPError as erro:
+            status, bruto, cabecalhos = erro.code, erro.read(), erro.headers
+        except OSError:
+            status, bruto, cabecalhos = 0, b"", {}
+        self.medidas.registrar(f"{metodo} {nome}", (time.perf_counter() - inicio) * 1000, 0 < status < 400)
+        try:
+            corpo = json.loads(bruto) if bruto else None
+        except ValueError:
+            corpo = None  # streaming (ndjson) ou HTML de erro
+        return status, corpo, cabecalhos
+
+
+# =====================================================
+# Cenários
+# =====================================================
+def login(cliente, numero):
+    status, corpo, _ = cliente.chamar("/api/estudantes/login", "POST", "/api/estudantes/login",
+                                      {"email": f"aluno{numero}@sintetico.unibus", "senha": SENHA_SINTETICA})
+    if status != 200:
+        return None
+    return {"id": corpo["id"], "profile_id": corpo.get("profile_id"), "token": corpo["token"]}
+
+
+def login_gestao(cliente):
+    status, corpo, _ = cliente.chamar("/api/gestao/login", "POST", "/api/gestao/login",
+                                      {"email": "gestor1@sintetico.unibus", "senha": SENHA_SINTETICA})
+    return corpo["token"] if status == 200 else None
+
+
+def cenario_inicio(cliente, usuario, rng):
+    status, painel, _ = cliente.chamar("/api/estudantes/dashboard", "GET", "/api/estudantes/dashboard",
+                                       token=usuario["token"])
+    rotas = (painel or {}).get("rotas") or [] if status == 200 else []
+    if not rotas:
+        return
+    inscritas = [r for r in rotas if r.get("inscrito")]
+    rota = rng.choice(inscritas or rotas)
+    cliente.chamar("/api/rotas/detalhes/<rota>/<estudante>", "GET",
+                   f"/api/rotas/detalhes/{rota['id']}/{usuario['id']}", token=usuario["token"])
+
+
+def cenario_avisos(cliente, usuario, rng):
+    token = usuario["token"]
+    cliente.chamar("/api/notificacoes/nao_lidas", "GET", "/api/notificacoes/nao_lidas", token=token)
+    status, pagina, cabecalhos = cliente.chamar("/api/notificacoes/listar", "GET",
+                                                "/api/notificacoes/listar?limite=30", token=token)
+    if status != 200:
+        return
+    proximo = cabecalhos.get("X-Proximo-Cursor")
+    if proximo and rng.random() < 0.3:
+        cliente.chamar("/api/notificacoes/listar?cursor", "GET",
+                       f"/api/notificacoes/listar?limite=30&cursor={urllib.parse.quote(proximo)}", token=token)
+    nao_lidas = [n for n in pagina or [] if not n.get("lida")]
+    if nao_lidas and rng.random() < 0.5:
+        cliente.chamar("/api/notificacoes/marcar_lida/<id>", "PUT",
+                       f"/api/notificacoes/marcar_lida/{rng.choice(nao_lidas)['id']}", token=token)
+
+
+# usuario aqui é o gestor (token da gestão)
+def cenario_envio(cliente, usuario, rng):
+    token = usuario["token"]
+    _, rotas, _ = cliente.chamar("/api/notificacoes/rotas", "GET", "/api/notificacoes/rotas")
+    cliente.chamar("/api/notificacoes/motoristas", "GET", "/api/notificacoes/motoristas")
+    cliente.chamar("/api/notificacoes/historico", "GET", "/api/notificacoes/historico", token=token)
+    escolhidas = [r["id"] for r in rng.sample(rotas, min(2, len(rotas)))] if rotas else []
+    cliente.chamar("/api/notificacoes/enviar", "POST", "/api/notificacoes/enviar", {
+        "remetente_tipo": "Gestão", "destinatario_tipo": "Estudantes",
+        "routes": escolhidas, "drivers": [], "titulo": "Aviso de carga",
+        "mensagem": "Ônibus atrasado 10 minutos.", "prioridade": "Média", "tipo": "aviso",
+    }, token=token)
+    cliente.chamar("/api/notificacoes/historico", "GET", "/api/notificacoes/historico", token=token)
+
+
+CENARIOS = {
+    "inicio": cenario_inicio,
+    "avisos": cenario_avisos,
+    "envio": cenario_envio,
+}
+
+
+def ler_mix(texto):
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        if nome.strip() not in CENARIOS:
+            raise SystemExit(f"cenário desconhecido: {nome} (use {', '.join(CENARIOS)})")
+        mix[nome.strip()] = float(peso or 1)
+    return mix
+
+
+# =====================================================
+# Fases
+# =====================================================
+def fase_login(base, quantidade, estudantes, concorrencia, semente):
+    medidas = Medidas()
+    cliente = Cliente(base, medidas)
+    numeros = random.Random(semente).sample(range(1, estudantes + 1), min(quantidade, estudantes))
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        usuarios = [u for u in executor.map(lambda n: login(cliente, n), numeros) if u]
+    return usuarios, medidas.resumo(time.perf_counter() - inicio)
+
+
+def fase_mista(base, usuarios, gestor, quantidade, duracao, mix, pausa, semente):
+    medidas = Medidas()
+    cliente = Cliente(base, medidas)
+    nomes, pesos = list(mix), list(mix.values())
+    limite = time.perf_counter() + duracao
+
+    def usuario_virtual(i):
+        rng = random.Random(semente + i)
+        while time.perf_counter() < limite:
+            cenario = rng.choices(nomes, weights=pesos)[0]
+            usuario = gestor if cenario == "envio" else rng.choice(usuarios)
+            CENARIOS[cenario](cliente, usuario, rng)
+            if pausa:
+                time.sleep(rng.uniform(0, 2 * pausa))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=quantidade) as executor:
+        list(executor.map(usuario_virtual, range(quantidade)))
+    return medidas.resumo(time.perf_counter() - inicio)
+
+
+# =====================================================
+# Relatório e comparação com uma execução anterior
+# =====================================================
+def imprimir(titulo, resumo):
+    print(f"\n{titulo}")
+    print(f"{'endpoint':<48} {'pedidos':>8} {'erros':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for nome in sorted(resumo, key=lambda n: (n == "TOTAL", n)):
+        r = resumo[nome]
+        print(f"{nome:<48} {r['pedidos']:>8} {r['erros']:>6} {r['req_s']:>7} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+
+def regressoes(atual, base, tolerancia, folga_ms=5.0):
+    piores = []
+    for fase, resumo in atual.items():
+        for nome, r in resumo.items():
+            anterior = base.get(fase, {}).get(nome)
+            if anterior and r["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia) + folga_ms:
+                piores.append(f"{fase} {nome}: p95 {anterior['p95_ms']} -> {r['p95_ms']} ms")
+    return piores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--estudantes", type=int, default=5000, help="estudantes no banco semeado")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concorrencia-login", type=int, default=100)
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=60)
+    parser.add_argument("--mix", default=MIX_PADRAO)
+    parser.add_argument("--pausa", type=float, default=0.0, help="pausa média entre cenários (s)")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) para apontar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+    mix = ler_mix(args.mix)
+
+    usuarios, resumo_login = fase_login(args.url, args.logins, args.estudantes,
+                                        args.concorrencia_login, args.semente)
+    imprimir(f"Fase 1: {args.logins} logins simultâneos ({len(usuarios)} ok)", resumo_login)
+    if not usuarios:
+        raise SystemExit("nenhum login deu certo; o banco foi semeado com dados_sinteticos.py?")
+
+    token_gestao = login_gestao(Cliente(args.url, Medidas()))
+    if not token_gestao and mix.get("envio"):
+        raise SystemExit("login de gestor1@sintetico.unibus falhou (o cenário envio precisa do token da gestão)")
+    resumo_misto = fase_mista(args.url, usuarios, {"token": token_gestao}, args.duracao, mix, args.pausa, args.semente)
+    imprimir(f"Fase 2: {args.usuarios} usuários por {args.duracao:.0f} s ({args.mix})", resumo_misto)
+
+    resultado = {"login": resumo_login, "misto": resumo_misto}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(resultado, parametros=vars(args)), f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            piores = regressoes(resultado, json.load(f), args.tolerancia)
+        print("\n" + ("Regressões:\n  " + "\n  ".join(piores) if piores else "Sem regressões de p95."))
+        raise SystemExit(1 if piores else 0)
+
+
+if __name__ == "__main__":
+    main()
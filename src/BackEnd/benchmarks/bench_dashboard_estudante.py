@@ -0,0 +1,70 @@
+# Benchmark da tela inicial do estudante contra um servidor rodando
+#
+# Compara a sequência antiga de três chamadas
+#   /api/rotas/listar -> /inscricaoEstudante/listar_rotas_estudante/<id>
+#   -> /api/rotas/detalhes/<rota>/<id>
+# com a chamada única /api/estudantes/<id>/dashboard.
+#
+#   python benchmarks/bench_dashboard_estudante.py --url http://localhost:5000 --estudante <id>
+#
+# --atraso-ms soma um atraso por requisição para simular a latência da rede móvel.
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+
+
+def get(url, atraso):
+    if atraso:
+        time.sleep(atraso)
+    with urllib.request.urlopen(url) as resposta:
+        return json.loads(resposta.read())
+
+
+def sequencia_antiga(base, estudante, atraso):
+    rotas = get(f"{base}/api/rotas/listar", atraso)
+    get(f"{base}/inscricaoEstudante/listar_rotas_estudante/{estudante}", atraso)
+    if rotas:
+        get(f"{base}/api/rotas/detalhes/{rotas[0]['id']}/{estudante}", atraso)
+
+
+def dashboard(base, estudante, atraso):
+    get(f"{base}/api/estudantes/{estudante}/dashboard", atraso)
+
+
+def medir(funcao, repeticoes, *args):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "p50": statistics.median(tempos),
+        "p95": tempos[max(0, int(len(tempos) * 0.95) - 1)],
+        "media": statistics.fmean(tempos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--estudante", required=True)
+    parser.add_argument("--repeticoes", type=int, default=100)
+    parser.add_argument("--atraso-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    atraso = args.atraso_ms / 1000
+
+    # aquecimento (pool de conexões, caches)
+    sequencia_antiga(args.url, args.estudante, 0)
+    dashboard(args.url, args.estudante, 0)
+
+    print(f"{'caminho':>16} {'p50 (ms)':>10} {'p95 (ms)':>10} {'média (ms)':>11}")
+    for nome, funcao in (("3 chamadas", sequencia_antiga), ("dashboard", dashboard)):
+        r = medir(funcao, args.repeticoes, args.url, args.estudante, atraso)
+        print(f"{nome:>16} {r['p50']:>10.2f} {r['p95']:>10.2f} {r['media']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
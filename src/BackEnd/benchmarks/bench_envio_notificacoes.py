@@ -0,0 +1,131 @@
+# Benchmark do fan-out de POST /api/notificacoes/enviar ("Todos")
+#
+# Compara o caminho antigo (set em Python + um INSERT por destinatário)
+# com os modos "lotes" e "sql" de envio_notificacoes.py.
+#
+# Usa um banco MySQL descartável (UNIBUS_BENCH_DB, padrão UNIBUS_BENCH) com as
+# mesmas credenciais UNIBUS_DB_* do servidor. Exemplo:
+#   python benchmarks/bench_envio_notificacoes.py --destinatarios 10000 100000
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+
+from banco import CONFIG_BANCO
+from envio_notificacoes import consulta_destinatarios, distribuir
+
+BANCO_BENCH = os.environ.get("UNIBUS_BENCH_DB", "UNIBUS_BENCH")
+
+
+def preparar(conn, quantidade):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS notificacoes")
+    cursor.execute("DROP TABLE IF EXISTS profiles")
+    cursor.execute("""
+        CREATE TABLE profiles (
+            id VARCHAR(36) PRIMARY KEY,
+            email VARCHAR(255),
+            nome_completo VARCHAR(255),
+            role VARCHAR(20),
+            is_active TINYINT(1) DEFAULT 1,
+            KEY idx_profiles_role (role, is_active)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE notificacoes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            envio_id INT,
+            usuario_id VARCHAR(36),
+            titulo VARCHAR(255),
+            mensagem TEXT,
+            tipo VARCHAR(30),
+            lida TINYINT(1) DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_notificacoes_envio (envio_id, usuario_id)
+        )
+    """)
+    lote = []
+    for i in range(quantidade):
+        role = "estudante" if i % 20 else "motorista"
+        lote.append((str(uuid.uuid4()), f"user{i}@bench", f"Usuário {i}", role))
+        if len(lote) == 5000:
+            cursor.executemany("INSERT INTO profiles (id, email, nome_completo, role) VALUES (%s,%s,%s,%s)", lote)
+            lote = []
+    if lote:
+        cursor.executemany("INSERT INTO profiles (id, email, nome_completo, role) VALUES (%s,%s,%s,%s)", lote)
+    conn.commit()
+    cursor.close()
+
+
+def limpar(conn):
+    cursor = conn.cursor()
+    cursor.execute("TRUNCATE TABLE notificacoes")
+    conn.commit()
+    cursor.close()
+
+
+# Reprodução do código anterior de enviar_notificacao
+def envio_antigo(conn, envio_id):
+    cursor = conn.cursor()
+    sql, params = consulta_destinatarios("Todos")
+    cursor.execute(sql, params)
+    recipient_user_ids = set(r[0] for r in cursor.fetchall())
+    for uid in recipient_user_ids:
+        cursor.execute("""
+            INSERT INTO notificacoes (envio_id, usuario_id, titulo, mensagem, tipo)
+            VALUES (%s,%s,%s,%s,%s)
+        """, (envio_id, uid, "Bench", "Mensagem", "aviso"))
+    conn.commit()
+    cursor.close()
+    return len(recipient_user_ids)
+
+
+def envio_novo(conn, envio_id, modo, tamanho_lote):
+    cursor = conn.cursor()
+    total = distribuir(conn, cursor, envio_id, "Bench", "Mensagem", "aviso",
+                       consulta_destinatarios("Todos"), modo=modo, tamanho_lote=tamanho_lote)
+    conn.commit()
+    cursor.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--destinatarios", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--sem-antigo", action="store_true",
+                        help="pula o caminho antigo (lento em 100k)")
+    args = parser.parse_args()
+
+    config = dict(CONFIG_BANCO)
+    config.pop("database")
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BANCO_BENCH}")
+    cursor.close()
+    conn.database = BANCO_BENCH
+
+    print(f"{'destinatários':>14} {'caminho':>10} {'linhas':>8} {'tempo (s)':>10}")
+    for quantidade in args.destinatarios:
+        preparar(conn, quantidade)
+        casos = [("lotes", lambda: envio_novo(conn, 1, "lotes", args.lote)),
+                 ("sql", lambda: envio_novo(conn, 1, "sql", args.lote))]
+        if not args.sem_antigo:
+            casos.insert(0, ("antigo", lambda: envio_antigo(conn, 1)))
+        for nome, funcao in casos:
+            limpar(conn)
+            inicio = time.perf_counter()
+            linhas = funcao()
+            duracao = time.perf_counter() - inicio
+            print(f"{quantidade:>14} {nome:>10} {linhas:>8} {duracao:>10.3f}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
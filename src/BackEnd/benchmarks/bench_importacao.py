@@ -0,0 +1,119 @@
+# Benchmark da importação em lote de estudantes (importacao.py)
+#
+# Gera um CSV sintético com N alunos e mede:
+#   - leitura + validação (sem banco)
+#   - hash das senhas numa thread (como o cadastro um a um) e no pool de processos
+#   - com --banco, a importação completa num banco MySQL descartável
+#     (UNIBUS_BENCH_DB, padrão UNIBUS_BENCH) com tabelas mínimas de profiles/estudantes
+#   python benchmarks/bench_importacao.py --estudantes 50000 --amostra-hash 2000 --banco
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+from werkzeug.security import generate_password_hash
+
+from banco import CONFIG_BANCO
+from importacao import ImportacaoEstudantes, importar, ler_planilha
+from senhas import PROCESSOS_HASH, hashes_em_lote, encerrar_pool
+
+BANCO_BENCH = os.environ.get("UNIBUS_BENCH_DB", "UNIBUS_BENCH")
+
+NOMES = ["João", "José", "Ana", "Antônio", "Maria", "Júlia", "Lúcia", "Luís", "Inês", "Cecília"]
+SOBRENOMES = ["Silva", "Santos", "Araújo", "Conceição", "Gonçalves", "Lima", "Ferreira", "Galvão"]
+
+
+def gerar_csv(quantidade):
+    aleatorio = random.Random(42)
+    linhas = ["nome_completo;escola;turma;email;numero_matricula;nome_responsavel;"
+              "numero_responsavel;senha;latitude;longitude"]
+    for i in range(quantidade):
+        linhas.append(f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)};"
+                      f"Escola Municipal {i % 40};{i % 9 + 1}º A;aluno{i}@bench;{2024000000 + i};"
+                      f"Responsável;(87) 99999-0000;senha{i};"
+                      f"{-8.4 + aleatorio.random() * 0.3:.6f};{-36.1 + aleatorio.random() * 0.3:.6f}")
+    return ("\n".join(linhas) + "\n").encode()
+
+
+def preparar_banco():
+    config = dict(CONFIG_BANCO)
+    config.pop("database")
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BANCO_BENCH}")
+    conn.database = BANCO_BENCH
+    cursor.execute("DROP TABLE IF EXISTS estudantes")
+    cursor.execute("DROP TABLE IF EXISTS profiles")
+    cursor.execute("""
+        CREATE TABLE profiles (
+            id VARCHAR(36) PRIMARY KEY,
+            email VARCHAR(255) UNIQUE,
+            nome_completo VARCHAR(255),
+            role VARCHAR(20)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE estudantes (
+            id VARCHAR(36) PRIMARY KEY,
+            nome_completo VARCHAR(255), escola VARCHAR(255), turma VARCHAR(50),
+            email VARCHAR(255), numero_matricula VARCHAR(50) UNIQUE,
+            nome_responsavel VARCHAR(255), numero_responsavel VARCHAR(30),
+            senha VARCHAR(255), created_by VARCHAR(36), profile_id VARCHAR(36),
+            latitude DECIMAL(10,7), longitude DECIMAL(10,7)
+        )
+    """)
+    conn.commit()
+    cursor.close()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--estudantes", type=int, default=50000)
+    parser.add_argument("--amostra-hash", type=int, default=1000, help="senhas usadas para medir o hash")
+    parser.add_argument("--banco", action="store_true", help="faz a importação completa no MySQL")
+    args = parser.parse_args()
+
+    conteudo = gerar_csv(args.estudantes)
+    print(f"CSV: {args.estudantes} linhas, {len(conteudo) / 1e6:.1f} MB")
+
+    inicio = time.perf_counter()
+    validacao = ImportacaoEstudantes()
+    validas = sum(1 for numero, registro in ler_planilha(io.BytesIO(conteudo), "alunos.csv")
+                  if validacao.validar(numero, registro))
+    duracao = time.perf_counter() - inicio
+    print(f"leitura + validação: {validas / duracao:>10.0f} linhas/s")
+
+    senhas = [f"senha{i}" for i in range(args.amostra_hash)]
+    inicio = time.perf_counter()
+    for senha in senhas[:max(1, len(senhas) // 10)]:
+        generate_password_hash(senha)
+    por_hash = (time.perf_counter() - inicio) / max(1, len(senhas) // 10)
+    print(f"hash numa thread:    {1 / por_hash:>10.0f} senhas/s "
+          f"(50k alunos ~ {50000 * por_hash / 60:.0f} min)")
+
+    list(hashes_em_lote(senhas[:PROCESSOS_HASH * 2]))  # sobe os processos
+    inicio = time.perf_counter()
+    list(hashes_em_lote(senhas))
+    por_hash = (time.perf_counter() - inicio) / len(senhas)
+    print(f"hash no pool ({PROCESSOS_HASH} proc): {1 / por_hash:>7.0f} senhas/s "
+          f"(50k alunos ~ {50000 * por_hash / 60:.1f} min)")
+
+    if args.banco:
+        conn = preparar_banco()
+        inicio = time.perf_counter()
+        relatorio = importar(conn, "estudantes", ler_planilha(io.BytesIO(conteudo), "alunos.csv"))
+        duracao = time.perf_counter() - inicio
+        conn.close()
+        print(f"importação completa: {relatorio['importados']} alunos em {duracao:.1f} s "
+              f"({relatorio['importados'] / duracao:.0f}/s, {len(relatorio['erros'])} erros)")
+    encerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# Teste de carga das inscrições concorrentes contra um servidor rodando
+#
+# Cadastra uma rota com poucas vagas e N estudantes, dispara N pedidos de
+# /inscricaoEstudante/inscrever ao mesmo tempo (mais alguns toques repetidos do
+# mesmo aluno) e confere no fim:
+#   - inscritos == capacidade, sem aluno repetido
+#   - todos os outros na lista de espera, cada um uma vez
+#   - ao remover inscrições, os primeiros da espera são promovidos
+# Mostra requisições/s e p50/p95/p99. As rotas de gestão pedem login: o
+# benchmark entra como gestor1 do banco sintético (--email/--senha) e inscreve
+# cada estudante com o token da gestão.
+#
+#   python benchmarks/bench_inscricao_concorrente.py --url http://localhost:5000 --pedidos 500
+#
+# Com muitos pedidos simultâneos, suba UNIBUS_DB_POOL_TAMANHO/UNIBUS_DB_POOL_TIMEOUT
+# no servidor (senão os pedidos esperam pelo pool e a latência mede a fila).
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+TOKEN = None
+
+
+def chamar(metodo, url, corpo=None):
+    dados = json.dumps(corpo).encode() if corpo is not None else None
+    headers = {"Content-Type": "application/json"}
+    if TOKEN:
+        headers["Authorization"] = f"Bearer {TOKEN}"
+    pedido = urllib.request.Request(url, data=dados, method=metodo, headers=headers)
+    try:
+        with urllib.request.urlopen(pedido) as resposta:
+            return resposta.status, json.loads(resposta.read() or b"null"), resposta.headers
+    except urllib.error.HTTPError as erro:
+        return erro.code, json.loads(erro.read() or b"null"), erro.headers
+
+
+def login(base, email, senha):
+    status, corpo, _ = chamar("POST", f"{base}/api/gestao/login", {"email": email, "senha": senha})
+    if status != 200:
+        raise SystemExit(f"falha no login da gestão: {status} {corpo}")
+    return corpo["token"]
+
+
+def preparar(base, pedidos, capacidade):
+    marca = uuid.uuid4().hex[:8]
+    status, corpo, _ = chamar("POST", f"{base}/api/rotas/cadastrar", {
+        "nome_rota": f"Carga {marca}", "numero_onibus": "0", "placa_veiculo": "CAR0000",
+        "turno": "manha", "capacidade": capacidade, "pontos_parada": [],
+    })
+    if status != 201:
+        raise SystemExit(f"falha ao cadastrar rota: {status} {corpo}")
+    rota_id = corpo["id_rota"]
+
+    def cadastrar(i):
+        status, corpo, _ = chamar("POST", f"{base}/api/estudantes/cadastro", {
+            "nome_completo": f"Aluno Carga {marca} {i:04d}", "escola": "Escola Carga",
+            "turma": "1º A", "email": f"carga{marca}{i}@bench", "numero_matricula": f"C{marca}{i:04d}",
+            "nome_responsavel": "Responsável", "numero_responsavel": "(87) 99999-0000",
+            "senha": "carga123",
+        })
+        if status != 201:
+            raise SystemExit(f"falha ao cadastrar estudante: {status} {corpo}")
+        return corpo["estudante_id"]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        estudantes = list(executor.map(cadastrar, range(pedidos)))
+    return rota_id, estudantes
+
+
+def inscrever(base, rota_id, estudante_id):
+    inicio = time.perf_counter()
+    status, corpo, _ = chamar("POST", f"{base}/inscricaoEstudante/inscrever",
+                              {"estudante_id": estudante_id, "rota_id": rota_id})
+    return status, corpo, (time.perf_counter() - inicio) * 1000
+
+
+def inscritos(base, rota_id):
+    ids, cursor = [], None
+    while True:
+        url = f"{base}/inscricaoEstudante/listar/{rota_id}?limite=200"
+        if cursor:
+            url += f"&cursor={urllib.parse.quote(cursor)}"
+        _, pagina, headers = chamar("GET", url)
+        ids += [item["id"] for item in pagina]
+        cursor = headers.get("X-Proximo-Cursor")
+        if not cursor:
+            return ids
+
+
+def espera(base, rota_id):
+    _, lista, _ = chamar("GET", f"{base}/inscricaoEstudante/espera/{rota_id}")
+    return [item["estudante_id"] for item in lista]
+
+
+def percentil(tempos, p):
+    return tempos[min(len(tempos) - 1, int(len(tempos) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--pedidos", type=int, default=500)
+    parser.add_argument("--capacidade", type=int, default=44)
+    parser.add_argument("--repetidos", type=int, default=50, help="toques extras de alunos já enviados")
+    parser.add_argument("--remover", type=int, default=5)
+    parser.add_argument("--email", default="gestor1@sintetico.unibus")
+    parser.add_argument("--senha", default="unibus123")
+    args = parser.parse_args()
+
+    global TOKEN
+    TOKEN = login(args.url, args.email, args.senha)
+
+    rota_id, estudantes = preparar(args.url, args.pedidos, args.capacidade)
+    envios = estudantes + estudantes[:args.repetidos]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.pedidos) as executor:
+        resultados = list(executor.map(lambda e: inscrever(args.url, rota_id, e), envios))
+    duracao = time.perf_counter() - inicio
+
+    tempos = sorted(t for _, _, t in resultados)
+    status = Counter(s for s, _, _ in resultados)
+    print(f"{len(envios)} pedidos em {duracao:.2f} s ({len(envios) / duracao:.0f} req/s)")
+    print(f"p50 {statistics.median(tempos):.1f} ms | p95 {percentil(tempos, 0.95):.1f} ms | "
+          f"p99 {percentil(tempos, 0.99):.1f} ms")
+    print("status:", dict(sorted(status.items())))
+
+    ativos, fila = inscritos(args.url, rota_id), espera(args.url, rota_id)
+    erros = []
+    if len(ativos) != args.capacidade:
+        erros.append(f"{len(ativos)} inscritos para {args.capacidade} vagas")
+    if len(set(ativos)) != len(ativos):
+        erros.append("estudante inscrito mais de uma vez")
+    if len(set(fila)) != len(fila) or set(fila) & set(ativos):
+        erros.append("lista de espera com repetidos ou com inscritos")
+    if set(ativos) | set(fila) != set(estudantes):
+        erros.append("estudantes fora da rota e da lista de espera")
+
+    # Removendo inscrições, os primeiros da espera entram na ordem
+    promovidos = []
+    for estudante_id in ativos[:args.remover]:
+        _, corpo, _ = chamar("DELETE", f"{args.url}/inscricaoEstudante/remover"
+                                       f"?estudante_id={estudante_id}&rota_id={rota_id}")
+        promovidos += corpo.get("promovidos", [])
+    if promovidos != fila[:len(promovidos)] or len(inscritos(args.url, rota_id)) != args.capacidade:
+        erros.append("promoção da lista de espera fora de ordem ou incompleta")
+
+    print(f"inscritos {len(ativos)} | espera {len(fila)} | promovidos {len(promovidos)}")
+    print("OK" if not erros else "FALHOU: " + "; ".join(erros))
+    raise SystemExit(1 if erros else 0)
+
+
+if __name__ == "__main__":
+    main()
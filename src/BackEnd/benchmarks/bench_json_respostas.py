@@ -0,0 +1,199 @@
+# Benchmark da serialização das maiores listas da API (sem banco)
+#
+# Monta linhas sintéticas no formato que o cursor devolve e mede, por
+# cenário, o caminho antigo (cursor dictionary=True, laços de isoformat()/
+# json.loads e o jsonify padrão do Flask) contra o atual (cursor de tuplas
+# com como_dicts, JSONBruto e respostas_json). O motor atual é o de
+# UNIBUS_JSON; rode com UNIBUS_JSON=padrao para medir o json da biblioteca padrão.
+#   python benchmarks/bench_json_respostas.py --rotas 2000 --paradas 12
+#   UNIBUS_JSON=padrao python benchmarks/bench_json_respostas.py --repeticoes 10
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import respostas_json
+from paradas import COLUNAS_ROTA
+from respostas_json import JSONBruto, como_dicts
+
+INICIO = datetime(2025, 3, 10, 7, 0)
+
+
+class CursorTuplas:
+    def __init__(self, colunas):
+        self.column_names = tuple(colunas)
+
+
+# O que o cursor(dictionary=True) faz: um dict por linha no Python
+def linhas_dict(colunas, linhas):
+    return [dict(zip(colunas, linha)) for linha in linhas]
+
+
+# =====================================================
+# Dados sintéticos
+# =====================================================
+def gerar_rotas(n, paradas_por_rota):
+    colunas = COLUNAS_ROTA + ("pontos_parada",)
+    linhas, paradas = [], {}
+    for i in range(1, n + 1):
+        pontos = [{"name": f"Parada {j}", "latitude": -8.28 + j / 1000, "longitude": -35.97 - j / 1000,
+                   "horario": f"06:{j % 60:02d}"} for j in range(paradas_por_rota)]
+        paradas[i] = pontos
+        linhas.append((i, f"Rota {i}", str(100 + i), f"ABC{i:04d}", "manha", f"Motorista {i}", "81999990000",
+                       "06:00", "07:00", "12:00", "13:00", "Observação da rota", 1,
+                       INICIO + timedelta(minutes=i), 40, i % 40, json.dumps(pontos)))
+    return colunas, linhas, paradas
+
+
+def gerar_envios(n, rotas_por_envio):
+    colunas = ("id", "titulo", "mensagem", "remetente_tipo", "destinatario_tipo", "prioridade",
+               "routes_json", "drivers_json", "created_at", "totalRecipients", "readCount")
+    linhas = [(i, f"Aviso {i}", "Mensagem do aviso " * 5, "gestao", "estudantes", "normal",
+               json.dumps(list(range(i, i + rotas_por_envio))), json.dumps([i]),
+               INICIO - timedelta(minutes=i), 300, Decimal(i % 300)) for i in range(n, 0, -1)]
+    return colunas, linhas
+
+
+def gerar_caixa(n):
+    colunas = ("id", "envio_id", "titulo", "mensagem", "remetente_tipo", "destinatario_tipo",
+               "prioridade", "tipo", "lida", "created_at")
+    linhas = [(i, i, f"Aviso {i}", "Mensagem do aviso " * 5, "gestao", "estudantes", "normal", "aviso",
+               i % 2, INICIO - timedelta(minutes=i)) for i in range(n, 0, -1)]
+    return colunas, linhas
+
+
+# =====================================================
+# Cenários: (antes, agora), cada um devolvendo o corpo da resposta
+# =====================================================
+def cenarios(app, antigo, args):
+    colunas_rota, linhas_rota, paradas = gerar_rotas(args.rotas, args.paradas)
+    colunas_envio, linhas_envio = gerar_envios(args.envios, args.rotas_por_envio)
+    colunas_caixa, linhas_caixa = gerar_caixa(args.envios)
+    linhas_export = linhas_envio * max(1, args.exportados // len(linhas_envio))
+
+    def responder(provedor, obj):
+        return provedor.response(obj).get_data()
+
+    # GET /api/rotas/listar
+    def rotas_antes():
+        rotas = linhas_dict(colunas_rota, linhas_rota)  # SELECT * traz o JSON antigo junto
+        for rota in rotas:
+            rota["pontos_parada"] = paradas.get(rota["id"], [])
+        return responder(antigo, rotas)
+
+    def rotas_agora():
+        rotas = como_dicts(CursorTuplas(COLUNAS_ROTA), (linha[:-1] for linha in linhas_rota))
+        for rota in rotas:
+            rota["pontos_parada"] = paradas.get(rota["id"], [])
+        return responder(app.json, rotas)
+
+    # GET /api/estudantes/<id>/dashboard (lista de rotas com "inscrito")
+    inscritas = set(range(1, args.rotas + 1, 50))
+
+    def dashboard_antes():
+        rotas = linhas_dict(colunas_rota[:12], (linha[:12] for linha in linhas_rota))
+        for rota in rotas:
+            rota["inscrito"] = rota["id"] in inscritas
+        return responder(antigo, {"rotas": rotas})
+
+    def dashboard_agora():
+        colunas = colunas_rota[:12]
+        rotas = [dict(zip(colunas, r), inscrito=r[0] in inscritas) for r in (linha[:12] for linha in linhas_rota)]
+        return responder(app.json, {"rotas": rotas})
+
+    # GET /api/notificacoes/historico (uma página)
+    def historico_antes():
+        rows = linhas_dict(colunas_envio, linhas_envio)
+        for r in rows:
+            r["created_at"] = r["created_at"].isoformat()
+            r["routes"] = json.loads(r.pop("routes_json"))
+            r["drivers"] = json.loads(r.pop("drivers_json"))
+        return responder(antigo, rows)
+
+    def _envio_agora(r):
+        r["routes"] = JSONBruto(r.pop("routes_json") or "[]")
+        r["drivers"] = JSONBruto(r.pop("drivers_json") or "[]")
+        return r
+
+    def historico_agora():
+        rows = linhas_dict(colunas_envio, linhas_envio)  # continua com cursor de dicts (paginação)
+        return responder(app.json, [_envio_agora(r) for r in rows])
+
+    # GET /api/notificacoes/historico?formato=ndjson
+    def ndjson_antes():
+        partes = []
+        for r in linhas_dict(colunas_envio, linhas_export):
+            r["created_at"] = r["created_at"].isoformat()
+            r["routes"] = json.loads(r.pop("routes_json"))
+            r["drivers"] = json.loads(r.pop("drivers_json"))
+            partes.append(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+        return "".join(partes).encode()
+
+    def ndjson_agora():
+        return b"".join(respostas_json.codificar(_envio_agora(r)) + b"\n"
+                        for r in linhas_dict(colunas_envio, linhas_export))
+
+    # GET /api/notificacoes/listar (uma página da caixa de entrada)
+    def caixa_antes():
+        rows = linhas_dict(colunas_caixa, linhas_caixa)
+        for r in rows:
+            r["created_at"] = r["created_at"].isoformat()
+        return responder(antigo, rows)
+
+    def caixa_agora():
+        return responder(app.json, linhas_dict(colunas_caixa, linhas_caixa))
+
+    return {
+        f"rotas/listar ({args.rotas} rotas)": (rotas_antes, rotas_agora),
+        f"dashboard ({args.rotas} rotas)": (dashboard_antes, dashboard_agora),
+        f"historico ({args.envios} envios)": (historico_antes, historico_agora),
+        f"historico ndjson ({len(linhas_export)})": (ndjson_antes, ndjson_agora),
+        f"notificacoes/listar ({args.envios})": (caixa_antes, caixa_agora),
+    }
+
+
+def medir(funcao, repeticoes):
+    funcao()  # aquece
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rotas", type=int, default=2000)
+    parser.add_argument("--paradas", type=int, default=12, help="paradas por rota")
+    parser.add_argument("--envios", type=int, default=100, help="itens por página (o LIMITE_MAXIMO da paginação)")
+    parser.add_argument("--rotas-por-envio", type=int, default=20)
+    parser.add_argument("--exportados", type=int, default=10000, help="envios no export ndjson")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    respostas_json.init_app(app)
+    antigo = DefaultJSONProvider(app)  # o jsonify do Flask (json padrão, chaves ordenadas)
+
+    print(f"motor: {respostas_json.MOTOR}")
+    print(f"{'cenário':<32} {'antes ms':>9} {'agora ms':>9} {'ganho':>7} {'KB antes':>9} {'KB agora':>9}")
+    with app.test_request_context():
+        for nome, (antes, agora) in cenarios(app, antigo, args).items():
+            ms_antes, bytes_antes = medir(antes, args.repeticoes)
+            ms_agora, bytes_agora = medir(agora, args.repeticoes)
+            print(f"{nome:<32} {ms_antes:>9.2f} {ms_agora:>9.2f} {ms_antes / ms_agora:>6.1f}x "
+                  f"{bytes_antes / 1024:>9.0f} {bytes_agora / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
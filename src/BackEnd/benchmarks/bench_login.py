@@ -0,0 +1,67 @@
+# Benchmark da conferência de senha no login (senhas.py / autenticacao.py)
+#
+# Simula o pico de logins do início do turno: --concorrencia threads (como as
+# do servidor) conferem senhas ao mesmo tempo. Mede logins/s e logins/s por
+# núcleo para cada custo de hash (UNIBUS_HASH_METODO) e número de processos
+# do pool. "rehash" confere hashes gravados com custo antigo (pbkdf2), que o
+# login regrava com o custo atual. Não precisa de banco.
+#   python benchmarks/bench_login.py --processos 1 4 --metodos scrypt:32768:8:1 scrypt:16384:8:1
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+import senhas
+
+SENHA = "senha-do-aluno"
+HASH_ANTIGO = "pbkdf2:sha256:260000"
+
+
+def configurar(metodo, processos):
+    # os processos do pool leem o método do ambiente ao subir
+    os.environ["UNIBUS_HASH_METODO"] = metodo
+    senhas.encerrar_pool()
+    senhas.METODO_HASH = senhas._normalizar_metodo(metodo)
+    senhas.PROCESSOS_HASH = processos
+    senhas._vagas = threading.BoundedSemaphore(processos * 8)
+
+
+def medir(senha_hash, logins, concorrencia):
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(lambda _: senhas.verificar_senha(senha_hash, SENHA), range(concorrencia)))  # aquece
+        inicio = time.perf_counter()
+        resultados = list(executor.map(lambda _: senhas.verificar_senha(senha_hash, SENHA), range(logins)))
+        duracao = time.perf_counter() - inicio
+    assert all(confere for confere, _ in resultados)
+    return logins / duracao
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metodos", nargs="+", default=["scrypt:32768:8:1", "scrypt:16384:8:1",
+                                                          "pbkdf2:sha256:600000"])
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'método':>22} {'processos':>9} {'cenário':>8} {'logins/s':>9} {'por núcleo':>11}")
+    for metodo in args.metodos:
+        for processos in sorted(set(args.processos)):
+            configurar(metodo, processos)
+            nucleos = min(processos, os.cpu_count() or 1)
+            for cenario, senha_hash in (("atual", generate_password_hash(SENHA, method=metodo)),
+                                        ("rehash", generate_password_hash(SENHA, method=HASH_ANTIGO))):
+                taxa = medir(senha_hash, args.logins, args.concorrencia)
+                print(f"{metodo:>22} {processos:>9} {cenario:>8} {taxa:>9.1f} {taxa / nucleos:>11.1f}")
+    senhas.encerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Benchmark da otimização de ordem das paradas (otimizacao_rotas.py)
+#
+# Gera instâncias aleatórias (paradas espalhadas numa área de ~10 km, escola
+# no canto) e compara a ordem digitada, o vizinho mais próximo, NN + 2-opt e
+# o otimizador completo (NN + 2-opt + Or-opt). Não precisa de banco.
+#   python benchmarks/bench_otimizacao_rotas.py --paradas 50 200 1000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from otimizacao_rotas import ProblemaRota, vizinho_mais_proximo, dois_opt, otimizar
+
+
+def instancia(quantidade, semente):
+    aleatorio = np.random.default_rng(semente)
+    lats = -8.33 + aleatorio.random(quantidade) * 0.09
+    lngs = -36.05 + aleatorio.random(quantidade) * 0.09
+    paradas = [{"name": f"Parada {i}", "latitude": lat, "longitude": lng, "horario": None}
+               for i, (lat, lng) in enumerate(zip(lats, lngs))]
+    return ProblemaRota(paradas, escola=(-8.24, -35.96))
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paradas", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--sementes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'paradas':>8} {'método':>16} {'distância (km)':>15} {'tempo (s)':>10}")
+    for quantidade in args.paradas:
+        totais = {}
+        for semente in range(args.sementes):
+            problema = instancia(quantidade, semente)
+            casos = [
+                ("digitada", lambda: problema.caminho_inicial()),
+                ("vizinho próx.", lambda: vizinho_mais_proximo(problema)),
+                ("NN + 2-opt", lambda: dois_opt(problema, vizinho_mais_proximo(problema))),
+                ("completo", lambda: otimizar(problema)),
+            ]
+            for nome, funcao in casos:
+                caminho, duracao = cronometrar(funcao)
+                distancia, tempo = totais.get(nome, (0.0, 0.0))
+                totais[nome] = (distancia + problema.distancia(caminho), tempo + duracao)
+        for nome, (distancia, tempo) in totais.items():
+            print(f"{quantidade:>8} {nome:>16} {distancia / args.sementes / 1000:>15.1f} "
+                  f"{tempo / args.sementes:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Benchmark do servidor: desenvolvimento (app.run) x produção (gunicorn)
+#
+# Sobe cada servidor num processo à parte, mede o tempo até responder a
+# primeira requisição e depois req/s, p50 e p95 de cada endpoint com
+# --concorrencia clientes por --duracao segundos. Os endpoints padrão leem o
+# banco de UNIBUS_DB_NAME (use o semeado por dados_sinteticos.py); "/" não
+# usa banco e mede só o servidor. O histórico e o dashboard pedem login: o
+# benchmark entra como gestor1 do banco sintético (--email/--senha).
+#   UNIBUS_DB_NAME=UNIBUS_carga python benchmarks/bench_servidor.py --workers 4 --threads 4
+#   python benchmarks/bench_servidor.py --endpoints / --duracao 5
+import argparse
+import json
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS_PADRAO = [
+    "/",
+    "/api/notificacoes/rotas",
+    "/api/notificacoes/motoristas",
+    "/api/rotas/listar",
+    "/api/notificacoes/historico?limite=30",
+    "/api/estudantes/1/dashboard",
+]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def comando(servidor, porta, workers, threads):
+    if servidor == "dev":
+        # o mesmo app.run de app.py, sem o reloader (que duplicaria o processo)
+        return [sys.executable, "-c",
+                f"from app import app; app.run(host='127.0.0.1', port={porta}, debug=True, use_reloader=False)"]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{porta}", "--workers", str(workers), "--threads", str(threads)]
+
+
+def subir(servidor, workers, threads, espera=30):
+    porta = porta_livre()
+    ambiente = dict(os.environ, UNIBUS_SEGREDO=os.environ.get("UNIBUS_SEGREDO") or secrets.token_hex(16))
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando(servidor, porta, workers, threads), cwd=DIRETORIO, env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{porta}"
+    while time.perf_counter() - inicio < espera:
+        if processo.poll() is not None:
+            raise SystemExit(f"{servidor}: o servidor saiu com código {processo.returncode}")
+        try:
+            urllib.request.urlopen(base + "/", timeout=1).read()
+            return processo, base, time.perf_counter() - inicio
+        except OSError:
+            time.sleep(0.05)
+    processo.terminate()
+    raise SystemExit(f"{servidor}: não respondeu em {espera} s")
+
+
+def login(base, email, senha):
+    pedido = urllib.request.Request(base + "/api/gestao/login", method="POST",
+                                    data=json.dumps({"email": email, "senha": senha}).encode(),
+                                    headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(pedido, timeout=30) as resposta:
+            return json.loads(resposta.read())["token"]
+    except OSError:
+        return None
+
+
+def chamar(url, token=None):
+    pedido = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(pedido, timeout=30) as resposta:
+            resposta.read()
+            ok = resposta.status < 400
+    except urllib.error.HTTPError as erro:
+        erro.read()
+        ok = erro.code < 400
+    except OSError:
+        ok = False
+    return (time.perf_counter() - inicio) * 1000, ok
+
+
+def medir(url, concorrencia, duracao, token=None):
+    limite = time.perf_counter() + duracao
+
+    def cliente(_):
+        tempos, erros = [], 0
+        while time.perf_counter() < limite:
+            ms, ok = chamar(url, token)
+            tempos.append(ms)
+            erros += not ok
+        return tempos, erros
+
+    chamar(url, token)  # aquece (cache, pool de conexões)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(cliente, range(concorrencia)))
+    total = time.perf_counter() - inicio
+    tempos = sorted(t for lista, _ in resultados for t in lista)
+    return {
+        "req_s": len(tempos) / total,
+        "p50": statistics.median(tempos),
+        "p95": tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        "erros": sum(e for _, e in resultados),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servidores", nargs="+", default=["dev", "gunicorn"], choices=["dev", "gunicorn"])
+    parser.add_argument("--workers", type=int, default=(os.cpu_count() or 1) * 2 + 1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS_PADRAO)
+    parser.add_argument("--email", default="gestor1@sintetico.unibus")
+    parser.add_argument("--senha", default="unibus123")
+    args = parser.parse_args()
+
+    resultados = {}
+    for servidor in args.servidores:
+        processo, base, partida = subir(servidor, args.workers, args.threads)
+        try:
+            print(f"{servidor}: respondeu em {partida:.2f} s")
+            # o segredo dos tokens muda a cada servidor: login de novo em cada um
+            token = login(base, args.email, args.senha) if set(args.endpoints) - {"/"} else None
+            for endpoint in args.endpoints:
+                resultados[(servidor, endpoint)] = medir(base + endpoint, args.concorrencia, args.duracao, token)
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    print(f"\n{'endpoint':<40} {'servidor':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'erros':>6}")
+    for endpoint in args.endpoints:
+        base_rps = None
+        for servidor in args.servidores:
+            r = resultados[(servidor, endpoint)]
+            ganho = f"  x{r['req_s'] / base_rps:.1f}" if base_rps else ""
+            base_rps = base_rps or r["req_s"]
+            print(f"{endpoint:<40} {servidor:>9} {r['req_s']:>8.0f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                  f"{r['erros']:>6}{ganho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import re
+
+from paginacao import filtro_cursor
+
+# =====================================================
+# Busca de estudantes para a gestão escolar
+#
+# Usa a coluna gerada estudantes.nome_busca (collation utf8mb4_0900_ai_ci,
+# migração 005), então acento e caixa não importam nem no LIKE nem no FULLTEXT.
+#
+# - matricula: igualdade exata (índice único de numero_matricula)
+# - q com todos os termos de 3+ letras: FULLTEXT em modo booleano, cada termo
+#   como prefixo de alguma palavra do nome ("ana silv" -> +ana* +silv*)
+# - q com algum termo curto: prefixo do nome completo (LIKE 'q%', faixa no índice),
+#   porque o FULLTEXT do InnoDB não indexa palavras com menos de 3 letras
+# - escola/turma: igualdade (índice (escola, turma, nome_busca, id))
+# Ordem alfabética (nome_busca, id) com paginação por chave.
+# =====================================================
+
+TAMANHO_MINIMO_FULLTEXT = 3
+
+COLUNAS = """
+    e.id, e.nome_completo, e.escola, e.turma, e.email, e.numero_matricula,
+    e.nome_responsavel, e.numero_responsavel, e.nome_busca
+"""
+
+
+def termos_busca(texto):
+    return re.findall(r"\w+", texto or "")
+
+
+def _escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Devolve (trecho de WHERE, params) para o texto digitado
+def filtro_nome(texto, coluna="e.nome_busca"):
+    termos = termos_busca(texto)
+    if not termos:
+        return "", []
+    if all(len(t) >= TAMANHO_MINIMO_FULLTEXT for t in termos):
+        consulta = " ".join(f"+{t}*" for t in termos)
+        return f" AND MATCH({coluna}) AGAINST (%s IN BOOLEAN MODE)", [consulta]
+    prefixo = " ".join(termos)
+    return f" AND {coluna} LIKE %s", [_escapar_like(prefixo) + "%"]
+
+
+def montar_busca(texto=None, matricula=None, escola=None, turma=None, posicao=None, limite=30):
+    where = " WHERE 1 = 1"
+    params = []
+
+    if matricula:
+        where += " AND e.numero_matricula = %s"
+        params.append(matricula)
+    if escola:
+        where += " AND e.escola = %s"
+        params.append(escola)
+    if turma:
+        where += " AND e.turma = %s"
+        params.append(turma)
+
+    trecho, extra = filtro_nome(texto)
+    where += trecho
+    params.extend(extra)
+
+    trecho, extra = filtro_cursor(posicao, "e.nome_busca", "e.id", ordem="ASC")
+    where += trecho
+    params.extend(extra)
+
+    sql = f"""
+        SELECT {COLUNAS}
+        FROM estudantes e
+        {where}
+        ORDER BY e.nome_busca, e.id
+        LIMIT %s
+    """
+    params.append(limite + 1)  # +1 para saber se existe próxima página
+    return sql, params
@@ -0,0 +1,230 @@
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+
+from respostas_json import carregar, codificar
+
+# =====================================================
+# Cache de respostas GET com TTL, invalidação por namespace e ETag
+#
+# UNIBUS_CACHE_BACKEND=memoria (padrão): LRU no próprio processo, com no
+#   máximo UNIBUS_CACHE_TAMANHO respostas.
+# UNIBUS_CACHE_BACKEND=sqlite: arquivo SQLite em UNIBUS_CACHE_ARQUIVO,
+#   compartilhado entre os workers da mesma máquina (a invalidação vale para todos).
+# =====================================================
+
+BACKEND = os.environ.get("UNIBUS_CACHE_BACKEND", "memoria")
+ARQUIVO_SQLITE = os.environ.get("UNIBUS_CACHE_ARQUIVO", "/tmp/unibus_cache.sqlite3")
+TTL_PADRAO = int(os.environ.get("UNIBUS_CACHE_TTL", "300"))
+TAMANHO_MEMORIA = int(os.environ.get("UNIBUS_CACHE_TAMANHO", "2000"))
+# De quanto em quanto tempo (s) as gravações apagam as respostas já expiradas
+INTERVALO_LIMPEZA = float(os.environ.get("UNIBUS_CACHE_LIMPEZA", "60"))
+
+
+class CacheMemoria:
+    def __init__(self, tamanho=TAMANHO_MEMORIA, intervalo_limpeza=INTERVALO_LIMPEZA):
+        self.tamanho = tamanho
+        self.intervalo_limpeza = intervalo_limpeza
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self._proxima_limpeza = time.time() + intervalo_limpeza
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return item[1:]
+
+    def gravar(self, chave, ttl, etag, corpo, mimetype):
+        agora = time.time()
+        with self._lock:
+            self._dados[chave] = (agora + ttl, etag, corpo, mimetype)
+            self._dados.move_to_end(chave)
+            if agora >= self._proxima_limpeza:
+                self._proxima_limpeza = agora + self.intervalo_limpeza
+                for expirada in [c for c, item in self._dados.items() if item[0] < agora]:
+                    del self._dados[expirada]
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+
+    def invalidar(self, namespace):
+        prefixo = namespace + ":"
+        with self._lock:
+            for chave in [c for c in self._dados if c.startswith(prefixo)]:
+                del self._dados[chave]
+
+
+class CacheSQLite:
+    def __init__(self, arquivo):
+        self._arquivo = arquivo
+        self._local = threading.local()
+        self._proxima_limpeza = time.time() + INTERVALO_LIMPEZA
+        with self._conexao() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS cache_respostas (
+                    chave TEXT PRIMARY KEY,
+                    expira REAL NOT NULL,
+                    etag TEXT NOT NULL,
+                    corpo BLOB NOT NULL,
+                    mimetype TEXT NOT NULL
+                )
+            """)
+
+    # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+    def _conexao(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._arquivo, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT expira, etag, corpo, mimetype FROM cache_respostas WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None or linha[0] < time.time():
+            return None
+        return linha[1], bytes(linha[2]), linha[3]
+
+    def gravar(self, chave, ttl, etag, corpo, mimetype):
+        agora = time.time()
+        db = self._conexao()
+        db.execute(
+            "INSERT OR REPLACE INTO cache_respostas (chave, expira, etag, corpo, mimetype) VALUES (?,?,?,?,?)",
+            (chave, agora + ttl, etag, corpo, mimetype)
+        )
+        # cada worker limpa de vez em quando; repetir a limpeza não faz mal
+        if agora >= self._proxima_limpeza:
+            self._proxima_limpeza = agora + INTERVALO_LIMPEZA
+            db.execute("DELETE FROM cache_respostas WHERE expira < ?", (agora,))
+
+    def invalidar(self, namespace):
+        # chave LIKE 'namespace:%' sem depender de caracteres especiais no nome
+        prefixo = namespace + ":"
+        self._conexao().execute(
+            "DELETE FROM cache_respostas WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo)
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheSQLite(ARQUIVO_SQLITE) if BACKEND == "sqlite" else CacheMemoria()
+    return _cache
+
+
+# Chamado por quem altera os dados (cadastrar/atualizar/remover rota, etc.).
+# "rota" apaga os namespaces de todas as rotas ("rota:1", "rota:2", ...).
+def invalidar(*namespaces):
+    cache = obter_cache()
+    for namespace in namespaces:
+        cache.invalidar(namespace)
+
+
+def _etag_confere(etag):
+    return etag in request.if_none_match
+
+
+def _resposta(corpo, etag, mimetype):
+    resposta = current_app.response_class(corpo, mimetype=mimetype)
+    resposta.set_etag(etag)
+    return resposta
+
+
+def _nao_modificado(etag):
+    resposta = current_app.response_class(status=304)
+    resposta.set_etag(etag)
+    return resposta
+
+
+# Junta os campos dinâmicos (fora do cache) ao objeto JSON guardado
+def _complementar(corpo, extra):
+    dados = carregar(corpo)
+    dados.update(extra)
+    return codificar(dados)
+
+
+# =====================================================
+# Decorador para views GET: guarda o corpo das respostas 200 por namespace
+# (pode usar os argumentos da URL: "rota:{id_rota}" dá um namespace por rota)
+# e responde 304 quando o If-None-Match do app bate com o ETag.
+#
+# complemento: função opcional chamada com os mesmos argumentos da view a cada
+# requisição; o dicionário devolvido é mesclado na resposta depois do cache
+# (ex.: ETA do ônibus nos detalhes da rota). O ETag vale para o corpo final.
+# Devolver None (ou {}) serve o corpo do cache como está, sem re-serializar.
+#
+# por_usuario: a resposta depende de quem chama (rotas sem id na URL, usuário
+# do token em g.usuario); a chave inclui o papel e o id.
+#
+# parametros: {nome: tipo} dos argumentos da query que a view lê. Só eles
+# entram na chave, já convertidos (lat=-8.280 e lat=-8.28 dão a mesma chave);
+# o resto da query string é ignorado.
+# =====================================================
+def _valor(nome, tipo):
+    bruto = request.args.get(nome)
+    try:
+        return tipo(bruto) if bruto is not None else None
+    except ValueError:
+        return bruto  # a view responde 400; a chave só não pode cair na do valor ausente
+
+
+def _chave(namespace, parametros):
+    chave = f"{namespace}:{request.path}"
+    if parametros:
+        chave += "?" + "&".join(f"{nome}={_valor(nome, tipo)!r}" for nome, tipo in sorted(parametros.items()))
+    return chave
+
+
+def em_cache(namespace, ttl=None, complemento=None, por_usuario=False, parametros=None):
+    ttl = TTL_PADRAO if ttl is None else ttl
+
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = obter_cache()
+            chave = _chave(namespace.format(**kwargs), parametros)
+            if por_usuario:
+                usuario = g.get("usuario") or {}
+                chave += f"#{usuario.get('papel')}:{usuario.get('id')}"
+
+            item = cache.obter(chave)
+            if item is not None:
+                etag, corpo, mimetype = item
+            else:
+                resposta = current_app.make_response(view(*args, **kwargs))
+                if resposta.status_code != 200 or resposta.is_streamed:
+                    return resposta
+                corpo, mimetype = resposta.get_data(), resposta.mimetype
+                etag = hashlib.sha1(corpo).hexdigest()
+                cache.gravar(chave, ttl, etag, corpo, mimetype)
+
+            extra = complemento(*args, **kwargs) if complemento else None
+            if extra:
+                corpo = _complementar(corpo, extra)
+                etag = hashlib.sha1(corpo).hexdigest()
+
+            if _etag_confere(etag):
+                return _nao_modificado(etag)
+            return _resposta(corpo, etag, mimetype)
+        return wrapper
+    return decorador
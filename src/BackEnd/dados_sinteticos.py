@@ -0,0 +1,325 @@
+# Dados sintéticos para diagnóstico e testes de carga
+#
+# semear(conn) enche um banco vazio, já migrado, com escolas (gestao),
+# rotas com paradas, um motorista por rota, estudantes com perfil e casa,
+# inscrições, lista de espera, envios de notificação com as notificações de
+# cada destinatário e viagens com posições GPS. A mesma semente gera sempre
+# os mesmos dados. Todos os usuários têm a senha SENHA_SINTETICA e emails
+# previsíveis (aluno<N>@, motorista<N>@, gestor<N>@sintetico.unibus).
+#
+#   python dados_sinteticos.py                        -> perfil "pequeno" em UNIBUS_carga
+#   python dados_sinteticos.py --perfil municipio     -> ~50 mil estudantes, 2 mil rotas, 6 meses de avisos
+#   python dados_sinteticos.py --banco UNIBUS_x --estudantes 20000 --recriar
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+import migrar
+from banco import CONFIG_BANCO
+from senhas import gerar_hash
+
+# Tamanhos por perfil; "municipio" é a escala de uma rede municipal média
+PERFIS = {
+    "pequeno": {
+        "escolas": 20,
+        "rotas": 200,
+        "paradas_por_rota": 12,
+        "estudantes": 5000,
+        "envios": 300,
+        "meses": 3,
+        "notificacoes_por_usuario": 20,
+        "viagens_por_rota": 5,
+        "posicoes_por_viagem": 60,
+    },
+    "municipio": {
+        "escolas": 120,
+        "rotas": 2000,
+        "paradas_por_rota": 15,
+        "estudantes": 50000,
+        "envios": 2500,
+        "meses": 6,
+        "notificacoes_por_usuario": 60,
+        "viagens_por_rota": 20,
+        "posicoes_por_viagem": 60,
+    },
+}
+TAMANHOS_PADRAO = PERFIS["pequeno"]
+
+BANCO_CARGA = os.environ.get("UNIBUS_CARGA_DB", CONFIG_BANCO["database"] + "_carga")
+
+SENHA_SINTETICA = "unibus123"
+# Centro do município (Caruaru-PE) e espalhamento das escolas, em graus
+CENTRO = (-8.2835, -35.9761)
+ESPALHAMENTO = 0.08
+LOTE_INSERCAO = 1000
+
+TURNOS = ["Manhã", "Tarde", "Noite"]
+TURMAS = ["1º A", "1º B", "2º A", "2º B", "3º A", "3º B", "9º A", "9º B"]
+PRIORIDADES = ["Baixa", "Média", "Alta"]
+NOMES = ["Ana", "João", "Maria", "José", "Francisca", "Antônio", "Luíza", "Pedro",
+         "Júlia", "Lucas", "Beatriz", "Gabriel", "Letícia", "Rafael", "Íris", "Mateus"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira",
+              "Almeida", "Costa", "Gomes", "Ribeiro", "Araújo", "Cavalcanti", "Barbosa"]
+
+
+def _inserir(cursor, tabela, colunas, linhas):
+    marcadores = "(" + ",".join(["%s"] * len(colunas)) + ")"
+    for i in range(0, len(linhas), LOTE_INSERCAO):
+        lote = linhas[i:i + LOTE_INSERCAO]
+        cursor.execute(
+            f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES {','.join([marcadores] * len(lote))}",
+            [campo for linha in lote for campo in linha]
+        )
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _nome(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _perto(rng, lat, lng, graus):
+    return round(lat + rng.uniform(-graus, graus), 7), round(lng + rng.uniform(-graus, graus), 7)
+
+
+def _gravar_viagens(conn, cursor, viagens, posicoes):
+    _inserir(cursor, "viagens", ("id", "rota_id", "motorista_id", "status", "iniciada_em", "encerrada_em"),
+             viagens)
+    _inserir(cursor, "viagens_posicoes", ("viagem_id", "latitude", "longitude", "velocidade", "direcao",
+                                          "registrado_em"), posicoes)
+    conn.commit()
+    return len(posicoes)
+
+
+def semear(conn, tamanhos=None, semente=42, saida=sys.stdout):
+    t = dict(TAMANHOS_PADRAO, **(tamanhos or {}))
+    rng = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM estudantes")
+        if cursor.fetchone()[0]:
+            raise ValueError("semear() espera um banco vazio (a tabela estudantes já tem linhas)")
+
+        senha_hash = gerar_hash(SENHA_SINTETICA)
+        perfis = []
+
+        # Escolas e gestores
+        escolas, gestao = [], []
+        for g in range(1, t["escolas"] + 1):
+            lat, lng = _perto(rng, *CENTRO, ESPALHAMENTO)
+            nome_escola = f"Escola Municipal {g:03d}"
+            email = f"gestor{g}@sintetico.unibus"
+            profile_id = _uuid(rng)
+            perfis.append((profile_id, email, f"Gestor {g}", "gestao"))
+            escolas.append((nome_escola, lat, lng))
+            gestao.append((g, nome_escola, f"Rua {g}, Centro", lat, lng, "", f"Gestor {g}",
+                           "Diretor(a)", email, "", senha_hash, profile_id))
+
+        # Rotas (cada uma leva os alunos de uma escola) e suas paradas
+        rotas, paradas, motoristas = [], [], []
+        rotas_da_escola = {}
+        for r in range(1, t["rotas"] + 1):
+            nome_escola, lat_escola, lng_escola = escolas[(r - 1) % len(escolas)]
+            rotas_da_escola.setdefault(nome_escola, []).append(r)
+            nome_rota = f"Rota {r:04d}"
+            turno = rng.choice(TURNOS)
+            capacidade = rng.choice([20, 30, 40, 44, 50])
+            nome_motorista = _nome(rng)
+            rotas.append((r, nome_rota, str(100 + r), f"SIN{r:04d}", turno, nome_motorista,
+                          "(81) 90000-0000", "06:00", "07:00", "12:00", "13:00", None, capacidade))
+            for ordem in range(1, t["paradas_por_rota"] + 1):
+                lat, lng = _perto(rng, lat_escola, lng_escola, ESPALHAMENTO / 2)
+                paradas.append((r, ordem, f"Parada {ordem}", lat, lng, f"06:{ordem * 4 % 60:02d}", None))
+            paradas.append((r, t["paradas_por_rota"] + 1, nome_escola, lat_escola, lng_escola, "07:00",
+                            "destination"))
+
+            email = f"motorista{r}@sintetico.unibus"
+            profile_id = _uuid(rng)
+            perfis.append((profile_id, email, nome_motorista, "motorista"))
+            motoristas.append((r, nome_motorista, email, senha_hash, "(81) 90000-0000", f"SIN{r:04d}",
+                               nome_rota, r, "", profile_id))
+
+        # Estudantes: ~75% inscritos numa rota da escola (as primeiras rotas de
+        # cada escola são as mais procuradas); rota cheia vai para a espera
+        estudantes, inscricoes, espera = [], [], []
+        ocupacao = {r[0]: 0 for r in rotas}
+        lugares = {r[0]: r[-1] for r in rotas}
+        for i in range(1, t["estudantes"] + 1):
+            nome_escola, lat_escola, lng_escola = escolas[rng.randrange(len(escolas))]
+            estudante_id, profile_id = _uuid(rng), _uuid(rng)
+            nome = _nome(rng)
+            email = f"aluno{i}@sintetico.unibus"
+            perfis.append((profile_id, email, nome, "estudante"))
+            lat, lng = _perto(rng, lat_escola, lng_escola, ESPALHAMENTO / 2)
+            estudantes.append((estudante_id, nome, nome_escola, rng.choice(TURMAS), email,
+                               f"2025{i:06d}", _nome(rng), "(81) 98888-0000", senha_hash,
+                               None, profile_id, lat, lng, 1 if rng.random() > 0.03 else 0))
+            if rng.random() < 0.75 and nome_escola in rotas_da_escola:
+                opcoes = rotas_da_escola[nome_escola]
+                rota_id = opcoes[int(rng.triangular(0, len(opcoes), 0))]
+                if ocupacao[rota_id] < lugares[rota_id]:
+                    ocupacao[rota_id] += 1
+                    inscricoes.append((estudante_id, rota_id))
+                else:
+                    espera.append((rota_id, estudante_id))
+
+        _inserir(cursor, "profiles", ("id", "email", "nome_completo", "role"), perfis)
+        _inserir(cursor, "gestao", ("id", "nome_escola", "endereco", "latitude", "longitude", "contato_escola",
+                                    "nome_gestor", "cargo", "email_gestor", "telefone_gestor", "senha",
+                                    "profile_id"), gestao)
+        _inserir(cursor, "rotas", ("id", "nome_rota", "numero_onibus", "placa_veiculo", "turno", "motorista_nome",
+                                   "motorista_telefone", "horario_saida_casa", "horario_chegada_escola",
+                                   "horario_saida_escola", "horario_chegada_casa", "observacoes", "capacidade"),
+                 rotas)
+        _inserir(cursor, "rotas_paradas", ("rota_id", "ordem", "nome", "latitude", "longitude", "horario", "tipo"),
+                 paradas)
+        _inserir(cursor, "motoristas", ("id", "nome_completo", "email", "senha", "telefone", "placa_onibus",
+                                        "rota", "rota_id", "foto_perfil", "profile_id"), motoristas)
+        _inserir(cursor, "estudantes", ("id", "nome_completo", "escola", "turma", "email", "numero_matricula",
+                                        "nome_responsavel", "numero_responsavel", "senha", "created_by",
+                                        "profile_id", "latitude", "longitude", "is_active"), estudantes)
+        _inserir(cursor, "inscricoes_rotas", ("estudante_id", "rota_id"), inscricoes)
+        _inserir(cursor, "inscricoes_espera", ("rota_id", "estudante_id"), espera)
+        cursor.execute("""
+            UPDATE rotas r
+            SET vagas_ocupadas = (
+                SELECT COUNT(*) FROM inscricoes_rotas i
+                WHERE i.rota_id = r.id AND i.status = 'ativa'
+            )
+        """)
+        conn.commit()
+        print(f"{len(escolas)} escolas, {len(rotas)} rotas, {len(estudantes)} estudantes, "
+              f"{len(inscricoes)} inscrições, {len(espera)} na espera", file=saida)
+
+        # Envios dos últimos meses; cada usuário recebe uma amostra dos envios
+        # que o alcançariam (Todos/Estudantes/Motoristas), na data do envio
+        envios, jobs = [], []
+        minutos = t["meses"] * 30 * 24 * 60
+        for e in range(1, t["envios"] + 1):
+            criado = agora - timedelta(minutes=rng.randrange(minutos))
+            tipo = rng.choices(["Todos", "Estudantes", "Motoristas"], weights=[2, 6, 2])[0]
+            rotas_envio = json.dumps(rng.sample(range(1, len(rotas) + 1), min(2, len(rotas)))) \
+                if tipo == "Estudantes" and rng.random() < 0.5 else None
+            envios.append((e, "Gestão", None, tipo, f"Aviso {e}", f"Mensagem sintética {e}", rotas_envio, None,
+                           rng.choice(PRIORIDADES), criado))
+            jobs.append((e, "aviso", "done", criado, criado))
+        _inserir(cursor, "notificacoes_envios", ("id", "remetente_tipo", "remetente_id", "destinatario_tipo",
+                                                 "titulo", "mensagem", "routes_json", "drivers_json",
+                                                 "prioridade", "created_at"), envios)
+        _inserir(cursor, "notificacoes_jobs", ("envio_id", "tipo", "status", "created_at", "finished_at"), jobs)
+        conn.commit()
+
+        colunas = ("envio_id", "usuario_id", "titulo", "mensagem", "tipo", "lida", "created_at")
+        para_estudantes = [e for e in envios if e[3] != "Motoristas"]
+        para_motoristas = [e for e in envios if e[3] != "Estudantes"]
+        destinatarios = [(e[10], para_estudantes) for e in estudantes] + \
+                        [(m[9], para_motoristas) for m in motoristas]
+        total_notificacoes = 0
+        lote = []
+        for usuario_id, alcance in destinatarios:
+            for envio in rng.sample(alcance, min(t["notificacoes_por_usuario"], len(alcance))):
+                # avisos antigos quase sempre já foram lidos
+                lida = rng.random() < (0.95 if (agora - envio[9]).days > 7 else 0.4)
+                lote.append((envio[0], usuario_id, envio[4], envio[5], "aviso", int(lida), envio[9]))
+            if len(lote) >= LOTE_INSERCAO * 10:
+                _inserir(cursor, "notificacoes", colunas, lote)
+                conn.commit()
+                total_notificacoes += len(lote)
+                lote = []
+        _inserir(cursor, "notificacoes", colunas, lote)
+        conn.commit()
+        total_notificacoes += len(lote)
+
+        # Viagens encerradas (histórico do ETA) e uma em andamento em metade das rotas
+        pontos = {}
+        for p in paradas:
+            pontos.setdefault(p[0], []).append((p[3], p[4]))
+        total_viagens = total_posicoes = 0
+        viagens, posicoes = [], []
+        for rota in rotas:
+            rota_id = rota[0]
+            dias = list(range(t["viagens_por_rota"], 0, -1))
+            for dia in dias + ([0] if rota_id % 2 else []):
+                total_viagens += 1
+                inicio = (agora - timedelta(days=dia)).replace(hour=6, minute=0, second=0)
+                em_andamento = dia == 0
+                viagens.append((total_viagens, rota_id, rota_id, "em_andamento" if em_andamento else "encerrada",
+                                inicio, None if em_andamento else inicio + timedelta(hours=1)))
+                caminho = pontos[rota_id]
+                n = t["posicoes_por_viagem"] // (2 if em_andamento else 1)
+                for k in range(n):
+                    a = caminho[min(k * len(caminho) // max(n, 1), len(caminho) - 1)]
+                    posicoes.append((total_viagens, a[0], a[1], rng.uniform(15, 45), rng.uniform(0, 360),
+                                     inicio + timedelta(seconds=k * 60)))
+            if len(posicoes) >= LOTE_INSERCAO * 10:
+                total_posicoes += _gravar_viagens(conn, cursor, viagens, posicoes)
+                viagens, posicoes = [], []
+        total_posicoes += _gravar_viagens(conn, cursor, viagens, posicoes)
+        print(f"{len(envios)} envios, {total_notificacoes} notificações, {total_viagens} viagens, "
+              f"{total_posicoes} posições", file=saida)
+
+        # Estatísticas em dia para o otimizador escolher os índices
+        cursor.execute("ANALYZE TABLE profiles, gestao, estudantes, rotas, rotas_paradas, motoristas, "
+                       "inscricoes_rotas, inscricoes_espera, notificacoes_envios, notificacoes, "
+                       "notificacoes_jobs, viagens, viagens_posicoes")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+# =====================================================
+# Banco separado para diagnóstico/carga: criado do zero (ou reaproveitado),
+# com todas as migrações e os dados sintéticos
+# =====================================================
+def preparar_banco(nome, recriar=True, tamanhos=None, semente=42, saida=sys.stdout):
+    if nome == CONFIG_BANCO["database"]:
+        raise SystemExit(f"{nome} é o banco da aplicação; use outro nome")
+    config = {c: v for c, v in CONFIG_BANCO.items() if c != "database"}
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute("SHOW DATABASES LIKE %s", (nome,))
+    existe = cursor.fetchone() is not None
+    if recriar or not existe:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{nome}`")
+        cursor.execute(f"CREATE DATABASE `{nome}` CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci")
+    cursor.close()
+    conn.database = nome
+
+    aplicadas = migrar.migrar(conn, saida)
+    if recriar or not existe:
+        semear(conn, tamanhos, semente, saida)
+    return conn, aplicadas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--banco", default=BANCO_CARGA)
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default="pequeno")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--recriar", action="store_true", help="apaga o banco se já existir")
+    for campo in PERFIS["pequeno"]:
+        parser.add_argument("--" + campo.replace("_", "-"), type=int, dest=campo)
+    args = parser.parse_args()
+
+    tamanhos = dict(PERFIS[args.perfil])
+    tamanhos.update({c: getattr(args, c) for c in tamanhos if getattr(args, c) is not None})
+
+    inicio = time.perf_counter()
+    conn, _ = preparar_banco(args.banco, args.recriar, tamanhos, args.semente)
+    conn.close()
+    print(f"Banco {args.banco} pronto em {time.perf_counter() - inicio:.0f} s "
+          f"(suba a API com UNIBUS_DB_NAME={args.banco})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import re
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+
+import banco
+
+# =====================================================
+# Detector de N+1 e de consultas lentas (modo de desenvolvimento)
+#
+# UNIBUS_CONSULTAS_DEBUG=1 loga cada consulta da requisição com o tempo e,
+# no fim, aponta:
+#   - o mesmo formato de consulta repetido UNIBUS_N1_REPETICOES vezes ou mais
+#     (o típico N+1: um SELECT por item de uma lista);
+#   - requisições com mais consultas que o orçamento do endpoint;
+#   - consultas acima de UNIBUS_CONSULTA_LENTA_MS.
+# O orçamento é declarado na view com @orcamento_consultas(n), logo abaixo do
+# @route; sem ele vale UNIBUS_ORCAMENTO_CONSULTAS (só aviso).
+# verificar_consultas.py usa o mesmo detector para falhar o CI.
+# =====================================================
+
+ATIVO = os.environ.get("UNIBUS_CONSULTAS_DEBUG", "0") == "1"
+LOGAR_CONSULTAS = True
+ORCAMENTO_PADRAO = int(os.environ.get("UNIBUS_ORCAMENTO_CONSULTAS", "10"))
+REPETICOES_N1 = int(os.environ.get("UNIBUS_N1_REPETICOES", "3"))
+LENTA_MS = float(os.environ.get("UNIBUS_CONSULTA_LENTA_MS", "100"))
+
+_ouvintes = []
+
+
+def formato(sql):
+    texto = re.sub(r"\s+", " ", sql).strip()
+    texto = re.sub(r"IN \((%s, ?)*%s\)", "IN (...)", texto)
+    texto = re.sub(r"VALUES (\([^()]*\)(, ?)?)+", "VALUES (...)", texto)
+    return texto
+
+
+# Orçamento de consultas da view (e quantas repetições do mesmo formato aceita)
+def orcamento_consultas(maximo, repeticoes=None):
+    def decorador(view):
+        view.orcamento_consultas = (maximo, repeticoes or REPETICOES_N1)
+        return view
+    return decorador
+
+
+# Recebe (metodo, regra, relatorio) ao fim de cada requisição analisada
+def ouvir_relatorios(funcao):
+    _ouvintes.append(funcao)
+    return funcao
+
+
+def analisar(consultas, orcamento=None):
+    declarado = orcamento is not None
+    maximo, repeticoes = orcamento or (ORCAMENTO_PADRAO, REPETICOES_N1)
+    formatos = Counter(formato(sql) for sql, _ in consultas)
+    return {
+        "consultas": len(consultas),
+        "orcamento": maximo,
+        "declarado": declarado,
+        "banco_ms": round(sum(d for _, d in consultas) * 1000, 3),
+        "repetidas": [(texto, n) for texto, n in formatos.most_common() if n >= repeticoes],
+        "lentas": [(formato(sql), round(d * 1000, 1)) for sql, d in consultas if d * 1000 >= LENTA_MS],
+        "acima": len(consultas) > maximo,
+    }
+
+
+def _ao_consultar(sql, params, duracao):
+    if has_app_context() and "consultas_debug" in g:
+        g.consultas_debug.append((sql, duracao))
+
+
+def _inicio():
+    g.consultas_debug = []
+
+
+def _orcamento_da_view():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "orcamento_consultas", None)
+
+
+def _resposta(resposta):
+    consultas = g.get("consultas_debug")
+    if consultas is not None:
+        resposta.headers["X-Consultas"] = str(len(consultas))
+    return resposta
+
+
+def _fim(exc=None):
+    consultas = g.pop("consultas_debug", None)
+    if consultas is None or request.url_rule is None:
+        return
+    relatorio = analisar(consultas, _orcamento_da_view())
+    regra = request.url_rule.rule
+    if LOGAR_CONSULTAS:
+        _logar(request.method, request.full_path.rstrip("?"), consultas, relatorio)
+    for funcao in list(_ouvintes):
+        funcao(request.method, regra, relatorio)
+
+
+def _logar(metodo, caminho, consultas, relatorio):
+    print(f"[consultas] {metodo} {caminho}: {relatorio['consultas']} consulta(s), "
+          f"{relatorio['banco_ms']:.1f} ms no banco")
+    for sql, duracao in consultas:
+        print(f"    {duracao * 1000:7.1f} ms  {formato(sql)[:160]}")
+    if relatorio["acima"]:
+        print(f"  ! acima do orçamento: {relatorio['consultas']} > {relatorio['orcamento']}")
+    for texto, n in relatorio["repetidas"]:
+        print(f"  ! possível N+1 ({n}x): {texto[:160]}")
+    for texto, ms in relatorio["lentas"]:
+        print(f"  ! consulta lenta ({ms} ms): {texto[:160]}")
+
+
+def init_app(app):
+    if not ATIVO:
+        return
+    banco.observar_consultas(_ao_consultar)
+    app.before_request(_inicio)
+    app.after_request(_resposta)
+    app.teardown_request(_fim)
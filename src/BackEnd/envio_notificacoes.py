@@ -0,0 +1,150 @@
+import os
+
+# =====================================================
+# Fan-out de notificações
+# Os destinatários são resolvidos em SQL e gravados direto em `notificacoes`,
+# sem montar o conjunto de ids em Python.
+# =====================================================
+
+# "sql"   -> um único INSERT ... SELECT (menos round-trips)
+# "lotes" -> páginas de TAMANHO_LOTE ids com INSERT multi-linha e commit por lote
+MODO_FANOUT = os.environ.get("UNIBUS_NOTIF_MODO", "sql")
+TAMANHO_LOTE = int(os.environ.get("UNIBUS_NOTIF_LOTE", "1000"))
+
+
+def _placeholders(valores):
+    return ','.join(['%s'] * len(valores))
+
+
+# =====================================================
+# Monta o SELECT que devolve os profile ids (coluna `id`) dos destinatários.
+# Retorna (sql, params) ou None quando o filtro não alcança ninguém.
+# =====================================================
+def consulta_destinatarios(destinatario_tipo, routes=None, drivers=None):
+    routes = list(routes or [])
+    drivers = list(drivers or [])
+
+    if destinatario_tipo == "Todos":
+        return "SELECT id FROM profiles WHERE role IN ('estudante','motorista') AND is_active=1", []
+
+    if destinatario_tipo == "Estudantes":
+        if routes:
+            return f"""
+                SELECT e.profile_id AS id
+                FROM inscricoes_rotas ir
+                JOIN estudantes e ON e.id = ir.estudante_id
+                WHERE ir.rota_id IN ({_placeholders(routes)}) AND ir.status = 'ativa' AND e.is_active=1
+            """, routes
+        return "SELECT profile_id AS id FROM estudantes WHERE is_active=1", []
+
+    if destinatario_tipo == "Motoristas":
+        if drivers:
+            return f"""
+                SELECT p.id
+                FROM motoristas m
+                JOIN profiles p ON p.id = m.profile_id AND p.is_active=1
+                WHERE m.id IN ({_placeholders(drivers)})
+            """, drivers
+        if routes:
+            # Motoristas das rotas escolhidas (índice em motoristas.rota_id); se
+            # nenhuma das rotas existir, mantém o comportamento antigo de avisar
+            # todos os motoristas.
+            ph = _placeholders(routes)
+            return f"""
+                SELECT p.id
+                FROM motoristas m
+                JOIN profiles p ON p.id = m.profile_id AND p.is_active=1
+                WHERE m.rota_id IN ({ph})
+                UNION
+                SELECT p.id
+                FROM profiles p
+                WHERE p.role='motorista' AND p.is_active=1
+                  AND NOT EXISTS (SELECT 1 FROM rotas WHERE id IN ({ph}))
+            """, routes + routes
+
+    return None
+
+
+# =====================================================
+# Estratégia 1: INSERT ... SELECT em um único comando
+# =====================================================
+def inserir_por_select(cursor, envio_id, titulo, mensagem, tipo, consulta):
+    sql, params = consulta
+    cursor.execute(f"""
+        INSERT INTO notificacoes (envio_id, usuario_id, titulo, mensagem, tipo)
+        SELECT DISTINCT %s, d.id, %s, %s, %s
+        FROM ({sql}) d
+        WHERE d.id IS NOT NULL
+    """, [envio_id, titulo, mensagem, tipo] + list(params))
+    return cursor.rowcount
+
+
+# =====================================================
+# Estratégia 2: lotes com paginação por chave (keyset) sobre o id do destinatário
+# Só TAMANHO_LOTE ids ficam em memória por vez e cada lote tem sua própria transação.
+# =====================================================
+def inserir_em_lotes(conn, cursor, envio_id, titulo, mensagem, tipo, consulta,
+                     tamanho_lote=None, ao_gravar_lote=None):
+    sql, params = consulta
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE
+    ultimo_id = None
+    total = 0
+
+    while True:
+        if ultimo_id is None:
+            cursor.execute(f"""
+                SELECT DISTINCT d.id FROM ({sql}) d
+                WHERE d.id IS NOT NULL
+                ORDER BY d.id LIMIT %s
+            """, list(params) + [tamanho_lote])
+        else:
+            cursor.execute(f"""
+                SELECT DISTINCT d.id FROM ({sql}) d
+                WHERE d.id IS NOT NULL AND d.id > %s
+                ORDER BY d.id LIMIT %s
+            """, list(params) + [ultimo_id, tamanho_lote])
+        ids = [r['id'] if isinstance(r, dict) else r[0] for r in cursor.fetchall()]
+        if not ids:
+            break
+
+        total += inserir_lote(cursor, envio_id, titulo, mensagem, tipo, ids)
+        conn.commit()
+        if ao_gravar_lote:
+            ao_gravar_lote(total)
+
+        ultimo_id = ids[-1]
+        if len(ids) < tamanho_lote:
+            break
+
+    return total
+
+
+# INSERT multi-linha para uma lista de ids já resolvida
+def inserir_lote(cursor, envio_id, titulo, mensagem, tipo, usuario_ids):
+    if not usuario_ids:
+        return 0
+    valores = ','.join(['(%s,%s,%s,%s,%s)'] * len(usuario_ids))
+    params = []
+    for uid in usuario_ids:
+        params.extend((envio_id, uid, titulo, mensagem, tipo))
+    cursor.execute(
+        f"INSERT INTO notificacoes (envio_id, usuario_id, titulo, mensagem, tipo) VALUES {valores}",
+        params
+    )
+    return len(usuario_ids)
+
+
+# =====================================================
+# Grava as notificações individuais de um envio e devolve quantas foram criadas.
+# No modo "sql" quem chama faz o commit; no modo "lotes" cada lote é commitado.
+# =====================================================
+def distribuir(conn, cursor, envio_id, titulo, mensagem, tipo, consulta,
+               modo=None, tamanho_lote=None, ao_gravar_lote=None):
+    modo = modo or MODO_FANOUT
+    if modo == "lotes":
+        return inserir_em_lotes(conn, cursor, envio_id, titulo, mensagem, tipo, consulta,
+                                tamanho_lote, ao_gravar_lote)
+    total = inserir_por_select(cursor, envio_id, titulo, mensagem, tipo, consulta)
+    if ao_gravar_lote:
+        ao_gravar_lote(total)
+    return total
@@ -0,0 +1,356 @@
+import os
+import threading
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+import banco
+from paradas import carregar_paradas
+
+# =====================================================
+# Previsão de chegada (ETA) nas paradas de uma rota
+#
+# ModeloRota: paradas da rota em arrays NumPy + tempo de cada trecho
+#   (parada i -> i+1), aprendido das viagens encerradas (mediana) ou,
+#   sem histórico, estimado pela distância a VELOCIDADE_PADRAO.
+# EstimadorViagem: estado incremental de uma viagem em andamento. A cada
+#   posição nova só olha as próximas JANELA_PARADAS paradas, avança a
+#   próxima parada e corrige um fator de ritmo (atraso/adiantamento).
+# GerenciadorEta: guarda modelos por rota (com TTL) e estimadores por viagem.
+#   Modelo vencido continua em uso enquanto o novo carrega; ao trocar, o
+#   estimador da viagem passa para o modelo novo sem perder o progresso.
+# =====================================================
+
+RAIO_TERRA_M = 6371000.0
+VELOCIDADE_PADRAO_MS = float(os.environ.get("UNIBUS_ETA_VELOCIDADE_KMH", "25")) / 3.6
+LIMIAR_PARADA_M = float(os.environ.get("UNIBUS_ETA_LIMIAR_M", "60"))
+JANELA_PARADAS = 5
+TTL_MODELO = float(os.environ.get("UNIBUS_ETA_TTL_MODELO", "600"))
+VIAGENS_HISTORICO = int(os.environ.get("UNIBUS_ETA_VIAGENS_HISTORICO", "20"))
+
+
+def haversine_m(lat, lng, lats, lngs):
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - np.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# =====================================================
+# Tempos de trecho a partir de viagens passadas
+# viagens: lista de (lats, lngs, timestamps) de cada viagem, em ordem de tempo
+# Devolve um array com n-1 tempos (segundos); NaN onde não há dado.
+# =====================================================
+def aprender_tempos_segmentos(lats_paradas, lngs_paradas, viagens):
+    n = len(lats_paradas)
+    if n < 2 or not viagens:
+        return np.full(max(n - 1, 0), np.nan)
+
+    amostras = []
+    for lats, lngs, tempos in viagens:
+        if len(lats) == 0:
+            continue
+        # distância de cada posição (linhas) a cada parada (colunas)
+        d = haversine_m(lats[:, None], lngs[:, None], lats_paradas[None, :], lngs_paradas[None, :])
+        perto = d < LIMIAR_PARADA_M
+        passou = perto.any(axis=0)
+        primeira = perto.argmax(axis=0)
+        chegadas = np.where(passou, tempos[primeira], np.nan)
+        trechos = np.diff(chegadas)
+        trechos[trechos <= 0] = np.nan
+        amostras.append(trechos)
+
+    if not amostras:
+        return np.full(n - 1, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # colunas só com NaN
+        return np.nanmedian(np.vstack(amostras), axis=0)
+
+
+class ModeloRota:
+    def __init__(self, rota_id, paradas, tempos_historicos=None):
+        self.rota_id = rota_id
+        self.paradas = paradas
+        self.lats = np.array([p["latitude"] for p in paradas], dtype=float)
+        self.lngs = np.array([p["longitude"] for p in paradas], dtype=float)
+        n = len(paradas)
+
+        if n >= 2:
+            self.dist_segmentos = haversine_m(self.lats[:-1], self.lngs[:-1], self.lats[1:], self.lngs[1:])
+        else:
+            self.dist_segmentos = np.zeros(0)
+
+        estimado = self.dist_segmentos / VELOCIDADE_PADRAO_MS
+        if tempos_historicos is not None and len(tempos_historicos) == len(estimado):
+            self.tempos_segmentos = np.where(np.isnan(tempos_historicos), estimado, tempos_historicos)
+        else:
+            self.tempos_segmentos = estimado
+        self.criado_em = time.monotonic()
+
+    def __len__(self):
+        return len(self.paradas)
+
+
+class EstimadorViagem:
+    def __init__(self, modelo, viagem_id):
+        self.modelo = modelo
+        self.viagem_id = viagem_id
+        self.proxima = 0
+        self.fator = 1.0
+        self.ultimo_ts = None
+        self.ultimo_restante = None
+        self.etas = np.zeros(0)
+        self.posicao = None
+
+    # Projeta a posição nos trechos da janela à frente (sem voltar atrás) e
+    # devolve os segundos previstos até a próxima parada. Funciona mesmo
+    # quando nenhuma posição caiu perto da parada que ficou para trás.
+    def _avancar(self, lat, lng):
+        m = self.modelo
+        n = len(m)
+        if self.proxima == 0:
+            d_primeira = float(haversine_m(lat, lng, m.lats[0], m.lngs[0]))
+            if d_primeira >= LIMIAR_PARADA_M and (n == 1 or not self._passou_primeira(lat, lng)):
+                return d_primeira / VELOCIDADE_PADRAO_MS
+            if n == 1:
+                self.proxima = 1
+                return 0.0
+
+        inicio = max(self.proxima - 1, 0)
+        fim = min(n - 1, inicio + JANELA_PARADAS)
+        j, t = self._projetar(lat, lng, inicio, fim)
+        if j == n - 2 and (t >= 1.0 or haversine_m(lat, lng, m.lats[-1], m.lngs[-1]) < LIMIAR_PARADA_M):
+            self.proxima = n
+            return 0.0
+        self.proxima = j + 1
+        return float(m.tempos_segmentos[j]) * (1.0 - t)
+
+    # Trecho (i -> i+1, i em [inicio, fim)) mais próximo do ponto e a fração já percorrida
+    def _projetar(self, lat, lng, inicio, fim):
+        m = self.modelo
+        escala = np.cos(np.radians(lat))
+        ax = (m.lngs[inicio:fim] - lng) * escala
+        ay = m.lats[inicio:fim] - lat
+        bx = (m.lngs[inicio + 1:fim + 1] - lng) * escala
+        by = m.lats[inicio + 1:fim + 1] - lat
+        dx, dy = bx - ax, by - ay
+        comprimento = dx * dx + dy * dy
+        t = np.clip(-(ax * dx + ay * dy) / np.where(comprimento > 0, comprimento, 1.0), 0.0, 1.0)
+        px, py = ax + t * dx, ay + t * dy
+        i = int(np.argmin(px * px + py * py))
+        return inicio + i, float(t[i])
+
+    # Antes da primeira parada: a projeção cai além do começo do primeiro trecho?
+    def _passou_primeira(self, lat, lng):
+        j, t = self._projetar(lat, lng, 0, min(len(self.modelo) - 1, JANELA_PARADAS))
+        return j > 0 or t > 0.0
+
+    def atualizar(self, lat, lng, ts):
+        if self.ultimo_ts is not None and ts <= self.ultimo_ts:
+            return  # posição repetida ou fora de ordem: mantém o cálculo anterior
+        m = self.modelo
+        n = len(m)
+        anterior = self.ultimo_ts
+        self.ultimo_ts = ts
+        self.posicao = {"latitude": lat, "longitude": lng, "timestamp": ts}
+        if self.proxima >= n:  # já passou da última parada (ou o modelo novo tem menos)
+            self.etas = np.zeros(0)
+            return
+
+        ate_proxima = self._avancar(lat, lng)
+        if self.proxima >= n:
+            self.etas = np.zeros(0)
+            return
+
+        k = self.proxima
+        restante = ate_proxima + float(m.tempos_segmentos[k:].sum())
+
+        # Ritmo: quanto tempo realmente passou para "consumir" o tempo previsto
+        if self.ultimo_restante is not None:
+            progresso = self.ultimo_restante - restante
+            decorrido = ts - anterior
+            if progresso > 1.0:
+                razao = min(max(decorrido / progresso, 0.5), 3.0)
+                self.fator = 0.8 * self.fator + 0.2 * razao
+
+        self.ultimo_restante = restante
+        acumulado = np.concatenate(([0.0], np.cumsum(m.tempos_segmentos[k:])))
+        self.etas = (ate_proxima + acumulado) * self.fator
+
+    # Modelo recarregado no meio da viagem: mantém a parada atual e o fator de
+    # ritmo e recalcula os ETAs da última posição com os tempos novos
+    def trocar_modelo(self, modelo):
+        self.modelo = modelo
+        self.proxima = min(self.proxima, len(modelo))
+        self.ultimo_restante = None  # restante do modelo antigo não se compara com o novo
+        self.etas = np.zeros(0)
+        if self.posicao is not None:
+            posicao, self.ultimo_ts = self.posicao, None
+            self.atualizar(posicao["latitude"], posicao["longitude"], posicao["timestamp"])
+
+    def resultado(self):
+        m = self.modelo
+        base = self.ultimo_ts or time.time()
+        paradas = []
+        for i, parada in enumerate(m.paradas):
+            item = {"ordem": i + 1, "name": parada["name"], "horario": parada.get("horario")}
+            if i < self.proxima:
+                item["passou"] = True
+            else:
+                segundos = float(self.etas[i - self.proxima])
+                item["passou"] = False
+                item["eta_segundos"] = int(round(segundos))
+                item["chegada_prevista"] = datetime.fromtimestamp(base + segundos).isoformat(timespec="seconds")
+            paradas.append(item)
+        return {
+            "viagem_id": self.viagem_id,
+            "proxima_parada": self.proxima + 1 if self.proxima < len(m) else None,
+            "fator_ritmo": round(self.fator, 3),
+            "posicao": self.posicao,
+            "paradas": paradas,
+        }
+
+
+# =====================================================
+# Carregamento do banco (síncrono)
+# =====================================================
+def carregar_modelo(cursor, rota_id):
+    paradas = carregar_paradas(cursor, [rota_id]).get(rota_id, [])
+    if not paradas:
+        return None
+
+    cursor.execute("""
+        SELECT p.viagem_id, p.latitude, p.longitude, UNIX_TIMESTAMP(p.registrado_em)
+        FROM (
+            SELECT id FROM viagens
+            WHERE rota_id = %s AND status = 'encerrada'
+            ORDER BY id DESC
+            LIMIT %s
+        ) v
+        JOIN viagens_posicoes p ON p.viagem_id = v.id
+        ORDER BY p.viagem_id, p.registrado_em
+    """, (rota_id, VIAGENS_HISTORICO))
+    linhas = cursor.fetchall()
+
+    viagens = []
+    if linhas:
+        if isinstance(linhas[0], dict):
+            linhas = [tuple(l.values()) for l in linhas]
+        dados = np.array([(float(a), float(b), float(c), float(d)) for a, b, c, d in linhas])
+        ids = dados[:, 0]
+        cortes = np.nonzero(np.diff(ids))[0] + 1
+        for bloco in np.split(dados, cortes):
+            viagens.append((bloco[:, 1], bloco[:, 2], bloco[:, 3]))
+
+    modelo_base = ModeloRota(rota_id, paradas)
+    historico = aprender_tempos_segmentos(modelo_base.lats, modelo_base.lngs, viagens)
+    return ModeloRota(rota_id, paradas, historico)
+
+
+# Última posição gravada da viagem em andamento da rota
+def ultima_posicao(cursor, rota_id):
+    cursor.execute("""
+        SELECT v.id, p.latitude, p.longitude, UNIX_TIMESTAMP(p.registrado_em)
+        FROM viagens v
+        JOIN viagens_posicoes p ON p.viagem_id = v.id
+        WHERE v.rota_id = %s AND v.status = 'em_andamento'
+        ORDER BY v.id DESC, p.registrado_em DESC
+        LIMIT 1
+    """, (rota_id,))
+    linha = cursor.fetchone()
+    if not linha:
+        return None
+    if isinstance(linha, dict):
+        linha = tuple(linha.values())
+    return int(linha[0]), float(linha[1]), float(linha[2]), float(linha[3])
+
+
+class GerenciadorEta:
+    def __init__(self, ttl_modelo=TTL_MODELO):
+        self.ttl_modelo = ttl_modelo
+        self._modelos = {}
+        self._estimadores = {}
+        self._carregando = set()
+        self._lock = threading.Lock()
+
+    # Modelo da rota, mesmo vencido (None se nunca foi carregado)
+    def modelo(self, rota_id):
+        with self._lock:
+            return self._modelos.get(rota_id)
+
+    # True para quem deve (re)carregar o modelo agora: sem modelo ou vencido, e
+    # só um carregamento por rota de cada vez (os outros seguem com o vencido)
+    def precisa_carregar(self, rota_id):
+        with self._lock:
+            modelo = self._modelos.get(rota_id)
+            if modelo is not None and time.monotonic() - modelo.criado_em < self.ttl_modelo:
+                return False
+            if rota_id in self._carregando:
+                return False
+            self._carregando.add(rota_id)
+            return True
+
+    def guardar_modelo(self, modelo):
+        with self._lock:
+            self._modelos[modelo.rota_id] = modelo
+            self._carregando.discard(modelo.rota_id)
+
+    def invalidar(self, rota_id=None):
+        with self._lock:
+            if rota_id is None:
+                self._modelos.clear()
+            else:
+                self._modelos.pop(rota_id, None)
+
+    # Aplica uma posição nova e devolve o ETA; None se o modelo ainda não foi carregado
+    def atualizar(self, rota_id, viagem_id, lat, lng, ts):
+        modelo = self.modelo(rota_id)
+        if modelo is None:
+            return None
+        with self._lock:
+            estimador = self._estimadores.get(rota_id)
+            if estimador is None or estimador.viagem_id != viagem_id:
+                estimador = self._estimadores[rota_id] = EstimadorViagem(modelo, viagem_id)
+            elif estimador.modelo is not modelo:
+                estimador.trocar_modelo(modelo)
+            estimador.atualizar(lat, lng, ts)
+            return estimador.resultado()
+
+    # Carrega (ou recarrega) o modelo; sem cursor abre uma conexão própria
+    # (fora de requisições). Chamado por quem recebeu True de precisa_carregar.
+    def carregar(self, rota_id, cursor=None):
+        try:
+            if cursor is not None:
+                modelo = carregar_modelo(cursor, rota_id)
+            else:
+                with banco.conexao() as conn:
+                    cursor = conn.cursor(dictionary=True)
+                    try:
+                        modelo = carregar_modelo(cursor, rota_id)
+                    finally:
+                        cursor.close()
+            if modelo is not None:
+                self.guardar_modelo(modelo)
+            return modelo
+        finally:
+            with self._lock:
+                self._carregando.discard(rota_id)
+
+    # Caminho síncrono (Flask): carrega o modelo se preciso e usa a última posição gravada
+    def eta_da_rota(self, cursor, rota_id):
+        posicao = ultima_posicao(cursor, rota_id)
+        if posicao is None:
+            return None
+        if self.precisa_carregar(rota_id):
+            self.carregar(rota_id, cursor)
+        if self.modelo(rota_id) is None:
+            return None
+        viagem_id, lat, lng, ts = posicao
+        return self.atualizar(rota_id, viagem_id, lat, lng, ts)
+
+
+gerenciador = GerenciadorEta()
@@ -0,0 +1,404 @@
+# Roda EXPLAIN em todas as consultas que os blueprints fazem e aponta as que
+# leem a tabela inteira.
+#
+# Cria um banco separado (UNIBUS_EXPLICAR_DB, padrão "<banco>_explicar"),
+# aplica todas as migrações do zero, semeia dados sintéticos
+# (dados_sinteticos.py), chama cada endpoint pelo test client do Flask gravando
+# os SQL executados (banco.observar_consultas) e roda EXPLAIN em cada formato
+# de consulta. Também lista índices redundantes e os que o roteiro não usou.
+#   python explicar_consultas.py                  -> banco novo + relatório
+#   python explicar_consultas.py --manter         -> reaproveita o banco já semeado
+#   python explicar_consultas.py --estudantes 20000 --json plano.json
+# Sai com código 1 se alguma consulta filtrada ler a tabela inteira (para CI).
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+
+import mysql.connector
+
+import banco
+import senhas
+from banco import CONFIG_BANCO
+from dados_sinteticos import preparar_banco, SENHA_SINTETICA
+from detector_consultas import formato
+
+BANCO_EXPLICAR = os.environ.get("UNIBUS_EXPLICAR_DB", CONFIG_BANCO["database"] + "_explicar")
+# Tabelas com menos linhas que isso podem ser lidas inteiras (o otimizador faz isso de propósito)
+MIN_LINHAS = 100
+# Varredura de uma consulta que devolve mais que isso da tabela (%) é só aviso
+FILTRADO_ACEITO = 50.0
+
+COMANDOS_EXPLICAVEIS = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE", "WITH")
+
+
+# =====================================================
+# Ids do banco semeado usados no roteiro
+# =====================================================
+def _amostra(conn):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT e.id, e.email, e.profile_id, e.escola, e.turma, e.numero_matricula, i.rota_id
+            FROM estudantes e JOIN inscricoes_rotas i ON i.estudante_id = e.id AND i.status = 'ativa'
+            WHERE e.is_active = 1 ORDER BY e.id LIMIT 1
+        """)
+        estudante = cursor.fetchone()
+        cursor.execute("""
+            SELECT e.id, e.escola FROM estudantes e
+            WHERE e.is_active = 1
+              AND NOT EXISTS (SELECT 1 FROM inscricoes_rotas i WHERE i.estudante_id = e.id)
+              AND NOT EXISTS (SELECT 1 FROM inscricoes_espera w WHERE w.estudante_id = e.id)
+            ORDER BY e.id LIMIT 2
+        """)
+        sem_rota = cursor.fetchall()
+        cursor.execute("SELECT rota_id FROM inscricoes_espera ORDER BY id LIMIT 1")
+        cheia = cursor.fetchone()
+        cursor.execute("SELECT id, email, profile_id, rota_id FROM motoristas ORDER BY id LIMIT 1")
+        motorista = cursor.fetchone()
+        cursor.execute("SELECT id, email_gestor FROM gestao ORDER BY id LIMIT 1")
+        gestor = cursor.fetchone()
+        cursor.execute("SELECT id FROM notificacoes WHERE usuario_id = %s LIMIT 1", (estudante["profile_id"],))
+        notificacao = cursor.fetchone()
+        return {
+            "estudante": estudante, "sem_rota": sem_rota, "motorista": motorista, "gestor": gestor,
+            "rota_cheia": cheia["rota_id"] if cheia else estudante["rota_id"],
+            "notificacao": notificacao["id"] if notificacao else 0,
+        }
+    finally:
+        cursor.close()
+
+
+# =====================================================
+# Roteiro: uma chamada para cada endpoint (e variantes de filtro)
+# =====================================================
+def _csv(linhas):
+    return (io.BytesIO("\n".join(linhas).encode("utf-8")), "planilha.csv")
+
+
+def roteiro(a):
+    from autenticacao import emitir_token
+
+    e, m = a["estudante"], a["motorista"]
+    livre, outro = a["sem_rota"][0], a["sem_rota"][-1]
+    aluno = {"Authorization": "Bearer " + emitir_token("estudante", e["id"], e["profile_id"])}
+    motorista = {"Authorization": "Bearer " + emitir_token("motorista", m["id"], m["profile_id"])}
+    gestao = {"Authorization": "Bearer " + emitir_token("gestao", a["gestor"]["id"])}
+    rota, cheia = e["rota_id"], a["rota_cheia"]
+    notif = "/api/notificacoes"
+
+    return [
+        ("POST", "/api/estudantes/login", {"json": {"email": e["email"], "senha": SENHA_SINTETICA}}),
+        ("POST", "/api/motoristas/login", {"json": {"email": m["email"], "senha": SENHA_SINTETICA}}),
+        ("POST", "/api/gestao/login", {"json": {"email": a["gestor"]["email_gestor"],
+                                                "senha": SENHA_SINTETICA}}),
+        ("POST", "/api/estudantes/cadastro", {"json": {
+            "nome_completo": "Aluna Explicar", "escola": e["escola"], "turma": e["turma"],
+            "email": "explicar@sintetico.unibus", "numero_matricula": "EXPLICAR1",
+            "nome_responsavel": "Responsável", "numero_responsavel": "0", "senha": SENHA_SINTETICA}}),
+        ("POST", "/api/motoristas/cadastrar", {"json": {
+            "nome_completo": "Motorista Explicar", "email": "explicar.motorista@sintetico.unibus",
+            "rota": "Rota 0001"}}),
+        ("POST", "/api/gestao/cadastrar", {"json": {
+            "nome_escola": "Escola Explicar", "nome_gestor": "Gestor Explicar",
+            "email_gestor": "explicar.gestor@sintetico.unibus", "senha": SENHA_SINTETICA}}),
+        ("POST", "/api/rotas/cadastrar", {"headers": gestao, "json": {
+            "nome_rota": "Rota Explicar", "capacidade": 40,
+            "pontos_parada": [{"name": "A", "latitude": -8.28, "longitude": -35.97}]}}),
+        ("GET", f"/api/estudantes/buscar?q=ana+silv&escola={e['escola']}", {"headers": gestao}),
+        ("GET", "/api/estudantes/buscar?q=an", {"headers": gestao}),
+        ("GET", f"/api/estudantes/buscar?matricula={e['numero_matricula']}", {"headers": gestao}),
+        ("GET", f"/api/estudantes/buscar?escola={e['escola']}&turma={e['turma']}", {"headers": gestao}),
+        ("GET", "/api/estudantes/dashboard", {"headers": aluno}),
+        ("GET", f"/api/estudantes/{e['id']}/dashboard", {"headers": aluno}),
+        ("GET", "/api/gestao/listar", {"headers": gestao}),
+        ("GET", "/api/motoristas/listar", {"headers": gestao}),
+        ("PUT", "/api/motoristas/atualizar", {"headers": motorista, "json": {
+            "nome_completo": "Motorista Atualizado", "email": m["email"], "rota_id": m["rota_id"]}}),
+        ("GET", f"{notif}/rotas", {}),
+        ("GET", f"{notif}/motoristas", {}),
+        ("GET", f"{notif}/listar?limite=5", {"headers": aluno, "paginas": 2}),
+        ("GET", f"{notif}/listar/{e['profile_id']}", {"headers": aluno}),
+        ("GET", f"{notif}/nao_lidas", {"headers": aluno}),
+        ("GET", f"{notif}/nao_lidas/{e['profile_id']}", {"headers": aluno}),
+        ("PUT", f"{notif}/marcar_lida/{a['notificacao']}", {"headers": aluno}),
+        ("POST", f"{notif}/enviar", {"headers": gestao, "json": {"destinatario_tipo": "Estudantes", "routes": [rota],
+                                              "titulo": "t", "mensagem": "m", "sincrono": True}}),
+        ("POST", f"{notif}/enviar", {"headers": gestao, "json": {"destinatario_tipo": "Estudantes",
+                                              "titulo": "t", "mensagem": "m", "sincrono": True}}),
+        ("POST", f"{notif}/enviar", {"headers": gestao, "json": {"destinatario_tipo": "Motoristas", "drivers": [m["id"]],
+                                              "titulo": "t", "mensagem": "m", "sincrono": True}}),
+        ("POST", f"{notif}/enviar", {"headers": gestao, "json": {"destinatario_tipo": "Motoristas", "routes": [rota],
+                                              "titulo": "t", "mensagem": "m", "sincrono": True}}),
+        ("POST", f"{notif}/enviar", {"headers": gestao, "json": {"destinatario_tipo": "Todos", "titulo": "t", "mensagem": "m"}}),
+        ("WORKER", "fila_notificacoes", {}),
+        ("GET", f"{notif}/envios/1/status", {"headers": gestao}),
+        ("GET", f"{notif}/historico?limite=20", {"headers": gestao, "paginas": 2}),
+        ("GET", f"{notif}/historico?de=2020-01-01&ate=2100-01-01", {"headers": gestao}),
+        ("GET", f"{notif}/historico?formato=ndjson", {"headers": gestao}),
+        ("GET", "/api/rotas/listar", {}),
+        ("GET", f"/api/rotas/detalhes/{rota}/{e['id']}", {"headers": aluno}),
+        ("GET", f"/api/rotas/detalhes/{rota}", {"headers": aluno}),
+        ("GET", f"/api/rotas/{rota}/eta", {}),
+        ("GET", f"/api/rotas/{rota}/otimizar", {"headers": gestao}),
+        ("GET", "/api/rotas/proximas?lat=-8.2835&lng=-35.9761&raio=1000", {}),
+        ("POST", "/api/rotas/iniciar", {"headers": motorista, "json": {"rota_id": m["rota_id"] or rota}}),
+        ("POST", "/inscricaoEstudante/inscrever", {"headers": gestao, "json": {"estudante_id": livre["id"], "rota_id": rota}}),
+        ("POST", "/inscricaoEstudante/inscrever", {"headers": gestao, "json": {"estudante_id": outro["id"], "rota_id": cheia}}),
+        ("GET", f"/inscricaoEstudante/espera/{cheia}", {"headers": gestao}),
+        ("GET", f"/inscricaoEstudante/listar/{rota}?limite=10", {"headers": gestao, "paginas": 2}),
+        ("GET", f"/inscricaoEstudante/listar/{rota}?q=ana", {"headers": gestao}),
+        ("GET", f"/inscricaoEstudante/listar_rotas_estudante/{e['id']}", {"headers": aluno}),
+        ("GET", "/inscricaoEstudante/minhas_rotas", {"headers": aluno}),
+        ("DELETE", f"/inscricaoEstudante/remover?estudante_id={e['id']}&rota_id={rota}", {"headers": gestao}),
+        ("POST", "/api/atribuicao/previa", {"headers": gestao, "json": {"escola": e["escola"]}, "previa": True}),
+        ("POST", "/api/importacao/estudantes", {"headers": gestao, "data": {"arquivo": _csv([
+            "nome_completo;escola;turma;email;numero_matricula;nome_responsavel;numero_responsavel;senha",
+            f"Aluno Importado;{e['escola']};1º A;importado@sintetico.unibus;IMP0001;Resp;0;{SENHA_SINTETICA}",
+        ])}}),
+        ("POST", "/api/importacao/motoristas", {"headers": gestao, "data": {"arquivo": _csv([
+            "nome_completo;email;rota", "Motorista Importado;importado.motorista@sintetico.unibus;Rota 0002",
+        ])}}),
+        ("POST", "/api/importacao/rotas", {"headers": gestao, "data": {"arquivo": _csv([
+            "nome_rota;capacidade;parada_nome;parada_latitude;parada_longitude",
+            "Rota Importada;40;P1;-8.28;-35.97", ";;P2;-8.29;-35.98",
+        ])}}),
+    ]
+
+
+def _rodar_worker():
+    import fila_notificacoes
+
+    with banco.conexao() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            job = fila_notificacoes._pegar_job(conn, cursor, "explicar")
+            if job:
+                fila_notificacoes.processar_job(conn, cursor, job)
+        finally:
+            cursor.close()
+
+
+def executar_roteiro(cliente, chamadas, gravadas, saida):
+    atual = threading.local()
+
+    def gravar(sql, params, duracao):
+        gravadas.append((getattr(atual, "rotulo", "?"), sql, params))
+
+    banco.observar_consultas(gravar)
+    try:
+        for metodo, url, opcoes in chamadas:
+            atual.rotulo = f"{metodo} {url.split('?')[0]}"
+            if metodo == "WORKER":
+                _rodar_worker()
+                continue
+            pedido = {k: v for k, v in opcoes.items() if k in ("json", "headers", "data")}
+            for _ in range(opcoes.get("paginas", 1)):
+                resposta = cliente.open(url, method=metodo, **pedido)
+                resposta.get_data()
+                if resposta.status_code >= 500:
+                    print(f"  {atual.rotulo} -> {resposta.status_code}", file=saida)
+                if opcoes.get("previa") and resposta.status_code == 200:
+                    atual.rotulo = "POST /api/atribuicao/aplicar"
+                    cliente.post("/api/atribuicao/aplicar", headers=pedido.get("headers"),
+                                 json={"previa_id": resposta.get_json()["previa_id"]})
+                proximo = resposta.headers.get("X-Proximo-Cursor")
+                if not proximo:
+                    break
+                url = url + ("&" if "?" in url else "?") + "cursor=" + proximo
+    finally:
+        banco.parar_de_observar(gravar)
+
+
+# =====================================================
+# EXPLAIN de cada formato de consulta
+# =====================================================
+def explicavel(texto):
+    comando = texto.split(" ", 1)[0].upper()
+    if comando not in COMANDOS_EXPLICAVEIS:
+        return False
+    if comando in ("INSERT", "REPLACE") and " SELECT " not in texto.upper():
+        return False  # INSERT ... VALUES não tem plano de leitura
+    return " FROM " in texto.upper() or comando in ("UPDATE", "DELETE")
+
+
+def agrupar(gravadas):
+    formatos = {}
+    for rotulo, sql, params in gravadas:
+        texto = formato(sql)
+        if not explicavel(texto):
+            continue
+        item = formatos.setdefault(texto, {"sql": sql, "params": params, "origens": [], "execucoes": 0})
+        item["execucoes"] += 1
+        if rotulo not in item["origens"]:
+            item["origens"].append(rotulo)
+    return formatos
+
+
+def classificar(texto, linha, min_linhas):
+    tabela = linha.get("table") or ""
+    if tabela.startswith("<"):
+        return None  # tabela derivada/temporária da própria consulta
+    linhas = linha.get("rows") or 0
+    filtrado = float(linha.get("filtered") or 100.0)
+    extra = linha.get("Extra") or ""
+    com_where = " WHERE " in texto.upper()
+
+    if linha.get("type") == "ALL" and linhas >= min_linhas:
+        if not com_where:
+            return ("aviso", f"{tabela}: lista a tabela inteira ({linhas} linhas, sem WHERE)")
+        if filtrado >= FILTRADO_ACEITO:
+            return ("aviso", f"{tabela}: varredura completa que devolve ~{filtrado:.0f}% das linhas")
+        return ("problema", f"{tabela}: VARREDURA COMPLETA de {linhas} linhas "
+                            f"(possible_keys={linha.get('possible_keys')})")
+    if linha.get("type") == "index" and linhas >= min_linhas and com_where and "LIMIT" not in texto.upper():
+        return ("aviso", f"{tabela}: lê o índice {linha.get('key')} inteiro ({linhas} entradas)")
+    if "Using filesort" in extra and linhas >= min_linhas:
+        return ("aviso", f"{tabela}: ordena {linhas} linhas fora do índice (filesort)")
+    if "Using temporary" in extra and linhas >= min_linhas:
+        return ("aviso", f"{tabela}: tabela temporária")
+    return None
+
+
+def explicar(conn, formatos, min_linhas):
+    cursor = conn.cursor(dictionary=True)
+    resultado = []
+    try:
+        for texto, item in formatos.items():
+            try:
+                cursor.execute("EXPLAIN " + item["sql"], item["params"])
+                plano = cursor.fetchall()
+            except mysql.connector.Error as erro:
+                resultado.append(dict(item, formato=texto, plano=[], achados=[("aviso", f"EXPLAIN falhou: {erro.msg}")]))
+                continue
+            achados = [a for a in (classificar(texto, linha, min_linhas) for linha in plano) if a]
+            resultado.append(dict(item, formato=texto, plano=plano, achados=achados))
+    finally:
+        cursor.close()
+    return resultado
+
+
+# =====================================================
+# Gestão de índices: redundantes (prefixo de outro) e não usados no roteiro
+# =====================================================
+def indices_redundantes(conn, nome_banco):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, INDEX_TYPE,
+                   GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+            GROUP BY TABLE_NAME, INDEX_NAME, NON_UNIQUE, INDEX_TYPE
+        """, (nome_banco,))
+        indices = {}
+        for tabela, indice, nao_unico, tipo, colunas in cursor.fetchall():
+            if tipo == "BTREE":
+                indices.setdefault(tabela, []).append((indice, bool(nao_unico), colunas.split(",")))
+    finally:
+        cursor.close()
+
+    redundantes = []
+    for tabela, lista in sorted(indices.items()):
+        for indice, nao_unico, colunas in lista:
+            if indice == "PRIMARY" or not nao_unico:
+                continue
+            for outro, _, colunas_outro in lista:
+                if outro != indice and colunas_outro[:len(colunas)] == colunas and \
+                        (len(colunas_outro) > len(colunas) or outro < indice):
+                    redundantes.append((tabela, indice, outro))
+                    break
+    return redundantes
+
+
+def indices_nao_usados(conn, nome_banco):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT OBJECT_NAME, INDEX_NAME
+            FROM performance_schema.table_io_waits_summary_by_index_usage
+            WHERE OBJECT_SCHEMA = %s AND INDEX_NAME IS NOT NULL
+              AND INDEX_NAME <> 'PRIMARY' AND COUNT_READ = 0
+            ORDER BY OBJECT_NAME, INDEX_NAME
+        """, (nome_banco,))
+        return cursor.fetchall()
+    except mysql.connector.Error:
+        return []  # performance_schema desligado
+    finally:
+        cursor.close()
+
+
+# =====================================================
+# Relatório
+# =====================================================
+def imprimir(resultado, redundantes, nao_usados, saida=sys.stdout):
+    problemas = 0
+    for item in sorted(resultado, key=lambda r: (not any(a[0] == "problema" for a in r["achados"]),
+                                                  r["origens"][0])):
+        if not item["achados"]:
+            continue
+        print(f"\n{' | '.join(item['origens'])}  ({item['execucoes']}x)", file=saida)
+        print(f"  {item['formato'][:200]}", file=saida)
+        for linha in item["plano"]:
+            print(f"    {linha.get('table') or '-':<22} type={linha.get('type') or '-':<7} "
+                  f"key={linha.get('key') or '-':<32} rows={linha.get('rows') or 0:<8} "
+                  f"{linha.get('Extra') or ''}", file=saida)
+        for nivel, texto in item["achados"]:
+            problemas += nivel == "problema"
+            print(f"  [{nivel}] {texto}", file=saida)
+
+    if redundantes:
+        print("\nÍndices redundantes (o outro já cobre as mesmas colunas):", file=saida)
+        for tabela, indice, outro in redundantes:
+            print(f"  {tabela}.{indice} -> {outro}", file=saida)
+    if nao_usados:
+        print("\nÍndices que nenhuma consulta do roteiro leu:", file=saida)
+        for tabela, indice in nao_usados:
+            print(f"  {tabela}.{indice}", file=saida)
+
+    sem_achados = sum(1 for r in resultado if not r["achados"])
+    print(f"\n{len(resultado)} formatos de consulta explicados: {sem_achados} sem achados, "
+          f"{problemas} varredura(s) completa(s) com filtro.", file=saida)
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manter", action="store_true", help="reaproveita o banco de diagnóstico já semeado")
+    parser.add_argument("--estudantes", type=int, default=None)
+    parser.add_argument("--rotas", type=int, default=None)
+    parser.add_argument("--min-linhas", type=int, default=MIN_LINHAS)
+    parser.add_argument("--json", help="grava os planos neste arquivo")
+    args = parser.parse_args()
+
+    tamanhos = {k: v for k, v in (("estudantes", args.estudantes), ("rotas", args.rotas)) if v}
+    # hash no próprio processo: o roteiro faz poucos logins
+    senhas.PROCESSOS_HASH = 1
+
+    conn, aplicadas = preparar_banco(BANCO_EXPLICAR, not args.manter, tamanhos)
+    try:
+        amostra = _amostra(conn)
+        CONFIG_BANCO["database"] = BANCO_EXPLICAR  # o pool da aplicação nasce apontando para cá
+        from app import app
+
+        gravadas = []
+        executar_roteiro(app.test_client(), roteiro(amostra), gravadas, sys.stdout)
+        resultado = explicar(conn, agrupar(gravadas), args.min_linhas)
+        redundantes = indices_redundantes(conn, BANCO_EXPLICAR)
+        nao_usados = indices_nao_usados(conn, BANCO_EXPLICAR)
+    finally:
+        conn.close()
+        banco.obter_pool().fechar_todas()
+
+    print(f"{len(aplicadas)} migração(ões) aplicada(s); {len(gravadas)} consultas gravadas.")
+    problemas = imprimir(resultado, redundantes, nao_usados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+    sys.exit(1 if problemas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import json
+import os
+import socket
+import threading
+import traceback
+
+import mysql.connector
+
+import banco
+from envio_notificacoes import consulta_destinatarios, distribuir
+
+# =====================================================
+# Fila de envios de notificação
+# A fila é a própria tabela `notificacoes_jobs` no MySQL (sem broker externo).
+# POST /enviar grava o envio + o job e responde na hora; threads de trabalho
+# pegam os jobs com SELECT ... FOR UPDATE SKIP LOCKED e fazem o fan-out em lotes.
+# =====================================================
+
+NUM_WORKERS = int(os.environ.get("UNIBUS_NOTIF_WORKERS", "2"))
+INTERVALO_POLL = float(os.environ.get("UNIBUS_NOTIF_POLL", "2"))
+# Jobs em "processing" sem atualização há mais que isso voltam para a fila
+# (o processo que os pegou morreu no meio do fan-out)
+TIMEOUT_JOB = int(os.environ.get("UNIBUS_NOTIF_TIMEOUT_JOB", "600"))
+
+STATUS_NA_FILA = "queued"
+STATUS_PROCESSANDO = "processing"
+STATUS_CONCLUIDO = "done"
+STATUS_FALHOU = "failed"
+
+SQL_TABELA_JOBS = """
+    CREATE TABLE IF NOT EXISTS notificacoes_jobs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        envio_id INT NOT NULL,
+        tipo VARCHAR(30) NOT NULL DEFAULT 'aviso',
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        destinatarios_gravados INT NOT NULL DEFAULT 0,
+        erro TEXT NULL,
+        worker VARCHAR(100) NULL,
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME NULL,
+        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        finished_at DATETIME NULL,
+        KEY idx_jobs_status (status, id),
+        KEY idx_jobs_envio (envio_id)
+    )
+"""
+
+_acordar = threading.Event()
+_workers = []
+_parar = threading.Event()
+
+
+# =====================================================
+# Enfileirar (chamado dentro da transação do envio; quem chama faz o commit)
+# =====================================================
+def enfileirar(cursor, envio_id, tipo):
+    cursor.execute(
+        "INSERT INTO notificacoes_jobs (envio_id, tipo, status) VALUES (%s, %s, %s)",
+        (envio_id, tipo, STATUS_NA_FILA)
+    )
+    return cursor.lastrowid
+
+
+# Acorda os workers depois do commit
+def avisar_workers():
+    _acordar.set()
+
+
+def status_envio(cursor, envio_id):
+    cursor.execute("""
+        SELECT envio_id, status, destinatarios_gravados, erro,
+               created_at, started_at, finished_at
+        FROM notificacoes_jobs
+        WHERE envio_id = %s
+        ORDER BY id DESC
+        LIMIT 1
+    """, (envio_id,))
+    return cursor.fetchone()
+
+
+# =====================================================
+# Worker
+# =====================================================
+def _pegar_job(conn, cursor, nome_worker):
+    conn.start_transaction()
+    cursor.execute("""
+        SELECT id, envio_id, tipo
+        FROM notificacoes_jobs
+        WHERE status = %s
+           OR (status = %s AND updated_at < NOW() - INTERVAL %s SECOND)
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    """, (STATUS_NA_FILA, STATUS_PROCESSANDO, TIMEOUT_JOB))
+    job = cursor.fetchone()
+    if not job:
+        conn.rollback()
+        return None
+    cursor.execute("""
+        UPDATE notificacoes_jobs
+        SET status = %s, worker = %s, started_at = NOW(), destinatarios_gravados = 0
+        WHERE id = %s
+    """, (STATUS_PROCESSANDO, nome_worker, job["id"]))
+    conn.commit()
+    return job
+
+
+def _finalizar(cursor, job_id, status, gravados, erro=None):
+    cursor.execute("""
+        UPDATE notificacoes_jobs
+        SET status = %s, destinatarios_gravados = %s, erro = %s, finished_at = NOW()
+        WHERE id = %s
+    """, (status, gravados, erro, job_id))
+
+
+def processar_job(conn, cursor, job):
+    cursor.execute("""
+        SELECT id, destinatario_tipo, titulo, mensagem, routes_json, drivers_json
+        FROM notificacoes_envios WHERE id = %s
+    """, (job["envio_id"],))
+    envio = cursor.fetchone()
+    if not envio:
+        _finalizar(cursor, job["id"], STATUS_FALHOU, 0, "Envio não encontrado.")
+        conn.commit()
+        return
+
+    # Job retomado depois de uma queda: recomeça do zero
+    cursor.execute("DELETE FROM notificacoes WHERE envio_id = %s", (envio["id"],))
+    conn.commit()
+
+    routes = json.loads(envio["routes_json"]) if envio["routes_json"] else []
+    drivers = json.loads(envio["drivers_json"]) if envio["drivers_json"] else []
+    consulta = consulta_destinatarios(envio["destinatario_tipo"], routes, drivers)
+
+    def progresso(total):
+        cursor.execute(
+            "UPDATE notificacoes_jobs SET destinatarios_gravados = %s WHERE id = %s",
+            (total, job["id"])
+        )
+        conn.commit()
+
+    total = 0
+    if consulta is not None:
+        total = distribuir(conn, cursor, envio["id"], envio["titulo"], envio["mensagem"],
+                           job["tipo"], consulta, modo="lotes", ao_gravar_lote=progresso)
+
+    if not total:
+        # Mesmo comportamento do envio síncrono: sem destinatários não fica envio
+        cursor.execute("DELETE FROM notificacoes_envios WHERE id = %s", (envio["id"],))
+        _finalizar(cursor, job["id"], STATUS_FALHOU, 0, "Nenhum destinatário encontrado.")
+    else:
+        _finalizar(cursor, job["id"], STATUS_CONCLUIDO, total)
+    conn.commit()
+
+
+def _loop_worker(nome_worker):
+    while not _parar.is_set():
+        try:
+            with banco.conexao() as conn:
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    while not _parar.is_set():
+                        job = _pegar_job(conn, cursor, nome_worker)
+                        if not job:
+                            break
+                        try:
+                            processar_job(conn, cursor, job)
+                        except Exception as erro:
+                            traceback.print_exc()
+                            conn.rollback()
+                            _finalizar(cursor, job["id"], STATUS_FALHOU, 0, str(erro))
+                            conn.commit()
+                finally:
+                    cursor.close()
+        except mysql.connector.Error:
+            traceback.print_exc()
+
+        _acordar.wait(INTERVALO_POLL)
+        _acordar.clear()
+
+
+def garantir_tabela():
+    with banco.conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_TABELA_JOBS)
+        conn.commit()
+        cursor.close()
+
+
+def iniciar_workers(quantidade=None):
+    quantidade = NUM_WORKERS if quantidade is None else quantidade
+    if _workers or quantidade <= 0:
+        return
+    try:
+        garantir_tabela()
+    except mysql.connector.Error:
+        traceback.print_exc()
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    for i in range(quantidade):
+        t = threading.Thread(target=_loop_worker, args=(f"{base}:{i}",),
+                             name=f"notificacoes-worker-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+
+
+def parar_workers():
+    _parar.set()
+    _acordar.set()
+    for t in _workers:
+        t.join(timeout=5)
+    _workers.clear()
+    _parar.clear()
@@ -0,0 +1,89 @@
+# Configuração do gunicorn para produção (Linux)
+#
+#   UNIBUS_SEGREDO=... gunicorn -c gunicorn.conf.py
+#
+# Vários processos (UNIBUS_WORKERS), cada um com UNIBUS_THREADS threads
+# (worker gthread). O app é importado uma vez no processo mestre
+# (preload_app) e os workers herdam a memória por copy-on-write; o pool de
+# conexões, os workers da fila de notificações e o pool de hash são criados
+# em cada processo depois do fork.
+#
+# Conexões com o MySQL: até UNIBUS_WORKERS x UNIBUS_DB_POOL_TAMANHO (o padrão
+# do pool aqui é threads + 2); confira o max_connections do servidor.
+#
+# Recarga sem derrubar requisições:
+#   kill -HUP <mestre>   -> workers novos com a configuração relida; os antigos
+#                           terminam o que estão atendendo (graceful_timeout).
+#                           Com preload_app o código NÃO é relido no HUP.
+#   kill -USR2 <mestre>  -> sobe um mestre novo com o código novo; depois
+#                           kill -QUIT <mestre antigo> (troca sem downtime).
+# O cache de respostas em memória é por processo; com vários workers use
+# UNIBUS_CACHE_BACKEND=sqlite para a invalidação valer para todos.
+# As métricas de /metrics também são por processo (cada scrape cai num worker).
+import multiprocessing
+import os
+
+_nucleos = multiprocessing.cpu_count()
+
+bind = os.environ.get("UNIBUS_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("UNIBUS_WORKERS", str(_nucleos * 2 + 1)))
+threads = int(os.environ.get("UNIBUS_THREADS", "4"))
+worker_class = "gthread"
+wsgi_app = "wsgi:app"
+preload_app = True
+
+timeout = int(os.environ.get("UNIBUS_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("UNIBUS_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("UNIBUS_KEEPALIVE", "5"))
+# Recicla o worker depois de N requisições (0 = nunca); o jitter evita que
+# todos reiniciem juntos
+max_requests = int(os.environ.get("UNIBUS_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("UNIBUS_ACCESS_LOG") or None
+errorlog = "-"
+
+# Lidos no import do app (preload), então precisam estar definidos aqui.
+# Uma thread por conexão e uma folga para os workers da fila; os processos já
+# ocupam os núcleos, então o hash de senha roda na própria thread por padrão
+# (um por vez por worker, com a fila UNIBUS_HASH_FILA e o 503 do senhas.py).
+os.environ.setdefault("UNIBUS_DB_POOL_TAMANHO", str(threads + 2))
+os.environ.setdefault("UNIBUS_HASH_PROCESSOS", str(max(1, _nucleos // workers)))
+
+
+def on_starting(server):
+    # Com segredo aleatório cada mestre (e cada USR2) emitiria tokens que os
+    # outros não aceitam
+    if not os.environ.get("UNIBUS_SEGREDO"):
+        raise SystemExit("Defina UNIBUS_SEGREDO: em produção todos os workers precisam do mesmo segredo")
+
+
+def when_ready(server):
+    import banco
+
+    # Nada de conexão aberta no mestre para não ser herdada pelos workers
+    banco.obter_pool().fechar_todas()
+
+
+def post_fork(server, worker):
+    import banco
+
+    banco.apos_fork()
+
+
+def post_worker_init(worker):
+    import fila_notificacoes
+
+    # Só nos deploys que recebem envios (UNIBUS_BLUEPRINTS com notificacoes)
+    if "notificacoes_bp" in worker.wsgi.blueprints:
+        fila_notificacoes.iniciar_workers()
+
+
+def worker_exit(server, worker):
+    import banco
+    import fila_notificacoes
+    import senhas
+
+    fila_notificacoes.parar_workers()
+    senhas.encerrar_pool()
+    banco.obter_pool().fechar_todas()
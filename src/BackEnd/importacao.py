@@ -0,0 +1,501 @@
+# Importação em lote de estudantes, motoristas e rotas a partir de CSV/XLSX.
+#   python importacao.py estudantes alunos.xlsx
+#   python importacao.py motoristas motoristas.csv --simular
+#   python importacao.py rotas rotas.csv --relatorio erros.csv
+# O mesmo pipeline atende POST /api/importacao/<tipo> (ImportacaoLote.py).
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import unicodedata
+import uuid
+import zipfile
+
+import mysql.connector
+
+from banco import CONFIG_BANCO
+from cache_respostas import invalidar
+from paradas import salvar_paradas
+from senhas import hashes_em_lote, encerrar_pool
+
+# =====================================================
+# Pipeline
+# 1. a planilha é lida linha a linha (csv / openpyxl read_only), sem
+#    carregar o arquivo inteiro
+# 2. cada linha é validada; duplicados no arquivo e no banco viram erro
+# 3. as senhas do lote são enviadas ao pool de processos (senhas.py) e,
+#    enquanto os hashes saem, o lote anterior é gravado
+# 4. cada lote é um INSERT multi-linha por tabela e um commit; se o lote
+#    esbarrar numa chave única, é regravado linha a linha (SAVEPOINT) e só
+#    a linha com problema vai para o relatório
+# =====================================================
+
+TAMANHO_LOTE = int(os.environ.get("UNIBUS_IMPORTACAO_LOTE", "1000"))
+CODIFICACAO_PADRAO = "utf-8-sig"
+# Mesmo padrão de /api/motoristas/cadastrar quando a senha não vem
+SENHA_PADRAO_MOTORISTA = "123456"
+
+# Cabeçalhos aceitos além do nome da coluna no banco
+APELIDOS = {
+    "nome": "nome_completo",
+    "aluno": "nome_completo",
+    "matricula": "numero_matricula",
+    "responsavel": "nome_responsavel",
+    "telefone_responsavel": "numero_responsavel",
+    "lat": "latitude",
+    "lng": "longitude",
+    "lon": "longitude",
+    "placa": "placa_onibus",
+    "rota_nome": "nome_rota",
+    "parada": "parada_nome",
+    "parada_lat": "parada_latitude",
+    "parada_lng": "parada_longitude",
+}
+
+
+class ErroLinha(ValueError):
+    pass
+
+
+# =====================================================
+# Leitura (CSV ou XLSX) -> (número da linha, {coluna: texto})
+# =====================================================
+def normalizar_cabecalho(nome):
+    nome = unicodedata.normalize("NFKD", str(nome or "")).encode("ascii", "ignore").decode()
+    nome = "_".join(nome.strip().lower().replace("-", " ").split())
+    return APELIDOS.get(nome, nome)
+
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    # matrícula e telefone chegam como número no Excel
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _registros(linhas):
+    try:
+        cabecalho = [normalizar_cabecalho(c) for c in next(linhas)]
+    except StopIteration:
+        return
+    for numero, valores in enumerate(linhas, start=2):
+        registro = {c: _texto(v) for c, v in zip(cabecalho, valores) if c}
+        if any(registro.values()):
+            yield numero, registro
+
+
+def ler_csv(arquivo, codificacao=CODIFICACAO_PADRAO):
+    texto = io.TextIOWrapper(arquivo, encoding=codificacao, newline="")
+    try:
+        primeira = texto.readline()
+    except UnicodeDecodeError:
+        raise ValueError(f"Arquivo não está em {codificacao}; informe a codificação (ex.: latin-1)")
+    # Excel em português salva com ";"
+    delimitador = max(";,\t", key=primeira.count)
+    return _registros(csv.reader(itertools.chain([primeira], texto), delimiter=delimitador))
+
+
+def ler_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar .xlsx instale o openpyxl (pip install openpyxl)")
+    try:
+        livro = load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ValueError("Arquivo .xlsx inválido ou corrompido")
+
+    def linhas():
+        try:
+            yield from _registros(livro.active.iter_rows(values_only=True))
+        finally:
+            livro.close()
+    return linhas()
+
+
+def ler_planilha(arquivo, nome_arquivo, codificacao=CODIFICACAO_PADRAO):
+    extensao = os.path.splitext(nome_arquivo or "")[1].lower()
+    if extensao in (".xlsx", ".xlsm"):
+        return ler_xlsx(arquivo)
+    if extensao in (".csv", ".txt", ""):
+        return ler_csv(arquivo, codificacao)
+    raise ValueError(f"Formato não suportado: {extensao} (use .csv ou .xlsx)")
+
+
+# =====================================================
+# Validação
+# =====================================================
+def _obrigatorios(registro, campos):
+    faltando = [c for c in campos if not registro.get(c)]
+    if faltando:
+        raise ErroLinha(f"Campos obrigatórios faltando: {', '.join(faltando)}")
+
+
+def _numero(registro, campo, tipo=float):
+    valor = registro.get(campo)
+    if not valor:
+        return None
+    try:
+        return tipo(valor.replace(",", ".") if tipo is float else valor)
+    except ValueError:
+        raise ErroLinha(f"{campo} inválido: {valor}")
+
+
+def _coordenadas(registro, prefixo=""):
+    latitude = _numero(registro, prefixo + "latitude")
+    longitude = _numero(registro, prefixo + "longitude")
+    if (latitude is None) != (longitude is None):
+        raise ErroLinha(f"Informe {prefixo}latitude e {prefixo}longitude juntas")
+    if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ErroLinha(f"Coordenadas fora do intervalo: {latitude}, {longitude}")
+    return latitude, longitude
+
+
+def _email(registro):
+    email = registro.get("email", "")
+    if "@" not in email:
+        raise ErroLinha(f"email inválido: {email}")
+    return email
+
+
+def _inserir_varios(cursor, sql, linhas):
+    if not linhas:
+        return
+    marcadores = "(" + ",".join(["%s"] * len(linhas[0])) + ")"
+    cursor.execute(f"{sql} VALUES {','.join([marcadores] * len(linhas))}",
+                   [campo for linha in linhas for campo in linha])
+
+
+def _ja_cadastrados(cursor, sql, valores):
+    valores = list(valores)
+    if not valores:
+        return set()
+    cursor.execute(sql.format(",".join(["%s"] * len(valores))), valores)
+    return {str(r[0]).lower() for r in cursor.fetchall()}
+
+
+# =====================================================
+# Tipos de importação
+# validar(numero, registro) -> item | ErroLinha
+# existentes(cursor, lote) -> {índice no lote: erro} (já no banco)
+# preparar(lote) -> um valor por item (hashes, começam a ser gerados aqui)
+# gravar(cursor, lote, preparados)
+# =====================================================
+class Importacao:
+    def __init__(self, created_by=None):
+        self.created_by = created_by
+        self.vistos = {}
+
+    def registros(self, linhas):
+        return linhas
+
+    # Chave única repetida dentro do próprio arquivo
+    def _unico(self, campo, valor, numero):
+        chave = (campo, valor.lower())
+        if chave in self.vistos:
+            raise ErroLinha(f"{campo} repetido no arquivo (linha {self.vistos[chave]})")
+        self.vistos[chave] = numero
+
+    def existentes(self, cursor, lote):
+        return {}
+
+    def preparar(self, lote):
+        return [None] * len(lote)
+
+
+class ImportacaoEstudantes(Importacao):
+    OBRIGATORIOS = ["nome_completo", "escola", "turma", "email",
+                    "numero_matricula", "nome_responsavel", "numero_responsavel", "senha"]
+
+    def validar(self, numero, registro):
+        _obrigatorios(registro, self.OBRIGATORIOS)
+        email = _email(registro)
+        latitude, longitude = _coordenadas(registro)
+        self._unico("email", email, numero)
+        self._unico("numero_matricula", registro["numero_matricula"], numero)
+        return dict(registro, email=email, latitude=latitude, longitude=longitude)
+
+    def existentes(self, cursor, lote):
+        emails = _ja_cadastrados(cursor, "SELECT email FROM profiles WHERE email IN ({})",
+                                 (e["email"] for _, e in lote))
+        matriculas = _ja_cadastrados(
+            cursor, "SELECT numero_matricula FROM estudantes WHERE numero_matricula IN ({})",
+            (e["numero_matricula"] for _, e in lote))
+        erros = {}
+        for i, (_, e) in enumerate(lote):
+            if e["email"].lower() in emails:
+                erros[i] = "Email já cadastrado."
+            elif e["numero_matricula"].lower() in matriculas:
+                erros[i] = "Número de matrícula já cadastrado."
+        return erros
+
+    def preparar(self, lote):
+        return hashes_em_lote(e["senha"] for _, e in lote)
+
+    def gravar(self, cursor, lote, hashes):
+        profiles, estudantes = [], []
+        for (_, e), senha_hash in zip(lote, hashes):
+            profile_id, estudante_id = str(uuid.uuid4()), str(uuid.uuid4())
+            profiles.append((profile_id, e["email"], e["nome_completo"], "estudante"))
+            estudantes.append((
+                estudante_id, e["nome_completo"], e["escola"], e["turma"], e["email"],
+                e["numero_matricula"], e["nome_responsavel"], e["numero_responsavel"],
+                senha_hash, self.created_by, profile_id, e["latitude"], e["longitude"]
+            ))
+        _inserir_varios(cursor, "INSERT INTO profiles (id, email, nome_completo, role)", profiles)
+        _inserir_varios(cursor, """
+            INSERT INTO estudantes (
+                id, nome_completo, escola, turma, email,
+                numero_matricula, nome_responsavel, numero_responsavel,
+                senha, created_by, profile_id, latitude, longitude
+            )""", estudantes)
+
+
+# Motoristas: perfil criado junto; rota pela coluna rota_id ou pelo nome (rota)
+class ImportacaoMotoristas(Importacao):
+    def validar(self, numero, registro):
+        _obrigatorios(registro, ["nome_completo", "email"])
+        email = _email(registro)
+        rota_id = _numero(registro, "rota_id", int)
+        self._unico("email", email, numero)
+        return dict(registro, email=email, rota_id=rota_id)
+
+    def existentes(self, cursor, lote):
+        emails = _ja_cadastrados(cursor, "SELECT email FROM profiles WHERE email IN ({})",
+                                 (m["email"] for _, m in lote))
+        return {i: "Email já cadastrado." for i, (_, m) in enumerate(lote) if m["email"].lower() in emails}
+
+    # {nome_rota: id} das rotas citadas pelo nome no lote
+    def _rotas_por_nome(self, cursor, lote):
+        nomes = {m["rota"] for _, m in lote if m.get("rota") and not m["rota_id"]}
+        if not nomes:
+            return {}
+        cursor.execute(f"SELECT nome_rota, MIN(id) FROM rotas WHERE nome_rota IN ({','.join(['%s'] * len(nomes))}) "
+                       f"GROUP BY nome_rota", list(nomes))
+        return dict(cursor.fetchall())
+
+    def preparar(self, lote):
+        return hashes_em_lote(m.get("senha") or SENHA_PADRAO_MOTORISTA for _, m in lote)
+
+    def gravar(self, cursor, lote, hashes):
+        rotas = self._rotas_por_nome(cursor, lote)
+        profiles, motoristas = [], []
+        for (_, m), senha_hash in zip(lote, hashes):
+            profile_id = str(uuid.uuid4())
+            profiles.append((profile_id, m["email"], m["nome_completo"], "motorista"))
+            motoristas.append((
+                m["nome_completo"], m["email"], senha_hash, m.get("telefone"),
+                m.get("placa_onibus"), m.get("rota"), m["rota_id"] or rotas.get(m.get("rota")),
+                m.get("foto_perfil", ""), profile_id
+            ))
+        _inserir_varios(cursor, "INSERT INTO profiles (id, email, nome_completo, role)", profiles)
+        _inserir_varios(cursor, """
+            INSERT INTO motoristas (
+                nome_completo, email, senha, telefone,
+                placa_onibus, rota, rota_id, foto_perfil, profile_id
+            )""", motoristas)
+
+
+# Rotas: uma linha por parada. Linhas seguidas com o mesmo nome_rota (ou com
+# nome_rota vazio) são paradas da mesma rota; os dados da rota vêm da primeira.
+class ImportacaoRotas(Importacao):
+    CAMPOS = ["nome_rota", "numero_onibus", "placa_veiculo", "turno",
+              "motorista_nome", "motorista_telefone",
+              "horario_saida_casa", "horario_chegada_escola",
+              "horario_saida_escola", "horario_chegada_casa", "observacoes"]
+
+    def registros(self, linhas):
+        atual = None
+        for numero, registro in linhas:
+            nome = registro.get("nome_rota")
+            if atual is None or (nome and nome != atual[1]["nome_rota"]):
+                if atual is not None:
+                    yield atual
+                atual = (numero, {"nome_rota": nome, "rota": registro, "paradas": []})
+            atual[1]["paradas"].append((numero, registro))
+        if atual is not None:
+            yield atual
+
+    def validar(self, numero, grupo):
+        rota = grupo["rota"]
+        _obrigatorios(rota, ["nome_rota"])
+        self._unico("nome_rota", rota["nome_rota"], numero)
+        capacidade = _numero(rota, "capacidade", int)
+        if capacidade is not None and capacidade <= 0:
+            raise ErroLinha("capacidade deve ser maior que zero")
+
+        pontos = []
+        for linha, registro in grupo["paradas"]:
+            if not any(registro.get(c) for c in ("parada_nome", "parada_latitude", "parada_longitude")):
+                continue
+            try:
+                latitude, longitude = _coordenadas(registro, "parada_")
+            except ErroLinha as erro:
+                raise ErroLinha(f"linha {linha}: {erro}")
+            if latitude is None:
+                raise ErroLinha(f"linha {linha}: parada sem parada_latitude/parada_longitude")
+            pontos.append({"name": registro.get("parada_nome") or f"Parada {len(pontos) + 1}",
+                           "latitude": latitude, "longitude": longitude,
+                           "horario": registro.get("parada_horario") or None,
+                           "type": registro.get("parada_tipo") or None})
+        return {"valores": [rota.get(c) or None for c in self.CAMPOS] + [capacidade], "pontos": pontos}
+
+    def gravar(self, cursor, lote, _):
+        # Poucas rotas por escola: INSERT por rota (precisa do id) e paradas em lote
+        for _, rota in lote:
+            cursor.execute(f"""
+                INSERT INTO rotas ({', '.join(self.CAMPOS)}, capacidade)
+                VALUES ({', '.join(['%s'] * (len(self.CAMPOS) + 1))})
+            """, rota["valores"])
+            salvar_paradas(cursor, cursor.lastrowid, rota["pontos"])
+
+
+TIPOS = {
+    "estudantes": ImportacaoEstudantes,
+    "motoristas": ImportacaoMotoristas,
+    "rotas": ImportacaoRotas,
+}
+
+
+def _lotes(itens, tamanho):
+    itens = iter(itens)
+    while True:
+        lote = list(itertools.islice(itens, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+# =====================================================
+# Importação: devolve o relatório
+# {tipo, simulacao, linhas, importados, erros: [{linha, erro}], interrompido?}
+# (em rotas, "linhas" conta rotas; o erro aponta a primeira linha da rota)
+# Com simular=True só valida (inclusive contra o banco), sem gravar.
+# =====================================================
+def importar(conn, tipo, linhas, simular=False, tamanho_lote=TAMANHO_LOTE, created_by=None, progresso=None):
+    importacao = TIPOS[tipo](created_by)
+    relatorio = {"tipo": tipo, "simulacao": simular, "linhas": 0, "importados": 0, "erros": []}
+    cursor = conn.cursor()
+
+    def erro(numero, mensagem):
+        relatorio["erros"].append({"linha": numero, "erro": mensagem})
+
+    def gravar(lote, preparados):
+        preparados = list(preparados)
+        try:
+            importacao.gravar(cursor, lote, preparados)
+            conn.commit()
+            relatorio["importados"] += len(lote)
+        except mysql.connector.IntegrityError:
+            conn.rollback()
+            # alguém cadastrou no meio do caminho: linha a linha, só a culpada fica de fora
+            for item, preparado in zip(lote, preparados):
+                cursor.execute("SAVEPOINT linha_importacao")
+                try:
+                    importacao.gravar(cursor, [item], [preparado])
+                    relatorio["importados"] += 1
+                except mysql.connector.Error as falha:
+                    cursor.execute("ROLLBACK TO SAVEPOINT linha_importacao")
+                    erro(item[0], falha.msg)
+            conn.commit()
+        if progresso:
+            progresso(relatorio)
+
+    pendente = None
+    try:
+        for bruto in _lotes(importacao.registros(linhas), tamanho_lote):
+            lote = []
+            for numero, registro in bruto:
+                relatorio["linhas"] += 1
+                try:
+                    lote.append((numero, importacao.validar(numero, registro)))
+                except ErroLinha as falha:
+                    erro(numero, str(falha))
+
+            repetidos = importacao.existentes(cursor, lote)
+            for i, mensagem in repetidos.items():
+                erro(lote[i][0], mensagem)
+            lote = [item for i, item in enumerate(lote) if i not in repetidos]
+
+            if simular:
+                relatorio["importados"] += len(lote)
+            if simular or not lote:
+                if progresso:
+                    progresso(relatorio)
+                continue
+
+            # hashes deste lote em paralelo com a gravação do anterior
+            preparados = importacao.preparar(lote)
+            if pendente:
+                gravar(*pendente)
+            pendente = (lote, preparados)
+        if pendente:
+            gravar(*pendente)
+    except mysql.connector.Error as falha:
+        # lotes já gravados ficam; o relatório diz até onde foi
+        conn.rollback()
+        relatorio["interrompido"] = str(falha)
+    except (UnicodeDecodeError, csv.Error) as falha:
+        conn.rollback()
+        relatorio["interrompido"] = f"Arquivo ilegível na linha {relatorio['linhas'] + 2}: {falha}"
+    finally:
+        cursor.close()
+
+    relatorio["erros"].sort(key=lambda e: e["linha"])
+    if tipo == "rotas" and relatorio["importados"] and not simular:
+        invalidar("rotas", "rota")
+    return relatorio
+
+
+def escrever_relatorio(relatorio, arquivo):
+    escritor = csv.writer(arquivo, delimiter=";")
+    escritor.writerow(["linha", "erro"])
+    for e in relatorio["erros"]:
+        escritor.writerow([e["linha"], e["erro"]])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tipo", choices=sorted(TIPOS))
+    parser.add_argument("arquivo")
+    parser.add_argument("--simular", action="store_true", help="só valida, não grava")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--relatorio", help="CSV com as linhas recusadas")
+    parser.add_argument("--codificacao", default=CODIFICACAO_PADRAO, help="ex.: latin-1 para CSV antigo do Excel")
+    parser.add_argument("--created-by")
+    args = parser.parse_args()
+
+    def progresso(r):
+        print(f"\r{r['linhas']} linhas, {r['importados']} importadas, {len(r['erros'])} erros",
+              end="", file=sys.stderr, flush=True)
+
+    conn = mysql.connector.connect(**CONFIG_BANCO)
+    try:
+        with open(args.arquivo, "rb") as arquivo:
+            linhas = ler_planilha(arquivo, args.arquivo, args.codificacao)
+            relatorio = importar(conn, args.tipo, linhas, args.simular, args.lote, args.created_by, progresso)
+    finally:
+        conn.close()
+        encerrar_pool()
+    print(file=sys.stderr)
+
+    if args.relatorio:
+        with open(args.relatorio, "w", newline="", encoding="utf-8-sig") as saida:
+            escrever_relatorio(relatorio, saida)
+    for e in relatorio["erros"][:20]:
+        print(f"linha {e['linha']}: {e['erro']}")
+    if len(relatorio["erros"]) > 20:
+        print(f"... e mais {len(relatorio['erros']) - 20} (use --relatorio)")
+    acao = "válidas" if args.simular else "importadas"
+    print(f"{relatorio['importados']} de {relatorio['linhas']} linhas {acao}.")
+    if "interrompido" in relatorio:
+        print(f"Importação interrompida: {relatorio['interrompido']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
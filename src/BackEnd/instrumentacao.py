@@ -0,0 +1,264 @@
+import bisect
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, g, has_app_context, request
+
+import banco
+import respostas_json
+
+# =====================================================
+# Métricas por requisição, expostas em /metrics (formato Prometheus)
+#
+# Para cada endpoint (a regra da URL, ex.: /api/rotas/detalhes/<id_rota>/<id_estudante>)
+# guarda o histograma de latência e quanto do tempo foi banco (execute + fetch
+# nos cursores do pool), serialização JSON e o resto (Python). Conta também
+# consultas e linhas lidas.
+#
+# UNIBUS_METRICAS=0 desliga tudo (nem os cursores são embrulhados).
+# UNIBUS_PERFIL_LENTAS=1 liga o amostrador de pilhas: requisições acima de
+#   UNIBUS_PERFIL_LIMITE_MS geram um arquivo .folded em UNIBUS_PERFIL_DIR
+#   (flamegraph.pl, speedscope.app e inferno leem esse formato).
+# =====================================================
+
+ATIVO = os.environ.get("UNIBUS_METRICAS", "1") != "0"
+PERFIL_LENTAS = os.environ.get("UNIBUS_PERFIL_LENTAS", "0") == "1"
+PERFIL_LIMITE_MS = float(os.environ.get("UNIBUS_PERFIL_LIMITE_MS", "500"))
+PERFIL_INTERVALO_MS = float(os.environ.get("UNIBUS_PERFIL_INTERVALO_MS", "5"))
+PERFIL_DIR = os.environ.get("UNIBUS_PERFIL_DIR", "perfis_lentos")
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # a última é o +Inf
+        self.soma = 0.0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencia = defaultdict(lambda: Histograma(LIMITES_LATENCIA))
+        self.consultas_por_req = defaultdict(lambda: Histograma(LIMITES_CONSULTAS))
+        self.requisicoes = Counter()  # (endpoint, metodo, status)
+        self.segundos = defaultdict(Counter)  # (endpoint, metodo) -> banco/json/python
+        self.consultas = Counter()
+        self.linhas = Counter()
+
+    def registrar(self, endpoint, metodo, status, medicao, total):
+        chave = (endpoint, metodo)
+        python = max(0.0, total - medicao["banco"] - medicao["json"])
+        with self._lock:
+            self.latencia[chave].observar(total)
+            self.consultas_por_req[chave].observar(medicao["consultas"])
+            self.requisicoes[(endpoint, metodo, str(status))] += 1
+            self.segundos[chave].update(banco=medicao["banco"], json=medicao["json"], python=python)
+            self.consultas[chave] += medicao["consultas"]
+            self.linhas[chave] += medicao["linhas"]
+
+    def texto(self):
+        linhas = []
+
+        def rotulos(endpoint, metodo, **extra):
+            pares = [("endpoint", endpoint), ("metodo", metodo)] + list(extra.items())
+            return ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares)
+
+        def histograma(nome, ajuda, dados):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} histogram")
+            for (endpoint, metodo), h in sorted(dados.items()):
+                acumulado = 0
+                for limite, n in zip(h.limites + ("+Inf",), h.contagens):
+                    acumulado += n
+                    linhas.append(f"{nome}_bucket{{{rotulos(endpoint, metodo, le=limite)}}} {acumulado}")
+                linhas.append(f"{nome}_sum{{{rotulos(endpoint, metodo)}}} {h.soma:.6f}")
+                linhas.append(f"{nome}_count{{{rotulos(endpoint, metodo)}}} {acumulado}")
+
+        def contador(nome, ajuda, dados, formato="{}"):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} counter")
+            for chave, valor in sorted(dados):
+                linhas.append(f"{nome}{{{rotulos(*chave)}}} {formato.format(valor)}")
+
+        with self._lock:
+            histograma("unibus_requisicao_segundos", "Latência das requisições por endpoint.", self.latencia)
+            histograma("unibus_consultas_por_requisicao", "Consultas ao banco por requisição.",
+                       self.consultas_por_req)
+            linhas.append("# HELP unibus_requisicoes_total Requisições por endpoint e status.")
+            linhas.append("# TYPE unibus_requisicoes_total counter")
+            for (endpoint, metodo, status), n in sorted(self.requisicoes.items()):
+                linhas.append(f"unibus_requisicoes_total{{{rotulos(endpoint, metodo, status=status)}}} {n}")
+            for parte, ajuda in (("banco", "Tempo em execute/fetch nos cursores do pool."),
+                                 ("json", "Tempo serializando respostas JSON."),
+                                 ("python", "Tempo restante da requisição (código Python).")):
+                contador(f"unibus_{parte}_segundos_total", ajuda,
+                         [(chave, s[parte]) for chave, s in self.segundos.items()], "{:.6f}")
+            contador("unibus_consultas_total", "Consultas executadas.", self.consultas.items())
+            contador("unibus_linhas_lidas_total", "Linhas lidas do banco.", self.linhas.items())
+
+        linhas.append("# HELP unibus_pool Estado do pool de conexões (ver /status/banco).")
+        linhas.append("# TYPE unibus_pool gauge")
+        for nome, valor in banco.obter_pool().metricas().items():
+            linhas.append(f'unibus_pool{{medida="{nome}"}} {valor}')
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = Registro()
+
+
+# =====================================================
+# Tempo de banco e de JSON da requisição atual
+# (workers e scripts usam o pool fora de requisição e não entram na conta)
+# =====================================================
+def _medicao_atual():
+    return g.get("medicao") if has_app_context() else None
+
+
+def _ao_consultar(sql, params, duracao):
+    medicao = _medicao_atual()
+    if medicao is not None:
+        medicao["consultas"] += 1
+        medicao["banco"] += duracao
+
+
+def _ao_ler(linhas, duracao):
+    medicao = _medicao_atual()
+    if medicao is not None:
+        medicao["linhas"] += linhas
+        medicao["banco"] += duracao
+
+
+# jsonify, dumps e response passam todos por codificar
+class ProvedorJSONMedido(respostas_json.ProvedorJSON):
+    def codificar(self, obj, indentar=False):
+        inicio = time.perf_counter()
+        try:
+            return super().codificar(obj, indentar)
+        finally:
+            medicao = _medicao_atual()
+            if medicao is not None:
+                medicao["json"] += time.perf_counter() - inicio
+
+
+# =====================================================
+# Amostrador de pilhas para requisições lentas (opt-in)
+# Uma thread lê sys._current_frames() a cada intervalo, só para as threads
+# que estão atendendo requisição; no fim, se passou do limite, grava as
+# pilhas no formato "folded" (uma pilha por linha, raiz;...;folha contagem).
+# =====================================================
+class Amostrador:
+    def __init__(self, intervalo_ms, limite_ms, diretorio):
+        self.intervalo = intervalo_ms / 1000
+        self.limite_ms = limite_ms
+        self.diretorio = diretorio
+        self._ativas = {}  # id da thread -> Counter de pilhas
+        self._lock = threading.Lock()
+        self._thread = None
+        self._sequencia = itertools.count(1)
+
+    def iniciar(self, id_thread):
+        with self._lock:
+            self._ativas[id_thread] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._amostrar, name="amostrador-pilhas", daemon=True)
+                self._thread.start()
+
+    def terminar(self, id_thread):
+        with self._lock:
+            return self._ativas.pop(id_thread, None)
+
+    def _amostrar(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                if not self._ativas:
+                    continue
+                quadros = sys._current_frames()
+                for id_thread, pilhas in self._ativas.items():
+                    quadro = quadros.get(id_thread)
+                    if quadro is not None:
+                        pilhas[_pilha(quadro)] += 1
+
+    def gravar(self, pilhas, endpoint, metodo, ms):
+        os.makedirs(self.diretorio, exist_ok=True)
+        nome = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{metodo}{endpoint}").strip("_")
+        caminho = os.path.join(self.diretorio, f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}-{next(self._sequencia)}_{nome}_{ms:.0f}ms.folded")
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, n in pilhas.most_common():
+                f.write(f"{pilha} {n}\n")
+        return caminho
+
+
+def _pilha(quadro):
+    nomes = []
+    while quadro is not None:
+        nomes.append(f"{quadro.f_globals.get('__name__', '?')}:{quadro.f_code.co_name}")
+        quadro = quadro.f_back
+    return ";".join(reversed(nomes))
+
+
+amostrador = Amostrador(PERFIL_INTERVALO_MS, PERFIL_LIMITE_MS, PERFIL_DIR) if PERFIL_LENTAS else None
+
+
+# =====================================================
+# Ganchos da requisição
+# =====================================================
+def _inicio():
+    g.medicao = {"inicio": time.perf_counter(), "banco": 0.0, "json": 0.0, "consultas": 0, "linhas": 0}
+    if amostrador is not None:
+        amostrador.iniciar(threading.get_ident())
+
+
+def _resposta(resposta):
+    g.status_resposta = resposta.status_code
+    return resposta
+
+
+def _fim(exc=None):
+    medicao = g.pop("medicao", None)
+    if medicao is None:
+        return
+    total = time.perf_counter() - medicao["inicio"]
+    regra = request.url_rule
+    endpoint = regra.rule if regra is not None else "<sem rota>"
+    pilhas = amostrador.terminar(threading.get_ident()) if amostrador is not None else None
+    if endpoint == "/metrics":
+        return
+    status = 500 if exc is not None else g.get("status_resposta", 500)
+    registro.registrar(endpoint, request.method, status, medicao, total)
+
+    if pilhas and total * 1000 >= amostrador.limite_ms:
+        caminho = amostrador.gravar(pilhas, endpoint, request.method, total * 1000)
+        print(f"Requisição lenta ({total * 1000:.0f} ms) {request.method} {request.path}: {caminho}")
+
+
+def metricas():
+    return Response(registro.texto(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    if not ATIVO:
+        return
+    app.json = ProvedorJSONMedido(app)  # no lugar do respostas_json.ProvedorJSON
+    banco.observar_consultas(_ao_consultar)
+    banco.observar_linhas(_ao_ler)
+    app.before_request(_inicio)
+    app.after_request(_resposta)
+    app.teardown_request(_fim)
+    app.add_url_rule("/metrics", "metrics", metricas)
@@ -0,0 +1,87 @@
+# Aplica as migrações de migrations/*.sql que ainda não rodaram neste banco.
+#   python migrar.py            -> aplica as pendentes
+#   python migrar.py --listar   -> mostra o que já foi aplicado
+import argparse
+import os
+import sys
+
+import mysql.connector
+
+from banco import CONFIG_BANCO
+
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def arquivos_migracao():
+    return sorted(f for f in os.listdir(PASTA_MIGRACOES) if f.endswith(".sql"))
+
+
+# Separa o arquivo em comandos (um ";" no fim da linha encerra o comando)
+def comandos(sql):
+    atual = []
+    for linha in sql.splitlines():
+        if linha.strip().startswith("--"):
+            continue
+        atual.append(linha)
+        if linha.rstrip().endswith(";"):
+            comando = "\n".join(atual).strip().rstrip(";")
+            if comando:
+                yield comando
+            atual = []
+    resto = "\n".join(atual).strip()
+    if resto:
+        yield resto
+
+
+def aplicadas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versao VARCHAR(150) PRIMARY KEY,
+            aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT versao FROM schema_migrations")
+    return {r[0] for r in cursor.fetchall()}
+
+
+def migrar(conn, saida=sys.stdout):
+    cursor = conn.cursor()
+    feitas = aplicadas(cursor)
+    novas = []
+    for arquivo in arquivos_migracao():
+        if arquivo in feitas:
+            continue
+        with open(os.path.join(PASTA_MIGRACOES, arquivo), encoding="utf-8") as f:
+            sql = f.read()
+        print(f"Aplicando {arquivo}...", file=saida)
+        for comando in comandos(sql):
+            cursor.execute(comando)
+        cursor.execute("INSERT INTO schema_migrations (versao) VALUES (%s)", (arquivo,))
+        conn.commit()
+        novas.append(arquivo)
+    cursor.close()
+    return novas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listar", action="store_true")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**CONFIG_BANCO)
+    try:
+        if args.listar:
+            cursor = conn.cursor()
+            feitas = aplicadas(cursor)
+            cursor.close()
+            for arquivo in arquivos_migracao():
+                print(("[x] " if arquivo in feitas else "[ ] ") + arquivo)
+            return
+        novas = migrar(conn)
+        print(f"{len(novas)} migração(ões) aplicada(s).")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
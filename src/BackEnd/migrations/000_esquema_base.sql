@@ -0,0 +1,143 @@
+-- Esquema base: as tabelas que o backend usa desde o início, no formato de
+-- antes das migrações 001+ (que acrescentam colunas e índices por cima).
+-- Num banco que já existe (criado à mão) nada muda: todas são IF NOT EXISTS.
+-- Só chaves primárias, únicas e estrangeiras aqui; os índices de cada consulta
+-- ficam nas migrações numeradas, que rodam nos dois casos.
+
+-- Um perfil por usuário de qualquer papel (estudante, motorista, gestao)
+CREATE TABLE IF NOT EXISTS profiles (
+    id VARCHAR(36) PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    nome_completo VARCHAR(255) NULL,
+    role VARCHAR(20) NOT NULL,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_profiles_email (email)
+);
+
+-- Escola + gestor (login da gestão por email_gestor)
+CREATE TABLE IF NOT EXISTS gestao (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nome_escola VARCHAR(255) NOT NULL,
+    endereco VARCHAR(255) NULL,
+    latitude DECIMAL(10,7) NULL,
+    longitude DECIMAL(10,7) NULL,
+    contato_escola VARCHAR(100) NULL,
+    nome_gestor VARCHAR(255) NULL,
+    cargo VARCHAR(100) NULL,
+    email_gestor VARCHAR(255) NOT NULL,
+    telefone_gestor VARCHAR(30) NULL,
+    senha VARCHAR(255) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_gestao_email (email_gestor)
+);
+
+-- Login por email; busca por matrícula (igualdade exata)
+CREATE TABLE IF NOT EXISTS estudantes (
+    id VARCHAR(36) PRIMARY KEY,
+    nome_completo VARCHAR(255) NOT NULL,
+    escola VARCHAR(255) NOT NULL,
+    turma VARCHAR(50) NULL,
+    email VARCHAR(255) NOT NULL,
+    numero_matricula VARCHAR(50) NOT NULL,
+    nome_responsavel VARCHAR(255) NULL,
+    numero_responsavel VARCHAR(30) NULL,
+    senha VARCHAR(255) NOT NULL,
+    created_by VARCHAR(36) NULL,
+    profile_id VARCHAR(36) NULL,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_estudantes_email (email),
+    UNIQUE KEY uq_estudantes_matricula (numero_matricula),
+    UNIQUE KEY uq_estudantes_profile (profile_id),
+    CONSTRAINT fk_estudantes_profile FOREIGN KEY (profile_id) REFERENCES profiles (id) ON DELETE SET NULL
+);
+
+-- pontos_parada (JSON) vai para rotas_paradas na 003
+CREATE TABLE IF NOT EXISTS rotas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nome_rota VARCHAR(255) NOT NULL,
+    numero_onibus VARCHAR(20) NULL,
+    placa_veiculo VARCHAR(20) NULL,
+    turno VARCHAR(20) NULL,
+    motorista_nome VARCHAR(255) NULL,
+    motorista_telefone VARCHAR(30) NULL,
+    horario_saida_casa VARCHAR(10) NULL,
+    horario_chegada_escola VARCHAR(10) NULL,
+    horario_saida_escola VARCHAR(10) NULL,
+    horario_chegada_casa VARCHAR(10) NULL,
+    observacoes TEXT NULL,
+    pontos_parada JSON NULL,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- rota (nome) é o formato antigo; rota_id e profile_id chegam na 008
+CREATE TABLE IF NOT EXISTS motoristas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nome_completo VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    senha VARCHAR(255) NOT NULL,
+    telefone VARCHAR(30) NULL,
+    placa_onibus VARCHAR(20) NULL,
+    rota VARCHAR(255) NULL,
+    foto_perfil TEXT NULL,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_motoristas_email (email)
+);
+
+-- Os índices das chaves estrangeiras são criados pelo MySQL e trocados pelos
+-- compostos da 005/006/007 quando eles chegam
+CREATE TABLE IF NOT EXISTS inscricoes_rotas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    estudante_id VARCHAR(36) NOT NULL,
+    rota_id INT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'ativa',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_inscricoes_estudante FOREIGN KEY (estudante_id) REFERENCES estudantes (id) ON DELETE CASCADE,
+    CONSTRAINT fk_inscricoes_rota FOREIGN KEY (rota_id) REFERENCES rotas (id) ON DELETE CASCADE
+);
+
+-- Um envio por POST /enviar; routes_json/drivers_json guardam o filtro usado
+CREATE TABLE IF NOT EXISTS notificacoes_envios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    remetente_tipo VARCHAR(30) NULL,
+    remetente_id VARCHAR(36) NULL,
+    destinatario_tipo VARCHAR(30) NOT NULL,
+    titulo VARCHAR(255) NOT NULL,
+    mensagem TEXT NOT NULL,
+    routes_json TEXT NULL,
+    drivers_json TEXT NULL,
+    prioridade VARCHAR(20) NULL DEFAULT 'Baixa',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Uma linha por destinatário (usuario_id = profiles.id); fan-out em lote, sem FK
+CREATE TABLE IF NOT EXISTS notificacoes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    envio_id INT NULL,
+    usuario_id VARCHAR(36) NOT NULL,
+    titulo VARCHAR(255) NULL,
+    mensagem TEXT NULL,
+    tipo VARCHAR(30) NULL DEFAULT 'aviso',
+    lida TINYINT(1) NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Mesma definição de fila_notificacoes.SQL_TABELA_JOBS
+CREATE TABLE IF NOT EXISTS notificacoes_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    envio_id INT NOT NULL,
+    tipo VARCHAR(30) NOT NULL DEFAULT 'aviso',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    destinatarios_gravados INT NOT NULL DEFAULT 0,
+    erro TEXT NULL,
+    worker VARCHAR(100) NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at DATETIME NULL,
+    KEY idx_jobs_status (status, id),
+    KEY idx_jobs_envio (envio_id)
+);
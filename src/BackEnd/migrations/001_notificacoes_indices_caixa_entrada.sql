@@ -0,0 +1,8 @@
+-- Caixa de entrada paginada: WHERE usuario_id = ? ORDER BY created_at DESC, id DESC LIMIT ?
+CREATE INDEX idx_notificacoes_usuario_data ON notificacoes (usuario_id, created_at, id);
+
+-- Contagem de não lidas sem tocar nas linhas da tabela
+CREATE INDEX idx_notificacoes_usuario_lida ON notificacoes (usuario_id, lida);
+
+-- Fan-out e reprocessamento de jobs (DELETE/COUNT por envio)
+CREATE INDEX idx_notificacoes_envio ON notificacoes (envio_id, usuario_id);
@@ -0,0 +1,5 @@
+-- Histórico por envio: páginas de notificacoes_envios em (created_at, id)
+CREATE INDEX idx_envios_data ON notificacoes_envios (created_at, id);
+
+-- Contagem de entregues/lidas por envio direto no índice
+CREATE INDEX idx_notificacoes_envio_lida ON notificacoes (envio_id, lida);
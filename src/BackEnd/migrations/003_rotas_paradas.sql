@@ -0,0 +1,34 @@
+-- Paradas normalizadas: uma linha por parada, em vez do JSON em rotas.pontos_parada
+CREATE TABLE rotas_paradas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    rota_id INT NOT NULL,
+    ordem INT NOT NULL,
+    nome VARCHAR(255) NULL,
+    latitude DECIMAL(10,7) NOT NULL,
+    longitude DECIMAL(10,7) NOT NULL,
+    horario VARCHAR(10) NULL,
+    tipo VARCHAR(20) NULL,
+    UNIQUE KEY uq_paradas_rota_ordem (rota_id, ordem),
+    KEY idx_paradas_lat_lng (latitude, longitude, rota_id),
+    CONSTRAINT fk_paradas_rota FOREIGN KEY (rota_id) REFERENCES rotas (id) ON DELETE CASCADE
+);
+
+-- Copia as paradas já cadastradas (JSON) para a nova tabela
+INSERT INTO rotas_paradas (rota_id, ordem, nome, latitude, longitude, horario, tipo)
+SELECT r.id, jt.ordem, jt.nome, jt.latitude, jt.longitude, jt.horario, jt.tipo
+FROM rotas r,
+     JSON_TABLE(r.pontos_parada, '$[*]' COLUMNS (
+         ordem FOR ORDINALITY,
+         nome VARCHAR(255) PATH '$.name',
+         latitude DECIMAL(10,7) PATH '$.latitude',
+         longitude DECIMAL(10,7) PATH '$.longitude',
+         horario VARCHAR(10) PATH '$.horario',
+         tipo VARCHAR(20) PATH '$.type'
+     )) jt
+WHERE r.pontos_parada IS NOT NULL
+  AND JSON_VALID(r.pontos_parada)
+  AND jt.latitude IS NOT NULL
+  AND jt.longitude IS NOT NULL;
+
+-- O JSON antigo deixa de ser gravado
+ALTER TABLE rotas MODIFY pontos_parada TEXT NULL;
@@ -0,0 +1,23 @@
+-- Viagens (uma por início de rota pelo motorista)
+CREATE TABLE viagens (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    rota_id INT NOT NULL,
+    motorista_id INT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'em_andamento',
+    iniciada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    encerrada_em DATETIME NULL,
+    KEY idx_viagens_rota_status (rota_id, status),
+    CONSTRAINT fk_viagens_rota FOREIGN KEY (rota_id) REFERENCES rotas (id)
+);
+
+-- Posições GPS gravadas em lote pelo servidor de rastreamento
+CREATE TABLE viagens_posicoes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    viagem_id INT NOT NULL,
+    latitude DECIMAL(10,7) NOT NULL,
+    longitude DECIMAL(10,7) NOT NULL,
+    velocidade FLOAT NULL,
+    direcao FLOAT NULL,
+    registrado_em DATETIME(3) NOT NULL,
+    KEY idx_posicoes_viagem_data (viagem_id, registrado_em)
+);
@@ -0,0 +1,18 @@
+-- Busca de estudantes (GET /api/estudantes/buscar)
+-- nome_busca é uma cópia do nome com collation insensível a acento e caixa
+-- ("joao" encontra "João"); por ser coluna gerada, fica em dia sozinha no cadastro.
+ALTER TABLE estudantes
+    ADD COLUMN nome_busca VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci
+        GENERATED ALWAYS AS (nome_completo) STORED;
+
+-- Prefixo do nome completo e paginação em ordem alfabética
+CREATE INDEX idx_estudantes_nome_busca ON estudantes (nome_busca, id);
+
+-- Filtros de escola/turma com a mesma ordem
+CREATE INDEX idx_estudantes_escola_turma_nome ON estudantes (escola, turma, nome_busca, id);
+
+-- Prefixo de qualquer palavra do nome (sobrenome, por exemplo)
+CREATE FULLTEXT INDEX ft_estudantes_nome_busca ON estudantes (nome_busca);
+
+-- Inscritos de uma rota (listar_inscritos)
+CREATE INDEX idx_inscricoes_rota_estudante ON inscricoes_rotas (rota_id, estudante_id);
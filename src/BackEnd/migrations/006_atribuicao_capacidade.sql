@@ -0,0 +1,16 @@
+-- Atribuição em lote de estudantes às rotas (POST /api/atribuicao/previa)
+-- Localização da casa do estudante (opcional no cadastro)
+ALTER TABLE estudantes
+    ADD COLUMN latitude DECIMAL(10,7) NULL,
+    ADD COLUMN longitude DECIMAL(10,7) NULL;
+
+-- Lugares no ônibus da rota; NULL usa UNIBUS_CAPACIDADE_PADRAO
+ALTER TABLE rotas
+    ADD COLUMN capacidade INT NULL;
+
+-- Estudantes ativos de uma escola
+CREATE INDEX idx_estudantes_escola_ativo ON estudantes (escola, is_active);
+
+-- Ocupação das rotas e inscrição ativa de cada estudante
+CREATE INDEX idx_inscricoes_rota_status ON inscricoes_rotas (rota_id, status);
+CREATE INDEX idx_inscricoes_estudante_status ON inscricoes_rotas (estudante_id, status);
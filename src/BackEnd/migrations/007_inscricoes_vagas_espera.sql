@@ -0,0 +1,43 @@
+-- Inscrição sem corrida: contador de vagas por rota, uma inscrição ativa por
+-- (estudante, rota) garantida pelo banco e lista de espera.
+
+-- Lugares ocupados (inscrições ativas); atualizado junto com cada inscrição
+ALTER TABLE rotas
+    ADD COLUMN vagas_ocupadas INT NOT NULL DEFAULT 0;
+
+UPDATE rotas r
+SET vagas_ocupadas = (
+    SELECT COUNT(*) FROM inscricoes_rotas i
+    WHERE i.rota_id = r.id AND i.status = 'ativa'
+);
+
+-- Remove inscrições ativas duplicadas (mantém a mais antiga) antes da chave única
+DELETE i1 FROM inscricoes_rotas i1
+JOIN inscricoes_rotas i2
+  ON i1.estudante_id = i2.estudante_id
+ AND i1.rota_id = i2.rota_id
+ AND i2.status = 'ativa'
+ AND i1.id > i2.id
+WHERE i1.status = 'ativa';
+
+UPDATE rotas r
+SET vagas_ocupadas = (
+    SELECT COUNT(*) FROM inscricoes_rotas i
+    WHERE i.rota_id = r.id AND i.status = 'ativa'
+);
+
+-- 1 quando ativa, NULL nos outros status (NULL não conflita na chave única)
+ALTER TABLE inscricoes_rotas
+    ADD COLUMN ativa TINYINT GENERATED ALWAYS AS (IF(status = 'ativa', 1, NULL)) STORED,
+    ADD UNIQUE KEY uq_inscricoes_ativa (estudante_id, rota_id, ativa);
+
+-- Fila por rota, na ordem de chegada (id)
+CREATE TABLE inscricoes_espera (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    rota_id INT NOT NULL,
+    estudante_id VARCHAR(36) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_espera_rota_estudante (rota_id, estudante_id),
+    KEY idx_espera_estudante (estudante_id),
+    CONSTRAINT fk_espera_rota FOREIGN KEY (rota_id) REFERENCES rotas (id) ON DELETE CASCADE
+);
@@ -0,0 +1,48 @@
+-- Motoristas e gestão ligados a profiles por chave estrangeira (como estudantes)
+-- e motorista -> rota por id, no lugar dos joins por email e por nome da rota
+ALTER TABLE motoristas
+    ADD COLUMN profile_id VARCHAR(36) NULL,
+    ADD COLUMN rota_id INT NULL;
+
+ALTER TABLE gestao
+    ADD COLUMN profile_id VARCHAR(36) NULL;
+
+-- Perfis que faltam: motoristas e gestores cujo email ainda não tem profile
+INSERT INTO profiles (id, email, nome_completo, role)
+SELECT UUID(), m.email, m.nome_completo, 'motorista'
+FROM motoristas m
+WHERE m.email IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM profiles p WHERE p.email = m.email);
+
+INSERT INTO profiles (id, email, nome_completo, role)
+SELECT UUID(), g.email_gestor, g.nome_gestor, 'gestao'
+FROM gestao g
+WHERE g.email_gestor IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM profiles p WHERE p.email = g.email_gestor);
+
+-- Liga pelo email só aqui; daqui em diante a ligação é o profile_id
+UPDATE motoristas m
+JOIN profiles p ON p.email = m.email AND p.role = 'motorista'
+SET m.profile_id = p.id;
+
+UPDATE gestao g
+JOIN profiles p ON p.email = g.email_gestor AND p.role = 'gestao'
+SET g.profile_id = p.id;
+
+-- Rota do motorista pelo nome gravado em motoristas.rota (nomes repetidos: a mais antiga)
+UPDATE motoristas m
+SET m.rota_id = (SELECT MIN(r.id) FROM rotas r WHERE r.nome_rota = m.rota)
+WHERE m.rota IS NOT NULL AND m.rota <> '';
+
+ALTER TABLE motoristas
+    ADD UNIQUE KEY uq_motoristas_profile (profile_id),
+    ADD KEY idx_motoristas_rota (rota_id),
+    ADD CONSTRAINT fk_motoristas_profile FOREIGN KEY (profile_id) REFERENCES profiles (id) ON DELETE SET NULL,
+    ADD CONSTRAINT fk_motoristas_rota FOREIGN KEY (rota_id) REFERENCES rotas (id) ON DELETE SET NULL;
+
+ALTER TABLE gestao
+    ADD UNIQUE KEY uq_gestao_profile (profile_id),
+    ADD CONSTRAINT fk_gestao_profile FOREIGN KEY (profile_id) REFERENCES profiles (id) ON DELETE SET NULL;
+
+-- Destinatários "Todos"/"Motoristas": perfis ativos por papel
+CREATE INDEX idx_profiles_role_ativo ON profiles (role, is_active);
@@ -0,0 +1,20 @@
+-- Índices para as consultas dos blueprints que ainda liam a tabela inteira
+-- (apontadas por python explicar_consultas.py)
+
+-- GET /api/notificacoes/rotas: WHERE is_active = 1 ORDER BY nome_rota
+CREATE INDEX idx_rotas_ativa_nome ON rotas (is_active, nome_rota);
+
+-- Rota do motorista pelo nome (cadastro no formato antigo e importação em lote)
+CREATE INDEX idx_rotas_nome ON rotas (nome_rota);
+
+-- GET /api/notificacoes/motoristas: WHERE is_active = 1 ORDER BY nome_completo
+CREATE INDEX idx_motoristas_ativo_nome ON motoristas (is_active, nome_completo);
+
+-- Envio para "Estudantes" sem filtro de rota: só o índice, sem ler as linhas
+CREATE INDEX idx_estudantes_ativo_perfil ON estudantes (is_active, profile_id);
+
+-- Localização da escola (detalhes/otimizar rota): WHERE nome_escola = ? e o join e.escola = g.nome_escola
+CREATE INDEX idx_gestao_escola ON gestao (nome_escola);
+
+-- Próximo da fila de espera da rota em ordem de chegada (sem filesort)
+CREATE INDEX idx_espera_rota_ordem ON inscricoes_espera (rota_id, id);
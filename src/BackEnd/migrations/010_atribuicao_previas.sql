@@ -0,0 +1,11 @@
+-- Prévias da atribuição em lote (POST /api/atribuicao/previa), lidas no /aplicar.
+-- Ficam no banco para o /aplicar achar a prévia em qualquer worker do gunicorn;
+-- as vencidas são apagadas na próxima prévia gerada.
+CREATE TABLE atribuicao_previas (
+    id CHAR(32) PRIMARY KEY,
+    escola VARCHAR(255) NOT NULL,
+    dados LONGTEXT NOT NULL,
+    criada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expira_em DATETIME NOT NULL,
+    KEY idx_previas_expira (expira_em)
+);
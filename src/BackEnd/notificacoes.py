@@ -1,68 +1,89 @@
-from flask import Blueprint, request, jsonify
-import mysql.connector
+from flask import Blueprint, request, jsonify, Response, stream_with_context, g
+from banco import conectar
+from envio_notificacoes import consulta_destinatarios, distribuir, MODO_FANOUT
+from fila_notificacoes import enfileirar, avisar_workers, status_envio
+from cache_respostas import em_cache
+from autenticacao import requer_login, dono_da_url
+from detector_consultas import orcamento_consultas
+from paginacao import ler_limite, decodificar_cursor, filtro_cursor, cortar_pagina, resposta_paginada
+from respostas_json import JSONBruto, carregar, codificar, como_dicts
+import os
 import traceback
 import json
+from datetime import datetime, timedelta
 
 notificacoes_bp = Blueprint('notificacoes_bp', __name__)
 
-# -----------------------
-# Conexão com o banco
-# -----------------------
-def conectar():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="neto2007",
-        database="UNIBUS"
-    )
+# Com "0" o POST /enviar volta a gravar tudo dentro da requisição
+ENVIO_ASSINCRONO = os.environ.get("UNIBUS_NOTIF_ASSINCRONO", "1") == "1"
 
 # -----------------------
 # GET /rotas
 # -----------------------
 @notificacoes_bp.route('/rotas', methods=['GET'])
+@orcamento_consultas(1)
+@em_cache("rotas")
 def listar_rotas():
+    cursor = None
     try:
         conn = conectar()
         cursor = conn.cursor()
         cursor.execute("SELECT id, nome_rota FROM rotas WHERE is_active = 1 ORDER BY nome_rota")
-        rows = cursor.fetchall()
-        data = [{'id': r[0], 'nome_rota': r[1]} for r in rows]
-        return jsonify(data)
+        return jsonify(como_dicts(cursor, cursor.fetchall()))
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
 
 # -----------------------
 # GET /motoristas
 # -----------------------
 @notificacoes_bp.route('/motoristas', methods=['GET'])
+@orcamento_consultas(1)
 def listar_motoristas():
+    cursor = None
     try:
         conn = conectar()
         cursor = conn.cursor()
-        cursor.execute("SELECT id, nome_completo, rota FROM motoristas WHERE is_active = 1 ORDER BY nome_completo")
-        rows = cursor.fetchall()
-        data = [{'id': r[0], 'nome_completo': r[1], 'rota': r[2]} for r in rows]
-        return jsonify(data)
+        cursor.execute("SELECT id, nome_completo, rota, rota_id FROM motoristas WHERE is_active = 1 ORDER BY nome_completo")
+        return jsonify(como_dicts(cursor, cursor.fetchall()))
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
 
 # -----------------------
-# GET /listar/<usuario_id>
+# GET /listar?limite=30&cursor=...  (usuário do token)
+# GET /listar/<usuario_id>          (app antigo; usuario_id = profile id)
+# Caixa de entrada paginada por (created_at, id); o próximo
+# cursor vem no header X-Proximo-Cursor.
 # -----------------------
+@notificacoes_bp.route('/listar', methods=['GET'])
+@orcamento_consultas(1)
+@requer_login('estudante', 'motorista')
+def listar_minhas_notificacoes():
+    return listar_notificacoes_usuario(usuario_id=g.usuario['profile_id'])
+
+
 @notificacoes_bp.route('/listar/<usuario_id>', methods=['GET'])
+@orcamento_consultas(1)
+@dono_da_url(None, 'usuario_id', campo='profile_id')
 def listar_notificacoes_usuario(usuario_id):
+    cursor = None
     try:
+        limite = ler_limite(request.args)
+        try:
+            posicao = decodificar_cursor(request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        filtro, params_filtro = filtro_cursor(posicao, 'n.created_at', 'n.id')
+
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
-        query = """
+        # Usa o índice (usuario_id, created_at, id): lê só limite+1 linhas
+        query = f"""
             SELECT n.id AS id,
                    ne.id AS envio_id,
                    ne.titulo,
@@ -72,54 +93,92 @@ def listar_notificacoes_usuario(usuario_id):
                    ne.prioridade,
                    COALESCE(n.tipo, 'aviso') AS tipo,
                    COALESCE(n.lida, FALSE) AS lida,
-                   ne.created_at
-            FROM notificacoes_envios ne
-            LEFT JOIN notificacoes n
-            ON ne.id = n.envio_id AND n.usuario_id = %s
-            ORDER BY ne.created_at DESC
+                   n.created_at
+            FROM notificacoes n
+            JOIN notificacoes_envios ne ON ne.id = n.envio_id
+            WHERE n.usuario_id = %s{filtro}
+            ORDER BY n.created_at DESC, n.id DESC
+            LIMIT %s
         """
-        cursor.execute(query, (usuario_id,))
-        rows = cursor.fetchall()
-        for r in rows:
-            if hasattr(r['created_at'], 'isoformat'):
-                r['created_at'] = r['created_at'].isoformat()
-        return jsonify(rows)
+        cursor.execute(query, [usuario_id] + params_filtro + [limite + 1])
+        rows, proximo = cortar_pagina(cursor.fetchall(), limite)
+        return resposta_paginada(rows, proximo)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if cursor: cursor.close()
+
+# -----------------------
+# GET /nao_lidas  (usuário do token) ou /nao_lidas/<usuario_id>
+# Só conta (índice usuario_id, lida), sem trazer título/mensagem
+# -----------------------
+@notificacoes_bp.route('/nao_lidas', methods=['GET'])
+@orcamento_consultas(1)
+@requer_login('estudante', 'motorista')
+def contar_minhas_nao_lidas():
+    return contar_nao_lidas(usuario_id=g.usuario['profile_id'])
+
+
+@notificacoes_bp.route('/nao_lidas/<usuario_id>', methods=['GET'])
+@orcamento_consultas(1)
+@dono_da_url(None, 'usuario_id', campo='profile_id')
+def contar_nao_lidas(usuario_id):
+    cursor = None
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM notificacoes WHERE usuario_id = %s AND lida = FALSE",
+            (usuario_id,)
+        )
+        return jsonify({"usuario_id": usuario_id, "nao_lidas": cursor.fetchone()[0]})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
 
 # -----------------------
-# PUT /marcar_lida/<notificacao_id>
+# PUT /marcar_lida/<notificacao_id>  (só notificações do usuário do token)
 # -----------------------
 @notificacoes_bp.route('/marcar_lida/<notificacao_id>', methods=['PUT'])
+@orcamento_consultas(2)
+@requer_login('estudante', 'motorista')
 def marcar_lida(notificacao_id):
+    cursor = None
     try:
         conn = conectar()
         cursor = conn.cursor()
-        cursor.execute("UPDATE notificacoes SET lida = TRUE WHERE id = %s", (notificacao_id,))
+        cursor.execute("UPDATE notificacoes SET lida = TRUE WHERE id = %s AND usuario_id = %s",
+                       (notificacao_id, g.usuario['profile_id']))
         conn.commit()
+        if not cursor.rowcount:
+            # rowcount é 0 também para a já lida; só é 404 se não for do usuário
+            cursor.execute("SELECT 1 FROM notificacoes WHERE id = %s AND usuario_id = %s",
+                           (notificacao_id, g.usuario['profile_id']))
+            if cursor.fetchone() is None:
+                return jsonify({"error": "Notificação não encontrada."}), 404
         return jsonify({"success": True})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
 
 # -----------------------
 # POST /enviar
 # -----------------------
 @notificacoes_bp.route('/enviar', methods=['POST'])
+@orcamento_consultas(2)
+@requer_login('gestao')
 def enviar_notificacao():
     conn = None
     cursor = None
     try:
         payload = request.get_json()
         remetente_tipo = payload.get('remetente_tipo', 'Gestão')
-        remetente_id = payload.get('remetente_id')
+        remetente_id = g.usuario.get('profile_id') or g.usuario['id']
         destinatario_tipo = payload.get('destinatario_tipo')
         routes = payload.get('routes') or []
         drivers = payload.get('drivers') or []
@@ -131,6 +190,13 @@ def enviar_notificacao():
         if not destinatario_tipo or not titulo or not mensagem:
             return jsonify({"error": "destinatario, titulo e mensagem são obrigatórios"}), 400
 
+        # -----------------------
+        # Determina destinatários (como SELECT, sem trazer os ids para o Python)
+        # -----------------------
+        consulta = consulta_destinatarios(destinatario_tipo, routes, drivers)
+        if consulta is None:
+            return jsonify({"error": "Nenhum destinatário encontrado."}), 400
+
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
 
@@ -149,120 +215,185 @@ def enviar_notificacao():
             json.dumps(drivers) if drivers else None,
             prioridade
         ))
-        conn.commit()
-
-        cursor.execute("SELECT LAST_INSERT_ID() AS envio_id")
-        envio_id = cursor.fetchone()['envio_id']
-
-        recipient_user_ids = set()
-
-        def add_recipient_rows(rows):
-            for r in rows:
-                if isinstance(r, dict):
-                    recipient_user_ids.add(r['id'])
-                else:
-                    recipient_user_ids.add(r[0])
+        envio_id = cursor.lastrowid
 
         # -----------------------
-        # Determina destinatários
+        # Modo assíncrono: enfileira e responde na hora;
+        # os workers de fila_notificacoes fazem o fan-out.
         # -----------------------
-        if destinatario_tipo == "Todos":
-            cursor.execute("SELECT id FROM profiles WHERE role IN ('estudante','motorista') AND is_active=1")
-            add_recipient_rows(cursor.fetchall())
-        elif destinatario_tipo == "Estudantes":
-            if routes:
-                placeholders = ','.join(['%s'] * len(routes))
-                query = f"""
-                    SELECT DISTINCT e.profile_id AS id
-                    FROM inscricoes_rotas ir
-                    JOIN estudantes e ON e.id = ir.estudante_id
-                    WHERE ir.rota_id IN ({placeholders}) AND e.is_active=1
-                """
-                cursor.execute(query, routes)
-                add_recipient_rows(cursor.fetchall())
-            else:
-                cursor.execute("SELECT profile_id AS id FROM estudantes WHERE is_active=1")
-                add_recipient_rows(cursor.fetchall())
-        elif destinatario_tipo == "Motoristas":
-            if drivers:
-                placeholders = ','.join(['%s'] * len(drivers))
-                query = f"""
-                    SELECT p.id
-                    FROM motoristas m
-                    JOIN profiles p ON p.email = m.email AND p.role='motorista' AND p.is_active=1
-                    WHERE m.id IN ({placeholders})
-                """
-                cursor.execute(query, drivers)
-                add_recipient_rows(cursor.fetchall())
-            elif routes:
-                placeholders = ','.join(['%s'] * len(routes))
-                cursor.execute(f"SELECT nome_rota FROM rotas WHERE id IN ({placeholders})", routes)
-                route_rows = cursor.fetchall()
-                route_names = [r[0] for r in route_rows] if route_rows else []
-                if route_names:
-                    ph = ','.join(['%s'] * len(route_names))
-                    query = f"""
-                        SELECT p.id
-                        FROM motoristas m
-                        JOIN profiles p ON p.email = m.email AND p.role='motorista' AND p.is_active=1
-                        WHERE m.rota IN ({ph})
-                    """
-                    cursor.execute(query, route_names)
-                    add_recipient_rows(cursor.fetchall())
-                else:
-                    cursor.execute("SELECT id FROM profiles WHERE role='motorista' AND is_active=1")
-                    add_recipient_rows(cursor.fetchall())
+        if ENVIO_ASSINCRONO and not payload.get('sincrono'):
+            enfileirar(cursor, envio_id, tipo)
+            conn.commit()
+            avisar_workers()
+            return jsonify({
+                "success": True,
+                "message": "Mensagem enfileirada para envio.",
+                "destinatario_tipo": destinatario_tipo,
+                "envio_id": envio_id,
+                "status": "queued"
+            }), 202
 
         # -----------------------
         # Insere notificações individuais
         # -----------------------
-        if not recipient_user_ids:
-            return jsonify({"error": "Nenhum destinatário encontrado."}), 400
+        modo = MODO_FANOUT
+        if modo == "lotes":
+            conn.commit()  # cada lote commita por conta própria
 
-        for uid in recipient_user_ids:
-            if uid is None:
-                continue  # ignora valores nulos
-            cursor.execute("""
-                INSERT INTO notificacoes (envio_id, usuario_id, titulo, mensagem, tipo)
-                VALUES (%s,%s,%s,%s,%s)
-            """, (envio_id, uid, titulo, mensagem, tipo))
+        total = distribuir(conn, cursor, envio_id, titulo, mensagem, tipo, consulta, modo=modo)
+
+        if not total:
+            if modo == "lotes":
+                cursor.execute("DELETE FROM notificacoes_envios WHERE id = %s", (envio_id,))
+                conn.commit()
+            else:
+                conn.rollback()
+            return jsonify({"error": "Nenhum destinatário encontrado."}), 400
 
         conn.commit()
 
         return jsonify({
             "success": True,
-            "message": f"Mensagem enviada com sucesso para {len(recipient_user_ids)} destinatários.",
+            "message": f"Mensagem enviada com sucesso para {total} destinatários.",
             "destinatario_tipo": destinatario_tipo,
-            "totalRecipients": len(recipient_user_ids)
+            "envio_id": envio_id,
+            "totalRecipients": total
         })
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
+
+# -----------------------
+# GET /envios/<envio_id>/status
+# -----------------------
+@notificacoes_bp.route('/envios/<int:envio_id>/status', methods=['GET'])
+@requer_login('gestao')
+def status_do_envio(envio_id):
+    cursor = None
+    try:
+        conn = conectar()
+        cursor = conn.cursor(dictionary=True)
+        status = status_envio(cursor, envio_id)
+        if not status:
+            return jsonify({"error": "Envio não encontrado na fila."}), 404
+        return jsonify(status)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if cursor: cursor.close()
 
 # -----------------------
 # GET /historico
+# Um item por envio (notificacoes_envios) com totalRecipients/readCount.
+# Parâmetros: limite, cursor (keyset em created_at, id), de/ate (datas ISO)
+# e formato=ndjson para exportar tudo em streaming, uma linha JSON por envio.
 # -----------------------
+def _ler_data(valor, fim_do_dia=False):
+    if not valor:
+        return None
+    data = datetime.fromisoformat(valor)
+    if fim_do_dia and len(valor) == 10:
+        data += timedelta(days=1)  # "ate=2025-03-10" inclui o dia inteiro
+    return data
+
+
+# routes_json/drivers_json são TEXT gravados com json.dumps no /enviar: quando
+# o banco confere que são JSON válido (json_valido, no SELECT) vão para a
+# resposta como estão (JSONBruto), sem json.loads + dumps a cada envio listado.
+# Texto inválido (gravado por fora do app) passa pelo json.loads; se nem assim
+# der, vira lista vazia em vez de corromper a página/NDJSON inteira.
+def _ler_json(texto):
+    try:
+        return carregar(texto) if texto else []
+    except ValueError:
+        return []
+
+
+def _formatar_envio(r):
+    routes_json = r.pop('routes_json', None)
+    drivers_json = r.pop('drivers_json', None)
+    if r.pop('json_valido', 0):
+        r['routes'] = JSONBruto(routes_json or '[]')
+        r['drivers'] = JSONBruto(drivers_json or '[]')
+    else:
+        r['routes'] = _ler_json(routes_json)
+        r['drivers'] = _ler_json(drivers_json)
+    return r
+
+
+SQL_HISTORICO = """
+    SELECT ne.id, ne.titulo, ne.mensagem, ne.remetente_tipo, ne.destinatario_tipo,
+           ne.prioridade, ne.routes_json, ne.drivers_json, ne.created_at,
+           COALESCE(JSON_VALID(ne.routes_json), 1) AND COALESCE(JSON_VALID(ne.drivers_json), 1) AS json_valido,
+           (SELECT COUNT(*) FROM notificacoes n
+            WHERE n.envio_id = ne.id) AS totalRecipients,
+           (SELECT COUNT(*) FROM notificacoes n
+            WHERE n.envio_id = ne.id AND n.lida = TRUE) AS readCount
+    FROM notificacoes_envios ne
+    WHERE 1=1{filtros}
+    ORDER BY ne.created_at DESC, ne.id DESC
+    {limite}
+"""
+
+
 @notificacoes_bp.route('/historico', methods=['GET'])
+@orcamento_consultas(1)
+@requer_login('gestao')
 def historico_notificacoes():
     try:
+        de = _ler_data(request.args.get('de'))
+        ate = _ler_data(request.args.get('ate'), fim_do_dia=True)
+        posicao = decodificar_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filtros, params = "", []
+    if de:
+        filtros += " AND ne.created_at >= %s"
+        params.append(de)
+    if ate:
+        filtros += " AND ne.created_at < %s"
+        params.append(ate)
+
+    if request.args.get('formato') == 'ndjson':
+        return _exportar_historico_ndjson(filtros, params)
+
+    cursor = None
+    try:
+        limite = ler_limite(request.args)
+        filtro, params_filtro = filtro_cursor(posicao, 'ne.created_at', 'ne.id')
         conn = conectar()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT n.id, n.envio_id, n.usuario_id, n.titulo, n.mensagem, n.tipo, n.lida, n.created_at
-            FROM notificacoes n
-            ORDER BY n.created_at DESC
-        """)
-        rows = cursor.fetchall()
-        for r in rows:
-            if hasattr(r['created_at'], 'isoformat'):
-                r['created_at'] = r['created_at'].isoformat()
-        return jsonify(rows)
+        cursor.execute(
+            SQL_HISTORICO.format(filtros=filtros + filtro, limite="LIMIT %s"),
+            params + params_filtro + [limite + 1]
+        )
+        rows, proximo = cortar_pagina(cursor.fetchall(), limite)
+        return resposta_paginada([_formatar_envio(r) for r in rows], proximo)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
+
+
+# Lê do cursor sem buffer e serializa linha a linha; a conexão da requisição
+# fica presa ao stream (stream_with_context) e volta ao pool no final.
+def _exportar_historico_ndjson(filtros, params):
+    def gerar():
+        cursor = conectar().cursor(dictionary=True)
+        try:
+            cursor.execute(SQL_HISTORICO.format(filtros=filtros, limite=""), params)
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                yield b"".join(codificar(_formatar_envio(r)) + b"\n" for r in rows)
+        finally:
+            cursor.close()
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson',
+                    headers={"Content-Disposition": "attachment; filename=historico_notificacoes.ndjson"})
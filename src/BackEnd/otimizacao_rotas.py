@@ -0,0 +1,245 @@
+import numpy as np
+
+from eta import haversine_m, VELOCIDADE_PADRAO_MS
+
+# =====================================================
+# Otimização da ordem das paradas de uma rota
+#
+# Caminho aberto: começa na primeira parada atual (ou em qualquer uma, com
+# fixar_inicio=False) e termina na escola (quando a localização é conhecida).
+# Início e fim viram dois nós fictícios na matriz de custos, então as buscas
+# locais tratam tudo como um caminho com as pontas fixas.
+#
+# 1. matriz de distâncias (haversine NumPy, n x n)
+# 2. vizinho mais próximo; a ordem atual também é candidata (nunca piora)
+# 3. 2-opt e Or-opt (trechos de 1 a 3 paradas, nas duas direções), com o
+#    ganho de cada movimento calculado para todas as posições de uma vez
+#
+# Janelas de horário: com "horario" (HH:MM) nas paradas, a chegada estimada
+# sai da distância acumulada a VELOCIDADE_PADRAO a partir do menor horário.
+# Movimentos que aumentam o atraso total (além da TOLERANCIA) são recusados.
+# =====================================================
+
+TOLERANCIA_MIN = 5
+GRANDE = 1e12
+MAX_PASSADAS = 1000
+
+
+def matriz_distancias(lats, lngs):
+    return haversine_m(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+
+def _minutos(horario):
+    try:
+        horas, minutos = str(horario).split(":")[:2]
+        return int(horas) * 60 + int(minutos)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProblemaRota:
+    # paradas: [{name, latitude, longitude, horario}]; escola: (lat, lng) ou None
+    def __init__(self, paradas, escola=None, fixar_inicio=True, velocidade_ms=VELOCIDADE_PADRAO_MS):
+        self.paradas = paradas
+        n = self.n = len(paradas)
+        lats = np.array([p["latitude"] for p in paradas], dtype=float)
+        lngs = np.array([p["longitude"] for p in paradas], dtype=float)
+
+        # nós 0..n-1 = paradas, n = início fictício, n+1 = fim fictício
+        self.inicio, self.fim = n, n + 1
+        custo = np.full((n + 2, n + 2), GRANDE)
+        custo[:n, :n] = matriz_distancias(lats, lngs)
+        if fixar_inicio and n:
+            custo[self.inicio, 0] = 0.0
+        else:
+            custo[self.inicio, :n] = 0.0
+        if escola is not None:
+            custo[:n, self.fim] = haversine_m(lats, lngs, escola[0], escola[1])
+        else:
+            custo[:n, self.fim] = 0.0
+        self.custo = custo
+
+        self.velocidade_ms = velocidade_ms
+        horarios = [_minutos(p.get("horario")) for p in paradas]
+        self.tem_janelas = any(h is not None for h in horarios)
+        self.limites = np.array([h + TOLERANCIA_MIN if h is not None else np.inf for h in horarios] + [np.inf, np.inf])
+        self.partida = min((h for h in horarios if h is not None), default=0)
+
+    def caminho_inicial(self):
+        return np.array([self.inicio] + list(range(self.n)) + [self.fim])
+
+    def distancia(self, caminho):
+        return float(self.custo[caminho[:-1], caminho[1:]].sum())
+
+    # Minutos de chegada estimados em cada posição do caminho
+    def chegadas(self, caminho):
+        trechos = self.custo[caminho[:-1], caminho[1:]]
+        return self.partida + np.concatenate(([0.0], np.cumsum(trechos))) / self.velocidade_ms / 60
+
+    def atraso(self, caminho):
+        if not self.tem_janelas:
+            return 0.0
+        return float(np.maximum(0.0, self.chegadas(caminho) - self.limites[caminho]).sum())
+
+
+def vizinho_mais_proximo(problema):
+    custo = problema.custo
+    restantes = np.ones(problema.n + 2, dtype=bool)
+    restantes[[problema.inicio, problema.fim]] = False
+    caminho = [problema.inicio]
+    atual = problema.inicio
+    for _ in range(problema.n):
+        linha = np.where(restantes, custo[atual], np.inf)
+        atual = int(np.argmin(linha))
+        restantes[atual] = False
+        caminho.append(atual)
+    caminho.append(problema.fim)
+    return np.array(caminho)
+
+
+# Aceita o caminho novo se ele não aumentar o atraso (janelas de horário)
+def _aceitar(problema, novo, atraso_atual):
+    if not problema.tem_janelas:
+        return True, 0.0
+    atraso = problema.atraso(novo)
+    return atraso <= atraso_atual + 1e-9, atraso
+
+
+def dois_opt(problema, caminho):
+    custo = problema.custo
+    m = len(caminho)
+    atraso_atual = problema.atraso(caminho)
+    for _ in range(MAX_PASSADAS):
+        melhorou = False
+        arestas = custo[caminho[:-1], caminho[1:]]
+        for i in range(m - 3):
+            js = np.arange(i + 2, m - 1)
+            a, b = caminho[i], caminho[i + 1]
+            c, d = caminho[js], caminho[js + 1]
+            ganho = custo[a, c] + custo[b, d] - arestas[i] - arestas[js]
+            for k in np.argsort(ganho)[:3]:
+                if ganho[k] >= -1e-7:
+                    break
+                j = js[k]
+                novo = np.concatenate((caminho[:i + 1], caminho[i + 1:j + 1][::-1], caminho[j + 1:]))
+                ok, atraso = _aceitar(problema, novo, atraso_atual)
+                if ok:
+                    caminho, atraso_atual, melhorou = novo, atraso, True
+                    arestas = custo[caminho[:-1], caminho[1:]]
+                    break
+        if not melhorou:
+            break
+    return caminho
+
+
+def or_opt(problema, caminho, tamanhos=(1, 2, 3)):
+    custo = problema.custo
+    m = len(caminho)
+    atraso_atual = problema.atraso(caminho)
+    for _ in range(MAX_PASSADAS):
+        melhorou = False
+        for tamanho in tamanhos:
+            i = 1
+            while i + tamanho - 1 <= m - 2:
+                arestas = custo[caminho[:-1], caminho[1:]]
+                anterior, proximo = caminho[i - 1], caminho[i + tamanho]
+                s0, s1 = caminho[i], caminho[i + tamanho - 1]
+                retirada = arestas[i - 1] + arestas[i + tamanho - 1] - custo[anterior, proximo]
+
+                # arestas (p, p+1) fora do trecho e das suas vizinhas
+                ps = np.concatenate((np.arange(0, i - 1), np.arange(i + tamanho, m - 1)))
+                if not len(ps):
+                    i += 1
+                    continue
+                u, v = caminho[ps], caminho[ps + 1]
+                direto = custo[u, s0] + custo[s1, v] - arestas[ps]
+                invertido = custo[u, s1] + custo[s0, v] - arestas[ps]
+                melhor_d, melhor_i = int(np.argmin(direto)), int(np.argmin(invertido))
+                if direto[melhor_d] <= invertido[melhor_i]:
+                    ganho, p, inverter = direto[melhor_d] - retirada, ps[melhor_d], False
+                else:
+                    ganho, p, inverter = invertido[melhor_i] - retirada, ps[melhor_i], True
+
+                if ganho < -1e-7:
+                    trecho = caminho[i:i + tamanho]
+                    if inverter:
+                        trecho = trecho[::-1]
+                    resto = np.concatenate((caminho[:i], caminho[i + tamanho:]))
+                    pos = p + 1 if p < i else p + 1 - tamanho
+                    novo = np.concatenate((resto[:pos], trecho, resto[pos:]))
+                    ok, atraso = _aceitar(problema, novo, atraso_atual)
+                    if ok:
+                        caminho, atraso_atual, melhorou = novo, atraso, True
+                        continue
+                i += 1
+        if not melhorou:
+            break
+    return caminho
+
+
+def busca_local(problema, caminho):
+    while True:
+        distancia = problema.distancia(caminho)
+        caminho = or_opt(problema, dois_opt(problema, caminho))
+        if problema.distancia(caminho) >= distancia - 1e-6:
+            return caminho
+
+
+def otimizar(problema):
+    atual = problema.caminho_inicial()
+    if problema.n < 3:
+        return atual
+
+    candidatos = [busca_local(problema, atual)]
+    nn = vizinho_mais_proximo(problema)
+    # com janelas, o vizinho mais próximo só vale se não atrasar mais que a ordem atual
+    if problema.atraso(nn) <= problema.atraso(atual) + 1e-9:
+        candidatos.append(busca_local(problema, nn))
+    return min(candidatos, key=lambda c: (problema.atraso(c), problema.distancia(c)))
+
+
+# =====================================================
+# Resultado para a API: antes/depois e o que muda de posição
+# =====================================================
+def _resumo(problema, caminho):
+    return {
+        "distancia_m": round(problema.distancia(caminho), 1),
+        "tempo_estimado_min": round(problema.distancia(caminho) / problema.velocidade_ms / 60, 1),
+        "atraso_total_min": round(problema.atraso(caminho), 1),
+    }
+
+
+def _atrasadas(problema, caminho):
+    if not problema.tem_janelas:
+        return []
+    chegadas = problema.chegadas(caminho)
+    atrasadas = []
+    for pos, no in enumerate(caminho):
+        if no < problema.n and chegadas[pos] > problema.limites[no]:
+            minutos = int(round(chegadas[pos]))
+            atrasadas.append({
+                "name": problema.paradas[no].get("name"),
+                "horario": problema.paradas[no].get("horario"),
+                "chegada_estimada": f"{minutos // 60 % 24:02d}:{minutos % 60:02d}",
+            })
+    return atrasadas
+
+
+def comparar(problema, otimizado):
+    atual = problema.caminho_inicial()
+    ordem = [int(no) for no in otimizado if no < problema.n]
+    antes, depois = _resumo(problema, atual), _resumo(problema, otimizado)
+    economia = antes["distancia_m"] - depois["distancia_m"]
+    return {
+        "atual": antes,
+        "otimizado": depois,
+        "economia_m": round(economia, 1),
+        "economia_pct": round(100 * economia / antes["distancia_m"], 1) if antes["distancia_m"] else 0.0,
+        "ordem_otimizada": [problema.paradas[i].get("name") for i in ordem],
+        "mudancas": [
+            {"name": problema.paradas[i].get("name"), "de": i + 1, "para": nova + 1}
+            for nova, i in enumerate(ordem) if i != nova
+        ],
+        "paradas_atrasadas": _atrasadas(problema, otimizado),
+        "indices": ordem,
+    }
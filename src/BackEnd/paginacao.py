@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime
+
+from flask import jsonify
+
+# =====================================================
+# Paginação por chave (keyset) em (created_at, id), do mais novo para o mais antigo.
+# O cursor é opaco para o app: base64 de "<created_at iso>|<id>".
+# Outras ordens (ex.: nome, id crescente) passam converter/converter_id e ordem="ASC".
+# A lista continua sendo a resposta; o próximo cursor vai no header X-Proximo-Cursor.
+# =====================================================
+
+LIMITE_PADRAO = 30
+LIMITE_MAXIMO = 100
+
+
+def ler_limite(args, padrao=LIMITE_PADRAO, maximo=LIMITE_MAXIMO):
+    try:
+        limite = int(args.get("limite", padrao))
+    except (TypeError, ValueError):
+        limite = padrao
+    return max(1, min(limite, maximo))
+
+
+def codificar_cursor(created_at, id_):
+    if hasattr(created_at, "isoformat"):
+        created_at = created_at.isoformat()
+    bruto = f"{created_at}|{id_}".encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, converter=datetime.fromisoformat, converter_id=int):
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id_ = bruto.rsplit("|", 1)
+        return converter(created_at), converter_id(id_)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+# Trecho de WHERE para "depois do cursor" na ordem (created_at DESC, id DESC)
+# (ou crescente, com ordem="ASC")
+def filtro_cursor(posicao, coluna_data="created_at", coluna_id="id", ordem="DESC"):
+    if posicao is None:
+        return "", []
+    created_at, id_ = posicao
+    op = ">" if ordem == "ASC" else "<"
+    return (f" AND ({coluna_data} {op} %s OR ({coluna_data} = %s AND {coluna_id} {op} %s))",
+            [created_at, created_at, id_])
+
+
+# Recebe até limite+1 linhas; devolve a página e o cursor seguinte (ou None)
+def cortar_pagina(rows, limite, campo_data="created_at", campo_id="id"):
+    if len(rows) <= limite:
+        return rows, None
+    rows = rows[:limite]
+    ultima = rows[-1]
+    return rows, codificar_cursor(ultima[campo_data], ultima[campo_id])
+
+
+def resposta_paginada(rows, proximo_cursor):
+    resposta = jsonify(rows)
+    if proximo_cursor:
+        resposta.headers["X-Proximo-Cursor"] = proximo_cursor
+        resposta.headers["Access-Control-Expose-Headers"] = "X-Proximo-Cursor"
+    return resposta
@@ -0,0 +1,142 @@
+import math
+
+# =====================================================
+# Paradas das rotas (tabela rotas_paradas)
+# Uma linha por parada, com ordem, coordenadas e horário previsto.
+# O índice (latitude, longitude) atende a busca por caixa delimitadora.
+# =====================================================
+
+# Colunas de rotas nas listas: todas menos pontos_parada, o JSON antigo
+# (migração 003) que as listas liam do banco só para substituir pelas paradas
+COLUNAS_ROTA = ("id", "nome_rota", "numero_onibus", "placa_veiculo", "turno",
+                "motorista_nome", "motorista_telefone", "horario_saida_casa",
+                "horario_chegada_escola", "horario_saida_escola", "horario_chegada_casa",
+                "observacoes", "is_active", "created_at", "capacidade", "vagas_ocupadas")
+
+
+def colunas_rota(alias=None):
+    return ", ".join(f"{alias}.{c}" if alias else c for c in COLUNAS_ROTA)
+
+
+RAIO_TERRA_M = 6371000.0
+RAIO_PADRAO_M = 500.0
+RAIO_MAXIMO_M = 5000.0
+
+
+def _para_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Grava as paradas de uma rota (INSERT multi-linha); ordem = posição na lista
+def salvar_paradas(cursor, rota_id, pontos):
+    linhas = []
+    for ordem, ponto in enumerate(pontos or [], start=1):
+        latitude = _para_float(ponto.get("latitude"))
+        longitude = _para_float(ponto.get("longitude"))
+        if latitude is None or longitude is None:
+            raise ValueError(f"Parada {ordem} sem latitude/longitude válidas")
+        linhas.append((rota_id, ordem, ponto.get("name"), latitude, longitude,
+                       ponto.get("horario") or None, ponto.get("type") or None))
+    if not linhas:
+        return 0
+    valores = ','.join(['(%s,%s,%s,%s,%s,%s,%s)'] * len(linhas))
+    params = [campo for linha in linhas for campo in linha]
+    cursor.execute(f"""
+        INSERT INTO rotas_paradas (rota_id, ordem, nome, latitude, longitude, horario, tipo)
+        VALUES {valores}
+    """, params)
+    return len(linhas)
+
+
+def _formatar_parada(r):
+    ponto = {
+        "name": r["nome"],
+        "latitude": float(r["latitude"]),
+        "longitude": float(r["longitude"]),
+        "horario": str(r["horario"]) if r["horario"] is not None else None,
+    }
+    if r.get("tipo"):
+        ponto["type"] = r["tipo"]
+    return ponto
+
+
+# Carrega as paradas de várias rotas em uma consulta: {rota_id: [ponto, ...]}
+def carregar_paradas(cursor, rota_ids=None):
+    if rota_ids is not None:
+        rota_ids = list(rota_ids)
+        if not rota_ids:
+            return {}
+        placeholders = ','.join(['%s'] * len(rota_ids))
+        cursor.execute(f"""
+            SELECT rota_id, nome, latitude, longitude, horario, tipo
+            FROM rotas_paradas
+            WHERE rota_id IN ({placeholders})
+            ORDER BY rota_id, ordem
+        """, rota_ids)
+    else:
+        cursor.execute("""
+            SELECT rota_id, nome, latitude, longitude, horario, tipo
+            FROM rotas_paradas
+            ORDER BY rota_id, ordem
+        """)
+
+    paradas = {}
+    for r in cursor.fetchall():
+        if not isinstance(r, dict):
+            r = dict(zip(("rota_id", "nome", "latitude", "longitude", "horario", "tipo"), r))
+        paradas.setdefault(r["rota_id"], []).append(_formatar_parada(r))
+    return paradas
+
+
+# Caixa delimitadora (em graus) que contém o círculo de raio_m em volta do ponto
+def caixa_delimitadora(lat, lng, raio_m):
+    delta_lat = math.degrees(raio_m / RAIO_TERRA_M)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    delta_lng = math.degrees(raio_m / (RAIO_TERRA_M * cos_lat))
+    return lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+
+
+# =====================================================
+# Rotas com alguma parada a até raio_m metros de (lat, lng).
+# O filtro BETWEEN usa o índice; a distância exata (haversine) refina.
+# Devolve uma linha por rota com a parada mais próxima, da mais perto para a mais longe.
+# =====================================================
+def rotas_proximas(cursor, lat, lng, raio_m):
+    lat_min, lat_max, lng_min, lng_max = caixa_delimitadora(lat, lng, raio_m)
+    cursor.execute("""
+        SELECT p.rota_id, p.nome, p.latitude, p.longitude, p.horario, p.tipo,
+               r.nome_rota, r.turno, r.numero_onibus, r.placa_veiculo, r.motorista_nome,
+               r.horario_saida_casa, r.horario_chegada_escola,
+               (%s * 2 * ASIN(SQRT(
+                    POW(SIN(RADIANS(p.latitude - %s) / 2), 2) +
+                    COS(RADIANS(%s)) * COS(RADIANS(p.latitude)) *
+                    POW(SIN(RADIANS(p.longitude - %s) / 2), 2)
+               ))) AS distancia_m
+        FROM rotas_paradas p
+        JOIN rotas r ON r.id = p.rota_id
+        WHERE p.latitude BETWEEN %s AND %s
+          AND p.longitude BETWEEN %s AND %s
+        HAVING distancia_m <= %s
+        ORDER BY distancia_m
+    """, (RAIO_TERRA_M, lat, lat, lng, lat_min, lat_max, lng_min, lng_max, raio_m))
+
+    rotas = {}
+    for r in cursor.fetchall():
+        if r["rota_id"] in rotas:
+            continue  # já temos a parada mais próxima desta rota
+        rotas[r["rota_id"]] = {
+            "id": r["rota_id"],
+            "nome_rota": r["nome_rota"],
+            "turno": r["turno"],
+            "numero_onibus": r["numero_onibus"],
+            "placa_veiculo": r["placa_veiculo"],
+            "motorista_nome": r["motorista_nome"],
+            "horario_saida_casa": r["horario_saida_casa"],
+            "horario_chegada_escola": r["horario_chegada_escola"],
+            "parada_mais_proxima": _formatar_parada(r),
+            "distancia_m": round(float(r["distancia_m"]), 1),
+        }
+    return list(rotas.values())
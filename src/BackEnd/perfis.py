@@ -0,0 +1,45 @@
+import uuid
+
+# =====================================================
+# Perfis (tabela profiles): um por usuário de qualquer papel
+# estudantes, motoristas e gestao apontam para o perfil por profile_id;
+# notificações e tokens usam o id do perfil.
+# =====================================================
+
+
+def criar_perfil(cursor, email, nome_completo, papel):
+    profile_id = str(uuid.uuid4())
+    cursor.execute("""
+        INSERT INTO profiles (id, email, nome_completo, role)
+        VALUES (%s, %s, %s, %s)
+    """, (profile_id, email, nome_completo, papel))
+    return profile_id
+
+
+# Mantém email/nome do perfil iguais aos da tabela do papel
+def atualizar_perfil(cursor, profile_id, email, nome_completo):
+    if not profile_id:
+        return
+    cursor.execute(
+        "UPDATE profiles SET email = %s, nome_completo = %s WHERE id = %s",
+        (email, nome_completo, profile_id)
+    )
+
+
+# Rota do motorista: pelo id (rota_id) ou, no formato antigo, pelo nome (rota).
+# -> (rota_id, nome_rota); (None, nome) se o nome não bater com nenhuma rota
+def resolver_rota(cursor, rota_id=None, nome_rota=None):
+    if rota_id:
+        cursor.execute("SELECT id, nome_rota FROM rotas WHERE id = %s", (rota_id,))
+    elif nome_rota:
+        cursor.execute("SELECT id, nome_rota FROM rotas WHERE nome_rota = %s ORDER BY id LIMIT 1", (nome_rota,))
+    else:
+        return None, None
+    linha = cursor.fetchone()
+    if linha is None:
+        if rota_id:
+            raise ValueError(f"Rota {rota_id} não encontrada")
+        return None, nome_rota
+    if isinstance(linha, dict):
+        return linha["id"], linha["nome_rota"]
+    return linha[0], linha[1]
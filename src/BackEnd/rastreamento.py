@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+import time
+import traceback
+from collections import OrderedDict, deque
+from datetime import datetime
+
+import banco
+
+# =====================================================
+# Rastreamento em tempo real dos ônibus (núcleo asyncio, sem framework web)
+#
+# - A última posição de cada rota fica em memória, junto com um buffer
+#   circular das posições recentes.
+# - Os assinantes (SSE/WebSocket) esperam num asyncio.Event trocado a cada
+#   posição nova: publicar é O(1) e o JSON é montado uma vez só por posição.
+# - As posições vão para o MySQL em lotes (viagens_posicoes), fora do event loop.
+#
+# O estado é por processo: o motorista e os estudantes de uma rota precisam
+# cair no mesmo processo de rastreamento (um processo por máquina, ou
+# balanceamento por rota).
+# =====================================================
+
+TAMANHO_BUFFER = int(os.environ.get("UNIBUS_RASTREIO_BUFFER", "120"))
+INTERVALO_GRAVACAO = float(os.environ.get("UNIBUS_RASTREIO_GRAVACAO", "5"))
+LOTE_GRAVACAO = int(os.environ.get("UNIBUS_RASTREIO_LOTE", "1000"))
+# Viagens conferidas no banco ficam em memória por TTL_VIAGEM segundos: uma
+# viagem encerrada pelo app Flask (ex.: /api/rotas/iniciar) deixa de aceitar
+# posições depois disso. No máximo MAX_VIAGENS guardadas (LRU).
+TTL_VIAGEM = float(os.environ.get("UNIBUS_RASTREIO_TTL_VIAGEM", "30"))
+MAX_VIAGENS = int(os.environ.get("UNIBUS_RASTREIO_MAX_VIAGENS", "5000"))
+
+
+class ViagemInvalida(Exception):
+    pass
+
+
+class ViagemDeOutroMotorista(Exception):
+    pass
+
+
+class CanalRota:
+    def __init__(self, rota_id):
+        self.rota_id = rota_id
+        self.viagem_id = None
+        self.ultima = None
+        self.ultima_json = None
+        self.recentes = deque(maxlen=TAMANHO_BUFFER)
+        self.versao = 0
+        self.assinantes = 0
+        self._evento = asyncio.Event()
+
+    def publicar(self, posicao):
+        self.ultima = posicao
+        self.ultima_json = json.dumps(posicao)
+        self.versao += 1
+        evento, self._evento = self._evento, asyncio.Event()
+        evento.set()
+
+    # Espera até existir uma versão mais nova que `versao` (ou estourar o timeout)
+    async def proxima(self, versao, timeout=None):
+        while self.versao == versao:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.versao
+
+
+def _posicao(viagem_id, rota_id, bruto):
+    try:
+        latitude = float(bruto["latitude"])
+        longitude = float(bruto["longitude"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Posição sem latitude/longitude")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Latitude/longitude fora do intervalo")
+
+    # timestamp em ms (formato do expo-location); sem ele, usa a hora de chegada
+    timestamp = bruto.get("timestamp")
+    timestamp = float(timestamp) / 1000 if timestamp else time.time()
+
+    def opcional(campo):
+        valor = bruto.get(campo)
+        return float(valor) if valor is not None else None
+
+    return {
+        "viagem_id": viagem_id,
+        "rota_id": rota_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "velocidade": opcional("velocidade"),
+        "direcao": opcional("direcao"),
+        "timestamp": int(timestamp * 1000),
+    }
+
+
+# =====================================================
+# Acesso ao banco (síncrono; chamado via run_in_executor)
+# =====================================================
+# -> (rota_id, motorista_id) ou None
+def _buscar_viagem(viagem_id):
+    with banco.conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT rota_id, motorista_id FROM viagens WHERE id = %s AND status = 'em_andamento'",
+            (viagem_id,)
+        )
+        linha = cursor.fetchone()
+        cursor.close()
+        return tuple(linha) if linha else None
+
+
+def _encerrar_viagem(viagem_id):
+    with banco.conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE viagens SET status = 'encerrada', encerrada_em = NOW()
+            WHERE id = %s AND status = 'em_andamento'
+        """, (viagem_id,))
+        conn.commit()
+        cursor.close()
+
+
+def _gravar_posicoes(posicoes):
+    with banco.conexao() as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(posicoes), LOTE_GRAVACAO):
+            lote = posicoes[i:i + LOTE_GRAVACAO]
+            valores = ','.join(['(%s,%s,%s,%s,%s,%s)'] * len(lote))
+            params = []
+            for p in lote:
+                params.extend((p["viagem_id"], p["latitude"], p["longitude"],
+                               p["velocidade"], p["direcao"],
+                               datetime.fromtimestamp(p["timestamp"] / 1000)))
+            cursor.execute(f"""
+                INSERT INTO viagens_posicoes
+                (viagem_id, latitude, longitude, velocidade, direcao, registrado_em)
+                VALUES {valores}
+            """, params)
+        conn.commit()
+        cursor.close()
+
+
+class Rastreamento:
+    def __init__(self):
+        self.canais = {}
+        self._viagens = OrderedDict()  # viagem_id -> (rota_id, motorista_id, conferida em)
+        self._pendentes = []
+        self._tarefa_gravacao = None
+        self._ouvintes = []
+
+    def canal(self, rota_id):
+        canal = self.canais.get(rota_id)
+        if canal is None:
+            canal = self.canais[rota_id] = CanalRota(rota_id)
+        return canal
+
+    # Outros módulos (ex.: ETA) podem reagir a cada posição nova, antes dela ser publicada
+    def ao_publicar(self, funcao):
+        self._ouvintes.append(funcao)
+
+    # Só o motorista que iniciou a viagem (viagens.motorista_id) envia posições ou encerra
+    async def _rota_da_viagem(self, viagem_id, motorista_id):
+        viagem = self._viagens.get(viagem_id)
+        agora = time.monotonic()
+        if viagem is None or agora - viagem[2] >= TTL_VIAGEM:
+            loop = asyncio.get_running_loop()
+            encontrada = await loop.run_in_executor(None, _buscar_viagem, viagem_id)
+            if encontrada is None:
+                if self._viagens.pop(viagem_id, None) is not None:
+                    self._avisar_encerrada(viagem_id, viagem[0])  # encerrada fora daqui
+                raise ViagemInvalida(f"Viagem {viagem_id} não encontrada ou encerrada")
+            rota_id, dono = encontrada
+            # uma viagem em andamento por rota: as outras da mesma rota saem da memória
+            for outra in [v for v, dados in self._viagens.items() if dados[0] == rota_id and v != viagem_id]:
+                del self._viagens[outra]
+            viagem = self._viagens[viagem_id] = (rota_id, dono, agora)
+            while len(self._viagens) > MAX_VIAGENS:
+                self._viagens.popitem(last=False)
+        self._viagens.move_to_end(viagem_id)
+        rota_id, dono, _ = viagem
+        if str(dono) != str(motorista_id):
+            raise ViagemDeOutroMotorista(f"Viagem {viagem_id} é de outro motorista")
+        return rota_id
+
+    # Recebe uma ou mais posições de uma viagem; publica a mais recente
+    async def registrar(self, viagem_id, brutas, motorista_id):
+        rota_id = await self._rota_da_viagem(viagem_id, motorista_id)
+        posicoes = sorted((_posicao(viagem_id, rota_id, b) for b in brutas),
+                          key=lambda p: p["timestamp"])
+        if not posicoes:
+            return 0
+
+        canal = self.canal(rota_id)
+        canal.viagem_id = viagem_id
+        canal.recentes.extend(posicoes)
+        self._pendentes.extend(posicoes)
+
+        mais_recente = posicoes[-1]
+        if canal.ultima is None or mais_recente["timestamp"] >= canal.ultima["timestamp"]:
+            # ouvintes rodam antes de publicar e podem acrescentar campos (ex.: "eta")
+            for ouvinte in self._ouvintes:
+                try:
+                    ouvinte(mais_recente)
+                except Exception:
+                    traceback.print_exc()
+            canal.publicar(mais_recente)
+
+        if len(self._pendentes) >= LOTE_GRAVACAO:
+            asyncio.ensure_future(self.gravar_pendentes())
+        return len(posicoes)
+
+    async def encerrar(self, viagem_id, motorista_id):
+        rota_id = await self._rota_da_viagem(viagem_id, motorista_id)
+        self._viagens.pop(viagem_id, None)
+        await self.gravar_pendentes()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _encerrar_viagem, viagem_id)
+        self._avisar_encerrada(viagem_id, rota_id)
+
+    def _avisar_encerrada(self, viagem_id, rota_id):
+        canal = self.canais.get(rota_id)
+        if canal is not None and canal.viagem_id == viagem_id:
+            canal.publicar({"viagem_id": viagem_id, "rota_id": rota_id, "encerrada": True})
+            canal.viagem_id = None
+
+    async def gravar_pendentes(self):
+        if not self._pendentes:
+            return
+        lote, self._pendentes = self._pendentes, []
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, _gravar_posicoes, lote)
+        except Exception:
+            traceback.print_exc()
+            # devolve para a próxima tentativa sem deixar o buffer crescer sem limite
+            self._pendentes = (lote + self._pendentes)[-LOTE_GRAVACAO * 10:]
+
+    async def _loop_gravacao(self):
+        while True:
+            await asyncio.sleep(INTERVALO_GRAVACAO)
+            await self.gravar_pendentes()
+
+    def iniciar(self):
+        if self._tarefa_gravacao is None:
+            self._tarefa_gravacao = asyncio.ensure_future(self._loop_gravacao())
+
+    async def parar(self):
+        if self._tarefa_gravacao is not None:
+            self._tarefa_gravacao.cancel()
+            self._tarefa_gravacao = None
+        await self.gravar_pendentes()
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import secrets
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import repeat
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele as respostas usam o json da biblioteca padrão
+    orjson = None
+
+# =====================================================
+# Serialização das respostas JSON (app.json)
+#
+# UNIBUS_JSON=orjson (padrão quando o orjson está instalado) ou padrao (json
+# da biblioteca padrão). Nos dois casos:
+#   datetime/date/time -> ISO 8601 (o que as views faziam com isoformat())
+#   Decimal            -> número
+#   timedelta (TIME)   -> "H:MM:SS"
+#   JSONBruto(texto)   -> o texto entra na resposta como está, sem
+#                         json.loads + dumps (colunas que o app já grava em JSON)
+# As chaves não são ordenadas (o jsonify do Flask ordenava).
+# =====================================================
+
+MOTOR = os.environ.get("UNIBUS_JSON") or ("orjson" if orjson else "padrao")
+if MOTOR not in ("orjson", "padrao"):
+    raise ValueError(f"UNIBUS_JSON inválido: {MOTOR} (use orjson ou padrao)")
+if MOTOR == "orjson" and orjson is None:
+    raise ValueError("Para UNIBUS_JSON=orjson instale o orjson (pip install orjson)")
+
+# O orjson 3.9+ embute texto JSON pronto (Fragment). Nas versões anteriores e
+# no json padrão o JSONBruto vira uma marca, trocada pelo texto no final.
+_FRAGMENTO = getattr(orjson, "Fragment", None) if MOTOR == "orjson" else None
+_MARCA = f"\x00json-bruto-{secrets.token_hex(4)}:"
+_RE_MARCA = re.compile(re.escape(json.dumps(_MARCA)[:-1].encode()) + rb'(\d+)"')
+
+
+class JSONBruto:
+    """Texto que já é JSON válido (ex.: routes_json gravado pelo próprio app)."""
+
+    __slots__ = ("texto",)
+
+    def __init__(self, texto):
+        self.texto = texto.decode() if isinstance(texto, (bytes, bytearray)) else texto
+
+
+def _converter(obj):
+    # datetime/date/time só chegam aqui no json padrão (o orjson já serializa)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, timedelta):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode()
+    return DefaultJSONProvider.default(obj)  # uuid, dataclass, __html__
+
+
+def codificar(obj, indentar=False):
+    brutos = []
+
+    def padrao(o):
+        if isinstance(o, JSONBruto):
+            if _FRAGMENTO is not None:
+                return _FRAGMENTO(o.texto)
+            brutos.append(o.texto)
+            return f"{_MARCA}{len(brutos) - 1}"
+        return _converter(o)
+
+    if MOTOR == "orjson":
+        opcoes = orjson.OPT_INDENT_2 if indentar else 0
+        try:
+            corpo = orjson.dumps(obj, default=padrao, option=opcoes)
+        except TypeError:
+            # chaves não-texto (ex.: {rota_id: ...}); a opção deixa tudo mais lento, só quando precisa
+            brutos.clear()
+            corpo = orjson.dumps(obj, default=padrao, option=opcoes | orjson.OPT_NON_STR_KEYS)
+    else:
+        corpo = json.dumps(obj, default=padrao, ensure_ascii=False, indent=2 if indentar else None,
+                           separators=None if indentar else (",", ":")).encode()
+    if brutos:
+        corpo = _RE_MARCA.sub(lambda m: brutos[int(m.group(1))].encode(), corpo)
+    return corpo
+
+
+carregar = orjson.loads if MOTOR == "orjson" else json.loads
+
+
+# Linhas de um cursor comum (tuplas) como lista de dicts. O map/zip monta tudo
+# em C; o cursor(dictionary=True) faz um dict por linha no Python.
+def como_dicts(cursor, linhas):
+    return list(map(dict, map(zip, repeat(cursor.column_names), linhas)))
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    def codificar(self, obj, indentar=False):
+        return codificar(obj, indentar)
+
+    def dumps(self, obj, **kwargs):
+        return self.codificar(obj, bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        return carregar(s)
+
+    # Como o do Flask (indenta em debug), mas entrega os bytes direto
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.codificar(obj, indentar) + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = ProvedorJSON(app)
@@ -0,0 +1,122 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# =====================================================
+# Hash de senhas em processos separados
+# O hash é CPU puro (scrypt); um pool de processos usa todos os núcleos sem
+# travar as threads do servidor. Com UNIBUS_HASH_PROCESSOS=1 o hash roda na
+# própria thread, um de cada vez por processo (padrão no gunicorn, onde os
+# workers já ocupam os núcleos; útil também em depuração).
+#
+# Custo: UNIBUS_HASH_METODO no formato do werkzeug (padrão scrypt:32768:8:1,
+# o mesmo de generate_password_hash). Formas curtas (scrypt, pbkdf2:sha256)
+# são completadas com os parâmetros padrão do werkzeug, como ficam gravadas no
+# hash. No login, hashes com outro método ou custo são refeitos com o atual
+# (rehash transparente).
+#
+# Fila limitada: no máximo UNIBUS_HASH_FILA senhas esperando/rodando (no
+# pool ou na própria thread); quem passar disso espera até UNIBUS_HASH_ESPERA
+# segundos e recebe HashOcupado (o login responde 503 em vez de empilhar
+# requisições).
+# =====================================================
+
+PROCESSOS_HASH = int(os.environ.get("UNIBUS_HASH_PROCESSOS", str(os.cpu_count() or 1)))
+
+
+# "scrypt" -> "scrypt:32768:8:1", "pbkdf2:sha256" -> "pbkdf2:sha256:<iterações padrão>"
+def _normalizar_metodo(metodo):
+    nome, *args = metodo.split(":")
+    try:
+        if nome == "scrypt" and len(args) in (0, 3):
+            n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+            return f"scrypt:{n}:{r}:{p}"
+        if nome == "pbkdf2" and len(args) <= 2:
+            algoritmo = args[0] if args else "sha256"
+            iteracoes = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f"pbkdf2:{algoritmo}:{iteracoes}"
+    except ValueError:
+        pass
+    raise ValueError(f"UNIBUS_HASH_METODO inválido: {metodo} (ex.: scrypt:32768:8:1 ou pbkdf2:sha256:600000)")
+
+
+METODO_HASH = _normalizar_metodo(os.environ.get("UNIBUS_HASH_METODO", "scrypt:32768:8:1"))
+FILA_HASH = int(os.environ.get("UNIBUS_HASH_FILA", str(PROCESSOS_HASH * 8)))
+ESPERA_FILA = float(os.environ.get("UNIBUS_HASH_ESPERA", "5"))
+
+_pool = None
+_trava = threading.Lock()
+_vagas = threading.BoundedSemaphore(FILA_HASH)
+_cpu = threading.Lock()  # sem pool: um hash por vez, os outros esperam na fila
+
+
+class HashOcupado(RuntimeError):
+    pass
+
+
+def obter_pool():
+    global _pool
+    if _pool is None:
+        with _trava:
+            if _pool is None:
+                # "spawn" não herda threads nem conexões abertas do servidor
+                _pool = ProcessPoolExecutor(max_workers=PROCESSOS_HASH,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def encerrar_pool():
+    global _pool
+    with _trava:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def gerar(senha):
+    return generate_password_hash(senha, method=METODO_HASH)
+
+
+def precisa_rehash(senha_hash):
+    return senha_hash.split("$", 1)[0] != METODO_HASH
+
+
+# Confere a senha e, se o hash estiver com custo antigo, já devolve o novo
+# (roda no processo do pool: uma ida só)
+def _verificar(senha_hash, senha):
+    if not senha_hash or not check_password_hash(senha_hash, senha):
+        return False, None
+    return True, gerar(senha) if precisa_rehash(senha_hash) else None
+
+
+def _executar(funcao, *args):
+    if not _vagas.acquire(timeout=ESPERA_FILA):
+        raise HashOcupado("Muitos logins ao mesmo tempo, tente novamente em instantes")
+    try:
+        if PROCESSOS_HASH <= 1:
+            with _cpu:
+                return funcao(*args)
+        return obter_pool().submit(funcao, *args).result()
+    finally:
+        _vagas.release()
+
+
+def gerar_hash(senha):
+    return _executar(gerar, senha)
+
+
+# -> (senha confere?, novo hash ou None)
+def verificar_senha(senha_hash, senha):
+    return _executar(_verificar, senha_hash, senha)
+
+
+# Começa a gerar os hashes já; o iterador devolve na mesma ordem das senhas
+def hashes_em_lote(senhas):
+    senhas = list(senhas)
+    if PROCESSOS_HASH <= 1 or len(senhas) < 2:
+        return iter([gerar(s) for s in senhas])
+    pedaco = max(1, len(senhas) // (PROCESSOS_HASH * 4))
+    return obter_pool().map(gerar, senhas, chunksize=pedaco)
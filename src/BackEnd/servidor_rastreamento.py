@@ -0,0 +1,253 @@
+# Servidor asyncio de rastreamento (roda ao lado do app Flask)
+#
+#   python servidor_rastreamento.py        -> porta 5001 (UNIBUS_RASTREIO_PORTA)
+#
+# Motorista (header "Authorization: Bearer <token>" do login, o mesmo
+# UNIBUS_SEGREDO do app Flask; só o motorista da viagem é aceito):
+#   POST /api/viagens/<viagem_id>/posicoes   {latitude, longitude, ...} ou {"posicoes": [...]}
+#   POST /api/viagens/<viagem_id>/encerrar
+# Estudantes:
+#   GET  /api/rotas/<rota_id>/posicao              última posição (JSON)
+#   GET  /api/rotas/<rota_id>/posicoes/recentes    buffer de posições recentes
+#   GET  /api/rotas/<rota_id>/posicoes/stream      Server-Sent Events
+#   GET  /api/rotas/<rota_id>/posicoes/ws          WebSocket
+#   GET  /api/rotas/<rota_id>/eta                  previsão de chegada nas paradas
+#
+# Cada posição publicada leva o ETA da viagem no campo "eta" (quando o modelo
+# da rota já foi carregado; o carregamento começa na primeira posição).
+# A viagem é criada no app Flask (POST /api/rotas/iniciar).
+import asyncio
+import json
+import os
+
+from aiohttp import web, WSMsgType
+
+from autenticacao import cache_tokens
+from eta import GerenciadorEta
+from rastreamento import Rastreamento, ViagemDeOutroMotorista, ViagemInvalida
+
+PORTA = int(os.environ.get("UNIBUS_RASTREIO_PORTA", "5001"))
+HEARTBEAT = float(os.environ.get("UNIBUS_RASTREIO_HEARTBEAT", "15"))
+
+CHAVE_RASTREAMENTO = web.AppKey("rastreamento", Rastreamento)
+CHAVE_ETA = web.AppKey("eta", GerenciadorEta)
+
+
+def _cabecalhos_cors(resposta):
+    resposta.headers["Access-Control-Allow-Origin"] = "*"
+    resposta.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+
+
+@web.middleware
+async def cors(request, handler):
+    if request.method == "OPTIONS":
+        resposta = web.Response()
+    else:
+        try:
+            resposta = await handler(request)
+        except web.HTTPException as erro:  # 400/401/403 levantados pelos handlers
+            _cabecalhos_cors(erro)
+            raise
+    if not resposta.prepared:  # streams (SSE/WebSocket) já enviaram os headers
+        _cabecalhos_cors(resposta)
+    return resposta
+
+
+def _erro(classe, mensagem):
+    return classe(text=json.dumps({"erro": mensagem}), content_type="application/json")
+
+
+def _id(request, nome):
+    try:
+        return int(request.match_info[nome])
+    except ValueError:
+        raise _erro(web.HTTPBadRequest, f"{nome} inválido")
+
+
+# Motorista do token (como o requer_login("motorista") do app Flask)
+def _motorista(request):
+    cabecalho = request.headers.get("Authorization", "")
+    token = cabecalho[7:].strip() if cabecalho.startswith("Bearer ") else None
+    usuario = cache_tokens.usuario(token) if token else None
+    if usuario is None:
+        raise _erro(web.HTTPUnauthorized, "Faça login novamente")
+    if usuario["papel"] != "motorista":
+        raise _erro(web.HTTPForbidden, "Acesso não permitido para este usuário")
+    return usuario["id"]
+
+
+# =====================================================
+# Motorista
+# =====================================================
+async def receber_posicoes(request):
+    viagem_id = _id(request, "viagem_id")
+    motorista_id = _motorista(request)
+    try:
+        corpo = await request.json()
+    except ValueError:
+        return web.json_response({"erro": "JSON inválido"}, status=400)
+    brutas = corpo.get("posicoes") if isinstance(corpo, dict) and "posicoes" in corpo else [corpo]
+
+    try:
+        recebidas = await request.app[CHAVE_RASTREAMENTO].registrar(viagem_id, brutas, motorista_id)
+    except ViagemInvalida as erro:
+        return web.json_response({"erro": str(erro)}, status=404)
+    except ViagemDeOutroMotorista as erro:
+        return web.json_response({"erro": str(erro)}, status=403)
+    except (ValueError, TypeError, AttributeError) as erro:
+        return web.json_response({"erro": str(erro)}, status=400)
+    return web.json_response({"recebidas": recebidas}, status=202)
+
+
+async def encerrar_viagem(request):
+    viagem_id = _id(request, "viagem_id")
+    motorista_id = _motorista(request)
+    try:
+        await request.app[CHAVE_RASTREAMENTO].encerrar(viagem_id, motorista_id)
+    except ViagemInvalida as erro:
+        return web.json_response({"erro": str(erro)}, status=404)
+    except ViagemDeOutroMotorista as erro:
+        return web.json_response({"erro": str(erro)}, status=403)
+    return web.json_response({"mensagem": "Viagem encerrada", "viagem_id": viagem_id})
+
+
+# =====================================================
+# Estudantes
+# =====================================================
+async def ultima_posicao(request):
+    canal = request.app[CHAVE_RASTREAMENTO].canais.get(_id(request, "rota_id"))
+    if canal is None or canal.ultima_json is None:
+        return web.json_response({"erro": "Sem posição para esta rota"}, status=404)
+    return web.Response(text=canal.ultima_json, content_type="application/json")
+
+
+async def posicoes_recentes(request):
+    canal = request.app[CHAVE_RASTREAMENTO].canais.get(_id(request, "rota_id"))
+    return web.json_response(list(canal.recentes) if canal else [])
+
+
+async def stream_sse(request):
+    canal = request.app[CHAVE_RASTREAMENTO].canal(_id(request, "rota_id"))
+    resposta = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "Access-Control-Allow-Origin": "*",
+    })
+    await resposta.prepare(request)
+
+    canal.assinantes += 1
+    try:
+        versao = canal.versao
+        if canal.ultima_json is not None:
+            await resposta.write(f"data: {canal.ultima_json}\n\n".encode())
+        while True:
+            nova = await canal.proxima(versao, HEARTBEAT)
+            if nova is None:
+                await resposta.write(b": ping\n\n")  # mantém proxies/NAT abertos
+                continue
+            versao = nova
+            await resposta.write(f"data: {canal.ultima_json}\n\n".encode())
+    except (ConnectionResetError, RuntimeError):
+        pass
+    finally:
+        canal.assinantes -= 1
+    return resposta
+
+
+async def stream_ws(request):
+    canal = request.app[CHAVE_RASTREAMENTO].canal(_id(request, "rota_id"))
+    ws = web.WebSocketResponse(heartbeat=HEARTBEAT)
+    await ws.prepare(request)
+
+    canal.assinantes += 1
+    try:
+        versao = canal.versao
+        if canal.ultima_json is not None:
+            await ws.send_str(canal.ultima_json)
+
+        # Termina quando o cliente fecha; mensagens recebidas são ignoradas
+        async def ler_cliente():
+            async for msg in ws:
+                if msg.type in (WSMsgType.CLOSE, WSMsgType.ERROR):
+                    break
+
+        leitura = asyncio.ensure_future(ler_cliente())
+        try:
+            while not ws.closed and not leitura.done():
+                nova = await canal.proxima(versao, HEARTBEAT)
+                if nova is None:
+                    continue
+                versao = nova
+                await ws.send_str(canal.ultima_json)
+        finally:
+            leitura.cancel()
+    except (ConnectionResetError, RuntimeError):
+        pass
+    finally:
+        canal.assinantes -= 1
+    return ws
+
+
+async def eta_rota(request):
+    canal = request.app[CHAVE_RASTREAMENTO].canais.get(_id(request, "rota_id"))
+    if canal is None or not canal.ultima or "eta" not in canal.ultima:
+        return web.json_response({"erro": "Sem previsão para esta rota"}, status=404)
+    return web.json_response(canal.ultima["eta"])
+
+
+# =====================================================
+# ETA: atualizado de forma incremental a cada posição publicada
+# =====================================================
+def _ouvinte_eta(gerenciador):
+    def ao_publicar(posicao):
+        rota_id = posicao["rota_id"]
+        # sem modelo ou vencido: carrega em segundo plano; o vencido segue em uso
+        if gerenciador.precisa_carregar(rota_id):
+            asyncio.get_running_loop().run_in_executor(None, gerenciador.carregar, rota_id)
+        eta = gerenciador.atualizar(rota_id, posicao["viagem_id"], posicao["latitude"],
+                                    posicao["longitude"], posicao["timestamp"] / 1000)
+        if eta is not None:
+            eta.pop("posicao", None)
+            posicao["eta"] = eta
+
+    return ao_publicar
+
+
+async def status(request):
+    rastreamento = request.app[CHAVE_RASTREAMENTO]
+    return web.json_response({
+        "rotas": len(rastreamento.canais),
+        "assinantes": sum(c.assinantes for c in rastreamento.canais.values()),
+        "viagens_ativas": sum(1 for c in rastreamento.canais.values() if c.viagem_id),
+    })
+
+
+async def _iniciar(app):
+    app[CHAVE_RASTREAMENTO].iniciar()
+
+
+async def _parar(app):
+    await app[CHAVE_RASTREAMENTO].parar()
+
+
+def criar_app():
+    app = web.Application(middlewares=[cors])
+    app[CHAVE_RASTREAMENTO] = Rastreamento()
+    app[CHAVE_ETA] = GerenciadorEta()
+    app[CHAVE_RASTREAMENTO].ao_publicar(_ouvinte_eta(app[CHAVE_ETA]))
+    app.router.add_post("/api/viagens/{viagem_id}/posicoes", receber_posicoes)
+    app.router.add_post("/api/viagens/{viagem_id}/encerrar", encerrar_viagem)
+    app.router.add_get("/api/rotas/{rota_id}/posicao", ultima_posicao)
+    app.router.add_get("/api/rotas/{rota_id}/posicoes/recentes", posicoes_recentes)
+    app.router.add_get("/api/rotas/{rota_id}/posicoes/stream", stream_sse)
+    app.router.add_get("/api/rotas/{rota_id}/posicoes/ws", stream_ws)
+    app.router.add_get("/api/rotas/{rota_id}/eta", eta_rota)
+    app.router.add_get("/status", status)
+    app.on_startup.append(_iniciar)
+    app.on_cleanup.append(_parar)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(criar_app(), host="0.0.0.0", port=PORTA)
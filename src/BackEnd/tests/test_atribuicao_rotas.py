@@ -0,0 +1,113 @@
+import re
+import sqlite3
+import unittest
+
+from atribuicao_rotas import CapacidadeExcedida, atribuir, gravar
+
+# =====================================================
+# Banco SQLite em memória com as colunas que atribuir/gravar usam.
+# O cursor traduz o SQL do MySQL que aparece nesses caminhos (%s, FOR UPDATE,
+# UPDATE com apelido).
+# =====================================================
+ESQUEMA = """
+CREATE TABLE estudantes (id TEXT PRIMARY KEY, escola TEXT NOT NULL, is_active INTEGER NOT NULL DEFAULT 1,
+                         latitude REAL, longitude REAL);
+CREATE TABLE rotas (id INTEGER PRIMARY KEY, nome_rota TEXT, capacidade INTEGER,
+                    vagas_ocupadas INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE rotas_paradas (id INTEGER PRIMARY KEY, rota_id INTEGER, ordem INTEGER, nome TEXT,
+                            latitude REAL, longitude REAL, horario TEXT, tipo TEXT);
+CREATE TABLE inscricoes_rotas (id INTEGER PRIMARY KEY, estudante_id TEXT, rota_id INTEGER,
+                               status TEXT NOT NULL DEFAULT 'ativa');
+CREATE TABLE inscricoes_espera (id INTEGER PRIMARY KEY, rota_id INTEGER, estudante_id TEXT);
+"""
+
+
+class CursorSQLite:
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+
+    def execute(self, sql, params=()):
+        sql = sql.replace("%s", "?").replace("FOR UPDATE", "")
+        sql = re.sub(r"UPDATE rotas r\b", "UPDATE rotas AS r", sql)
+        self._cursor.execute(sql, list(params))
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+
+class ConexaoSQLite:
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(ESQUEMA)
+
+    def cursor(self):
+        return CursorSQLite(self.conn)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def inscritos(self, rota_id):
+        return sorted(linha[0] for linha in self.conn.execute(
+            "SELECT estudante_id FROM inscricoes_rotas WHERE rota_id = ? AND status = 'ativa'", (rota_id,)))
+
+
+class ReatribuirTest(unittest.TestCase):
+    # Rota 1 com 2 lugares, ocupados por A e B (escola E). Em reatribuir, A e C
+    # (perto da parada) entram na rota; B não tem localização e fica sem rota.
+    # A prévia conta os lugares de A e B como livres, então gravar também
+    # precisa liberar o lugar de B.
+    def setUp(self):
+        self.db = ConexaoSQLite()
+        self.db.conn.executescript("""
+            INSERT INTO rotas (id, nome_rota, capacidade, vagas_ocupadas) VALUES (1, 'R1', 2, 2), (2, 'R2', 5, 1);
+            INSERT INTO rotas_paradas (rota_id, ordem, nome, latitude, longitude) VALUES (1, 1, 'P1', -8.0, -35.0);
+            INSERT INTO estudantes (id, escola, is_active, latitude, longitude) VALUES
+                ('A', 'E', 1, -8.001, -35.0),
+                ('B', 'E', 1, NULL, NULL),
+                ('C', 'E', 1, -8.0, -35.001),
+                ('D', 'Outra', 1, -8.0, -35.0),
+                ('X', 'E', 0, -8.0, -35.0);
+            INSERT INTO inscricoes_rotas (estudante_id, rota_id) VALUES ('A', 1), ('B', 1), ('X', 2), ('D', 2);
+        """)
+
+    def test_previa_e_gravacao_liberam_os_mesmos_lugares(self):
+        previa = atribuir(self.db.cursor(), "E", 800, [1], reatribuir=True)
+        rota = previa["rotas"][0]
+        self.assertEqual(rota["ocupadas"], 0)
+        self.assertEqual(sorted(a["estudante_id"] for a in previa["atribuidos"]), ["A", "C"])
+        self.assertEqual(previa["nao_atribuidos"], [{"estudante_id": "B", "motivo": "sem_localizacao"}])
+
+        inseridos, ignorados = gravar(self.db, self.db.cursor(), previa)
+        self.assertEqual((inseridos, ignorados), (2, 0))
+        self.assertEqual(self.db.inscritos(1), ["A", "C"])
+        # inativo e estudante de outra escola não entram no lote
+        self.assertEqual(self.db.inscritos(2), ["D", "X"])
+        vagas = self.db.conn.execute("SELECT vagas_ocupadas FROM rotas WHERE id = 1").fetchone()[0]
+        self.assertEqual(vagas, 2)
+
+    def test_outra_escola_continua_ocupando_lugar(self):
+        self.db.conn.execute("INSERT INTO inscricoes_rotas (estudante_id, rota_id) VALUES ('D', 1)")
+        previa = atribuir(self.db.cursor(), "E", 800, [1], reatribuir=True)
+        self.assertEqual(previa["rotas"][0]["ocupadas"], 1)
+        self.assertEqual(len(previa["atribuidos"]), 1)
+        gravar(self.db, self.db.cursor(), previa)
+        self.assertEqual(len(self.db.inscritos(1)), 2)
+
+    def test_gravar_recusa_quando_a_rota_encheu_depois_da_previa(self):
+        previa = atribuir(self.db.cursor(), "E", 800, [1], reatribuir=True)
+        self.db.conn.execute("INSERT INTO inscricoes_rotas (estudante_id, rota_id) VALUES ('D', 1)")
+        self.db.commit()
+        with self.assertRaises(CapacidadeExcedida):
+            gravar(self.db, self.db.cursor(), previa)
+        self.assertEqual(self.db.inscritos(1), ["A", "B", "D"])
+
+
+if __name__ == "__main__":
+    unittest.main()
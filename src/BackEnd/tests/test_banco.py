@@ -0,0 +1,28 @@
+import unittest
+
+from flask import Flask
+
+import banco
+import instrumentacao
+
+
+class ObservadoresTest(unittest.TestCase):
+    @unittest.skipUnless(instrumentacao.ATIVO, "UNIBUS_METRICAS=0")
+    def test_dois_apps_nao_duplicam_os_observadores(self):
+        instrumentacao.init_app(Flask("a"))
+        instrumentacao.init_app(Flask("b"))
+        self.assertEqual(banco._observadores.count(instrumentacao._ao_consultar), 1)
+        self.assertEqual(banco._observadores_linhas.count(instrumentacao._ao_ler), 1)
+
+    def test_parar_de_observar(self):
+        def observador(sql, params, duracao):
+            pass
+
+        banco.observar_consultas(observador)
+        banco.observar_consultas(observador)
+        banco.parar_de_observar(observador)
+        self.assertNotIn(observador, banco._observadores)
+
+
+if __name__ == "__main__":
+    unittest.main()
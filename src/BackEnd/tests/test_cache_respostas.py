@@ -0,0 +1,112 @@
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+import cache_respostas
+from cache_respostas import CacheMemoria, _chave, em_cache, invalidar
+
+
+class CacheMemoriaTest(unittest.TestCase):
+    def test_descarta_a_menos_usada_quando_enche(self):
+        cache = CacheMemoria(tamanho=2)
+        cache.gravar("rotas:/a", 60, "ea", b"a", "application/json")
+        cache.gravar("rotas:/b", 60, "eb", b"b", "application/json")
+        cache.obter("rotas:/a")
+        cache.gravar("rotas:/c", 60, "ec", b"c", "application/json")
+        self.assertIsNone(cache.obter("rotas:/b"))
+        self.assertEqual(cache.obter("rotas:/a"), ("ea", b"a", "application/json"))
+        self.assertIsNotNone(cache.obter("rotas:/c"))
+
+    def test_limpeza_apaga_expiradas_sem_leitura(self):
+        with mock.patch("cache_respostas.time.time", return_value=1000):
+            cache = CacheMemoria(tamanho=100, intervalo_limpeza=10)
+            cache.gravar("rotas:/velha", 5, "e", b"x", "application/json")
+        with mock.patch("cache_respostas.time.time", return_value=1020):
+            cache.gravar("rotas:/nova", 60, "e", b"y", "application/json")
+        self.assertEqual(list(cache._dados), ["rotas:/nova"])
+
+
+class ChaveTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def chave(self, url, parametros=None):
+        with self.app.test_request_context(url):
+            return _chave("rotas", parametros)
+
+    def test_query_fora_dos_parametros_nao_muda_a_chave(self):
+        self.assertEqual(self.chave("/api/rotas/listar?x=1&_=123"), self.chave("/api/rotas/listar"))
+
+    def test_parametros_normalizados(self):
+        parametros = {"lat": float, "lng": float, "raio": float}
+        self.assertEqual(self.chave("/proximas?lat=-8.280&lng=-35&lixo=1", parametros),
+                         self.chave("/proximas?lng=-35.0&lat=-8.28", parametros))
+        self.assertNotEqual(self.chave("/proximas?lat=1&lng=2&raio=abc", parametros),
+                            self.chave("/proximas?lat=1&lng=2", parametros))
+
+
+class InvalidacaoPorRotaTest(unittest.TestCase):
+    def setUp(self):
+        self.chamadas = []
+        self.app = Flask(__name__)
+
+        @self.app.route("/detalhes/<id_rota>")
+        @em_cache("rota:{id_rota}")
+        def detalhes(id_rota):
+            self.chamadas.append(id_rota)
+            return {"id": id_rota}
+
+        self.cliente = self.app.test_client()
+        self.cache = mock.patch.object(cache_respostas, "_cache", CacheMemoria())
+        self.cache.start()
+        self.addCleanup(self.cache.stop)
+
+    def test_invalida_so_a_rota_alterada(self):
+        for url in ("/detalhes/1", "/detalhes/12", "/detalhes/1", "/detalhes/12"):
+            self.cliente.get(url)
+        self.assertEqual(self.chamadas, ["1", "12"])
+
+        invalidar("rota:1")
+        self.cliente.get("/detalhes/1")
+        self.cliente.get("/detalhes/12")
+        self.assertEqual(self.chamadas, ["1", "12", "1"])
+
+        invalidar("rota")
+        self.cliente.get("/detalhes/12")
+        self.assertEqual(self.chamadas, ["1", "12", "1", "12"])
+
+
+class ComplementoTest(unittest.TestCase):
+    def setUp(self):
+        self.eta = None
+        self.app = Flask(__name__)
+
+        @self.app.route("/detalhes/<id_rota>")
+        @em_cache("rota:{id_rota}", complemento=lambda id_rota: {"eta": self.eta} if self.eta else None)
+        def detalhes(id_rota):
+            return {"id": id_rota, "eta": None}
+
+        self.cliente = self.app.test_client()
+        self.cache = mock.patch.object(cache_respostas, "_cache", CacheMemoria())
+        self.cache.start()
+        self.addCleanup(self.cache.stop)
+
+    def test_sem_complemento_devolve_o_corpo_do_cache(self):
+        primeira = self.cliente.get("/detalhes/1")
+        with mock.patch.object(cache_respostas, "_complementar") as complementar:
+            segunda = self.cliente.get("/detalhes/1")
+        complementar.assert_not_called()
+        self.assertEqual(segunda.get_json(), {"id": "1", "eta": None})
+        self.assertEqual(segunda.headers["ETag"], primeira.headers["ETag"])
+
+    def test_complemento_substitui_o_campo_e_o_etag(self):
+        primeira = self.cliente.get("/detalhes/1")
+        self.eta = {"minutos": 5}
+        segunda = self.cliente.get("/detalhes/1")
+        self.assertEqual(segunda.get_json(), {"id": "1", "eta": {"minutos": 5}})
+        self.assertNotEqual(segunda.headers["ETag"], primeira.headers["ETag"])
+
+
+if __name__ == "__main__":
+    unittest.main()
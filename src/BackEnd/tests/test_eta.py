@@ -0,0 +1,49 @@
+import unittest
+
+from eta import EstimadorViagem, GerenciadorEta, ModeloRota
+
+# Rota reta para o leste, paradas a cada ~1,1 km
+PARADAS = [{"name": f"P{i}", "latitude": -8.0, "longitude": -35.0 + i * 0.01} for i in range(5)]
+
+
+def modelo():
+    return ModeloRota(1, PARADAS)
+
+
+class GerenciadorEtaTest(unittest.TestCase):
+    def test_modelo_vencido_continua_em_uso_enquanto_recarrega(self):
+        gerenciador = GerenciadorEta(ttl_modelo=0)
+        self.assertTrue(gerenciador.precisa_carregar(1))
+        gerenciador.guardar_modelo(modelo())
+        # vencido: um só carregamento por vez, e o ETA sai do modelo antigo
+        self.assertTrue(gerenciador.precisa_carregar(1))
+        self.assertFalse(gerenciador.precisa_carregar(1))
+        self.assertIsNotNone(gerenciador.atualizar(1, 10, -8.0, -34.995, 1000))
+
+    def test_recarga_no_meio_da_viagem_mantem_progresso(self):
+        gerenciador = GerenciadorEta()
+        gerenciador.guardar_modelo(modelo())
+        for i, ts in enumerate(range(1000, 1400, 100)):
+            gerenciador.atualizar(1, 10, -8.0, -34.999 + i * 0.004, ts)
+        antes = gerenciador._estimadores[1]
+        proxima, fator = antes.proxima, antes.fator
+        self.assertGreater(proxima, 1)
+
+        gerenciador.guardar_modelo(modelo())
+        eta = gerenciador.atualizar(1, 10, -8.0, -34.999 + 3 * 0.004, 1300)  # mesma posição de novo
+        estimador = gerenciador._estimadores[1]
+        self.assertIs(estimador, antes)
+        self.assertEqual((estimador.proxima, estimador.fator), (proxima, fator))
+        self.assertEqual(eta["proxima_parada"], proxima + 1)
+        self.assertEqual(len(estimador.etas), len(PARADAS) - proxima)
+
+    def test_troca_para_modelo_com_menos_paradas(self):
+        estimador = EstimadorViagem(modelo(), 10)
+        estimador.atualizar(-8.0, -34.965, 1000)
+        estimador.trocar_modelo(ModeloRota(1, PARADAS[:3]))
+        self.assertLessEqual(estimador.proxima, 3)
+        estimador.resultado()
+
+
+if __name__ == "__main__":
+    unittest.main()
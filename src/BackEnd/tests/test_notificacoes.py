@@ -0,0 +1,19 @@
+import json
+import unittest
+
+from notificacoes import _formatar_envio
+from respostas_json import codificar
+
+
+class FormatarEnvioTest(unittest.TestCase):
+    def test_json_conferido_pelo_banco_vai_como_esta(self):
+        envio = _formatar_envio({"id": 1, "routes_json": "[1, 2]", "drivers_json": None, "json_valido": 1})
+        self.assertEqual(json.loads(codificar(envio)), {"id": 1, "routes": [1, 2], "drivers": []})
+
+    def test_texto_invalido_nao_corrompe_a_resposta(self):
+        envio = _formatar_envio({"id": 1, "routes_json": "[1, 2", "drivers_json": '[3]', "json_valido": 0})
+        self.assertEqual(json.loads(codificar(envio)), {"id": 1, "routes": [], "drivers": [3]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import rastreamento
+from rastreamento import Rastreamento, ViagemDeOutroMotorista, ViagemInvalida
+
+POSICAO = {"latitude": -8.0, "longitude": -35.0}
+
+
+class ViagensEmMemoriaTest(unittest.TestCase):
+    def setUp(self):
+        # viagem_id -> (rota_id, motorista_id) das viagens em andamento no "banco"
+        self.em_andamento = {1: (7, 3), 2: (8, 4)}
+        for nome, funcao in (("_buscar_viagem", self.em_andamento.get),
+                             ("_gravar_posicoes", lambda posicoes: None)):
+            patch = mock.patch.object(rastreamento, nome, funcao)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_viagem_encerrada_fora_deixa_de_aceitar_posicoes(self):
+        async def cenario():
+            rastreio = Rastreamento()
+            self.assertEqual(await rastreio.registrar(1, [POSICAO], 3), 1)
+            del self.em_andamento[1]  # encerrada pelo app Flask
+            with mock.patch.object(rastreamento, "TTL_VIAGEM", 0):
+                with self.assertRaises(ViagemInvalida):
+                    await rastreio.registrar(1, [POSICAO], 3)
+            self.assertNotIn(1, rastreio._viagens)
+            self.assertTrue(rastreio.canais[7].ultima["encerrada"])
+
+        asyncio.run(cenario())
+
+    def test_outro_motorista_e_limite_de_viagens(self):
+        async def cenario():
+            rastreio = Rastreamento()
+            with self.assertRaises(ViagemDeOutroMotorista):
+                await rastreio.registrar(1, [POSICAO], 4)
+            with mock.patch.object(rastreamento, "MAX_VIAGENS", 1):
+                await rastreio.registrar(2, [POSICAO], 4)
+            self.assertEqual(list(rastreio._viagens), [2])
+
+        asyncio.run(cenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest import mock
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+import senhas
+
+
+class FilaSemPoolTest(unittest.TestCase):
+    # Com UNIBUS_HASH_PROCESSOS=1 (padrão no gunicorn) a fila limitada também vale
+    def test_fila_cheia_responde_ocupado(self):
+        vagas = threading.BoundedSemaphore(1)
+        vagas.acquire()
+        with mock.patch.multiple(senhas, PROCESSOS_HASH=1, ESPERA_FILA=0.01, _vagas=vagas):
+            with self.assertRaises(senhas.HashOcupado):
+                senhas.gerar_hash("segredo")
+
+    def test_um_hash_por_vez_na_thread(self):
+        rodando, maximo = [0], [0]
+        trava = threading.Lock()
+
+        def gerar(senha):
+            with trava:
+                rodando[0] += 1
+                maximo[0] = max(maximo[0], rodando[0])
+            threading.Event().wait(0.02)
+            with trava:
+                rodando[0] -= 1
+            return senha
+
+        with mock.patch.multiple(senhas, PROCESSOS_HASH=1, _vagas=threading.BoundedSemaphore(8), gerar=gerar):
+            threads = [threading.Thread(target=senhas.gerar_hash, args=("s",)) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(maximo[0], 1)
+
+
+class MetodoHashTest(unittest.TestCase):
+    def test_formas_curtas_ganham_os_parametros_padrao(self):
+        self.assertEqual(senhas._normalizar_metodo("scrypt"), "scrypt:32768:8:1")
+        self.assertEqual(senhas._normalizar_metodo("scrypt:16384:8:1"), "scrypt:16384:8:1")
+        self.assertEqual(senhas._normalizar_metodo("pbkdf2"), f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}")
+        self.assertEqual(senhas._normalizar_metodo("pbkdf2:sha512"), f"pbkdf2:sha512:{DEFAULT_PBKDF2_ITERATIONS}")
+
+    def test_hash_gravado_com_o_metodo_atual_nao_precisa_rehash(self):
+        with mock.patch.object(senhas, "METODO_HASH", senhas._normalizar_metodo("pbkdf2:sha256:1000")):
+            self.assertFalse(senhas.precisa_rehash(senhas.gerar("segredo")))
+
+    def test_custo_diferente_precisa_rehash(self):
+        with mock.patch.object(senhas, "METODO_HASH", "pbkdf2:sha256:1000"):
+            gravado = senhas.gerar("segredo")
+        with mock.patch.object(senhas, "METODO_HASH", senhas._normalizar_metodo("pbkdf2:sha256:2000")):
+            self.assertTrue(senhas.precisa_rehash(gravado))
+
+    def test_metodo_invalido(self):
+        for metodo in ("md5", "scrypt:1", "pbkdf2:sha256:muitas"):
+            with self.assertRaises(ValueError):
+                senhas._normalizar_metodo(metodo)
+
+
+if __name__ == "__main__":
+    unittest.main()
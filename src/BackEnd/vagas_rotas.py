@@ -0,0 +1,140 @@
+import os
+
+# =====================================================
+# Vagas das rotas e lista de espera
+#
+# rotas.vagas_ocupadas é o contador de inscrições ativas. Ocupar uma vaga é um
+# UPDATE condicional (só passa se ainda houver lugar) e a linha da rota fica
+# travada até o commit, então inscrições concorrentes na mesma rota entram em
+# fila no banco em vez de disputar um SELECT seguido de INSERT.
+# A chave única uq_inscricoes_ativa impede duas inscrições ativas iguais.
+#
+# As funções recebem um cursor dentro de uma transação; quem chama faz o commit
+# (ou rollback, que desfaz também o contador).
+# =====================================================
+
+# Lugares de uma rota sem capacidade cadastrada
+CAPACIDADE_PADRAO = int(os.environ.get("UNIBUS_CAPACIDADE_PADRAO", "44"))
+
+
+# True se conseguiu um lugar (a linha da rota fica travada até o fim da transação)
+def ocupar_vaga(cursor, rota_id):
+    cursor.execute("""
+        UPDATE rotas SET vagas_ocupadas = vagas_ocupadas + 1
+        WHERE id = %s AND vagas_ocupadas < COALESCE(capacidade, %s)
+    """, (rota_id, CAPACIDADE_PADRAO))
+    return cursor.rowcount == 1
+
+
+def liberar_vaga(cursor, rota_id, quantidade=1):
+    cursor.execute("""
+        UPDATE rotas SET vagas_ocupadas = GREATEST(vagas_ocupadas - %s, 0)
+        WHERE id = %s
+    """, (quantidade, rota_id))
+
+
+# True se inseriu; False se o estudante já tinha inscrição ativa na rota
+def inserir_inscricao(cursor, estudante_id, rota_id):
+    # ON DUPLICATE KEY (e não INSERT IGNORE) para não esconder erro de chave estrangeira
+    cursor.execute("""
+        INSERT INTO inscricoes_rotas (estudante_id, rota_id)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE rota_id = rota_id
+    """, (estudante_id, rota_id))
+    return cursor.rowcount == 1
+
+
+def ja_inscrito(cursor, estudante_id, rota_id):
+    cursor.execute("""
+        SELECT 1 FROM inscricoes_rotas
+        WHERE estudante_id = %s AND rota_id = %s AND status = 'ativa'
+    """, (estudante_id, rota_id))
+    return cursor.fetchone() is not None
+
+
+# Trava a linha da rota; devolve True se ainda houver vaga, None se a rota não existe
+def travar_rota(cursor, rota_id):
+    cursor.execute("""
+        SELECT vagas_ocupadas < COALESCE(capacidade, %s) FROM rotas
+        WHERE id = %s
+        FOR UPDATE
+    """, (CAPACIDADE_PADRAO, rota_id))
+    linha = cursor.fetchone()
+    if linha is None:
+        return None
+    if isinstance(linha, dict):
+        linha = tuple(linha.values())
+    return bool(linha[0])
+
+
+# Entra na lista de espera (idempotente); devolve a posição na fila
+def entrar_na_espera(cursor, estudante_id, rota_id):
+    cursor.execute("""
+        INSERT IGNORE INTO inscricoes_espera (rota_id, estudante_id)
+        VALUES (%s, %s)
+    """, (rota_id, estudante_id))
+    return posicao_na_espera(cursor, estudante_id, rota_id)
+
+
+def posicao_na_espera(cursor, estudante_id, rota_id):
+    cursor.execute("""
+        SELECT COUNT(*) FROM inscricoes_espera w
+        JOIN inscricoes_espera eu ON eu.rota_id = w.rota_id AND eu.estudante_id = %s
+        WHERE w.rota_id = %s AND w.id <= eu.id
+    """, (estudante_id, rota_id))
+    linha = cursor.fetchone()
+    posicao = linha[0] if not isinstance(linha, dict) else list(linha.values())[0]
+    return posicao or None
+
+
+def sair_da_espera(cursor, estudante_id, rota_id):
+    cursor.execute(
+        "DELETE FROM inscricoes_espera WHERE rota_id = %s AND estudante_id = %s",
+        (rota_id, estudante_id)
+    )
+    return cursor.rowcount
+
+
+# Preenche as vagas livres da rota com a lista de espera, em ordem de chegada.
+# Devolve os estudantes promovidos.
+def promover_espera(cursor, rota_id):
+    promovidos = []
+    while True:
+        cursor.execute("""
+            SELECT w.id, w.estudante_id FROM inscricoes_espera w
+            WHERE w.rota_id = %s
+            ORDER BY w.id
+            LIMIT 1
+            FOR UPDATE
+        """, (rota_id,))
+        proximo = cursor.fetchone()
+        if not proximo:
+            break
+        if isinstance(proximo, dict):
+            proximo = (proximo["id"], proximo["estudante_id"])
+        espera_id, estudante_id = proximo
+
+        if not ocupar_vaga(cursor, rota_id):
+            break
+        cursor.execute("DELETE FROM inscricoes_espera WHERE id = %s", (espera_id,))
+        if inserir_inscricao(cursor, estudante_id, rota_id):
+            promovidos.append(estudante_id)
+        else:
+            liberar_vaga(cursor, rota_id)  # já estava inscrito: devolve o lugar
+    return promovidos
+
+
+# Recalcula o contador a partir das inscrições (usado após gravações em lote)
+def recontar_vagas(cursor, rota_ids):
+    rota_ids = list(rota_ids)
+    if not rota_ids:
+        return
+    marcadores = ','.join(['%s'] * len(rota_ids))
+    cursor.execute(f"""
+        UPDATE rotas r
+        SET vagas_ocupadas = (
+            SELECT COUNT(*) FROM inscricoes_rotas i
+            WHERE i.rota_id = r.id AND i.status = 'ativa'
+        )
+        WHERE r.id IN ({marcadores})
+    """, rota_ids)
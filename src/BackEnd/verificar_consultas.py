@@ -0,0 +1,111 @@
+# Confere o orçamento de consultas de cada endpoint (para o CI)
+#
+# Usa o mesmo banco semeado e o mesmo roteiro de explicar_consultas.py, com o
+# detector_consultas ligado, e sai com código 1 quando um endpoint com
+# @orcamento_consultas faz mais consultas que o declarado ou repete o mesmo
+# formato de consulta (N+1). Endpoints sem orçamento só aparecem com --todos.
+#   python verificar_consultas.py               -> banco novo + relatório
+#   python verificar_consultas.py --manter      -> reaproveita o banco já semeado
+#   python verificar_consultas.py --todos --mostrar-consultas
+import argparse
+import json
+import sys
+
+import banco
+import detector_consultas
+import senhas
+from banco import CONFIG_BANCO
+from dados_sinteticos import preparar_banco
+from explicar_consultas import BANCO_EXPLICAR, _amostra, roteiro, executar_roteiro
+
+
+def coletar(relatorios):
+    def guardar(metodo, regra, relatorio):
+        item = relatorios.setdefault((metodo, regra), {
+            "chamadas": 0, "max_consultas": 0, "orcamento": relatorio["orcamento"],
+            "declarado": relatorio["declarado"], "repetidas": {},
+        })
+        item["chamadas"] += 1
+        item["max_consultas"] = max(item["max_consultas"], relatorio["consultas"])
+        for texto, n in relatorio["repetidas"]:
+            item["repetidas"][texto] = max(n, item["repetidas"].get(texto, 0))
+    return guardar
+
+
+def sem_cobertura(app, relatorios):
+    vistos = {regra for _, regra in relatorios}
+    faltando = []
+    for regra in app.url_map.iter_rules():
+        view = app.view_functions.get(regra.endpoint)
+        if getattr(view, "orcamento_consultas", None) and regra.rule not in vistos:
+            faltando.append(regra.rule)
+    return sorted(faltando)
+
+
+def imprimir(relatorios, faltando, todos, saida=sys.stdout):
+    falhas = 0
+    print(f"{'endpoint':<62} {'chamadas':>8} {'consultas':>9} {'orçamento':>9}", file=saida)
+    for (metodo, regra), item in sorted(relatorios.items(), key=lambda r: (r[0][1], r[0][0])):
+        estourou = item["max_consultas"] > item["orcamento"]
+        falhou = item["declarado"] and (estourou or item["repetidas"])
+        falhas += bool(falhou)
+        if not (todos or falhou):
+            continue
+        orcamento = item["orcamento"] if item["declarado"] else "-"
+        marca = "  <- FALHOU" if falhou else ("  (aviso)" if estourou or item["repetidas"] else "")
+        print(f"{metodo + ' ' + regra:<62} {item['chamadas']:>8} {item['max_consultas']:>9} {orcamento:>9}{marca}",
+              file=saida)
+        for texto, n in item["repetidas"].items():
+            print(f"    N+1 ({n}x): {texto[:150]}", file=saida)
+
+    if faltando:
+        print("\nEndpoints com orçamento que o roteiro não chamou:", file=saida)
+        for regra in faltando:
+            print(f"  {regra}", file=saida)
+
+    declarados = sum(1 for item in relatorios.values() if item["declarado"])
+    print(f"\n{len(relatorios)} endpoints chamados, {declarados} com orçamento declarado, "
+          f"{falhas} fora do orçamento.", file=saida)
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manter", action="store_true", help="reaproveita o banco de diagnóstico já semeado")
+    parser.add_argument("--estudantes", type=int, default=None)
+    parser.add_argument("--rotas", type=int, default=None)
+    parser.add_argument("--todos", action="store_true", help="lista também os endpoints sem orçamento")
+    parser.add_argument("--mostrar-consultas", action="store_true", help="loga as consultas de cada requisição")
+    parser.add_argument("--json", help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    tamanhos = {k: v for k, v in (("estudantes", args.estudantes), ("rotas", args.rotas)) if v}
+    senhas.PROCESSOS_HASH = 1
+
+    conn, _ = preparar_banco(BANCO_EXPLICAR, not args.manter, tamanhos)
+    relatorios = {}
+    try:
+        amostra = _amostra(conn)
+        CONFIG_BANCO["database"] = BANCO_EXPLICAR
+        # O detector precisa estar ligado antes de o app registrar os ganchos
+        detector_consultas.ATIVO = True
+        detector_consultas.LOGAR_CONSULTAS = args.mostrar_consultas
+        detector_consultas.ouvir_relatorios(coletar(relatorios))
+        from app import app
+
+        executar_roteiro(app.test_client(), roteiro(amostra), [], sys.stdout)
+        faltando = sem_cobertura(app, relatorios)
+    finally:
+        conn.close()
+        banco.obter_pool().fechar_todas()
+
+    falhas = imprimir(relatorios, faltando, args.todos)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([dict(item, metodo=metodo, regra=regra) for (metodo, regra), item in relatorios.items()],
+                      f, ensure_ascii=False, indent=2)
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
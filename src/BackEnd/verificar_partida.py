@@ -0,0 +1,108 @@
+# Tempo de partida do app por conjunto de blueprints (para o CI)
+#
+# Para cada conjunto de app.CONJUNTOS sobe um interpretador novo com
+# -X importtime, cria o app com criar_app(conjunto) e mede o tempo até o app
+# ficar pronto (mediana de --repeticoes partidas). Compara com
+# orcamento_partida.json e sai com código 1 se algum conjunto passar do
+# orçamento ou importar um módulo proibido (ex.: numpy, que só deve ser
+# importado pelas rotas que usam).
+#   python verificar_partida.py                        -> confere o orçamento
+#   python verificar_partida.py --relatorio 15         -> mostra os 15 imports mais caros
+#   python verificar_partida.py --gravar               -> regrava medido_ms/max_ms com a medição desta máquina
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+
+from app import CONJUNTOS
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_ORCAMENTO = os.path.join(DIRETORIO, "orcamento_partida.json")
+FOLGA = 0.5  # max_ms = medido_ms * (1 + FOLGA) ao regravar
+
+CODIGO = """
+import time
+inicio = time.perf_counter()
+from app import criar_app
+criar_app({conjunto!r})
+print(round((time.perf_counter() - inicio) * 1000, 1))
+"""
+
+
+def partida(conjunto):
+    ambiente = dict(os.environ, UNIBUS_SEGREDO=os.environ.get("UNIBUS_SEGREDO") or "verificar-partida")
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", CODIGO.format(conjunto=conjunto)],
+                              cwd=DIRETORIO, env=ambiente, capture_output=True, text=True, check=True)
+    return float(processo.stdout.strip().splitlines()[-1]), _ler_importtime(processo.stderr)
+
+
+# -X importtime: "import time: <próprio us> | <acumulado us> | <indentação><módulo>"
+def _ler_importtime(texto):
+    modulos = {}
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos[nome.strip()] = {"proprio_ms": int(proprio) / 1000, "acumulado_ms": int(acumulado) / 1000,
+                                 "nivel": (len(nome) - len(nome.lstrip()) - 1) // 2}
+    return modulos
+
+
+def medir(conjunto, repeticoes):
+    tempos, modulos = [], {}
+    for _ in range(repeticoes):
+        ms, modulos = partida(conjunto)
+        tempos.append(ms)
+    return statistics.median(tempos), modulos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conjuntos", nargs="+", default=list(CONJUNTOS), choices=list(CONJUNTOS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--relatorio", type=int, default=0, metavar="N",
+                        help="lista os N imports mais caros de cada conjunto")
+    parser.add_argument("--gravar", action="store_true", help="regrava o orçamento com a medição atual")
+    args = parser.parse_args()
+
+    with open(ARQUIVO_ORCAMENTO, encoding="utf-8") as f:
+        orcamento = json.load(f)
+
+    falhas = []
+    print(f"{'conjunto':<15} {'partida ms':>10} {'orçamento':>10} {'módulos':>8}")
+    for conjunto in args.conjuntos:
+        ms, modulos = medir(conjunto, args.repeticoes)
+        regra = orcamento.setdefault(conjunto, {"proibidos": ["numpy", "openpyxl"]})
+        limite = regra.get("max_ms")
+        print(f"{conjunto:<15} {ms:>10.1f} {limite or '-':>10} {len(modulos):>8}")
+
+        if args.relatorio:
+            # imports do próprio app e dos blueprints (nível 0) e o que cada um puxa (nível 1)
+            topo = sorted((m for m in modulos.items() if m[1]["nivel"] <= 1), key=lambda m: -m[1]["acumulado_ms"])
+            for nome, dados in topo[:args.relatorio]:
+                print(f"    {dados['acumulado_ms']:8.1f} ms  {'  ' * dados['nivel']}{nome}")
+
+        proibidos = [nome for nome in regra.get("proibidos", []) if nome in modulos]
+        if proibidos:
+            falhas.append(f"{conjunto}: importa {', '.join(proibidos)} na partida")
+        if args.gravar:
+            regra["medido_ms"] = round(ms, 1)
+            regra["max_ms"] = math.ceil(ms * (1 + FOLGA))
+        elif limite and ms > limite:
+            falhas.append(f"{conjunto}: partida de {ms:.1f} ms passou do orçamento de {limite} ms")
+
+    if args.gravar:
+        with open(ARQUIVO_ORCAMENTO, "w", encoding="utf-8") as f:
+            json.dump(orcamento, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nOrçamento regravado em {os.path.basename(ARQUIVO_ORCAMENTO)}.")
+    for falha in falhas:
+        print(f"  ! {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Ponto de entrada WSGI para produção
+#
+#   gunicorn -c gunicorn.conf.py          (configuração em gunicorn.conf.py)
+#
+# O app.run(debug=True) de app.py continua sendo o servidor de desenvolvimento.
+# Aqui os workers da fila de notificações não são iniciados no import: com
+# preload_app o app é importado no processo mestre, e threads não sobrevivem
+# ao fork; gunicorn.conf.py inicia os workers em cada processo.
+# UNIBUS_BLUEPRINTS escolhe o que este deploy atende (ver CONJUNTOS em app.py);
+# os módulos pesados dos blueprints escolhidos já são importados aqui, no mestre.
+from app import criar_app
+
+app = criar_app(preaquecer=True)
+application = app
@@ -23,7 +23,7 @@ import {
   Phone,
   Car,
 } from "lucide-react-native";
-import { API_URL } from "../../BackEnd/IPconfig";
+import { API_URL, RASTREIO_WS_URL } from "../../BackEnd/IPconfig";
 
 type Stop = {
   id: number;
@@ -47,6 +47,12 @@ type RouteData = {
   pontos_parada: Stop[];
   destino_escola?: { nome: string; latitude: number; longitude: number };
   observacoes?: string;
+  eta?: EtaRota | null;
+};
+
+type EtaRota = {
+  proxima_parada: number | null;
+  paradas: { name: string; passou: boolean; eta_segundos?: number }[];
 };
 
 const DetalhesRotas = () => {
@@ -60,6 +66,37 @@ const DetalhesRotas = () => {
     latitudeDelta: 0.03,
     longitudeDelta: 0.03,
   });
+  const [busPosition, setBusPosition] = useState<{ latitude: number; longitude: number } | null>(null);
+  const [eta, setEta] = useState<EtaRota | null>(null);
+
+  // Minutos previstos até a parada (pelo nome), ou null se não houver previsão
+  const etaDaParada = (nome: string) => {
+    const parada = eta?.paradas.find((p) => p.name === nome);
+    if (!parada || parada.passou || parada.eta_segundos == null) return null;
+    return Math.max(1, Math.round(parada.eta_segundos / 60));
+  };
+
+  // Posição do ônibus em tempo real (WebSocket do servidor de rastreamento)
+  useEffect(() => {
+    if (!routeId) return;
+    const ws = new WebSocket(`${RASTREIO_WS_URL}/api/rotas/${routeId}/posicoes/ws`);
+    ws.onmessage = (event) => {
+      try {
+        const pos = JSON.parse(event.data);
+        if (pos.encerrada) {
+          setBusPosition(null);
+          setEta(null);
+        } else {
+          setBusPosition({ latitude: pos.latitude, longitude: pos.longitude });
+          if (pos.eta) setEta(pos.eta);
+        }
+      } catch (err) {
+        console.log("Posição inválida:", err);
+      }
+    };
+    ws.onerror = (err) => console.log("Rastreamento indisponível:", err);
+    return () => ws.close();
+  }, [routeId]);
 
   useEffect(() => {
     const fetchRouteDetails = async () => {
@@ -69,9 +106,11 @@ const DetalhesRotas = () => {
         const estudante = stored ? JSON.parse(stored) : null;
         if (!estudante) return;
 
-        const res = await fetch(
-          `${API_URL}/api/rotas/detalhes/${routeId}/${estudante.id}`
-        );
+        // Com token o servidor sabe quem é o estudante (id fora da URL)
+        if (!estudante.token) return router.replace("../index");
+        const res = await fetch(`${API_URL}/api/rotas/detalhes/${routeId}`, {
+          headers: { Authorization: `Bearer ${estudante.token}` },
+        });
         if (!res.ok) throw new Error("Rota não encontrada");
         const data: RouteData = await res.json();
 
@@ -105,6 +144,7 @@ const DetalhesRotas = () => {
         }
 
         setRouteData({ ...data, pontos_parada: stops });
+        if (data.eta) setEta(data.eta);
 
         // Ajusta região do mapa para englobar todos os pontos
         if (stops.length > 0) {
@@ -203,6 +243,9 @@ const DetalhesRotas = () => {
               }
             />
           ))}
+          {busPosition && (
+            <Marker coordinate={busPosition} title="Ônibus" pinColor="blue" />
+          )}
           {routeData.pontos_parada.length > 1 && (
             <Polyline
               coordinates={routeData.pontos_parada.map((s) => ({
@@ -236,6 +279,9 @@ const DetalhesRotas = () => {
               </View>
               <View style={{ flex: 1 }}>
                 <Text style={styles.stopName}>{stop.name}</Text>
+                {etaDaParada(stop.name) !== null && (
+                  <Text style={styles.stopTime}>Chega em ~{etaDaParada(stop.name)} min</Text>
+                )}
               </View>
               <Text style={styles.stopBadge}>
                 {stop.type === "origin"
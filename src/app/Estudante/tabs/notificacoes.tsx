@@ -188,6 +188,10 @@ export default function NotificationsScreen() {
   const [filter, setFilter] = useState("Todos");
 
   const [usuarioId, setUsuarioId] = useState<number | null>(null);
+  const [token, setToken] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [unreadCount, setUnreadCount] = useState(0);
 
    // 🔒 Bloqueia botão voltar do Android
   useEffect(() => {
@@ -215,6 +219,7 @@ export default function NotificationsScreen() {
         const parsed = JSON.parse(user);
         const id = parsed.profile_id || parsed.id;
         if (!id) return;
+        setToken(parsed.token || null);
         setUsuarioId(id);
       } catch (error) {
         console.error("Erro ao carregar usuário logado", error);
@@ -223,29 +228,47 @@ export default function NotificationsScreen() {
     loadUserId();
   }, []);
 
-  const unreadCount = notifications.filter((n) => !n.lida).length;
+  const mapNotification = (n: any): Notification => ({
+    id: n.id,
+    titulo: n.titulo,
+    mensagem: n.mensagem,
+    prioridade: n.prioridade,
+    destinatario_tipo: n.destinatario_tipo,
+    remetente_tipo: n.remetente_tipo,
+    tipo: n.tipo,
+    created_at: n.created_at,
+    lida: n.lida,
+  });
+
+  // Com token o servidor sabe quem é o usuário; sem token (sessão antiga) vai o id na URL
+  const caminhoUsuario = (rota: string) =>
+    token ? `${API_URL}/api/notificacoes/${rota}` : `${API_URL}/api/notificacoes/${rota}/${usuarioId}`;
+  const authHeaders = (): Record<string, string> => (token ? { Authorization: `Bearer ${token}` } : {});
+
+  const fetchUnreadCount = async () => {
+    if (!usuarioId) return;
+    try {
+      const res = await fetch(caminhoUsuario("nao_lidas"), { headers: authHeaders() });
+      const json = await res.json();
+      setUnreadCount(json.nao_lidas ?? 0);
+    } catch (error) {
+      console.error(error);
+    }
+  };
 
-  const fetchNotifications = async () => {
+  // Primeira página (cursor vazio) ou próxima página (cursor do header X-Proximo-Cursor)
+  const fetchNotifications = async (cursor: string | null = null) => {
     if (!usuarioId) return;
     try {
-      const res = await fetch(`${API_URL}/api/notificacoes/listar/${usuarioId}`);
+      const query = cursor ? `?limite=30&cursor=${encodeURIComponent(cursor)}` : "?limite=30";
+      const res = await fetch(`${caminhoUsuario("listar")}${query}`, { headers: authHeaders() });
       const data = await res.json();
 
       // Mapeia para Notification, garantindo os campos corretos
-      const mapped = data.map((n: any) => ({
-        id: n.id,
-        titulo: n.titulo,
-        mensagem: n.mensagem,
-        prioridade: n.prioridade,
-        destinatario_tipo: n.destinatario_tipo,
-        remetente_tipo: n.remetente_tipo,
-        tipo: n.tipo,
-        created_at: n.created_at,
-        lida: n.lida,
-      }));
-
+      const mapped = data.map(mapNotification);
 
-      setNotifications(mapped);
+      setNotifications((prev) => (cursor ? [...prev, ...mapped] : mapped));
+      setNextCursor(res.headers.get("X-Proximo-Cursor"));
 
     } catch (error) {
       console.error(error);
@@ -253,14 +276,25 @@ export default function NotificationsScreen() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchNotifications(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleConfirmRead = async (id: number) => {
     try {
-      const res = await fetch(`${API_URL}/api/notificacoes/marcar_lida/${id}`, { method: "PUT" });
+      const res = await fetch(`${API_URL}/api/notificacoes/marcar_lida/${id}`, {
+        method: "PUT",
+        headers: authHeaders(),
+      });
       const json = await res.json();
       if (json.success) {
         setNotifications((prev) =>
           prev.map((n) => (n.id === id ? { ...n, lida: true } : n))
         );
+        setUnreadCount((c) => Math.max(0, c - 1));
       }
     } catch (error) {
       console.error(error);
@@ -286,6 +320,7 @@ export default function NotificationsScreen() {
   useEffect(() => {
     if (!usuarioId) return;
     fetchNotifications();
+    fetchUnreadCount();
     if (Platform.OS === 'android') {
       NavigationBar.setVisibilityAsync('hidden');
       NavigationBar.setBehaviorAsync('overlay-swipe');
@@ -308,6 +343,8 @@ export default function NotificationsScreen() {
           renderItem={({ item }) => <NotificationCard item={item} onConfirm={handleConfirmRead} />}
           contentContainerStyle={{ paddingHorizontal: 14, paddingTop: 8, paddingBottom: 0 }}
           showsVerticalScrollIndicator={false}
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
         />
       </View>
     </View>
@@ -47,7 +47,7 @@ export default function MainRoutesScreen() {
   const router = useRouter();
   const logo = require("../../../../assets/images/Logo_App.png");
 
-  const [estudante, setEstudante] = useState<{ id: string; nome_completo: string } | null>(null);
+  const [estudante, setEstudante] = useState<{ id: string; nome_completo: string; token?: string } | null>(null);
   const [searchQuery, setSearchQuery] = useState("");
   const [selectedFilter, setSelectedFilter] = useState<"all" | "subscribed">("all");
   const [routes, setRoutes] = useState<RouteItem[]>([]);
@@ -88,17 +88,20 @@ export default function MainRoutesScreen() {
     async function fetchRoutes() {
       if (!estudante) return;
       try {
-        // Buscar todas as rotas
-        const resRoutes = await fetch(`${API_URL}/api/rotas/listar`);
-        const data = await resRoutes.json();
-
-        // Buscar rotas em que o estudante já está inscrito
-        const resInscritos = await fetch(`${API_URL}/inscricaoEstudante/listar_rotas_estudante/${estudante.id}`);
-        const inscritosData = await resInscritos.json();
-        const inscritosIds = inscritosData.map((r: any) => r.id);
+        // Rotas, inscrições e escola numa requisição só (estudante vem do token)
+        const res = estudante.token
+          ? await fetch(`${API_URL}/api/estudantes/dashboard`, { headers: authHeaders() })
+          : await fetch(`${API_URL}/api/estudantes/${estudante.id}/dashboard`);
+        if (res.status === 401) {
+          // Sessão expirada: volta para o login
+          await AsyncStorage.removeItem("estudante");
+          router.replace("../index");
+          return;
+        }
+        const data = await res.json();
 
         // Mapear rotas e marcar se está inscrito
-        const mappedRoutes: RouteItem[] = data.map((r: any) => ({
+        const mappedRoutes: RouteItem[] = (data.rotas || []).map((r: any) => ({
           id: r.id,
           routeName: r.nome_rota,
           driver: r.motorista_nome,
@@ -108,31 +111,18 @@ export default function MainRoutesScreen() {
           arrivalTime: r.horario_chegada_escola || "--:--",
           returnDeparture: r.horario_saida_escola || "--:--",
           returnArrival: r.horario_chegada_casa || "--:--",
-          subscribed: inscritosIds.includes(r.id),
+          subscribed: !!r.inscrito,
         }));
 
         setRoutes(mappedRoutes);
 
         // Header da escola
         if (mappedRoutes.length > 0) {
-          try {
-            const primeiraRotaId = mappedRoutes[0].id;
-            const res = await fetch(`${API_URL}/api/rotas/detalhes/${primeiraRotaId}/${estudante.id}`);
-            const data = await res.json();
-            const schoolName = data.destino_escola?.nome || "Escola Desconhecida";
-            setSchoolInfo({
-              name: schoolName,
-              totalRoutes: mappedRoutes.length,
-              openRoutes: mappedRoutes.filter(r => r.subscribed).length,
-            });
-          } catch (err) {
-            console.log("Erro ao buscar escola do estudante:", err);
-            setSchoolInfo({
-              name: "Escola Desconhecida",
-              totalRoutes: mappedRoutes.length,
-              openRoutes: mappedRoutes.filter(r => r.subscribed).length,
-            });
-          }
+          setSchoolInfo({
+            name: data.escola?.nome || "Escola Desconhecida",
+            totalRoutes: mappedRoutes.length,
+            openRoutes: mappedRoutes.filter(r => r.subscribed).length,
+          });
         }
       } catch (err) {
         console.log("Erro ao buscar rotas:", err);
@@ -161,6 +151,11 @@ export default function MainRoutesScreen() {
     });
   }, [routes, searchQuery, selectedFilter]);
 
+  // Token da sessão (login); o servidor usa o estudante do token
+  function authHeaders(): Record<string, string> {
+    return estudante?.token ? { Authorization: `Bearer ${estudante.token}` } : {};
+  }
+
   // Inscrição / remoção de rota (toggle)
   async function handleSubscribeRoute(routeId: string) {
     if (!estudante) return;
@@ -171,7 +166,7 @@ export default function MainRoutesScreen() {
       if (!route.subscribed) {
         const response = await fetch(`${API_URL}/inscricaoEstudante/inscrever`, {
           method: "POST",
-          headers: { "Content-Type": "application/json" },
+          headers: { "Content-Type": "application/json", ...authHeaders() },
           body: JSON.stringify({ estudante_id: estudante.id, rota_id: routeId }),
         });
         if (!response.ok) {
@@ -182,7 +177,7 @@ export default function MainRoutesScreen() {
       } else {
         const response = await fetch(`${API_URL}/inscricaoEstudante/remover?estudante_id=${estudante.id}&rota_id=${routeId}`, {
           method: "DELETE",
-          headers: { "Content-Type": "application/json" },
+          headers: { "Content-Type": "application/json", ...authHeaders() },
         });
         if (!response.ok) {
           const data = await response.json();
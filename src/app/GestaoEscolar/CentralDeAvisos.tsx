@@ -20,6 +20,7 @@ import MaterialIcons from "react-native-vector-icons/MaterialIcons";
 import FontAwesome5 from "react-native-vector-icons/FontAwesome5";
 import Ionicons from "react-native-vector-icons/Ionicons";
 import { API_URL } from "../../BackEnd/IPconfig";
+import AsyncStorage from "@react-native-async-storage/async-storage";
 
 type Tab = "send" | "history";
 type Recipient = "Todos" | "Estudantes" | "Motoristas";
@@ -59,6 +60,7 @@ export default function AdminNoticesScreen() {
   const [routes, setRoutes] = useState<RouteItem[]>([]);
   const [drivers, setDrivers] = useState<DriverItem[]>([]);
   const [enviosHistory, setEnviosHistory] = useState<EnviosItem[]>([]);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
 
   // modals
   type ModalKind = "route" | "driver" | "priority" | "noticeType" | null;
@@ -85,6 +87,13 @@ export default function AdminNoticesScreen() {
 
 
 
+  // Token da sessão da gestão (salvo no login): histórico e envio pedem login
+  async function authHeaders(): Promise<Record<string, string>> {
+    const sessao = await AsyncStorage.getItem("gestao");
+    const token = sessao ? JSON.parse(sessao).token : null;
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  }
+
   // fetch rotas
   async function fetchRoutes() {
     try {
@@ -113,13 +122,17 @@ export default function AdminNoticesScreen() {
     }
   }
 
-  // fetch history (envios)
-  async function fetchHistory() {
+  // fetch history (envios) — primeira página ou próxima (cursor do header X-Proximo-Cursor)
+  async function fetchHistory(cursor: string | null = null) {
     try {
-      setLoadingHistory(true);
-      const res = await fetch(`${API_URL}/api/notificacoes/historico`);
+      if (!cursor) setLoadingHistory(true);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const res = await fetch(`${API_URL}/api/notificacoes/historico${query}`, {
+        headers: await authHeaders(),
+      });
       const data = await res.json();
-      setEnviosHistory(data || []);
+      setEnviosHistory((prev) => (cursor ? [...prev, ...(data || [])] : data || []));
+      setHistoryCursor(res.headers.get("X-Proximo-Cursor"));
     } catch (err) {
       console.error("Erro historico:", err);
     } finally {
@@ -238,14 +251,18 @@ export default function AdminNoticesScreen() {
 
     const res = await fetch(`${API_URL}/api/notificacoes/enviar`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...(await authHeaders()) },
       body: JSON.stringify(body)
     });
 
     const data = await res.json();
 
     if (data && data.success) {
-      Alert.alert('Sucesso', `Notificação enviada para ${data.totalRecipients} destinatários.`);
+      if (data.status === 'queued') {
+        Alert.alert('Sucesso', 'Notificação enfileirada. Os destinatários receberão em instantes.');
+      } else {
+        Alert.alert('Sucesso', `Notificação enviada para ${data.totalRecipients} destinatários.`);
+      }
       
       // limpa form
       setTitle('');
@@ -600,7 +617,7 @@ export default function AdminNoticesScreen() {
             <View style={styles.filtersRow}>
               <Text style={{ fontWeight: "700" }}>Filtrar histórico</Text>
               <TouchableOpacity
-                onPress={fetchHistory}
+                onPress={() => fetchHistory()}
                 style={{ paddingHorizontal: 8 }}
               >
                 <MaterialIcons name="refresh" size={20} color="#333" />
@@ -630,7 +647,7 @@ export default function AdminNoticesScreen() {
                 onPress={() => setFilter("priority")}
               />
               <TouchableOpacity
-                onPress={fetchHistory}
+                onPress={() => fetchHistory()}
                 style={{ paddingHorizontal: 8 }}
               >
                 <MaterialIcons name="refresh" size={20} color="#333" />
@@ -665,6 +682,8 @@ export default function AdminNoticesScreen() {
                 data={filteredHistory}
                 keyExtractor={(i) => i.id.toString()}
                 contentContainerStyle={{ paddingBottom: 24 }}
+                onEndReached={() => historyCursor && fetchHistory(historyCursor)}
+                onEndReachedThreshold={0.5}
                 renderItem={({ item }) => (
                   <View style={styles.historyCard}>
                     <View style={styles.historyHeader}>
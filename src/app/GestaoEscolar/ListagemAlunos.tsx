@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import {
   View,
   Text,
@@ -13,6 +13,24 @@ import * as Sharing from "expo-sharing";
 import XLSX from "xlsx";
 import { Ionicons } from "@expo/vector-icons";
 import { useRouter } from "expo-router";
+import { API_URL } from "../../BackEnd/IPconfig";
+import AsyncStorage from "@react-native-async-storage/async-storage";
+
+// Token da sessão da gestão (salvo no login): as rotas de gestão pedem login
+async function authHeaders(): Promise<Record<string, string>> {
+  const sessao = await AsyncStorage.getItem("gestao");
+  const token = sessao ? JSON.parse(sessao).token : null;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}
+
+type Aluno = {
+  id: string;
+  nome: string;
+  matricula: string;
+  turma: string;
+  responsavel: string;
+  telefone: string;
+};
 
 export default function ListagemAlunos() {
   const router = useRouter();
@@ -32,33 +50,53 @@ export default function ListagemAlunos() {
     { id: 4, nome: "Sesi", horario: "07:10" },
   ];
 
-  const alunos = [
-    { id: 1, nome: "Ana Maria Silva", matricula: "2024001", turma: "1º A", responsavel: "Maria Silva", telefone: "(87) 99999-0001", ponto: pontosRota[0].nome },
-    { id: 2, nome: "João Pedro Santos", matricula: "2024002", turma: "1º A", responsavel: "Pedro Santos", telefone: "(87) 99999-0002", ponto: pontosRota[1].nome },
-    { id: 3, nome: "Maria Eduarda Lima", matricula: "2024003", turma: "1º B", responsavel: "Eduardo Lima", telefone: "(87) 99999-0003", ponto: pontosRota[0].nome },
-    { id: 4, nome: "Carlos Eduardo", matricula: "2024004", turma: "2º A", responsavel: "Carlos Oliveira", telefone: "(87) 99999-0004", ponto: pontosRota[2].nome },
-    { id: 5, nome: "Beatriz Ferreira", matricula: "2024005", turma: "2º A", responsavel: "Ferreira Costa", telefone: "(87) 99999-0005", ponto: pontosRota[1].nome },
-    { id: 6, nome: "Lucas Gabriel", matricula: "2024006", turma: "3º A", responsavel: "Gabriel Ferreira", telefone: "(87) 99999-0006", ponto: pontosRota[3].nome },
-  ];
+  const [alunos, setAlunos] = useState<Aluno[]>([]);
+  const [proximoCursor, setProximoCursor] = useState<string | null>(null);
 
   const turmas = ["1º A", "1º B", "2º A", "3º A"];
 
-  // Filtrar alunos
-  const alunosFiltrados = alunos.filter((aluno) => {
-    const matchSearch =
-      aluno.nome.toLowerCase().includes(search.toLowerCase()) ||
-      aluno.matricula.includes(search);
+  // Busca no servidor (nome sem acento/caixa, matrícula exata, turma, paginado)
+  const buscarAlunos = async (cursor?: string) => {
+    try {
+      const params = new URLSearchParams({ limite: "30" });
+      const termo = search.trim();
+      if (/^\d+$/.test(termo)) params.append("matricula", termo);
+      else if (termo) params.append("q", termo);
+      if (turmaSelecionada !== "all") params.append("turma", turmaSelecionada);
+      if (cursor) params.append("cursor", cursor);
+
+      const res = await fetch(`${API_URL}/api/estudantes/buscar?${params}`, {
+        headers: await authHeaders(),
+      });
+      if (!res.ok) throw new Error("Erro ao buscar alunos");
+      const data = await res.json();
+      const pagina: Aluno[] = data.map((e: any) => ({
+        id: e.id,
+        nome: e.nome_completo,
+        matricula: e.numero_matricula,
+        turma: e.turma,
+        responsavel: e.nome_responsavel,
+        telefone: e.numero_responsavel,
+      }));
+      setAlunos((atuais) => (cursor ? [...atuais, ...pagina] : pagina));
+      setProximoCursor(res.headers.get("X-Proximo-Cursor"));
+    } catch (error) {
+      console.error(error);
+    }
+  };
 
-    const matchTurma =
-      turmaSelecionada === "all" || aluno.turma === turmaSelecionada;
+  // Espera o usuário parar de digitar antes de buscar
+  useEffect(() => {
+    const timer = setTimeout(() => buscarAlunos(), 300);
+    return () => clearTimeout(timer);
+  }, [search, turmaSelecionada]);
 
-    return matchSearch && matchTurma;
-  });
+  const alunosFiltrados = alunos;
 
   // Exportar Excel
   const exportarExcel = async () => {
     try {
-      const dadosExportar = alunosFiltrados.map(({ ponto, ...rest }) => rest);
+      const dadosExportar = alunosFiltrados;
 
       const ws = XLSX.utils.json_to_sheet(dadosExportar);
       const wb = XLSX.utils.book_new();
@@ -180,12 +218,11 @@ export default function ListagemAlunos() {
                   turmaSelecionada === "all" && styles.filterTextActive,
                 ]}
               >
-                Todas ({alunos.length})
+                Todas
               </Text>
             </TouchableOpacity>
 
             {turmas.map((turma) => {
-              const count = alunos.filter((a) => a.turma === turma).length;
               return (
                 <TouchableOpacity
                   key={turma}
@@ -201,7 +238,7 @@ export default function ListagemAlunos() {
                       turmaSelecionada === turma && styles.filterTextActive,
                     ]}
                   >
-                    {turma} ({count})
+                    {turma}
                   </Text>
                 </TouchableOpacity>
               );
@@ -245,15 +282,20 @@ export default function ListagemAlunos() {
                   <Text style={styles.infoLabel}>Telefone</Text>
                   <Text style={styles.infoValue}>{aluno.telefone}</Text>
                 </View>
-                <View style={styles.infoBlock}>
-                  <Text style={styles.infoLabel}>Ponto</Text>
-                  <Text style={styles.infoValue}>{aluno.ponto}</Text>
-                </View>
               </View>
             </View>
           ))
         )}
 
+        {proximoCursor && (
+          <TouchableOpacity
+            style={styles.filterButton}
+            onPress={() => buscarAlunos(proximoCursor)}
+          >
+            <Text style={styles.filterText}>Carregar mais</Text>
+          </TouchableOpacity>
+        )}
+
         {/* Espaço antes do botão exportar */}
         <View style={{ height: 24 }} />
 
@@ -14,6 +14,14 @@ import { useRouter } from "expo-router";
 import { Ionicons } from "@expo/vector-icons";
 import MapView, { Marker, Polyline, LongPressEvent } from "react-native-maps";
 import { API_URL } from "../../BackEnd/IPconfig";
+import AsyncStorage from "@react-native-async-storage/async-storage";
+
+// Token da sessão da gestão (salvo no login): as rotas de gestão pedem login
+async function authHeaders(): Promise<Record<string, string>> {
+  const sessao = await AsyncStorage.getItem("gestao");
+  const token = sessao ? JSON.parse(sessao).token : null;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}
 
 type Ponto = {
   name: string;
@@ -94,7 +102,7 @@ export default function CadastroRota() {
     try {
       const res = await fetch(`${API_URL}/api/rotas/cadastrar`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", ...(await authHeaders()) },
         body: JSON.stringify({
           nome_rota: rota.nome,
           numero_onibus: rota.numeroOnibus,
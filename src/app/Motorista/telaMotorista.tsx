@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
   View,
   Text,
@@ -10,8 +10,10 @@ import {
 } from "react-native";
 import { Ionicons } from "@expo/vector-icons";
 import { createBottomTabNavigator } from "@react-navigation/bottom-tabs";
-import { API_URL } from "../../BackEnd/IPconfig";
+import * as Location from "expo-location";
+import { API_URL, RASTREIO_URL } from "../../BackEnd/IPconfig";
 import { useRouter } from 'expo-router';
+import AsyncStorage from "@react-native-async-storage/async-storage";
 
 // IMPORTANDO A NOVA TELA
 import MotoristaAvisosScreen from "./motoristaAviso"; // ajuste o caminho conforme a pasta
@@ -56,15 +58,55 @@ function MinhasRotasScreen() {
     },
   ];
 
+  // Envio contínuo da posição do ônibus durante a viagem
+  const watcherRef = useRef<Location.LocationSubscription | null>(null);
+
+  useEffect(() => {
+    return () => watcherRef.current?.remove();
+  }, []);
+
+  const transmitirPosicao = async (viagemId: number, token: string | null) => {
+    const { status } = await Location.requestForegroundPermissionsAsync();
+    if (status !== "granted") {
+      Alert.alert("Permissão negada", "Sem a localização os estudantes não verão o ônibus.");
+      return;
+    }
+    watcherRef.current?.remove();
+    watcherRef.current = await Location.watchPositionAsync(
+      { accuracy: Location.Accuracy.High, timeInterval: 3000, distanceInterval: 10 },
+      (loc) => {
+        fetch(`${RASTREIO_URL}/api/viagens/${viagemId}/posicoes`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
+          body: JSON.stringify({
+            latitude: loc.coords.latitude,
+            longitude: loc.coords.longitude,
+            velocidade: loc.coords.speed,
+            direcao: loc.coords.heading,
+            timestamp: loc.timestamp,
+          }),
+        }).catch((err) => console.log("Erro ao enviar posição:", err));
+      }
+    );
+  };
+
+  // Token da sessão do motorista (salvo no login): a viagem fica no nome dele
+  const tokenMotorista = async () => {
+    const sessao = await AsyncStorage.getItem("motorista");
+    return sessao ? JSON.parse(sessao).token : null;
+  };
+
   const iniciarRota = async (rotaId: number) => {
     try {
+      const token = await tokenMotorista();
       const res = await fetch(`${API_URL}/api/rotas/iniciar`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
         body: JSON.stringify({ rotaId }),
       });
       const data = await res.json();
-      if (!res.ok) throw new Error(data.message || "Erro ao iniciar rota");
+      if (!res.ok) throw new Error(data.erro || "Erro ao iniciar rota");
+      await transmitirPosicao(data.viagem_id, token);
       Alert.alert("Rota Iniciada", `Você iniciou a rota ${rotaId} com sucesso!`);
     } catch (error: any) {
       Alert.alert("Erro", error.message);